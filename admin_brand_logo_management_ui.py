@@ -11,6 +11,12 @@ import io
 from datetime import datetime
 from typing import List, Dict, Optional
 
+try:
+    from brand_logo_db import invalidate_brand_logo_index
+except ImportError:
+    def invalidate_brand_logo_index():
+        pass
+
 class BrandLogoAdmin:
     """Admin System für Herstellerlogos/Markenlogos"""
     
@@ -116,6 +122,7 @@ class BrandLogoAdmin:
                 datetime.now().isoformat()
             ))
             conn.commit()
+            invalidate_brand_logo_index()  # PDF-Seite 4 liest Logos über den Prozess-Index
             return True
         except sqlite3.IntegrityError:
             st.error(f"Marke '{brand_data['brand_name']}' existiert bereits!")
@@ -153,6 +160,7 @@ class BrandLogoAdmin:
                 brand_id
             ))
             conn.commit()
+            invalidate_brand_logo_index()
             return cursor.rowcount > 0
         except Exception as e:
             st.error(f"Fehler beim Aktualisieren: {e}")
@@ -167,6 +175,7 @@ class BrandLogoAdmin:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM brand_logos WHERE id = ?", [brand_id])
             conn.commit()
+            invalidate_brand_logo_index()
             return cursor.rowcount > 0
         except Exception as e:
             st.error(f"Fehler beim Löschen: {e}")
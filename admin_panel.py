@@ -28,9 +28,16 @@ except Exception:
     pa_upsert_attribute = None  # type: ignore
     pa_delete_attribute = None  # type: ignore
 
+# Datenblätter beim Upload einmalig optimieren (statt bei jedem Angebot)
+try:
+    from pdf_attachment_cache import optimize_attachment_upload
+except Exception:
+    def optimize_attachment_upload(filename, content):  # type: ignore
+        return content
+
 # Import new matrix classes
 try:
-    from matrix_loader import MatrixLoader
+    from matrix_loader import get_price_matrix_loader
     MATRIX_LOADER_AVAILABLE = True
 except ImportError:
     MATRIX_LOADER_AVAILABLE = False
@@ -1007,8 +1014,9 @@ def render_product_management(
                 datasheet_content_bytes_to_write, original_datasheet_filename_to_write = None, None
                 if uploaded_datasheet_pdf_file_form:
                     if uploaded_datasheet_pdf_file_form.size <= 5*1024*1024: 
-                        datasheet_content_bytes_to_write = uploaded_datasheet_pdf_file_form.getvalue()
                         original_datasheet_filename_to_write = uploaded_datasheet_pdf_file_form.name
+                        datasheet_content_bytes_to_write = optimize_attachment_upload(
+                            original_datasheet_filename_to_write, uploaded_datasheet_pdf_file_form.getvalue())
                         st.success(f"✅ Datenblatt erfolgreich verarbeitet: {uploaded_datasheet_pdf_file_form.name} ({uploaded_datasheet_pdf_file_form.size} Bytes)")
                     else: 
                         st.error(get_text_local("product_error_datasheet_too_large","Datenblatt-PDF zu groß (max. 5MB). Nicht hochgeladen."))
@@ -1336,6 +1344,19 @@ def render_general_settings_extended(load_admin_setting_func: Callable, save_adm
             else:
                 st.error("Fehler beim Speichern der Cheat-Einstellung.")
 
+def _refresh_compiled_price_matrix(matrix_loader, load_admin_setting_func):
+    """Kompiliert die gespeicherten Preismatrizen und entfernt veraltete Binärdateien."""
+    try:
+        excel_bytes = load_admin_setting_func('price_matrix_excel_bytes', None)
+        csv_data = load_admin_setting_func('price_matrix_csv_data', "")
+        excel_bytes = excel_bytes if isinstance(excel_bytes, (bytes, bytearray)) else None
+        csv_data = csv_data if isinstance(csv_data, str) else None
+        matrix_loader.compile_matrix(excel_bytes=excel_bytes, csv_data=csv_data)
+        matrix_loader.prune_compiled(matrix_loader.source_hashes(excel_bytes, csv_data))
+    except Exception as e_compile:
+        print(f"Fehler beim Kompilieren der Preis-Matrix: {e_compile}")
+
+
 def render_price_matrix(load_admin_setting_func: Callable, save_admin_setting_func: Callable, parse_csv_func_from_calculations: Callable, parse_excel_func_local_admin: Callable):
     """
     Render price matrix management UI.
@@ -1353,7 +1374,7 @@ def render_price_matrix(load_admin_setting_func: Callable, save_admin_setting_fu
 
     # Initialize MatrixLoader
     if MATRIX_LOADER_AVAILABLE:
-        matrix_loader = MatrixLoader()
+        matrix_loader = get_price_matrix_loader()
     else:
         st.error("MatrixLoader nicht verfügbar. Bitte neue Preismatrix-Klassen installieren.")
         return
@@ -1370,16 +1391,16 @@ def render_price_matrix(load_admin_setting_func: Callable, save_admin_setting_fu
             excel_bytes_content = uploaded_file_excel.getvalue()
             
             # Use MatrixLoader to parse Excel
-            price_matrix = matrix_loader.load_matrix(excel_bytes=excel_bytes_content)
+            matrix_df, _, matrix_errors = matrix_loader.load_matrix(excel_bytes=excel_bytes_content, persist=False)
             
-            if price_matrix and price_matrix.df is not None and not price_matrix.df.empty:
+            if matrix_df is not None and not matrix_df.empty:
                 st.session_state.uploaded_excel_bytes_for_save_admin = excel_bytes_content
-                st.session_state.parsed_excel_df_for_preview_admin = price_matrix.df
+                st.session_state.parsed_excel_df_for_preview_admin = matrix_df
                 st.success(get_text_local("admin_xlsx_parse_success", "Excel erfolgreich geparst."))
                 
                 # Show validation errors if any
-                if price_matrix.validation_errors:
-                    for error in price_matrix.validation_errors:
+                if matrix_errors:
+                    for error in matrix_errors:
                         st.warning(f"Validierung: {error}")
             else:
                 st.error(get_text_local("admin_xlsx_parse_error_empty", "Excel konnte nicht geparst werden oder ist leer."))
@@ -1402,6 +1423,7 @@ def render_price_matrix(load_admin_setting_func: Callable, save_admin_setting_fu
             if st.session_state.uploaded_excel_bytes_for_save_admin:
                 if save_admin_setting_func('price_matrix_excel_bytes', st.session_state.uploaded_excel_bytes_for_save_admin):
                     st.success("Preis-Matrix (Excel) gespeichert!")
+                    _refresh_compiled_price_matrix(matrix_loader, load_admin_setting_func)
                     st.session_state.uploaded_excel_bytes_for_save_admin = None
                     st.session_state.parsed_excel_df_for_preview_admin = None
                     st.session_state.selected_page_key_sui = "admin"
@@ -1419,18 +1441,19 @@ def render_price_matrix(load_admin_setting_func: Callable, save_admin_setting_fu
     if current_price_matrix_excel_bytes_from_db and isinstance(current_price_matrix_excel_bytes_from_db, bytes):
         try:
             # Use MatrixLoader to display current matrix
-            current_matrix = matrix_loader.load_matrix(excel_bytes=current_price_matrix_excel_bytes_from_db)
+            current_df, _, current_errors = matrix_loader.load_matrix(excel_bytes=current_price_matrix_excel_bytes_from_db)
             
-            if current_matrix and current_matrix.df is not None and not current_matrix.df.empty:
-                st.dataframe(current_matrix.df, use_container_width=True)
+            if current_df is not None and not current_df.empty:
+                st.dataframe(current_df, use_container_width=True)
                 
-                if current_matrix.validation_errors:
-                    for error in current_matrix.validation_errors:
+                if current_errors:
+                    for error in current_errors:
                         st.warning(f"Hinweis: {error}")
                         
                 if st.button(get_text_local("admin_delete_saved_price_matrix_button_xlsx", "Excel Preis-Matrix löschen"), key=f"delete_price_matrix_excel_final{WIDGET_KEY_SUFFIX}"):
                     if save_admin_setting_func('price_matrix_excel_bytes', None):
                         st.success("Excel Preis-Matrix gelöscht.")
+                        _refresh_compiled_price_matrix(matrix_loader, load_admin_setting_func)
                         st.session_state.selected_page_key_sui = "admin"
                         st.rerun()
                     else:
@@ -1466,16 +1489,16 @@ def render_price_matrix(load_admin_setting_func: Callable, save_admin_setting_fu
             
             if csv_content_temp is not None:
                 # Use MatrixLoader to parse CSV
-                price_matrix = matrix_loader.load_matrix(csv_data=csv_content_temp)
+                matrix_df, _, matrix_errors = matrix_loader.load_matrix(csv_data=csv_content_temp, persist=False)
                 
-                if price_matrix and price_matrix.df is not None and not price_matrix.df.empty:
+                if matrix_df is not None and not matrix_df.empty:
                     st.session_state.uploaded_csv_content_for_save_admin = csv_content_temp
-                    st.session_state.parsed_csv_df_for_preview_admin = price_matrix.df
+                    st.session_state.parsed_csv_df_for_preview_admin = matrix_df
                     st.success(get_text_local("admin_csv_parse_success", "CSV erfolgreich geparst."))
                     
                     # Show validation errors if any
-                    if price_matrix.validation_errors:
-                        for error in price_matrix.validation_errors:
+                    if matrix_errors:
+                        for error in matrix_errors:
                             st.warning(f"Validierung: {error}")
                 else:
                     st.error(get_text_local("admin_csv_parse_error_empty", "CSV konnte nicht geparst werden oder ist leer."))
@@ -1498,6 +1521,7 @@ def render_price_matrix(load_admin_setting_func: Callable, save_admin_setting_fu
             if st.session_state.uploaded_csv_content_for_save_admin:
                 if save_admin_setting_func('price_matrix_csv_data', st.session_state.uploaded_csv_content_for_save_admin):
                     st.success("Preis-Matrix (CSV) gespeichert!")
+                    _refresh_compiled_price_matrix(matrix_loader, load_admin_setting_func)
                     st.session_state.uploaded_csv_content_for_save_admin = None
                     st.session_state.parsed_csv_df_for_preview_admin = None
                     st.session_state.selected_page_key_sui = "admin"
@@ -1514,18 +1538,19 @@ def render_price_matrix(load_admin_setting_func: Callable, save_admin_setting_fu
     if current_price_matrix_csv_from_db and isinstance(current_price_matrix_csv_from_db, str) and current_price_matrix_csv_from_db.strip():
         try:
             # Use MatrixLoader to display current CSV matrix
-            current_csv_matrix = matrix_loader.load_matrix(csv_data=current_price_matrix_csv_from_db)
+            current_csv_df, _, current_csv_errors = matrix_loader.load_matrix(csv_data=current_price_matrix_csv_from_db)
             
-            if current_csv_matrix and current_csv_matrix.df is not None and not current_csv_matrix.df.empty:
-                st.dataframe(current_csv_matrix.df, use_container_width=True)
+            if current_csv_df is not None and not current_csv_df.empty:
+                st.dataframe(current_csv_df, use_container_width=True)
                 
-                if current_csv_matrix.validation_errors:
-                    for error in current_csv_matrix.validation_errors:
+                if current_csv_errors:
+                    for error in current_csv_errors:
                         st.warning(f"Hinweis: {error}")
                         
                 if st.button(get_text_local("admin_delete_saved_price_matrix_button_csv", "CSV Preis-Matrix löschen"), key=f"delete_price_matrix_csv_final{WIDGET_KEY_SUFFIX}"):
                     if save_admin_setting_func('price_matrix_csv_data', None):
                         st.success("CSV Preis-Matrix gelöscht.")
+                        _refresh_compiled_price_matrix(matrix_loader, load_admin_setting_func)
                         st.session_state.selected_page_key_sui = "admin"
                         st.rerun()
                     else:
@@ -1729,17 +1754,23 @@ def render_pdf_design_settings(load_admin_setting_func: Callable, save_admin_set
 
 def manage_templates_local(template_type_key: str, template_list_setting_key: str, item_name_label_key: str, item_content_label_key: Optional[str] = None, is_image_template: bool = False ):
     st.subheader(get_text_local(f"admin_{template_type_key}_header", f"{template_type_key.replace('_', ' ').title()} Vorlagen"))
-    templates: List[Dict[str, Any]] = _load_admin_setting_safe(template_list_setting_key, [])
-    if not isinstance(templates, list): st.error(f"Fehler: Vorlagendaten für '{template_list_setting_key}' nicht im Listenformat."); templates = []
+    # Vorlagen liegen in pdf_templates (Bilder als Blobs); die Liste enthält nur Metadaten, Bilder werden per ID geladen
+    try:
+        import pdf_template_store
+    except ImportError as e_store:
+        st.error(f"Vorlagenspeicher nicht verfügbar: {e_store}"); return
+    template_type = pdf_template_store.TEMPLATE_SETTING_KEYS.get(template_list_setting_key, template_type_key)
+    templates: List[Dict[str, Any]] = pdf_template_store.list_templates(template_type)
+    templates_by_id = {t['id']: t for t in templates}
     form_key_mt = f"{template_type_key}_form_mt_local_tpl{WIDGET_KEY_SUFFIX}"
     edit_mode_session_key = f"edit_mode_template_{template_type_key}{WIDGET_KEY_SUFFIX}"
     edit_index_session_key = f"edit_index_template_{template_type_key}{WIDGET_KEY_SUFFIX}"
     if edit_mode_session_key not in st.session_state: st.session_state[edit_mode_session_key] = False
     if edit_index_session_key not in st.session_state: st.session_state[edit_index_session_key] = -1
-    options_for_select = [get_text_local("admin_template_add_new_option", "--- Neue Vorlage erstellen ---")] + [f"{t.get('name', f'Vorlage {i+1}')} (ID: {i})" for i, t in enumerate(templates)]
+    options_for_select = [get_text_local("admin_template_add_new_option", "--- Neue Vorlage erstellen ---")] + [f"{t.get('name', f'Vorlage {i+1}')} (ID: {t['id']})" for i, t in enumerate(templates)]
     current_selection_index = 0
     if st.session_state[edit_mode_session_key] and st.session_state[edit_index_session_key] != -1:
-        if 0 <= st.session_state[edit_index_session_key] < len(templates): current_selection_index = st.session_state[edit_index_session_key] + 1
+        if st.session_state[edit_index_session_key] in templates_by_id: current_selection_index = list(templates_by_id).index(st.session_state[edit_index_session_key]) + 1
         else: st.session_state[edit_mode_session_key] = False; st.session_state[edit_index_session_key] = -1
     selected_template_display_name = st.selectbox(get_text_local("admin_select_template_to_edit_or_add_new", "Vorlage bearbeiten..."), options=options_for_select, key=f"select_or_add_template_{template_type_key}{WIDGET_KEY_SUFFIX}_select", index=current_selection_index)
     if selected_template_display_name == get_text_local("admin_template_add_new_option", "--- Neue Vorlage erstellen ---"):
@@ -1747,81 +1778,66 @@ def manage_templates_local(template_type_key: str, template_list_setting_key: st
             st.session_state[edit_mode_session_key] = False; st.session_state[edit_index_session_key] = -1; st.session_state.selected_page_key_sui = "admin"; st.rerun()
     else:
         try:
-            selected_idx = int(selected_template_display_name.split("(ID: ")[1].replace(")", ""))
-            if not st.session_state[edit_mode_session_key] or st.session_state[edit_index_session_key] != selected_idx:
-                st.session_state[edit_mode_session_key] = True; st.session_state[edit_index_session_key] = selected_idx; st.session_state.selected_page_key_sui = "admin"; st.rerun()
+            selected_id = int(selected_template_display_name.rsplit("(ID: ", 1)[1].replace(")", ""))
+            if not st.session_state[edit_mode_session_key] or st.session_state[edit_index_session_key] != selected_id:
+                st.session_state[edit_mode_session_key] = True; st.session_state[edit_index_session_key] = selected_id; st.session_state.selected_page_key_sui = "admin"; st.rerun()
         except (IndexError, ValueError):
             st.error(get_text_local("admin_template_selection_error", "Fehler bei der Auswahl der Vorlage..."))
             if st.session_state[edit_mode_session_key] or st.session_state[edit_index_session_key] != -1:
                 st.session_state[edit_mode_session_key] = False; st.session_state[edit_index_session_key] = -1; st.session_state.selected_page_key_sui = "admin"; st.rerun()
-    current_name_val = ""; current_content_val = ""; current_image_data_b64 = None
-    if st.session_state[edit_mode_session_key] and st.session_state[edit_index_session_key] != -1:
-        if 0 <= st.session_state[edit_index_session_key] < len(templates):
-            template_to_edit = templates[st.session_state[edit_index_session_key]]; current_name_val = template_to_edit.get('name', '')
-            if is_image_template: current_image_data_b64 = template_to_edit.get('data')
-            else: current_content_val = template_to_edit.get('content', '')
+    editing_id = st.session_state[edit_index_session_key] if st.session_state[edit_mode_session_key] and st.session_state[edit_index_session_key] != -1 else None
+    current_name_val = ""; current_content_val = ""; current_image_bytes = None
+    if editing_id is not None:
+        if editing_id in templates_by_id:
+            template_to_edit = templates_by_id[editing_id]; current_name_val = template_to_edit.get('name', '')
+            if is_image_template: current_image_bytes = pdf_template_store.get_template_image(editing_id)
+            else: current_content_val = template_to_edit.get('content') or ''
         else:
             st.warning(get_text_local("admin_template_edit_invalid_index_warning", "Die ausgewählte Vorlage...existiert nicht mehr...")); st.session_state[edit_mode_session_key] = False; st.session_state[edit_index_session_key] = -1; st.session_state.selected_page_key_sui = "admin"; st.rerun()
     with st.form(form_key_mt, clear_on_submit=False): # clear_on_submit hier auf False, um Werte bei Validierungsfehlern zu behalten
         st.markdown(f"**{get_text_local('admin_template_edit_add_header', 'Vorlage erstellen / bearbeiten')}**")
         new_template_name = st.text_input(get_text_local(item_name_label_key, "Vorlagenname"), value=current_name_val, key=f"{template_type_key}_name_input_mt{WIDGET_KEY_SUFFIX}_form")
-        new_template_data_b64_for_save = None; new_template_content_input = "" 
+        new_template_image_bytes = None; new_template_content_input = ""
         if is_image_template:
             uploaded_image_file = st.file_uploader(get_text_local("admin_upload_title_image", "Bild hochladen..."), type=["png", "jpg", "jpeg"], key=f"{template_type_key}_upload_fu_mt{WIDGET_KEY_SUFFIX}_form")
-            if uploaded_image_file: new_template_data_b64_for_save = base64.b64encode(uploaded_image_file.getvalue()).decode('utf-8'); st.image(uploaded_image_file, caption=get_text_local("admin_image_preview", "Vorschau"), width=200)
-            elif current_image_data_b64 and st.session_state[edit_mode_session_key]:
-                try: st.image(base64.b64decode(current_image_data_b64), caption=get_text_local("admin_current_image", "Aktuelles Bild"), width=200); new_template_data_b64_for_save = current_image_data_b64
+            if uploaded_image_file: new_template_image_bytes = uploaded_image_file.getvalue(); st.image(uploaded_image_file, caption=get_text_local("admin_image_preview", "Vorschau"), width=200)
+            elif current_image_bytes and editing_id is not None:
+                try: st.image(current_image_bytes, caption=get_text_local("admin_current_image", "Aktuelles Bild"), width=200)
                 except Exception: st.error(get_text_local("admin_error_displaying_current_image", "Fehler beim Anzeigen..."))
         else: new_template_content_input = st.text_area(get_text_local(item_content_label_key or "admin_template_content_label", "Inhalt..."), value=current_content_val, height=200, key=f"{template_type_key}_content_ta_mt{WIDGET_KEY_SUFFIX}_form")
         submit_button_text = get_text_local("admin_save_template_button", "Vorlage speichern")
-        if st.session_state[edit_mode_session_key] and st.session_state[edit_index_session_key] != -1: submit_button_text = get_text_local("admin_update_template_button", "Vorlage aktualisieren")
+        if editing_id is not None: submit_button_text = get_text_local("admin_update_template_button", "Vorlage aktualisieren")
         submitted = st.form_submit_button(submit_button_text)
         if submitted:
             if not new_template_name.strip(): st.error(get_text_local("admin_template_name_required", "Vorlagenname ist erforderlich."))
+            elif is_image_template and not new_template_image_bytes and editing_id is None:
+                st.error(get_text_local("admin_image_required_for_new_template", "Für eine neue Bildvorlage..."))
             else:
-                new_template_entry = {"name": new_template_name.strip()}; valid_to_save = True
-                if is_image_template:
-                    if new_template_data_b64_for_save: new_template_entry["data"] = new_template_data_b64_for_save
-                    elif not st.session_state[edit_mode_session_key]: st.error(get_text_local("admin_image_required_for_new_template", "Für eine neue Bildvorlage...")); valid_to_save = False
-                else: new_template_entry["content"] = new_template_content_input
-                if valid_to_save:
-                    temp_templates_list = templates[:]
-                    if st.session_state[edit_mode_session_key] and st.session_state[edit_index_session_key] != -1:
-                        if 0 <= st.session_state[edit_index_session_key] < len(temp_templates_list): temp_templates_list[st.session_state[edit_index_session_key]] = new_template_entry
-                        else: st.error(get_text_local("admin_template_update_error_invalid_index", "Fehler: Die zu aktualisierende Vorlage...")); valid_to_save = False 
-                    else: temp_templates_list.append(new_template_entry)
-                    if valid_to_save:
-                        if _save_admin_setting_safe(template_list_setting_key, temp_templates_list):
-                            st.success(get_text_local("admin_template_saved_success", "Vorlage gespeichert.")); st.session_state.selected_page_key_sui = "admin"; st.rerun()
-                        else: st.error(get_text_local("admin_template_save_error", "Fehler beim Speichern der Vorlage."))
-    if st.session_state[edit_mode_session_key] and st.session_state[edit_index_session_key] != -1:
-        if 0 <= st.session_state[edit_index_session_key] < len(templates):
-            delete_button_key = f"delete_template_{template_type_key}{WIDGET_KEY_SUFFIX}_outer_btn"
-            confirm_delete_session_key = f"confirm_delete_tpl_{template_type_key}_{st.session_state[edit_index_session_key]}{WIDGET_KEY_SUFFIX}_conf"
-            if st.button(get_text_local("admin_delete_template_button", "Ausgewählte Vorlage löschen"), key=delete_button_key, type="secondary"):
-                if st.session_state.get(confirm_delete_session_key, False):
-                    temp_templates_list_del = templates[:]
-                    try: 
-                        del temp_templates_list_del[st.session_state[edit_index_session_key]]
-                        if _save_admin_setting_safe(template_list_setting_key, temp_templates_list_del):
-                            st.success(get_text_local("admin_template_deleted_success", "Vorlage gelöscht.")); 
-                            if confirm_delete_session_key in st.session_state: del st.session_state[confirm_delete_session_key]
-                            st.session_state[edit_mode_session_key] = False; st.session_state[edit_index_session_key] = -1
-                            st.session_state.selected_page_key_sui = "admin"; st.rerun()
-                        else: st.error(get_text_local("admin_template_delete_error", "Fehler beim Speichern nach dem Löschen..."))
-                    except IndexError: 
-                        st.error("Fehler: Vorlage zum Löschen nicht im Index gefunden (IndexError).")
-                        if confirm_delete_session_key in st.session_state: del st.session_state[confirm_delete_session_key]
-                        st.session_state[edit_mode_session_key] = False; st.session_state[edit_index_session_key] = -1
-                        st.session_state.selected_page_key_sui = "admin"; st.rerun()
-                    except Exception as e: 
-                        st.error(f"Ein unerwarteter Fehler ist beim Löschen aufgetreten: {e}")
-                        if confirm_delete_session_key in st.session_state: del st.session_state[confirm_delete_session_key]
-                        st.session_state[edit_mode_session_key] = False; st.session_state[edit_index_session_key] = -1
-                        st.session_state.selected_page_key_sui = "admin"; st.rerun()
-                else:
-                    st.warning(get_text_local("admin_confirm_delete_template", "Sicher? Erneut klicken zum Löschen."))
-                    st.session_state[confirm_delete_session_key] = True; st.session_state.selected_page_key_sui = "admin"; st.rerun() 
+                # Bei Bildvorlagen ohne neuen Upload bleibt das gespeicherte Bild erhalten
+                saved_id = pdf_template_store.save_template(
+                    template_type, new_template_name.strip(),
+                    content=None if is_image_template else new_template_content_input,
+                    image_data=new_template_image_bytes if is_image_template else None,
+                    template_id=editing_id,
+                )
+                if saved_id is not None:
+                    st.success(get_text_local("admin_template_saved_success", "Vorlage gespeichert.")); st.session_state.selected_page_key_sui = "admin"; st.rerun()
+                elif editing_id is not None: st.error(get_text_local("admin_template_update_error_invalid_index", "Fehler: Die zu aktualisierende Vorlage..."))
+                else: st.error(get_text_local("admin_template_save_error", "Fehler beim Speichern der Vorlage."))
+    if editing_id is not None and editing_id in templates_by_id:
+        delete_button_key = f"delete_template_{template_type_key}{WIDGET_KEY_SUFFIX}_outer_btn"
+        confirm_delete_session_key = f"confirm_delete_tpl_{template_type_key}_{editing_id}{WIDGET_KEY_SUFFIX}_conf"
+        if st.button(get_text_local("admin_delete_template_button", "Ausgewählte Vorlage löschen"), key=delete_button_key, type="secondary"):
+            if st.session_state.get(confirm_delete_session_key, False):
+                deleted = pdf_template_store.delete_template(editing_id)
+                if confirm_delete_session_key in st.session_state: del st.session_state[confirm_delete_session_key]
+                if deleted: st.success(get_text_local("admin_template_deleted_success", "Vorlage gelöscht."))
+                else: st.error(get_text_local("admin_template_delete_error", "Fehler beim Speichern nach dem Löschen..."))
+                st.session_state[edit_mode_session_key] = False; st.session_state[edit_index_session_key] = -1
+                st.session_state.selected_page_key_sui = "admin"; st.rerun()
+            else:
+                st.warning(get_text_local("admin_confirm_delete_template", "Sicher? Erneut klicken zum Löschen."))
+                st.session_state[confirm_delete_session_key] = True; st.session_state.selected_page_key_sui = "admin"; st.rerun() 
     st.markdown("---")
 
 def render_api_key_settings(load_admin_setting_func: Callable, save_admin_setting_func: Callable):
@@ -40,6 +40,21 @@ try:
 except ImportError:
     global_import_errors_analysis: List[str] = []
 
+# Abgeleitete Reihen und fertige Figuren je Fingerprint der Eingangswerte wiederverwenden
+from analysis_series import (
+    annual_cost_series,
+    fingerprint as series_fingerprint,
+    get_series_cache,
+    results_fingerprint as cache_results_fingerprint,
+)
+
+try:
+    # Große Ergebniswerte (Chart-PNGs, DataFrames) als Handles statt im Session State halten
+    from session_blob_store import offload_session_value
+except ImportError:
+    def offload_session_value(slot, value, session_id=None, min_bytes=0):  # type: ignore
+        return value
+
 
 _CALCULATIONS_PERFORM_CALCULATIONS_AVAILABLE = False
 _DATABASE_LOAD_ADMIN_SETTING_AVAILABLE = False
@@ -1019,9 +1034,16 @@ def create_universal_2d_chart(
     y_label: str = "",
     default_chart_type: str = "Balken",
     default_colors: List[str] = None,
+    viz_settings: Optional[Dict[str, Any]] = None,
+    style_key: Optional[str] = None,
+    data_fingerprint: Optional[str] = None,
 ):
     """
     Universelle Funktion für 2D-Diagramme mit Typ- und Farbwahl
+
+    Die fertige Figur wird je Daten-Fingerprint/Diagrammtyp/Farbschema/Stil gecacht (Rückgabe ist eine
+    Kopie). data_fingerprint (z.B. Fingerprint der abgeleiteten Reihe) erspart das Hashen von data;
+    style_key wendet _apply_custom_style_to_fig im Cache an.
     """
     if default_colors is None:
         default_colors = [
@@ -1099,11 +1121,23 @@ def create_universal_2d_chart(
 
         colors = color_palettes.get(color_scheme, default_colors)
 
-        fig = _create_chart_by_type(data, chart_type, colors, title, x_label, y_label)
+        def _build():
+            fig = _create_chart_by_type(data, chart_type, colors, title, x_label, y_label)
+            # Shadcn-ähnliches Theme anwenden (ohne Farbvorgaben zu überschreiben)
+            _apply_shadcn_like_theme(fig)
+            if style_key:
+                _apply_custom_style_to_fig(fig, viz_settings, style_key)
+            return fig
 
-        # Shadcn-ähnliches Theme anwenden (ohne Farbvorgaben zu überschreiben)
-        _apply_shadcn_like_theme(fig)
-        return fig
+        if data_fingerprint is None:
+            # Ohne Reihen-Fingerprint bestimmen die Diagrammdaten selbst den Cache-Schlüssel
+            data_fingerprint = series_fingerprint(data)
+        return get_series_cache().figure(
+            f"universal_2d:{chart_key}",
+            (data_fingerprint, chart_type, color_scheme, tuple(default_colors), title, x_label, y_label,
+             style_key, series_fingerprint(viz_settings)),
+            _build,
+        )
 
     except Exception as e:
         # Fallback: Erstelle ein einfaches Fehler-Diagramm
@@ -1308,7 +1342,8 @@ def create_four_type_chart(
     y_label: str = "",
 ):
     """Spezielle Helper-Funktion nur mit vier erlaubten Typen: Balken, Säulen, Kreis, Donut.
-    Unterstützt entweder (x,y) oder (labels,values).
+    Unterstützt entweder (x,y) oder (labels,values). Die Figur wird je Daten/Typ/Texte gecacht
+    (Rückgabe ist eine Kopie).
     """
     col1, col2 = st.columns([2, 1])
     with col1:
@@ -1319,7 +1354,8 @@ def create_four_type_chart(
             ["Säulen", "Balken", "Kreis", "Donut"],
             key=f"{chart_key}_four_type",
         )
-    try:
+
+    def _build():
         if "x" in data and "y" in data:
             df = pd.DataFrame({"x": data["x"], "y": data["y"]})
             if chart_type == "Säulen":
@@ -1349,6 +1385,13 @@ def create_four_type_chart(
             fig.update_layout(title=title)
         _apply_shadcn_like_theme(fig)
         return fig
+
+    try:
+        return get_series_cache().figure(
+            f"four_type:{chart_key}",
+            (series_fingerprint(data), chart_type, title, x_label, y_label),
+            _build,
+        )
     except Exception as e:
         import plotly.graph_objects as go
         fig = go.Figure()
@@ -1367,9 +1410,14 @@ def create_multi_series_2d_chart(
     x_label: str = "",
     y_label: str = "",
     default_chart_type: str = "Säulen",
+    viz_settings: Optional[Dict[str, Any]] = None,
+    style_key: Optional[str] = None,
+    data_fingerprint: Optional[str] = None,
 ):
     """
     Erstellt 2D-Diagramme für mehrere Datenreihen
+
+    data_fingerprint/style_key wie bei create_universal_2d_chart (Figur-Cache).
     """
     # Diagramm-Konfiguration in Spalten
     col1, col2, col3 = st.columns([2, 1, 1])
@@ -1413,7 +1461,7 @@ def create_multi_series_2d_chart(
     colors = color_palettes.get(color_scheme, ["#1f77b4", "#ff7f0e", "#2ca02c"])
 
     # Multi-Series Chart erstellen
-    try:
+    def _build():
         if isinstance(data, dict) and "categories" in data and "series" in data:
             # Format: {'categories': ['Cat1', 'Cat2'], 'series': [{'name': 'Series1', 'data': [1, 2]}, ...]}
             categories = data["categories"]
@@ -1556,9 +1604,20 @@ def create_multi_series_2d_chart(
             ),
         )
         _apply_shadcn_like_theme(fig)
+        if style_key:
+            _apply_custom_style_to_fig(fig, viz_settings, style_key)
 
         return fig
 
+    try:
+        if data_fingerprint is None:
+            # Ohne Reihen-Fingerprint bestimmen die Diagrammdaten selbst den Cache-Schlüssel
+            data_fingerprint = series_fingerprint(data)
+        return get_series_cache().figure(
+            f"multi_series_2d:{chart_key}",
+            (data_fingerprint, chart_type, color_scheme, title, x_label, y_label, style_key, series_fingerprint(viz_settings)),
+            _build,
+        )
     except Exception as e:
         # Fallback: Erstelle ein einfaches Fehler-Diagramm
         import plotly.graph_objects as go
@@ -1703,6 +1762,11 @@ def _export_plotly_fig_to_bytes(
 ) -> Optional[bytes]:
     if fig is None:
         return None
+    # PNG je Figur-Inhalt nur einmal exportieren (auch für veränderte Kopien aus dem Diagramm-Cache korrekt)
+    return get_series_cache().export_bytes(fig, lambda f: _export_plotly_fig_to_png(f, texts))
+
+
+def _export_plotly_fig_to_png(fig: go.Figure, texts: Dict[str, str]) -> Optional[bytes]:
     # Cache-Key über die Figure-Struktur ableiten
     try:
         fig_json = fig.to_json()
@@ -1909,16 +1973,7 @@ def _compute_annual_cost_series(base_annual_cost: float, years: int, inc_percent
     - inc_percent: jährliche Preissteigerung in % (z. B. 5.0)
     Rückgabe: Liste der jährlichen Kosten je Jahr (nicht kumuliert).
     """
-    try:
-        years = int(max(1, years))
-        base = float(max(0.0, base_annual_cost))
-        r = max(0.0, float(inc_percent)) / 100.0
-    except Exception:
-        years, base, r = 20, 0.0, 0.0
-    series: List[float] = []
-    for i in range(years):
-        series.append(base * ((1.0 + r) ** i))
-    return series
+    return annual_cost_series(base_annual_cost, years, inc_percent).tolist()
 
 
 def _add_chart_controls(
@@ -2021,6 +2076,36 @@ def _add_chart_controls(
             st.session_state[key_secondary_color] = new_secondary_color
     st.markdown("---")
 
+def _cached_controlled_chart(
+    chart_key_prefix: str,
+    analysis_results: Dict[str, Any],
+    input_keys: Tuple[str, ...],
+    texts: Dict[str, str],
+    viz_settings: Dict[str, Any],
+    build,
+) -> Optional[go.Figure]:
+    """Figur eines Diagramms mit _add_chart_controls aus dem Cache (Key: Eingangswerte, Auswahl, Texte, Stil)."""
+    controls_state = tuple(
+        st.session_state.get(key)
+        for key in (
+            f"{chart_key_prefix}_type",
+            f"color_method_is_manual_{chart_key_prefix}",
+            f"{chart_key_prefix}_primary_color",
+            f"{chart_key_prefix}_secondary_color",
+            f"{chart_key_prefix}_color_palette",
+        )
+    )
+    cache = get_series_cache()
+    return cache.figure(
+        f"controlled:{chart_key_prefix}",
+        (
+            cache_results_fingerprint(analysis_results, input_keys),
+            controls_state,
+            series_fingerprint(texts, viz_settings),
+        ),
+        build,
+    )
+
 def render_daily_production_switcher(
     analysis_results: Dict[str, Any],
     texts: Dict[str, str],
@@ -2059,37 +2144,46 @@ def render_daily_production_switcher(
     )
 
     pv_label = get_text(texts, "pv_power_label_switcher", "Photovoltaik-Leistung (kW)")
-    fig = go.Figure()
-    if chart_type in ("Säulen", "Balken"):
-        if chart_type == "Säulen":
+
+    def _build():
+        fig = go.Figure()
+        if chart_type in ("Säulen", "Balken"):
+            if chart_type == "Säulen":
+                fig.add_trace(go.Bar(x=hours, y=power, name=pv_label))
+            else:
+                fig.add_trace(go.Bar(y=hours, x=power, orientation="h", name=pv_label))
+        elif chart_type == "Strich":
+            fig.add_trace(
+                go.Scatter(x=hours, y=power, mode="lines+markers", name=pv_label)
+            )
+        elif chart_type in ("Kreis", "Donut"):
+            total = sum(power) or 1.0
+            shares = [p / total for p in power]
+            hole = 0.4 if chart_type == "Donut" else 0
+            fig = px.pie(
+                names=[f"{h}h" for h in hours],
+                values=shares,
+                hole=hole,
+                title=title,
+            )
+        else:  # Fallback
             fig.add_trace(go.Bar(x=hours, y=power, name=pv_label))
-        else:
-            fig.add_trace(go.Bar(y=hours, x=power, orientation="h", name=pv_label))
-    elif chart_type == "Strich":
-        fig.add_trace(
-            go.Scatter(x=hours, y=power, mode="lines+markers", name=pv_label)
-        )
-    elif chart_type in ("Kreis", "Donut"):
-        total = sum(power) or 1.0
-        shares = [p / total for p in power]
-        hole = 0.4 if chart_type == "Donut" else 0
-        fig = px.pie(
-            names=[f"{h}h" for h in hours],
-            values=shares,
-            hole=hole,
-            title=title,
-        )
-    else:  # Fallback
-        fig.add_trace(go.Bar(x=hours, y=power, name=pv_label))
 
-    if chart_type not in ("Kreis", "Donut"):
-        fig.update_layout(
-            title=title,
-            xaxis_title="Stunde" if chart_type != "Balken" else pv_label,
-            yaxis_title=pv_label if chart_type != "Balken" else "Stunde",
-            template="plotly_white",
-        )
-    _apply_custom_style_to_fig(fig, viz_settings, "daily_production_switcher")
+        if chart_type not in ("Kreis", "Donut"):
+            fig.update_layout(
+                title=title,
+                xaxis_title="Stunde" if chart_type != "Balken" else pv_label,
+                yaxis_title=pv_label if chart_type != "Balken" else "Stunde",
+                template="plotly_white",
+            )
+        _apply_custom_style_to_fig(fig, viz_settings, "daily_production_switcher")
+        return fig
+
+    fig = get_series_cache().figure(
+        "daily_production_switcher",
+        (series_fingerprint(power), chart_type, title, pv_label, series_fingerprint(viz_settings)),
+        _build,
+    )
     with st.expander(title, expanded=False):
         st.plotly_chart(fig, use_container_width=True, key="analysis_daily_prod_switcher_key_v7_2d")
     analysis_results["daily_production_switcher_chart_bytes"] = _export_plotly_fig_to_bytes(fig, texts)
@@ -2630,7 +2724,7 @@ def render_production_vs_consumption_switcher(
 
     colors = color_palettes.get(color_scheme, ["#1f77b4", "#ff7f0e"])
 
-    # Diagramm erstellen
+    # Diagramm erstellen (bewusst ohne Figur-Cache, siehe Umfang in analysis_series)
     if chart_type == "Säulen":
         fig = go.Figure()
         fig.add_trace(
@@ -3900,14 +3994,10 @@ def render_selfuse_stack_switcher(
         return
 
     jahre_sim_labels = [f"Jahr {i}" for i in range(1, years_effective + 1)]
-    annual_prod_sim_raw = analysis_results.get("annual_productions_sim", [])
-    annual_prod_sim = [
-        float(p)
-        for p in annual_prod_sim_raw
-        if isinstance(p, (int, float)) and not math.isnan(p) and not math.isinf(p)
-    ]
+    series_cache = get_series_cache()
+    annual_prod_sim = series_cache.series("annual_productions", analysis_results)
 
-    if not (annual_prod_sim and len(annual_prod_sim) == years_effective):
+    if not (len(annual_prod_sim) and len(annual_prod_sim) == years_effective):
         st.info(
             get_text(
                 texts,
@@ -3918,45 +4008,15 @@ def render_selfuse_stack_switcher(
         analysis_results["selfuse_stack_switcher_chart_bytes"] = None
         return
 
-    # Berechnungen aus Jahr 1
-    monthly_direct_sc_yr1_sum = sum(
-        float(v)
-        for v in analysis_results.get("monthly_direct_self_consumption_kwh", [])
-        if isinstance(v, (int, float)) and not math.isnan(v) and not math.isinf(v)
-    )
-    monthly_storage_discharge_sc_yr1_sum = sum(
-        float(v)
-        for v in analysis_results.get("monthly_storage_discharge_for_sc_kwh", [])
-        if isinstance(v, (int, float)) and not math.isnan(v) and not math.isinf(v)
-    )
-    eigenverbrauch_yr1_kwh = (
-        monthly_direct_sc_yr1_sum + monthly_storage_discharge_sc_yr1_sum
-    )
-    einspeisung_yr1_kwh = sum(
-        float(v)
-        for v in analysis_results.get("monthly_feed_in_kwh", [])
-        if isinstance(v, (int, float)) and not math.isnan(v) and not math.isinf(v)
-    )
-
-    produktion_yr1_kwh_raw = analysis_results.get("annual_pv_production_kwh")
-    produktion_yr1_kwh = float(
-        produktion_yr1_kwh_raw
-        if isinstance(produktion_yr1_kwh_raw, (int, float))
-        and produktion_yr1_kwh_raw > 0
-        else 1.0
-    )
-    anteil_eigenverbrauch_yr1 = eigenverbrauch_yr1_kwh / produktion_yr1_kwh
-    anteil_einspeisung_yr1 = einspeisung_yr1_kwh / produktion_yr1_kwh
-
-    eigen_sim_kwh = [prod * anteil_eigenverbrauch_yr1 for prod in annual_prod_sim]
-    einspeisung_sim_kwh = [prod * anteil_einspeisung_yr1 for prod in annual_prod_sim]
+    # Eigenverbrauch/Einspeisung je Jahr mit den Anteilen aus Jahr 1 (Zeile 0/1 der abgeleiteten Reihe)
+    eigen_sim_kwh, einspeisung_sim_kwh = series_cache.series("selfuse_stack", analysis_results)
 
     # Chart-Daten für Multi-Series Chart vorbereiten
     chart_data = {
         "categories": jahre_sim_labels,
         "series": [
-            {"name": "Eigenverbrauch (kWh)", "data": eigen_sim_kwh},
-            {"name": "Einspeisung (kWh)", "data": einspeisung_sim_kwh},
+            {"name": "Eigenverbrauch (kWh)", "data": eigen_sim_kwh.tolist()},
+            {"name": "Einspeisung (kWh)", "data": einspeisung_sim_kwh.tolist()},
         ],
     }
 
@@ -3972,9 +4032,11 @@ def render_selfuse_stack_switcher(
         x_label="Simulationsjahr",
         y_label="Energie (kWh)",
         chart_key="analysis_selfuse_stack_switcher_key_v6_final",
+        viz_settings=viz_settings,
+        style_key="selfuse_stack_switcher",
+        data_fingerprint=series_cache.series_fingerprint("selfuse_stack", analysis_results),
     )
 
-    _apply_custom_style_to_fig(fig, viz_settings, "selfuse_stack_switcher")
     with st.expander(title, expanded=False):
         st.plotly_chart(
             fig,
@@ -4026,12 +4088,9 @@ def render_cost_growth_switcher(
     chart_data = {"categories": [f"Jahr {jahr}" for jahr in jahre_axis], "series": []}
 
     for s_percent in szenarien_prozent_vals:
-        s_rate = s_percent / 100.0
-        kosten_kwh_pro_jahr = [
-            basispreis_kwh * ((1 + s_rate) ** (jahr - 1)) for jahr in jahre_axis
-        ]
+        kosten_kwh_pro_jahr = basispreis_kwh * np.power(1 + s_percent / 100.0, jahre_axis - 1)
         chart_data["series"].append(
-            {"name": f"{s_percent:.2f}% p.a.", "data": kosten_kwh_pro_jahr}
+            {"name": f"{s_percent:.2f}% p.a.", "data": kosten_kwh_pro_jahr.tolist()}
         )
 
     title = get_text(
@@ -4046,9 +4105,11 @@ def render_cost_growth_switcher(
         x_label="Simulationsjahr",
         y_label="Strompreis (€/kWh)",
         chart_key="analysis_cost_growth_switcher_key_v6_final",
+        viz_settings=viz_settings,
+        style_key="cost_growth_switcher",
+        data_fingerprint=series_fingerprint(years_effective, basispreis_kwh, szenarien_prozent_vals),
     )
 
-    _apply_custom_style_to_fig(fig, viz_settings, "cost_growth_switcher")
     with st.expander(cost_growth_subheader, expanded=False):
         st.plotly_chart(
             fig,
@@ -4090,36 +4151,10 @@ def render_selfuse_ratio_switcher(
             "Nov",
             "Dez",
         ]
-    m_total_cons_raw = analysis_results.get("monthly_consumption_sim", [])
-    m_direct_sc_raw = analysis_results.get("monthly_direct_self_consumption_kwh", [])
-    m_storage_sc_raw = analysis_results.get("monthly_storage_discharge_for_sc_kwh", [])
-    m_total_cons = [
-        (
-            float(v)
-            if isinstance(v, (int, float)) and not math.isnan(v) and not math.isinf(v)
-            else 0.0
-        )
-        for v in m_total_cons_raw
-    ]
-    m_direct_sc = [
-        (
-            float(v)
-            if isinstance(v, (int, float)) and not math.isnan(v) and not math.isinf(v)
-            else 0.0
-        )
-        for v in m_direct_sc_raw
-    ]
-    m_storage_sc = [
-        (
-            float(v)
-            if isinstance(v, (int, float)) and not math.isnan(v) and not math.isinf(v)
-            else 0.0
-        )
-        for v in m_storage_sc_raw
-    ]
-    if not (
-        len(m_total_cons) == 12 and len(m_direct_sc) == 12 and len(m_storage_sc) == 12
-    ):
+    series_cache = get_series_cache()
+    # Leer, wenn Verbrauch/Direktverbrauch/Speicherentladung nicht je 12 Monatswerte haben
+    ev_monat_grad = series_cache.series("monthly_selfuse_ratio", analysis_results)
+    if len(ev_monat_grad) != 12:
         st.info(
             get_text(
                 texts,
@@ -4129,15 +4164,8 @@ def render_selfuse_ratio_switcher(
         )
         analysis_results["selfuse_ratio_switcher_chart_bytes"] = None
         return
-    ev_monat_kwh = [(d or 0) + (s or 0) for d, s in zip(m_direct_sc, m_storage_sc)]
-    ev_monat_grad = [
-        (ekwh / (c_tot if c_tot > 0 else 1) * 100)
-        for ekwh, c_tot in zip(ev_monat_kwh, m_total_cons)
-    ]
-    max_ev_kwh = max(ev_monat_kwh) if any(ev_monat_kwh) else 1.0
-    bubble_sizes = [(v / max_ev_kwh * 30) + 10 for v in ev_monat_kwh]
     #  PROFESSIONELLES 2D SHADCN CHART FÜR EIGENVERBRAUCH 
-    chart_data = {"x": month_labels, "y": ev_monat_grad}
+    chart_data = {"x": month_labels, "y": ev_monat_grad.tolist()}
 
     title = get_text(
         texts,
@@ -4151,8 +4179,12 @@ def render_selfuse_ratio_switcher(
         x_label="Monat",
         y_label="Eigenversorgungsgrad (%)",
         chart_key="selfuse_ratio_modern_2d_chart",
+        viz_settings=viz_settings,
+        style_key="selfuse_ratio_switcher",
+        data_fingerprint=series_fingerprint(
+            series_cache.series_fingerprint("monthly_selfuse_ratio", analysis_results), month_labels
+        ),
     )
-    _apply_custom_style_to_fig(fig, viz_settings, "selfuse_ratio_switcher")
     with st.expander(selfuse_ratio_subheader, expanded=False):
         st.plotly_chart(
             fig,
@@ -4449,13 +4481,9 @@ def render_income_projection_switcher(
         analysis_results["income_projection_switcher_chart_bytes"] = None
         return
     jahre_axis = np.arange(0, years_effective + 1)
-    annual_benefits_raw = analysis_results.get("annual_benefits_sim", [])
-    annual_benefits = [
-        float(b)
-        for b in annual_benefits_raw
-        if isinstance(b, (int, float)) and not math.isnan(b) and not math.isinf(b)
-    ]
-    if not (annual_benefits and len(annual_benefits) == years_effective):
+    series_cache = get_series_cache()
+    annual_benefits = series_cache.series("annual_benefits", analysis_results)
+    if not (len(annual_benefits) and len(annual_benefits) == years_effective):
         st.info(
             get_text(
                 texts,
@@ -4466,15 +4494,11 @@ def render_income_projection_switcher(
         analysis_results["income_projection_switcher_chart_bytes"] = None
         return
 
-    # Kumulierte Vorteile berechnen (Jahr 0 = 0, dann aufsummiert)
-    kum_vorteile = [0.0]  # Jahr 0 startet bei 0
-    running_total = 0.0
-    for benefit in annual_benefits:
-        running_total += benefit
-        kum_vorteile.append(running_total)
+    # Kumulierte Vorteile (Jahr 0 = 0, dann aufsummiert)
+    kum_vorteile = series_cache.series("cumulative_benefits", analysis_results)
 
     #  PROFESSIONELLE 2D EINNAHMENPROGNOSE 
-    chart_data = {"x": [f"Jahr {int(year)}" for year in jahre_axis], "y": kum_vorteile}
+    chart_data = {"x": [f"Jahr {int(year)}" for year in jahre_axis], "y": kum_vorteile.tolist()}
 
     title = get_text(
         texts,
@@ -4488,8 +4512,10 @@ def render_income_projection_switcher(
         x_label="Simulationsjahr",
         y_label="Kumulierte Vorteile (€)",
         chart_key="income_projection_modern_2d_chart",
+        viz_settings=viz_settings,
+        style_key="income_projection_switcher",
+        data_fingerprint=series_cache.series_fingerprint("cumulative_benefits", analysis_results),
     )
-    _apply_custom_style_to_fig(fig, viz_settings, "income_projection_switcher")
     with st.expander(income_proj_subheader, expanded=False):
         st.plotly_chart(
             fig,
@@ -4520,22 +4546,9 @@ def _create_monthly_production_consumption_chart(
         and len(monthly_cons_raw) == 12
     ):
         return None
-    monthly_prod = [
-        (
-            float(v)
-            if isinstance(v, (int, float)) and not math.isnan(v) and not math.isinf(v)
-            else 0.0
-        )
-        for v in monthly_prod_raw
-    ]
-    monthly_cons = [
-        (
-            float(v)
-            if isinstance(v, (int, float)) and not math.isnan(v) and not math.isinf(v)
-            else 0.0
-        )
-        for v in monthly_cons_raw
-    ]
+    series_cache = get_series_cache()
+    monthly_prod = series_cache.series("monthly_productions", analysis_results_local)
+    monthly_cons = series_cache.series("monthly_consumption", analysis_results_local)
     month_labels_chart = get_text(
         texts_local,
         "month_names_short_list_chart",
@@ -4708,14 +4721,7 @@ def _create_electricity_cost_projection_chart(
     ):
         return None
 
-    projected_costs = [
-        (
-            float(c)
-            if isinstance(c, (int, float)) and not math.isnan(c) and not math.isinf(c)
-            else 0.0
-        )
-        for c in projected_costs_raw
-    ]
+    projected_costs = get_series_cache().series("projected_annual_costs", analysis_results_local)
     sim_years_proj = sim_years_proj_raw
     price_increase_proj = float(price_increase_proj_raw)
 
@@ -4815,16 +4821,7 @@ def _create_cumulative_cashflow_chart(
     cumulative_cf_raw = analysis_results_local.get("cumulative_cash_flows_sim", [])
     if not (cumulative_cf_raw and isinstance(cumulative_cf_raw, list)):
         return None
-    cumulative_cf = [
-        (
-            float(cf)
-            if isinstance(cf, (int, float))
-            and not math.isnan(cf)
-            and not math.isinf(cf)
-            else 0.0
-        )
-        for cf in cumulative_cf_raw
-    ]
+    cumulative_cf = get_series_cache().series("cumulative_cash_flows", analysis_results_local)
 
     years_axis_cf = list(range(len(cumulative_cf)))
     df_cf = pd.DataFrame(
@@ -7020,7 +7017,7 @@ def render_analysis(
     # *** BACKUP-VERSTÄRKUNG: Zusätzliche Session State Speicherung in analysis.py ***
     try:
         # Aktualisiere Session State mit aktuellen Ergebnissen
-        st.session_state.calculation_results = results_for_display.copy()
+        st.session_state.calculation_results = offload_session_value("calculation_results", results_for_display)
 
         # NEU: Falls Wärmepumpen-Modus aktiv: relevante Bedarfsanalyse-Daten in Session heatpump_offer spiegeln
         if demand_mode in ('wp_only', 'pv_wp_combined'):
@@ -7075,7 +7072,7 @@ def render_analysis(
         ):
             timestamp = datetime.now().isoformat()
             backup_data = {
-                "results": results_for_display.copy(),
+                "results": st.session_state.calculation_results.copy(),
                 "timestamp": timestamp,
                 "project_data_summary": {
                     "anlage_kwp": results_for_display.get("anlage_kwp", 0),
@@ -7087,7 +7084,7 @@ def render_analysis(
                     ),
                 },
             }
-            st.session_state.calculation_results_backup = backup_data
+            st.session_state.calculation_results_backup = offload_session_value("calculation_results_backup", backup_data)
             st.session_state.calculation_timestamp = timestamp
 
         # Debug-Info
@@ -7223,8 +7220,15 @@ def render_analysis(
             supported_types=["bar", "line", "area"],
             viz_settings=viz_settings,
         )
-        fig_monthly_comp = _create_monthly_production_consumption_chart(
-            results_for_display, texts, viz_settings, "monthly_compare"
+        fig_monthly_comp = _cached_controlled_chart(
+            "monthly_compare",
+            results_for_display,
+            ("monthly_productions_sim", "monthly_consumption_sim"),
+            texts,
+            viz_settings,
+            lambda: _create_monthly_production_consumption_chart(
+                results_for_display, texts, viz_settings, "monthly_compare"
+            ),
         )
         if fig_monthly_comp:
             # Modernes Design anwenden!
@@ -7255,8 +7259,19 @@ def render_analysis(
             supported_types=["line", "bar"],
             viz_settings=viz_settings,
         )
-        fig_cost_projection = _create_electricity_cost_projection_chart(
-            results_for_display, texts, viz_settings, "cost_projection"
+        fig_cost_projection = _cached_controlled_chart(
+            "cost_projection",
+            results_for_display,
+            (
+                "annual_costs_hochrechnung_values",
+                "annual_costs_hochrechnung_jahre_effektiv",
+                "annual_costs_hochrechnung_steigerung_effektiv_prozent",
+            ),
+            texts,
+            viz_settings,
+            lambda: _create_electricity_cost_projection_chart(
+                results_for_display, texts, viz_settings, "cost_projection"
+            ),
         )
         if fig_cost_projection:
             # Modernes Design anwenden!
@@ -7347,8 +7362,15 @@ def render_analysis(
             supported_types=["area", "line", "bar"],
             viz_settings=viz_settings,
         )
-        fig_cum_cf = _create_cumulative_cashflow_chart(
-            results_for_display, texts, viz_settings, "cum_cashflow"
+        fig_cum_cf = _cached_controlled_chart(
+            "cum_cashflow",
+            results_for_display,
+            ("cumulative_cash_flows_sim",),
+            texts,
+            viz_settings,
+            lambda: _create_cumulative_cashflow_chart(
+                results_for_display, texts, viz_settings, "cum_cashflow"
+            ),
         )
         if fig_cum_cf:
             if CHART_MODERNIZER_AVAILABLE:
@@ -7780,11 +7802,13 @@ def render_analysis(
         try:
             # Stelle sicher, dass results_for_display ein Dictionary ist und Daten enthält
             if isinstance(results_for_display, dict) and len(results_for_display) > 0:
-                st.session_state["calculation_results"] = results_for_display.copy()
+                st.session_state["calculation_results"] = offload_session_value(
+                    "calculation_results", results_for_display
+                )
 
-                # Backup für Wiederherstellung nach Rerun
-                st.session_state["calculation_results_backup"] = (
-                    results_for_display.copy()
+                # Backup für Wiederherstellung nach Rerun (teilt die ausgelagerten Blobs)
+                st.session_state["calculation_results_backup"] = offload_session_value(
+                    "calculation_results_backup", st.session_state["calculation_results"].copy()
                 )
 
                 # Zusätzliche Validierung: Überprüfe wichtige Keys
@@ -0,0 +1,332 @@
+# analysis_series.py
+# Abgeleitete Zeitreihen und Diagramm-Cache für das Analyse-Dashboard (analysis.py)
+# Die Switcher-Diagramme leiten ihre Reihen (Kosten-Hochrechnung, kumulierte Vorteile, Eigenverbrauchs-Stack, ...)
+# aus analysis_results ab. Jede Reihe wird hier einmal je Fingerprint ihrer Eingangswerte als NumPy-Array berechnet
+# und von allen Diagrammen geteilt. Fertige Plotly-Figuren werden je (Diagramm, Daten-Fingerprint,
+# Diagrammtyp/Stil) zwischengespeichert, sodass ein Rerun nach einer unbeteiligten Widget-Änderung weder Reihen
+# noch Figuren neu aufbaut; Aufrufer erhalten jeweils eine Kopie. PNG-Exporte werden je Figur-Inhalt gecacht.
+#
+# Umfang: gecacht werden alle Diagramme, die über create_universal_2d_chart, create_multi_series_2d_chart,
+# create_four_type_chart oder _cached_controlled_chart (analysis.py) entstehen, sowie der Tagesproduktions-
+# Switcher. Nicht gecacht sind die direkt mit go.Figure gebauten Diagramme der Übersichts-/Detailabschnitte
+# (render_extended_calculations_dashboard, render_advanced_economics, ...) und
+# render_production_vs_consumption_switcher; sie werden bei jedem Rerun neu gebaut.
+from __future__ import annotations
+from typing import Optional, Dict, Any, Callable, Iterable, Mapping, Tuple
+from collections import OrderedDict
+import copy
+import hashlib
+import json
+import threading
+
+import numpy as np
+
+DEFAULT_MAX_SERIES = 512
+DEFAULT_MAX_FIGURES = 128
+
+# name -> (Eingangs-Keys aus analysis_results, Berechnungsfunktion(results, cache))
+_SERIES_REGISTRY: Dict[str, Tuple[Tuple[str, ...], Callable[[Mapping[str, Any], "DerivedSeriesCache"], np.ndarray]]] = {}
+
+_EMPTY = np.zeros(0, dtype=np.float64)
+_EMPTY.flags.writeable = False
+
+
+def derived_series(name: str, inputs: Iterable[str]):
+    """Registriert eine abgeleitete Reihe mit den analysis_results-Keys, von denen sie abhängt."""
+    def decorator(func):
+        _SERIES_REGISTRY[name] = (tuple(inputs), func)
+        return func
+    return decorator
+
+
+def _json_default(value: Any) -> Any:
+    # Arrays/DataFrames vollständig serialisieren (str() kürzt große Werte ab)
+    if isinstance(value, np.ndarray):
+        return {"dtype": str(value.dtype), "values": value.tolist()}
+    if isinstance(value, np.generic):
+        return value.item()
+    to_dict = getattr(value, "to_dict", None)
+    if callable(to_dict):
+        try:
+            return {"type": type(value).__name__, "value": to_dict(orient="split")}
+        except TypeError:
+            return {"type": type(value).__name__, "value": to_dict()}
+    return str(value)
+
+
+def _digest_value(value: Any) -> bytes:
+    if isinstance(value, np.ndarray):
+        return str(value.dtype).encode() + value.tobytes()
+    if isinstance(value, (list, tuple)) and value and all(
+        isinstance(v, (int, float)) and not isinstance(v, bool) for v in value
+    ):
+        return b"f8" + np.asarray(value, dtype=np.float64).tobytes()
+    return json.dumps(value, sort_keys=True, default=_json_default).encode("utf-8")
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stabiler Hash beliebiger (JSON-fähiger) Teile, z.B. Diagrammdaten oder Stil-Einstellungen."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        payload = _digest_value(part)
+        h.update(len(payload).to_bytes(8, "little"))
+        h.update(payload)
+    return h.hexdigest()
+
+
+def results_fingerprint(results: Optional[Mapping[str, Any]], keys: Iterable[str]) -> str:
+    """Fingerprint der angegebenen Ergebniswerte (fehlende Keys zählen als None)."""
+    results = results or {}
+    h = hashlib.blake2b(digest_size=16)
+    for key in keys:
+        payload = _digest_value(results.get(key))
+        h.update(key.encode("utf-8") + b"\0")
+        h.update(len(payload).to_bytes(8, "little"))
+        h.update(payload)
+    return h.hexdigest()
+
+
+def finite_array(values: Any, drop_invalid: bool = False) -> np.ndarray:
+    """
+    Wandelt eine Werteliste in ein float64-Array.
+
+    Nicht-numerische Werte, NaN und Inf werden zu 0.0 oder (drop_invalid=True) verworfen,
+    wie in den bisherigen Listen-Comprehensions der Switcher.
+    """
+    if isinstance(values, np.ndarray):
+        arr = values.astype(np.float64, copy=True).ravel() if values.dtype.kind in "biuf" else None
+    else:
+        arr = None
+    if arr is None:
+        if not isinstance(values, (list, tuple, np.ndarray)):
+            return _EMPTY
+        arr = np.fromiter(
+            (float(v) if isinstance(v, (int, float)) else np.nan for v in values),
+            dtype=np.float64,
+            count=len(values),
+        )
+    mask = np.isfinite(arr)
+    return arr[mask] if drop_invalid else np.where(mask, arr, 0.0)
+
+
+def _readonly(arr: np.ndarray) -> np.ndarray:
+    arr = np.asarray(arr, dtype=np.float64)
+    arr.flags.writeable = False
+    return arr
+
+
+def _copy_figure(fig: Any) -> Any:
+    """Unabhängige Kopie einer Plotly-Figur (Aufrufer ändern Layout/Stil nach dem Abruf)."""
+    try:
+        import plotly.graph_objects as go
+    except ImportError:
+        go = None
+    if go is not None and isinstance(fig, go.Figure):
+        return go.Figure(fig)
+    return copy.deepcopy(fig)
+
+
+def _figure_digest(fig: Any) -> Optional[str]:
+    to_json = getattr(fig, "to_json", None)
+    if not callable(to_json):
+        return None
+    try:
+        return hashlib.blake2b(to_json().encode("utf-8"), digest_size=16).hexdigest()
+    except Exception:
+        return None
+
+
+class DerivedSeriesCache:
+    """Prozessweiter LRU-Cache für abgeleitete Reihen und fertige Figuren (threadsicher)."""
+
+    def __init__(self, max_series: int = DEFAULT_MAX_SERIES, max_figures: int = DEFAULT_MAX_FIGURES):
+        self.max_series = max_series
+        self.max_figures = max_figures
+        self._lock = threading.RLock()
+        self._series: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        # Schlüssel -> Figur (wird nie herausgegeben, nur Kopien)
+        self._figures: "OrderedDict[Tuple[Any, ...], Any]" = OrderedDict()
+        # Hash des Figur-Inhalts (to_json) -> exportierte PNG-Bytes
+        self._exports: "OrderedDict[str, bytes]" = OrderedDict()
+
+    # --- Reihen ---
+
+    def series_fingerprint(self, name: str, results: Optional[Mapping[str, Any]]) -> str:
+        inputs, _ = _SERIES_REGISTRY[name]
+        return results_fingerprint(results, inputs)
+
+    def series(self, name: str, results: Optional[Mapping[str, Any]]) -> np.ndarray:
+        """Liefert die Reihe 'name' für results (schreibgeschützt, von allen Aufrufern geteilt)."""
+        inputs, func = _SERIES_REGISTRY[name]
+        key = (name, results_fingerprint(results, inputs))
+        with self._lock:
+            cached = self._series.get(key)
+            if cached is not None:
+                self._series.move_to_end(key)
+                return cached
+        value = _readonly(func(results or {}, self))
+        with self._lock:
+            self._series[key] = value
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+        return value
+
+    # --- Figuren ---
+
+    def figure(self, chart_id: str, key_parts: Tuple[Any, ...], build: Callable[[], Any]) -> Any:
+        """
+        Gibt eine Kopie der zwischengespeicherten Figur für (chart_id, key_parts) zurück oder baut sie mit build().
+
+        key_parts muss alles enthalten, was die Figur bestimmt (Reihen-Fingerprint, Diagrammtyp, Farben,
+        Texte). build() darf None liefern (Daten unvollständig); das wird nicht gespeichert.
+        """
+        key = (chart_id,) + tuple(key_parts)
+        with self._lock:
+            fig = self._figures.get(key)
+            if fig is not None:
+                self._figures.move_to_end(key)
+        if fig is None:
+            fig = build()
+            if fig is None:
+                return None
+            with self._lock:
+                self._figures[key] = fig
+                while len(self._figures) > self.max_figures:
+                    self._figures.popitem(last=False)
+        return _copy_figure(fig)
+
+    def export_bytes(self, fig: Any, export: Callable[[Any], Optional[bytes]]) -> Optional[bytes]:
+        """Exportiert eine Figur einmal je Inhalt; Figuren ohne to_json werden jedes Mal exportiert."""
+        digest = _figure_digest(fig)
+        if digest is not None:
+            with self._lock:
+                data = self._exports.get(digest)
+                if data is not None:
+                    self._exports.move_to_end(digest)
+                    return data
+        data = export(fig)
+        if data is not None and digest is not None:
+            with self._lock:
+                self._exports[digest] = data
+                while len(self._exports) > self.max_figures:
+                    self._exports.popitem(last=False)
+        return data
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self._figures.clear()
+            self._exports.clear()
+
+
+_cache: Optional[DerivedSeriesCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_series_cache() -> DerivedSeriesCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DerivedSeriesCache()
+        return _cache
+
+
+# --- Reihen-Definitionen ---
+
+def annual_cost_series(base_annual_cost: float, years: int, inc_percent: float) -> np.ndarray:
+    """Jährliche Kosten über 'years' Jahre mit inc_percent % Steigerung p.a. (Jahr 1 = Basiswert)."""
+    try:
+        years = int(max(1, years))
+        base = float(max(0.0, base_annual_cost))
+        r = max(0.0, float(inc_percent)) / 100.0
+    except Exception:
+        years, base, r = 20, 0.0, 0.0
+    return base * np.power(1.0 + r, np.arange(years, dtype=np.float64))
+
+
+@derived_series("annual_productions", ("annual_productions_sim",))
+def _annual_productions(results, cache):
+    return finite_array(results.get("annual_productions_sim"), drop_invalid=True)
+
+
+@derived_series("annual_benefits", ("annual_benefits_sim",))
+def _annual_benefits(results, cache):
+    return finite_array(results.get("annual_benefits_sim"), drop_invalid=True)
+
+
+@derived_series("cumulative_benefits", ("annual_benefits_sim",))
+def _cumulative_benefits(results, cache):
+    # Jahr 0 = 0, danach aufsummierte Vorteile
+    return np.concatenate(([0.0], np.cumsum(cache.series("annual_benefits", results))))
+
+
+@derived_series("cumulative_cash_flows", ("cumulative_cash_flows_sim",))
+def _cumulative_cash_flows(results, cache):
+    return finite_array(results.get("cumulative_cash_flows_sim"))
+
+
+@derived_series("projected_annual_costs", ("annual_costs_hochrechnung_values",))
+def _projected_annual_costs(results, cache):
+    return finite_array(results.get("annual_costs_hochrechnung_values"))
+
+
+@derived_series("monthly_productions", ("monthly_productions_sim",))
+def _monthly_productions(results, cache):
+    return finite_array(results.get("monthly_productions_sim"))
+
+
+@derived_series("monthly_consumption", ("monthly_consumption_sim",))
+def _monthly_consumption(results, cache):
+    return finite_array(results.get("monthly_consumption_sim"))
+
+
+@derived_series("monthly_direct_self_consumption", ("monthly_direct_self_consumption_kwh",))
+def _monthly_direct_self_consumption(results, cache):
+    return finite_array(results.get("monthly_direct_self_consumption_kwh"))
+
+
+@derived_series("monthly_storage_self_consumption", ("monthly_storage_discharge_for_sc_kwh",))
+def _monthly_storage_self_consumption(results, cache):
+    return finite_array(results.get("monthly_storage_discharge_for_sc_kwh"))
+
+
+@derived_series("monthly_feed_in", ("monthly_feed_in_kwh",))
+def _monthly_feed_in(results, cache):
+    return finite_array(results.get("monthly_feed_in_kwh"))
+
+
+@derived_series(
+    "monthly_selfuse_ratio",
+    ("monthly_consumption_sim", "monthly_direct_self_consumption_kwh", "monthly_storage_discharge_for_sc_kwh"),
+)
+def _monthly_selfuse_ratio(results, cache):
+    # Eigenversorgungsgrad je Monat in %; leer, wenn nicht alle drei Monatsreihen 12 Werte haben
+    cons = cache.series("monthly_consumption", results)
+    direct = cache.series("monthly_direct_self_consumption", results)
+    storage = cache.series("monthly_storage_self_consumption", results)
+    if not (len(cons) == len(direct) == len(storage) == 12):
+        return _EMPTY
+    return (direct + storage) / np.where(cons > 0, cons, 1.0) * 100.0
+
+
+@derived_series(
+    "selfuse_stack",
+    (
+        "annual_productions_sim",
+        "annual_pv_production_kwh",
+        "monthly_direct_self_consumption_kwh",
+        "monthly_storage_discharge_for_sc_kwh",
+        "monthly_feed_in_kwh",
+    ),
+)
+def _selfuse_stack(results, cache):
+    # Zeile 0: Eigenverbrauch, Zeile 1: Einspeisung je Simulationsjahr (Anteile aus Jahr 1)
+    production_yr1 = results.get("annual_pv_production_kwh")
+    production_yr1 = float(production_yr1) if isinstance(production_yr1, (int, float)) and production_yr1 > 0 else 1.0
+    self_use_yr1 = (
+        cache.series("monthly_direct_self_consumption", results).sum()
+        + cache.series("monthly_storage_self_consumption", results).sum()
+    )
+    feed_in_yr1 = cache.series("monthly_feed_in", results).sum()
+    shares = np.array([self_use_yr1, feed_in_yr1]) / production_yr1
+    return np.outer(shares, cache.series("annual_productions", results))
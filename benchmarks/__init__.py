@@ -0,0 +1,11 @@
+"""
+benchmarks
+
+Reproduzierbare Laufzeit-Messungen für die Angebotserstellung:
+- fixtures: synthetische Projekte und eine befüllte Temporär-Datenbank
+- offer_benchmark: Messlauf je Stufe, Auswertung (Median/IQR, Peak-RSS) und Baseline-Vergleich
+
+Aufruf:
+    python -m benchmarks.offer_benchmark
+    python -m benchmarks.offer_benchmark --update-baseline
+"""
@@ -0,0 +1,264 @@
+# benchmarks/fixtures.py
+"""
+Feste Benchmark-Eingaben: synthetische Projekte und eine befüllte Temporär-Datenbank.
+
+Alle Werte sind deterministisch (fester Seed), damit Messläufe auf verschiedenen
+Rechnern und zu verschiedenen Zeitpunkten dieselbe Arbeit verrichten:
+- Produktkatalog in realistischer Größe (Module, Wechselrichter, Speicher, Zubehör)
+- Preis-Matrix mit einer Zeile je Modulanzahl und einer Spalte je Speichermodell
+- 20 Firmen für den Multi-Angebots-Lauf
+- CSV-Datei für den Massen-Produktimport
+"""
+from __future__ import annotations
+
+import base64
+import contextlib
+import csv
+import io
+import os
+import random
+import shutil
+import struct
+import tempfile
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+DEFAULT_SEED = 20240601
+
+# Katalog- und Matrixgrößen orientieren sich an produktiven Installationen
+CATALOG_SIZES: Dict[str, int] = {
+    "Modul": 150,
+    "Wechselrichter": 80,
+    "Batteriespeicher": 60,
+    "Wallbox": 15,
+    "Energiemanagementsystem": 10,
+    "Leistungsoptimierer": 10,
+}
+MATRIX_MAX_MODULES = 200
+MULTI_OFFER_COMPANY_COUNT = 20
+IMPORT_ROW_COUNT = 2000
+
+_BRANDS = ["Aiko", "Jinko", "Trina", "Huawei", "SMA", "Fronius", "BYD", "Sungrow", "Sonnen", "Kostal"]
+
+# Szenarien: kleine/mittlere/große Anlage, mit und ohne Speicher, mit Wärmepumpe
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "small": {
+        "module_quantity": 12, "include_storage": False,
+        "annual_consumption_kwh_yr": 3200.0, "consumption_heating_kwh_yr": 0.0,
+    },
+    "medium": {
+        "module_quantity": 24, "include_storage": False,
+        "annual_consumption_kwh_yr": 4500.0, "consumption_heating_kwh_yr": 0.0,
+    },
+    "medium_storage": {
+        "module_quantity": 24, "include_storage": True,
+        "annual_consumption_kwh_yr": 4500.0, "consumption_heating_kwh_yr": 0.0,
+    },
+    "large_storage": {
+        "module_quantity": 60, "include_storage": True,
+        "annual_consumption_kwh_yr": 12000.0, "consumption_heating_kwh_yr": 0.0,
+    },
+    "heatpump": {
+        "module_quantity": 32, "include_storage": True,
+        "annual_consumption_kwh_yr": 5000.0, "consumption_heating_kwh_yr": 14000.0,
+        "future_hp": True,
+    },
+}
+
+
+@dataclass
+class BenchmarkDatabase:
+    """Pfad und Katalog-IDs einer befüllten Benchmark-Datenbank."""
+    db_path: str
+    work_dir: str
+    product_ids: Dict[str, List[int]] = field(default_factory=dict)
+    company_ids: List[int] = field(default_factory=list)
+    import_file: Optional[str] = None
+
+
+def _tiny_png(rgb: tuple, size: int = 48) -> bytes:
+    """Erzeugt ein einfarbiges PNG ohne Bildbibliothek (für Firmenlogos)."""
+    raw = b"".join(b"\x00" + bytes(rgb) * size for _ in range(size))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+def _product_rows(rng: random.Random) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    for category, count in CATALOG_SIZES.items():
+        for i in range(count):
+            brand = _BRANDS[i % len(_BRANDS)]
+            row: Dict[str, Any] = {
+                "category": category,
+                "brand": brand,
+                "price_euro": round(rng.uniform(80, 9000), 2),
+                "warranty_years": rng.choice([10, 12, 15, 25, 30]),
+                "efficiency_percent": round(rng.uniform(18, 23), 1),
+                "origin_country": "DE",
+                "description": f"{category} {brand} Benchmark-Produkt {i + 1}",
+            }
+            if category == "Modul":
+                watt = 380 + 5 * (i % 30)
+                row.update(model_name=f"{brand} BM-{watt}W-{i + 1:03d}", capacity_w=float(watt),
+                           length_m=1.72, width_m=1.13, weight_kg=21.5)
+            elif category == "Wechselrichter":
+                kw = 3 + (i % 18)
+                row.update(model_name=f"{brand} WR-{kw}K-{i + 1:03d}", power_kw=float(kw))
+            elif category == "Batteriespeicher":
+                kwh = round(5.0 + 0.5 * (i % 24), 1)
+                row.update(model_name=f"{brand} Speicher {kwh} kWh S{i + 1:03d}",
+                           storage_power_kw=kwh, capacity_w=kwh * 1000.0, max_cycles=6000)
+            else:
+                row.update(model_name=f"{brand} {category} {i + 1:03d}")
+            rows.append(row)
+    return rows
+
+
+def build_price_matrix_csv(storage_models: List[str], rng: random.Random,
+                           max_modules: int = MATRIX_MAX_MODULES) -> str:
+    """Preis-Matrix im Upload-Format (Semikolon, Dezimalkomma, Index 'Anzahl Module')."""
+    storage_surcharge = {name: rng.uniform(3500, 12000) for name in storage_models}
+    lines = [";".join(["Anzahl Module", *storage_models, "Ohne Speicher"])]
+    for n in range(1, max_modules + 1):
+        base = 2500.0 + n * rng.uniform(410, 440)
+        cells = [f"{base + storage_surcharge[name]:.2f}".replace(".", ",") for name in storage_models]
+        cells.append(f"{base:.2f}".replace(".", ","))
+        lines.append(";".join([str(n), *cells]))
+    return "\n".join(lines)
+
+
+def write_import_file(path: str, rng: random.Random, rows: int = IMPORT_ROW_COUNT) -> str:
+    """CSV für den Massenimport (Spaltennamen wie im deutschen Excel-Export)."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["kategorie", "produkt_modell", "hersteller", "preis_stück",
+                         "pv_modul_leistung", "wr_leistung_kw", "kapazitaet_speicher_kwh",
+                         "garantie_zeit", "wirkungsgrad_prozent"])
+        for i in range(rows):
+            kind = i % 3
+            brand = _BRANDS[i % len(_BRANDS)]
+            writer.writerow([
+                ("Modul", "Wechselrichter", "Batteriespeicher")[kind],
+                f"{brand} Import-{i:05d}",
+                brand,
+                f"{rng.uniform(80, 9000):.2f}",
+                400 + (i % 40) if kind == 0 else "",
+                f"{3 + i % 18}" if kind == 1 else "",
+                f"{5 + (i % 24) * 0.5}" if kind == 2 else "",
+                rng.choice([10, 15, 25]),
+                f"{rng.uniform(18, 23):.1f}",
+            ])
+    return path
+
+
+def seed_database(db_path: str, seed: int = DEFAULT_SEED) -> BenchmarkDatabase:
+    """Legt Schema, Admin-Einstellungen, Katalog, Preis-Matrix und Firmen in db_path an."""
+    import database
+    import product_db
+
+    rng = random.Random(seed)
+    bench_db = BenchmarkDatabase(db_path=db_path, work_dir=os.path.dirname(db_path))
+    with use_database(db_path), contextlib.redirect_stdout(io.StringIO()):
+        database.init_db()
+        conn = database.get_db_connection()
+        try:
+            product_db.create_product_table(conn)
+            rows = _product_rows(rng)
+            columns = sorted({k for r in rows for k in r})
+            conn.executemany(
+                f"INSERT INTO products ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [tuple(r.get(c) for c in columns) for r in rows],
+            )
+            conn.commit()
+            for row in conn.execute("SELECT id, category FROM products ORDER BY id"):
+                bench_db.product_ids.setdefault(row["category"], []).append(int(row["id"]))
+            storage_models = [r["model_name"] for r in rows if r["category"] == "Batteriespeicher"]
+        finally:
+            conn.close()
+
+        database.save_admin_setting("price_matrix_csv_data", build_price_matrix_csv(storage_models, rng))
+        # Keine Netzwerkzugriffe während der Messung
+        database.save_admin_setting("pvgis_enabled", "false")
+
+        for i in range(MULTI_OFFER_COMPANY_COUNT):
+            logo = base64.b64encode(_tiny_png((30 + 10 * i, 90, 160))).decode("ascii")
+            company_id = database.add_company({
+                "name": f"Benchmark Solar {i + 1:02d} GmbH",
+                "logo_base64": logo,
+                "street": f"Sonnenweg {i + 1}",
+                "zip_code": f"{10115 + i}",
+                "city": "Berlin",
+                "phone": "030 1234567",
+                "email": f"info{i + 1}@benchmark-solar.example",
+            })
+            if company_id:
+                bench_db.company_ids.append(int(company_id))
+
+    bench_db.import_file = write_import_file(os.path.join(bench_db.work_dir, "import_products.csv"), rng)
+    return bench_db
+
+
+@contextlib.contextmanager
+def use_database(db_path: str) -> Iterator[str]:
+    """Leitet database.DB_PATH temporär auf db_path um (wie im Selbsttest von product_db)."""
+    import database
+
+    original = database.DB_PATH
+    database.DB_PATH = db_path
+    try:
+        yield db_path
+    finally:
+        database.DB_PATH = original
+
+
+@contextlib.contextmanager
+def seeded_database(seed: int = DEFAULT_SEED) -> Iterator[BenchmarkDatabase]:
+    """Befüllte Benchmark-Datenbank in einem Temporärverzeichnis; wird danach gelöscht."""
+    work_dir = tempfile.mkdtemp(prefix="kakerlake_bench_")
+    try:
+        bench_db = seed_database(os.path.join(work_dir, "bench.db"), seed)
+        with use_database(bench_db.db_path):
+            yield bench_db
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def build_project_data(scenario: str, bench_db: BenchmarkDatabase) -> Dict[str, Any]:
+    """project_data eines Szenarios mit Produkt-IDs aus dem Benchmark-Katalog."""
+    spec = SCENARIOS[scenario]
+    ids = bench_db.product_ids
+    index = list(SCENARIOS).index(scenario)
+    details: Dict[str, Any] = {
+        "module_quantity": spec["module_quantity"],
+        "selected_module_id": ids["Modul"][index * 7 % len(ids["Modul"])],
+        "selected_inverter_id": ids["Wechselrichter"][index * 5 % len(ids["Wechselrichter"])],
+        "include_storage": spec["include_storage"],
+        "annual_consumption_kwh_yr": spec["annual_consumption_kwh_yr"],
+        "consumption_heating_kwh_yr": spec["consumption_heating_kwh_yr"],
+        "electricity_price_kwh": 0.32,
+        "roof_orientation": "Süd",
+        "roof_inclination_deg": 30,
+        "feed_in_type": "Teileinspeisung",
+        "future_hp": bool(spec.get("future_hp", False)),
+        "include_additional_components": True,
+        "selected_wallbox_id": ids["Wallbox"][index % len(ids["Wallbox"])],
+        "latitude": 52.52,
+        "longitude": 13.40,
+    }
+    if spec["include_storage"]:
+        details["selected_storage_id"] = ids["Batteriespeicher"][index * 3 % len(ids["Batteriespeicher"])]
+    return {
+        "customer_data": {
+            "salutation": "Herr", "first_name": "Max", "last_name": f"Benchmark-{scenario}",
+            "address": "Musterstraße", "house_number": "1", "zip_code": "12345",
+            "city": "Musterstadt", "email": "max@example.com", "phone_mobile": "0151 2345678",
+            "type": "Privat",
+        },
+        "project_details": details,
+        "economic_data": {"simulation_period_years": 20},
+    }
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+offer_benchmark.py
+==================
+Reproduzierbarer Benchmark der Angebotserstellung – Ende-zu-Ende und je Stufe.
+
+Gemessen werden (jeweils gegen eine befüllte Temporär-Datenbank, siehe fixtures.py):
+  - perform_calculations            je Szenario
+  - build_dynamic_data              je Szenario
+  - generate_custom_offer_pdf       je Szenario
+  - multi_offer_batch               20 Firmen inkl. ZIP
+  - bulk_product_import             CSV mit 2000 Zeilen
+
+Jeder Messfall läuft in einem eigenen Prozess (Peak-RSS ist damit je Fall aussagekräftig),
+zuerst mit Aufwärmläufen, danach mit --repeat Messungen. Ausgegeben werden Median, IQR
+und Peak-RSS; optional Vergleich gegen eine gespeicherte Baseline mit Schwellwert.
+
+Beispiele:
+    python -m benchmarks.offer_benchmark
+    python -m benchmarks.offer_benchmark --only perform_calculations --repeat 20
+    python -m benchmarks.offer_benchmark --update-baseline
+    python -m benchmarks.offer_benchmark --threshold 0.15 --output bench_output.json
+
+Exit-Code 1, wenn mindestens ein Fall langsamer als Baseline * (1 + threshold) ist.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from benchmarks.fixtures import (  # noqa: E402
+    SCENARIOS,
+    BenchmarkDatabase,
+    build_project_data,
+    seeded_database,
+    use_database,
+)
+
+DEFAULT_BASELINE_PATH = Path(__file__).resolve().with_name("baseline.json")
+DEFAULT_REPEAT = 5
+DEFAULT_WARMUP = 1
+DEFAULT_THRESHOLD = 0.25
+# Unterhalb dieser Differenz gilt eine Abweichung als Messrauschen
+MIN_ABS_DELTA_S = 0.002
+
+COORDS_DIR = ROOT_DIR / "coords"
+BG_DIR = ROOT_DIR / "pdf_templates_static" / "notext"
+
+CaseSetup = Callable[[BenchmarkDatabase], Callable[[], Any]]
+
+
+# ---------- Stufen ----------
+
+def _calculate(project_data: Dict[str, Any]) -> Dict[str, Any]:
+    from calculations import perform_calculations
+    return perform_calculations(project_data, texts={}, errors_list=[])
+
+
+def _company_info(bench_db: BenchmarkDatabase) -> Dict[str, Any]:
+    from database import get_company
+    return get_company(bench_db.company_ids[0]) if bench_db.company_ids else {}
+
+
+def _setup_perform_calculations(scenario: str) -> CaseSetup:
+    def setup(bench_db: BenchmarkDatabase) -> Callable[[], Any]:
+        project_data = build_project_data(scenario, bench_db)
+        return lambda: _calculate(project_data)
+    return setup
+
+
+def _setup_build_dynamic_data(scenario: str) -> CaseSetup:
+    def setup(bench_db: BenchmarkDatabase) -> Callable[[], Any]:
+        from pdf_template_engine import build_dynamic_data
+
+        project_data = build_project_data(scenario, bench_db)
+        analysis_results = _calculate(project_data)
+        company = _company_info(bench_db)
+        return lambda: build_dynamic_data(project_data, analysis_results, company)
+    return setup
+
+
+def _setup_custom_offer_pdf(scenario: str) -> CaseSetup:
+    def setup(bench_db: BenchmarkDatabase) -> Callable[[], Any]:
+        from pdf_template_engine import build_dynamic_data, generate_custom_offer_pdf
+
+        project_data = build_project_data(scenario, bench_db)
+        dynamic_data = build_dynamic_data(project_data, _calculate(project_data), _company_info(bench_db))
+
+        def run() -> bytes:
+            pdf_bytes = generate_custom_offer_pdf(COORDS_DIR, BG_DIR, dynamic_data)
+            if not pdf_bytes:
+                raise RuntimeError("generate_custom_offer_pdf lieferte keine Bytes")
+            return pdf_bytes
+        return run
+    return setup
+
+
+def _setup_multi_offer_batch(bench_db: BenchmarkDatabase) -> Callable[[], Any]:
+    """Nachbildung der Schleife aus MultiCompanyOfferGenerator.generate_multi_offers ohne UI."""
+    import streamlit as st
+    from database import get_company
+    from multi_offer_generator import MultiCompanyOfferGenerator
+
+    project_data = build_project_data("medium_storage", bench_db)
+    details = project_data["project_details"]
+    settings = {
+        "module_quantity": details["module_quantity"],
+        "include_storage": True,
+        "selected_module_id": details["selected_module_id"],
+        "selected_inverter_id": details["selected_inverter_id"],
+        "selected_storage_id": details["selected_storage_id"],
+        "enable_product_rotation": True,
+        "rotation_mode": "linear",
+        "product_rotation_step": 1,
+    }
+    st.session_state["calculation_results"] = _calculate(project_data)
+    st.session_state["multi_offer_settings"] = settings
+    generator = MultiCompanyOfferGenerator()
+    companies = [get_company(cid) for cid in bench_db.company_ids]
+
+    def run() -> bytes:
+        generated = []
+        for i, company in enumerate(companies):
+            company_settings = generator.get_rotated_products_for_company(i, settings)
+            offer_data = generator._prepare_offer_data(
+                project_data["customer_data"], company, company_settings, project_data, i
+            )
+            pdf_content = generator._generate_company_pdf(offer_data, company, i)
+            if not pdf_content:
+                raise RuntimeError(f"Kein PDF für {company.get('name')}")
+            generated.append({"filename": f"Angebot_{i:02d}.pdf", "pdf_content": pdf_content})
+        return generator._create_zip_download(generated)
+    return run
+
+
+def _setup_bulk_product_import(bench_db: BenchmarkDatabase) -> Callable[[], Any]:
+    import sqlite3
+    from solar_calculator_bridge import SolarCalculatorProductBridge
+
+    counter = {"n": 0}
+
+    def run() -> Dict[str, Any]:
+        # Jeder Lauf importiert in eine frische Datei, sonst würde ab Lauf 2 nur aktualisiert
+        counter["n"] += 1
+        target = os.path.join(bench_db.work_dir, f"import_{os.getpid()}_{counter['n']}.sqlite")
+        bridge = SolarCalculatorProductBridge(db_path=target)
+        bridge.get_connection = lambda: sqlite3.connect(target)
+        result = bridge.import_products_from_file(bench_db.import_file)
+        if not result.get("success"):
+            raise RuntimeError(f"Import fehlgeschlagen: {result.get('error')}")
+        return result
+    return run
+
+
+def build_cases() -> Dict[str, CaseSetup]:
+    """Alle Messfälle in fester Reihenfolge (Name -> Setup-Funktion)."""
+    cases: Dict[str, CaseSetup] = {}
+    for scenario in SCENARIOS:
+        cases[f"perform_calculations[{scenario}]"] = _setup_perform_calculations(scenario)
+    for scenario in SCENARIOS:
+        cases[f"build_dynamic_data[{scenario}]"] = _setup_build_dynamic_data(scenario)
+    for scenario in SCENARIOS:
+        cases[f"generate_custom_offer_pdf[{scenario}]"] = _setup_custom_offer_pdf(scenario)
+    cases["multi_offer_batch[20]"] = _setup_multi_offer_batch
+    cases["bulk_product_import[2000]"] = _setup_bulk_product_import
+    return cases
+
+
+# ---------- Messung ----------
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux liefert KiB, macOS Bytes
+        return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil  # type: ignore
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Median, Interquartilsabstand, Min/Max in Sekunden."""
+    if len(samples) >= 2:
+        q1, _, q3 = statistics.quantiles(samples, n=4, method="inclusive")
+    else:
+        q1 = q3 = samples[0]
+    return {
+        "median_s": statistics.median(samples),
+        "iqr_s": q3 - q1,
+        "min_s": min(samples),
+        "max_s": max(samples),
+    }
+
+
+def run_case(name: str, bench_db: BenchmarkDatabase, repeat: int, warmup: int) -> Dict[str, Any]:
+    """Führt einen Messfall aus (im aktuellen Prozess) und liefert die Kennzahlen."""
+    for noisy in ("streamlit", "pypdf", "PyPDF2"):
+        logging.getLogger(noisy).setLevel(logging.ERROR)
+    setup = build_cases()[name]
+    sink = io.StringIO()
+    with use_database(bench_db.db_path), contextlib.redirect_stdout(sink):
+        try:
+            fn = setup(bench_db)
+            for _ in range(warmup):
+                fn()
+            samples: List[float] = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                fn()
+                samples.append(time.perf_counter() - t0)
+                sink.seek(0)
+                sink.truncate()
+        except Exception as e:
+            return {"case": name, "error": f"{type(e).__name__}: {e}"}
+    return {"case": name, "samples_s": samples, "peak_rss_mb": _peak_rss_mb(), **summarize(samples)}
+
+
+def _run_case_worker(args: Tuple[str, BenchmarkDatabase, int, int]) -> Dict[str, Any]:
+    return run_case(*args)
+
+
+def run_benchmarks(case_names: List[str], bench_db: BenchmarkDatabase, repeat: int, warmup: int,
+                   isolate: bool = True) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    ctx = multiprocessing.get_context("spawn")
+    for name in case_names:
+        print(f"[BENCH] {name} ...", flush=True)
+        if isolate:
+            # maxtasksperchild=1: frischer Prozess je Fall -> unverfälschter Peak-RSS
+            with ctx.Pool(processes=1, maxtasksperchild=1) as pool:
+                res = pool.apply(_run_case_worker, ((name, bench_db, repeat, warmup),))
+        else:
+            res = run_case(name, bench_db, repeat, warmup)
+        results[name] = res
+    return results
+
+
+# ---------- Baseline ----------
+
+def load_baseline(path: Path) -> Dict[str, Dict[str, Any]]:
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8")).get("results", {})
+    except Exception as e:
+        print(f"[BENCH] Baseline {path} nicht lesbar: {e}")
+        return {}
+
+
+def compare_to_baseline(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+                        threshold: float) -> Dict[str, Dict[str, Any]]:
+    """Markiert je Fall 'ok', 'regression', 'improved' oder 'new' (ohne Baseline-Eintrag)."""
+    verdicts: Dict[str, Dict[str, Any]] = {}
+    for name, res in results.items():
+        if "error" in res:
+            verdicts[name] = {"status": "error"}
+            continue
+        base = baseline.get(name)
+        if not base or not base.get("median_s"):
+            verdicts[name] = {"status": "new"}
+            continue
+        ratio = res["median_s"] / base["median_s"]
+        delta = res["median_s"] - base["median_s"]
+        if ratio > 1.0 + threshold and delta > MIN_ABS_DELTA_S:
+            status = "regression"
+        elif ratio < 1.0 - threshold and -delta > MIN_ABS_DELTA_S:
+            status = "improved"
+        else:
+            status = "ok"
+        verdicts[name] = {"status": status, "ratio": round(ratio, 3), "baseline_median_s": base["median_s"]}
+    return verdicts
+
+
+def _environment() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        # Ohne echte Hintergrund-PDFs (z.B. nicht ausgecheckte LFS-Dateien) misst die PDF-Stufe nur Overlays
+        "pdf_backgrounds_available": any(
+            p.read_bytes()[:5] == b"%PDF-" for p in BG_DIR.glob("nt_nt_*.pdf")
+        ) if BG_DIR.exists() else False,
+    }
+
+
+def write_report(path: Path, results: Dict[str, Dict[str, Any]], repeat: int, warmup: int) -> None:
+    slim = {
+        name: {k: round(v, 6) if isinstance(v, float) else v for k, v in res.items() if k not in ("case", "samples_s")}
+        for name, res in results.items()
+    }
+    payload = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "repeat": repeat,
+        "warmup": warmup,
+        "environment": _environment(),
+        "results": slim,
+    }
+    path.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def print_table(results: Dict[str, Dict[str, Any]], verdicts: Dict[str, Dict[str, Any]]) -> None:
+    print(f"\n{'Fall':44} {'Median ms':>10} {'IQR ms':>9} {'RSS MB':>8} {'vs. Base':>9}  Status")
+    print("-" * 92)
+    for name, res in results.items():
+        verdict = verdicts.get(name, {})
+        if "error" in res:
+            print(f"{name:44} {'-':>10} {'-':>9} {'-':>8} {'-':>9}  FEHLER {res['error']}")
+            continue
+        ratio = f"{verdict['ratio']:.2f}x" if "ratio" in verdict else "-"
+        rss = f"{res['peak_rss_mb']:.1f}" if res.get("peak_rss_mb") is not None else "-"
+        print(f"{name:44} {res['median_s'] * 1000:10.1f} {res['iqr_s'] * 1000:9.1f} {rss:>8} {ratio:>9}  "
+              f"{verdict.get('status', '')}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark der Angebotserstellung (je Stufe und Ende-zu-Ende)")
+    ap.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Messläufe je Fall")
+    ap.add_argument("--warmup", type=int, default=DEFAULT_WARMUP, help="Aufwärmläufe je Fall (nicht gemessen)")
+    ap.add_argument("--only", action="append", default=[], help="Nur Fälle, deren Name den Text enthält (mehrfach möglich)")
+    ap.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE_PATH, help="Baseline-JSON")
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Erlaubte relative Verlangsamung (0.25 = 25%%)")
+    ap.add_argument("--update-baseline", action="store_true", help="Ergebnisse als neue Baseline speichern")
+    ap.add_argument("--output", type=Path, default=None, help="Ergebnisse zusätzlich als JSON schreiben")
+    ap.add_argument("--in-process", action="store_true", help="Alle Fälle im selben Prozess (schneller, RSS unscharf)")
+    ap.add_argument("--list", action="store_true", help="Nur Fallnamen ausgeben")
+    args = ap.parse_args(argv)
+
+    case_names = list(build_cases())
+    if args.only:
+        case_names = [n for n in case_names if any(sel in n for sel in args.only)]
+    if args.list:
+        print("\n".join(case_names))
+        return 0
+    if not case_names:
+        print("[BENCH] Keine passenden Fälle.")
+        return 2
+
+    with seeded_database() as bench_db:
+        results = run_benchmarks(case_names, bench_db, args.repeat, args.warmup, isolate=not args.in_process)
+
+    baseline = {} if args.update_baseline else load_baseline(args.baseline)
+    verdicts = compare_to_baseline(results, baseline, args.threshold)
+    print_table(results, verdicts)
+
+    if args.output:
+        write_report(args.output, results, args.repeat, args.warmup)
+    if args.update_baseline:
+        if any("error" in r for r in results.values()):
+            print("[BENCH] Baseline nicht aktualisiert: mindestens ein Fall ist fehlgeschlagen.")
+            return 1
+        write_report(args.baseline, results, args.repeat, args.warmup)
+        print(f"[BENCH] Baseline gespeichert: {args.baseline}")
+        return 0
+
+    failed = [n for n, v in verdicts.items() if v["status"] in ("regression", "error")]
+    if failed:
+        print(f"\n[BENCH] {len(failed)} Fall/Fälle über Schwellwert ({args.threshold:.0%}) oder fehlerhaft: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
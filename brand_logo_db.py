@@ -1,22 +1,42 @@
 # brand_logo_db.py
 # Verwaltung der Marken-Logos für PDF-Seite 4
+# Die Logo-Auflösung (resolve_brand_logo, get_logos_for_brands, database.get_brand_logo) läuft über einen
+# Prozess-Index, der admin_settings (brand_logo_<Marke>, Map 'brand_logos', Aliase) und die Tabelle brand_logos
+# einmal zusammenführt; Schreibfunktionen dieses Moduls und das Speichern der Settings verwerfen ihn.
 
 import sqlite3
 import base64
+import json
 import os
+import re
+import threading
 from typing import Dict, List, Optional, Any
 import traceback
 
 try:
+    import database as _database
     from database import get_db_connection, init_db
     DB_AVAILABLE = True
 except ImportError as e:
+    _database = None  # type: ignore
     def get_db_connection():
         print(f"brand_logo_db.py: Importfehler für database.py: {e}")
         return None
     DB_AVAILABLE = False
     print(f"brand_logo_db.py: Database nicht verfügbar: {e}")
 
+# Admin-Setting {Alias: Marke}, z.B. {"BYD Battery-Box": "BYD"}
+BRAND_LOGO_ALIAS_SETTING_KEY = "brand_logo_aliases"
+BRAND_LOGO_MAP_SETTING_KEY = "brand_logos"
+BRAND_LOGO_SETTING_PREFIX = "brand_logo_"
+
+_SUFFIX_PATTERN = re.compile(r"^(.*?)(pv|wr|speicher|ess|batterie|akku|stromspeicher)$", re.IGNORECASE)
+_index_lock = threading.Lock()
+# Datenbankpfad -> BrandLogoIndex
+_LOGO_INDEXES: Dict[str, "BrandLogoIndex"] = {}
+# Wird bei jeder Invalidierung erhöht; ein währenddessen gebauter Index wird nicht gespeichert
+_index_generation = 0
+
 def create_brand_logos_table(conn: sqlite3.Connection):
     """Erstellt die Tabelle für Marken-Logos"""
     cursor = conn.cursor()
@@ -85,6 +105,7 @@ def add_brand_logo(brand_name: str, logo_base64: str, logo_format: str = "PNG",
         
         conn.commit()
         conn.close()
+        invalidate_brand_logo_index()
         return True
         
     except Exception as e:
@@ -202,6 +223,7 @@ def delete_brand_logo(brand_name: str) -> bool:
         deleted_count = cursor.rowcount
         conn.commit()
         conn.close()
+        invalidate_brand_logo_index()
         
         if deleted_count > 0:
             print(f"Logo für Marke '{brand_name}' erfolgreich gelöscht")
@@ -273,6 +295,7 @@ def update_logo_position(brand_name: str, position_x: float, position_y: float,
         updated_count = cursor.rowcount
         conn.commit()
         conn.close()
+        invalidate_brand_logo_index()
         
         if updated_count > 0:
             print(f"Position für Logo '{brand_name}' aktualisiert")
@@ -294,13 +317,11 @@ def _base_brand_without_suffix(name: str) -> str:
     """Entfernt angehängte funktionale Suffixe wie PV / WR / SPEICHER / ESS / BATTERIE / AKKU / STROMSPEICHER"""
     if not name:
         return name
-    import re
     base = name.strip()
-    pattern = re.compile(r"^(.*?)(pv|wr|speicher|ess|batterie|akku|stromspeicher)$", re.IGNORECASE)
     prev = None
     while base and prev != base:
         prev = base
-        m = pattern.match(base)
+        m = _SUFFIX_PATTERN.match(base)
         if m and m.group(1).strip():
             base = m.group(1).strip()
     return base
@@ -335,56 +356,204 @@ def _fetch_all_brand_rows(conn) -> Dict[str, Dict[str, Any]]:
 def get_logos_for_brands(brand_names: List[str]) -> Dict[str, Dict[str, Any]]:
     """Holt Logos für eine Liste von Herstellern.
     Erweitert: Versucht auch Varianten ohne funktionale Suffixe zu matchen.
-    Reihenfolge je Marke:
+    Reihenfolge je Marke (siehe BrandLogoIndex.resolve):
       1. Exakter Name
-      2. Name ohne Leerzeichen (Fallback bereits durch Aufrufer evtl.)
-      3. Basis ohne Suffix (PV/WR/SPEICHER/ESS/BATTERIE/AKKU/STROMSPEICHER)
-      4. Groß/Klein ignorieren
-    Liefert dict mit Key des tatsächlich gefundenen DB-Namens.
+      2. Alias aus admin_settings 'brand_logo_aliases'
+      3. Groß/Klein ignorieren
+      4. Name ohne Leerzeichen/Trennzeichen
+      5. Basis ohne Suffix (PV/WR/SPEICHER/ESS/BATTERIE/AKKU/STROMSPEICHER)
+    Liefert dict mit Key des angefragten Namens; 'brand_name' ist der tatsächlich gefundene Name.
     """
     if not DB_AVAILABLE:
         return {}
     try:
-        conn = get_db_connection()
-        if not conn:
-            return {}
-        create_brand_logos_table(conn)
-        # Alle aktiven Logos einmal holen
-        all_rows = _fetch_all_brand_rows(conn)
-        conn.close()
-
-        # Indexe bauen
-        index_exact = {k: v for k, v in all_rows.items()}
-        index_norm = {_normalize_brand_key(k): v for k, v in all_rows.items()}
-        index_base = {_normalize_brand_key(_base_brand_without_suffix(k)): v for k, v in all_rows.items()}
-
+        index = get_brand_logo_index()
         result: Dict[str, Dict[str, Any]] = {}
         for wanted in brand_names:
             if not wanted:
                 continue
-            # 1. Exakt
-            if wanted in index_exact:
-                result[wanted] = index_exact[wanted]
-                continue
-            norm = _normalize_brand_key(wanted)
-            base = _normalize_brand_key(_base_brand_without_suffix(wanted))
-            # 2. Normalisiert (Spaces entfernt, lower)
-            if norm in index_norm:
-                result[wanted] = index_norm[norm]
-                continue
-            # 3. Basis ohne Suffix
-            if base in index_base:
-                result[wanted] = index_base[base]
-                continue
-            # 4. Versuche zusätzlich Groß/Klein Variation des Basis-Originals
-            # (bereits durch lower abgedeckt – hier keine Extra-Logik nötig)
-            # Wenn kein Treffer: Debug-Hinweis (einmal pro Marke)
-            print(f"Kein Logo-Match für {wanted} inkl. Varianten")
+            entry = index.resolve(wanted)
+            if entry is not None:
+                result[wanted] = dict(entry)
+            else:
+                print(f"Kein Logo-Match für {wanted} inkl. Varianten")
         return result
     except Exception as e:
         print(f"Fehler beim erweiterten Logo-Matching: {e}")
         return {}
 
+
+# --- Gemeinsamer Logo-Index ---
+
+def _loose_brand_key(name: str) -> str:
+    """Normalisierung ohne Leerzeichen und Trennzeichen (z.B. 'Fronius-Int.' -> 'froniusint')."""
+    return re.sub(r"[\s\-_.]+", "", (name or "").strip().lower())
+
+
+def _decode_logo(value: str) -> Optional[bytes]:
+    s = (value or "").strip()
+    if ";base64," in s:
+        s = s.split(";base64,", 1)[1]
+    try:
+        return base64.b64decode(s, validate=False)
+    except Exception:
+        return None
+
+
+def _guess_logo_format(data: Optional[bytes]) -> str:
+    if data:
+        if data.startswith(b"\x89PNG"):
+            return "PNG"
+        if data.startswith(b"\xff\xd8"):
+            return "JPEG"
+        if data.lstrip().startswith((b"<?xml", b"<svg")):
+            return "SVG"
+    return "PNG"
+
+
+class BrandLogoIndex:
+    """Alle Logo-Quellen in Prioritätsreihenfolge mit vorberechneten Lookup-Tabellen und dekodierten Bildern."""
+
+    def __init__(self, entries: List[Dict[str, Any]], aliases: Optional[Dict[str, Any]] = None):
+        self.exact: Dict[str, Dict[str, Any]] = {}
+        self.lower: Dict[str, Dict[str, Any]] = {}
+        self.loose: Dict[str, Dict[str, Any]] = {}
+        self.base: Dict[str, Dict[str, Any]] = {}
+        # Höhere Priorität zuerst: spätere Quellen überschreiben keine früheren Treffer
+        for entry in entries:
+            name = entry["brand_name"]
+            self.exact.setdefault(name, entry)
+            self.lower.setdefault(name.lower(), entry)
+            self.loose.setdefault(_loose_brand_key(name), entry)
+            self.base.setdefault(_loose_brand_key(_base_brand_without_suffix(name)), entry)
+        self.aliases: Dict[str, str] = {}
+        for alias, target in (aliases or {}).items():
+            if alias and isinstance(target, str) and target.strip():
+                self.aliases[_loose_brand_key(str(alias))] = target.strip()
+
+    def _lookup(self, name: str) -> Optional[Dict[str, Any]]:
+        if name in self.exact:
+            return self.exact[name]
+        entry = self.lower.get(name.lower()) or self.loose.get(_loose_brand_key(name))
+        if entry is not None:
+            return entry
+        return self.base.get(_loose_brand_key(_base_brand_without_suffix(name)))
+
+    def resolve(self, brand_name: str) -> Optional[Dict[str, Any]]:
+        name = (brand_name or "").strip()
+        if not name:
+            return None
+        if name in self.exact:
+            return self.exact[name]
+        alias_target = self.aliases.get(_loose_brand_key(name)) or self.aliases.get(
+            _loose_brand_key(_base_brand_without_suffix(name))
+        )
+        if alias_target:
+            entry = self._lookup(alias_target)
+            if entry is not None:
+                return entry
+        return self._lookup(name)
+
+
+def _admin_logo_entry(brand_name: str, value: Any, source: str) -> Optional[Dict[str, Any]]:
+    if not isinstance(value, str) or not value.strip() or not brand_name.strip():
+        return None
+    data = _decode_logo(value)
+    return {
+        'brand_name': brand_name.strip(),
+        'logo_base64': value,
+        'logo_format': _guess_logo_format(data),
+        'file_size_bytes': len(data) if data else 0,
+        'logo_bytes': data,
+        'source': source,
+    }
+
+
+def _build_brand_logo_index(conn: sqlite3.Connection) -> BrandLogoIndex:
+    entries: List[Dict[str, Any]] = []
+    aliases: Dict[str, Any] = {}
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT key, value FROM admin_settings WHERE key = ? OR key = ? OR key LIKE ? ESCAPE '\\'",
+            (BRAND_LOGO_MAP_SETTING_KEY, BRAND_LOGO_ALIAS_SETTING_KEY, "brand\\_logo\\_%"),
+        )
+        settings = {row[0]: row[1] for row in cursor.fetchall()}
+    except sqlite3.Error:
+        settings = {}
+
+    def _json_setting(key: str) -> Dict[str, Any]:
+        try:
+            value = json.loads(settings.get(key) or "{}")
+        except (TypeError, ValueError):
+            return {}
+        return value if isinstance(value, dict) else {}
+
+    # 1. Einzel-Keys brand_logo_<Marke>
+    for key, value in settings.items():
+        if key.startswith(BRAND_LOGO_SETTING_PREFIX) and key not in (BRAND_LOGO_MAP_SETTING_KEY, BRAND_LOGO_ALIAS_SETTING_KEY):
+            entry = _admin_logo_entry(key[len(BRAND_LOGO_SETTING_PREFIX):], value, "admin_setting")
+            if entry:
+                entries.append(entry)
+    # 2. Map 'brand_logos' {Marke: Base64}
+    for brand, value in _json_setting(BRAND_LOGO_MAP_SETTING_KEY).items():
+        entry = _admin_logo_entry(str(brand), value, "admin_map")
+        if entry:
+            entries.append(entry)
+    aliases = _json_setting(BRAND_LOGO_ALIAS_SETTING_KEY)
+
+    # 3. Tabelle brand_logos (aktive Einträge)
+    create_brand_logos_table(conn)
+    for row in _fetch_all_brand_rows(conn).values():
+        if not row.get('logo_base64'):
+            continue
+        row['logo_bytes'] = _decode_logo(row['logo_base64'])
+        row['source'] = "brand_logos"
+        entries.append(row)
+    return BrandLogoIndex(entries, aliases)
+
+
+def invalidate_brand_logo_index() -> None:
+    """Verwirft den Logo-Index (nach Änderungen an brand_logos oder den brand_logo-Settings)."""
+    global _index_generation
+    with _index_lock:
+        _LOGO_INDEXES.clear()
+        _index_generation += 1
+
+
+def get_brand_logo_index() -> BrandLogoIndex:
+    """Logo-Index der aktuellen Datenbank; wird beim ersten Zugriff nach einer Änderung neu aufgebaut."""
+    db_key = str(getattr(_database, "DB_PATH", "") or "")
+    with _index_lock:
+        index = _LOGO_INDEXES.get(db_key)
+        generation = _index_generation
+    if index is not None:
+        return index
+    conn = get_db_connection()
+    if not conn:
+        return BrandLogoIndex([])
+    try:
+        index = _build_brand_logo_index(conn)
+    finally:
+        conn.close()
+    with _index_lock:
+        # Eine Invalidierung während des Aufbaus: Index evtl. veraltet, nur für diesen Aufruf nutzen
+        if _index_generation == generation:
+            _LOGO_INDEXES[db_key] = index
+    return index
+
+
+def resolve_brand_logo(brand_name: str) -> Optional[Dict[str, Any]]:
+    """Logo-Eintrag (logo_base64, logo_format, logo_bytes, brand_name, source) für eine Marke oder None."""
+    if not DB_AVAILABLE or not brand_name:
+        return None
+    try:
+        return get_brand_logo_index().resolve(brand_name)
+    except Exception as e:
+        print(f"Fehler bei der Logo-Auflösung für '{brand_name}': {e}")
+        return None
+
+
 def deactivate_brand_logo(brand_name: str) -> bool:
     """Deaktiviert ein Logo (soft delete)"""
     if not DB_AVAILABLE:
@@ -405,6 +574,7 @@ def deactivate_brand_logo(brand_name: str) -> bool:
         updated_count = cursor.rowcount
         conn.commit()
         conn.close()
+        invalidate_brand_logo_index()
         
         if updated_count > 0:
             print(f"Logo für Marke '{brand_name}' deaktiviert")
@@ -11,6 +11,7 @@ Usage:
 import sys
 import json
 import traceback
+import threading
 from pathlib import Path
 import os
 
@@ -22,6 +23,7 @@ try:
     # Import our calculation modules
     from calculations import perform_calculations
     from analysis import create_live_pricing_data
+    from live_pricing_graph import DependencyGraph
     import pandas as pd
     
     # Try to import additional modules if they exist
@@ -247,46 +249,73 @@ def perform_full_calculations(config):
         }
 
 
+def _build_bridge_pricing_graph():
+    """
+    Dependency graph for live pricing: base values stay cached between slider
+    updates, only price-dependent nodes are recomputed
+    """
+    graph = DependencyGraph()
+    for name in ('base_price', 'annual_savings', 'discount_percent', 'surcharge_percent', 'additional_costs'):
+        graph.add_input(name, 0.0)
+    graph.add_node('discount_amount', lambda base, pct: base * (pct / 100), ['base_price', 'discount_percent'])
+    graph.add_node('surcharge_amount', lambda base, pct: base * (pct / 100), ['base_price', 'surcharge_percent'])
+    graph.add_node('final_price_netto',
+                   lambda base, discount, surcharge, extra: base - discount + surcharge + extra,
+                   ['base_price', 'discount_amount', 'surcharge_amount', 'additional_costs'])
+    graph.add_node('final_price_brutto', lambda netto: netto * 1.19, ['final_price_netto'])  # Add German VAT
+    graph.add_node('price_change_percent',
+                   lambda base, netto: ((netto - base) / base * 100) if base > 0 else 0,
+                   ['base_price', 'final_price_netto'])
+    # Recalculate amortization with new price
+    graph.add_node('new_amortization_years',
+                   lambda netto, savings: netto / savings if savings > 0 else 0,
+                   ['final_price_netto', 'annual_savings'])
+    # Simple ROI with new price
+    graph.add_node('new_roi_percent',
+                   lambda netto, savings: (savings / netto * 100) if netto > 0 else 0,
+                   ['final_price_netto', 'annual_savings'])
+    return graph
+
+
+_LIVE_PRICING_GRAPH = None
+# Der Graph ist zustandsbehaftet und prozessweit: Aufbau, Eingänge setzen und Auslesen
+# laufen unter diesem Lock, damit parallele Aufrufe keine fremden Zwischenwerte lesen
+_LIVE_PRICING_LOCK = threading.Lock()
+
+
 def calculate_live_pricing(base_results, modifications):
     """
     Calculate live pricing modifications
     """
+    global _LIVE_PRICING_GRAPH
     try:
-        # Extract base price
-        base_price = base_results.get('total_investment_netto', 0)
-        
-        # Apply modifications
-        discount_percent = modifications.get('discount_percent', 0)
-        surcharge_percent = modifications.get('surcharge_percent', 0)
-        additional_costs = modifications.get('additional_costs', 0)
-        
-        # Calculate new price
-        discount_amount = base_price * (discount_percent / 100)
-        surcharge_amount = base_price * (surcharge_percent / 100)
-        
-        final_price_netto = base_price - discount_amount + surcharge_amount + additional_costs
-        final_price_brutto = final_price_netto * 1.19  # Add German VAT
-        
-        # Recalculate affected KPIs
-        annual_production = base_results.get('annual_pv_production_kwh', 0)
-        annual_savings = base_results.get('annual_financial_benefit_year1', 0)
-        
-        # Recalculate amortization with new price
-        new_amortization_years = final_price_netto / annual_savings if annual_savings > 0 else 0
-        
-        # Simple ROI with new price
-        new_roi_percent = (annual_savings / final_price_netto * 100) if final_price_netto > 0 else 0
+        with _LIVE_PRICING_LOCK:
+            if _LIVE_PRICING_GRAPH is None:
+                _LIVE_PRICING_GRAPH = _build_bridge_pricing_graph()
+            graph = _LIVE_PRICING_GRAPH
+
+            graph.set_inputs({
+                'base_price': float(base_results.get('total_investment_netto', 0) or 0),
+                'annual_savings': float(base_results.get('annual_financial_benefit_year1', 0) or 0),
+                'discount_percent': float(modifications.get('discount_percent', 0) or 0),
+                'surcharge_percent': float(modifications.get('surcharge_percent', 0) or 0),
+                'additional_costs': float(modifications.get('additional_costs', 0) or 0),
+            })
+            values = graph.evaluate([
+                'base_price', 'discount_amount', 'surcharge_amount', 'additional_costs', 'final_price_netto',
+                'final_price_brutto', 'price_change_percent', 'new_amortization_years', 'new_roi_percent',
+            ])
         
         pricing_results = {
-            'base_price_netto': base_price,
-            'discount_amount': discount_amount,
-            'surcharge_amount': surcharge_amount,
-            'additional_costs': additional_costs,
-            'final_price_netto': final_price_netto,
-            'final_price_brutto': final_price_brutto,
-            'price_change_percent': ((final_price_netto - base_price) / base_price * 100) if base_price > 0 else 0,
-            'new_amortization_years': new_amortization_years,
-            'new_roi_percent': new_roi_percent,
+            'base_price_netto': values['base_price'],
+            'discount_amount': values['discount_amount'],
+            'surcharge_amount': values['surcharge_amount'],
+            'additional_costs': values['additional_costs'],
+            'final_price_netto': values['final_price_netto'],
+            'final_price_brutto': values['final_price_brutto'],
+            'price_change_percent': values['price_change_percent'],
+            'new_amortization_years': values['new_amortization_years'],
+            'new_roi_percent': values['new_roi_percent'],
             'updated_at': pd.Timestamp.now().isoformat()
         }
         
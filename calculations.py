@@ -42,7 +42,7 @@ except ImportError as e:
 try:
     from price_matrix import PriceMatrix
     from storage_model_resolver import StorageModelResolver
-    from matrix_loader import MatrixLoader
+    from matrix_loader import get_price_matrix_loader
     PRICE_MATRIX_CLASSES_AVAILABLE = True
 except ImportError as e:
     PRICE_MATRIX_CLASSES_AVAILABLE = False
@@ -224,6 +224,8 @@ def Dummy_get_product_by_model_name_calc(model_name):
     return None
 
 
+from feed_in_tariffs import annual_tariff_series, get_tariff_table
+
 _DATABASE_AVAILABLE = False
 try:
     from database import load_admin_setting as real_load_admin_setting
@@ -270,9 +272,16 @@ except Exception:
 # Old cache implementation removed - now using MatrixLoader class
 
 
+# Letzte Roh-Eingaben der Preis-Slider und das daraus abgeleitete Ergebnis
+_PRICING_MODIFICATIONS_CACHE: Dict[str, Any] = {"key": None, "value": None}
+
+
 def _collect_pricing_modifications_from_session() -> Dict[str, float]:
     """
     Sammelt alle Preismodifikationen aus verschiedenen Session State Quellen.
+
+    Unveränderte Slider-Werte liefern das zuletzt berechnete Ergebnis (als Kopie),
+    damit nachgelagerte Knoten des Live-Preis-Graphen nicht invalidiert werden.
     
     Returns:
         Dictionary mit standardisierten Preismodifikationen
@@ -288,30 +297,35 @@ def _collect_pricing_modifications_from_session() -> Dict[str, float]:
             except Exception:
                 return default
         
-        # Sammle aus verschiedenen Session State Quellen
-        modifications = {}
-        
-        # Aus pricing_modifications Dictionary (falls vorhanden)
         pricing_mods = st.session_state.get("pricing_modifications", {})
-        modifications["discount_percent"] = _to_float(pricing_mods.get("discount_percent", 0.0))
-        modifications["surcharge_percent"] = _to_float(pricing_mods.get("surcharge_percent", 0.0))
-        modifications["special_discount"] = _to_float(pricing_mods.get("special_discount", 0.0))
-        modifications["additional_costs"] = _to_float(pricing_mods.get("additional_costs", 0.0))
-        
-        # Aus individuellen Session State Keys (Slider-Werte)
-        slider_discount = _to_float(st.session_state.get("pricing_modifications_discount_slider", 0.0))
-        slider_rebates = _to_float(st.session_state.get("pricing_modifications_rebates_slider", 0.0))
-        slider_surcharge = _to_float(st.session_state.get("pricing_modifications_surcharge_slider", 0.0))
-        slider_special_costs = _to_float(st.session_state.get("pricing_modifications_special_costs_slider", 0.0))
-        slider_miscellaneous = _to_float(st.session_state.get("pricing_modifications_miscellaneous_slider", 0.0))
+        slider_keys = (
+            "pricing_modifications_discount_slider",
+            "pricing_modifications_rebates_slider",
+            "pricing_modifications_surcharge_slider",
+            "pricing_modifications_special_costs_slider",
+            "pricing_modifications_miscellaneous_slider",
+        )
+        cache_key = (
+            tuple(_to_float(pricing_mods.get(k, 0.0)) for k in
+                  ("discount_percent", "surcharge_percent", "special_discount", "additional_costs")),
+            tuple(_to_float(st.session_state.get(k, 0.0)) for k in slider_keys),
+        )
+        if _PRICING_MODIFICATIONS_CACHE["key"] == cache_key:
+            return dict(_PRICING_MODIFICATIONS_CACHE["value"])
+
+        # Sammle aus verschiedenen Session State Quellen
+        (dict_discount, dict_surcharge, dict_special, dict_additional), (
+            slider_discount, slider_rebates, slider_surcharge, slider_special_costs, slider_miscellaneous
+        ) = cache_key
         
         # Verwende Slider-Werte falls sie höher sind (Slider haben Priorität)
-        modifications["discount_percent"] = max(modifications["discount_percent"], slider_discount)
-        modifications["surcharge_percent"] = max(modifications["surcharge_percent"], slider_surcharge)
-        modifications["special_discount"] = max(modifications["special_discount"], slider_rebates)
-        modifications["additional_costs"] = max(modifications["additional_costs"], 
-                                               slider_special_costs + slider_miscellaneous)
-        
+        modifications = {
+            "discount_percent": max(dict_discount, slider_discount),
+            "surcharge_percent": max(dict_surcharge, slider_surcharge),
+            "special_discount": max(dict_special, slider_rebates),
+            "additional_costs": max(dict_additional, slider_special_costs + slider_miscellaneous),
+        }
+        _PRICING_MODIFICATIONS_CACHE.update(key=cache_key, value=dict(modifications))
         return modifications
         
     except Exception as e:
@@ -2235,8 +2249,8 @@ def perform_calculations(
     use_new_matrix_classes = PRICE_MATRIX_CLASSES_AVAILABLE
     
     if use_new_matrix_classes:
-        # Use new MatrixLoader implementation
-        matrix_loader = MatrixLoader()
+        # Gemeinsamer Loader: Cache und kompilierte Binärmatrix (mmap) überleben den Aufruf
+        matrix_loader = get_price_matrix_loader()
         price_matrix_df_for_lookup, pm_source, matrix_errors = matrix_loader.load_matrix(
             excel_bytes=price_matrix_excel_bytes if isinstance(price_matrix_excel_bytes, (bytes, bytearray)) else None,
             csv_data=price_matrix_csv_content if isinstance(price_matrix_csv_content, str) else None
@@ -2253,20 +2267,12 @@ def perform_calculations(
         price_matrix_df_for_lookup is not None and not price_matrix_df_for_lookup.empty
     )
 
-    # Einspeisevergütungen laden
-    feed_in_tariffs_block = real_load_admin_setting(
-        "feed_in_tariffs", Dummy_load_admin_setting_calc("feed_in_tariffs")
-    )
-    einspeiseverguetung_parts_data = (
-        feed_in_tariffs_block.get("parts", [])
-        if isinstance(feed_in_tariffs_block, dict)
-        else []
-    )
-    einspeiseverguetung_full_data = (
-        feed_in_tariffs_block.get("full", [])
-        if isinstance(feed_in_tariffs_block, dict)
-        else []
-    )
+    # Einspeisevergütungen: kompilierter Tarif-Index (gecacht bis zur nächsten Admin-Änderung)
+    feed_in_tariff_table = get_tariff_table(real_load_admin_setting)
+    if not (feed_in_tariff_table.has_rates("parts") or feed_in_tariff_table.has_rates("full")):
+        feed_in_tariff_table = get_tariff_table(
+            tariffs_block=Dummy_load_admin_setting_calc("feed_in_tariffs")
+        )
 
     # Globale Konstanten extrahieren mit robusten Fallbacks
     DEFAULT_YIELD_KWH_PER_KWP_ANNUAL = float(
@@ -3065,33 +3071,15 @@ def perform_calculations(
     feed_in_type_str = project_details.get(
         "feed_in_type", "Teileinspeisung"
     )  # Default auf Teileinspeisung
-    einspeiseverguetung_data_to_use = (
-        einspeiseverguetung_parts_data
-        if feed_in_type_str == "Teileinspeisung"
-        else einspeiseverguetung_full_data
-    )
-    if (
-        results["anlage_kwp"] > 0
-        and einspeiseverguetung_data_to_use
-        and isinstance(einspeiseverguetung_data_to_use, list)
-    ):
-        for entry in sorted(
-            einspeiseverguetung_data_to_use,
-            key=lambda x: float(x.get("kwp_max", 0.0) or 0.0),
-        ):  # Sicherstellen, dass kwp_max ein Float ist
-            if results["anlage_kwp"] <= float(
-                entry.get("kwp_max", float("inf")) or float("inf")
-            ):  # Sicherstellen, dass kwp_max ein Float ist
-                einspeiseverguetung_ct_per_kwh = float(
-                    entry.get("ct_per_kwh", 0.0) or 0.0
-                )  # Sicherstellen, dass ct_per_kwh ein Float ist
-                break
-        if (
-            einspeiseverguetung_ct_per_kwh == 0.0 and einspeiseverguetung_data_to_use
-        ):  # Wenn kein passender Tarif gefunden wurde, nimm den letzten
-            einspeiseverguetung_ct_per_kwh = float(
-                einspeiseverguetung_data_to_use[-1].get("ct_per_kwh", 0.0) or 0.0
-            )
+    feed_in_mode = "parts" if feed_in_type_str == "Teileinspeisung" else "full"
+    if results["anlage_kwp"] > 0:
+        feed_in_rate_eur = feed_in_tariff_table.lookup(
+            results["anlage_kwp"],
+            feed_in_mode,
+            commissioning_date=project_details.get("commissioning_date") or None,
+        )  # Stufe mit kleinster Obergrenze >= kWp, oberhalb der letzten Stufe die letzte
+        if feed_in_rate_eur is not None:
+            einspeiseverguetung_ct_per_kwh = round(feed_in_rate_eur * 100.0, 6)
     # elif not einspeiseverguetung_data_to_use and results['anlage_kwp'] > 0 and app_debug_mode_is_enabled: # Bereinigt
     # errors_list.append((texts.get("warn_no_feed_in_tariffs_defined", "Keine Einspeisevergütungen für Typ '{feed_in_type}' definiert.") or "").format(feed_in_type=feed_in_type_str))
 
@@ -3245,6 +3233,18 @@ def perform_calculations(
     # Wartungskosten für erweiterte Berechnungen definieren
     maintenance_cost_fixed_pa = annual_maintenance_costs_eur_year1_calc
 
+    # Einspeisetarif je Simulationsjahr: fest im EEG-Zeitraum, danach Marktwert
+    feed_in_tariffs_by_year = annual_tariff_series(
+        results["einspeiseverguetung_eur_per_kwh"],
+        results["simulation_period_years_effective"],
+        eeg_period_years=int(
+            global_constants.get("einspeiseverguetung_period_years", 20) or 20
+        ),
+        post_eeg_eur_per_kwh=float(
+            global_constants.get("marktwert_strom_eur_per_kwh_after_eeg", 0.03)
+            or 0.03
+        ),
+    )
     for year_idx in range(1, results["simulation_period_years_effective"] + 1):
         current_year_production = annual_pv_production_kwh * (
             annual_degredation_factor ** (year_idx - 1)
@@ -3274,16 +3274,7 @@ def perform_calculations(
         )
         annual_elec_prices_sim_list.append(elec_price_sim)
 
-        feed_in_tariff_sim = results[
-            "einspeiseverguetung_eur_per_kwh"
-        ]  # Annahme: fester Tarif für EEG-Zeitraum
-        if year_idx > int(
-            global_constants.get("einspeiseverguetung_period_years", 20) or 20
-        ):  # Nach EEG-Vergütungszeitraum
-            feed_in_tariff_sim = float(
-                global_constants.get("marktwert_strom_eur_per_kwh_after_eeg", 0.03)
-                or 0.03
-            )  # Marktwert
+        feed_in_tariff_sim = float(feed_in_tariffs_by_year[year_idx - 1])
         annual_feed_in_tariffs_sim_list.append(feed_in_tariff_sim)
 
         cost_savings_sim = current_year_ev * elec_price_sim
@@ -3848,12 +3839,17 @@ def perform_calculations(
             # Zeitstempel für dieses Berechnungsergebnis
             timestamp = datetime.now().isoformat()
 
-            # Speichere Hauptergebnisse
-            st.session_state.calculation_results = results.copy()
+            # Speichere Hauptergebnisse; große Werte (Bytes, DataFrames, Reihen) werden ausgelagert,
+            # im Session State bleiben nur Handles (LazyBlobDict löst sie beim Zugriff auf)
+            try:
+                from session_blob_store import offload_session_value
+            except ImportError:
+                offload_session_value = lambda slot, value: value
+            st.session_state.calculation_results = offload_session_value("calculation_results", results)
 
             # Erstelle Backup-Kopie mit Zeitstempel
             backup_data = {
-                "results": results.copy(),
+                "results": st.session_state.calculation_results.copy(),
                 "timestamp": timestamp,
                 "project_data_summary": {
                     "anlage_kwp": results.get("anlage_kwp", 0),
@@ -3865,7 +3861,8 @@ def perform_calculations(
                     ),
                 },
             }
-            st.session_state.calculation_results_backup = backup_data
+            # Backup teilt die Blobs der Hauptergebnisse (keine zweite Kopie)
+            st.session_state.calculation_results_backup = offload_session_value("calculation_results_backup", backup_data)
 
             # Speichere zusätzlich einen Timestamp für Debugging
             st.session_state.calculation_timestamp = timestamp
@@ -6,7 +6,11 @@ Berechnungen für die Auslegung und Analyse von Wärmepumpensystemen.
 Author: Suratina Sicmislar
 Version: 1.0 (Fully Implemented)
 """
-from typing import Dict, List, Any
+import math
+import re
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
 
 def calculate_building_heat_load(
     building_type: str, living_area_m2: float, insulation_quality: str
@@ -55,10 +59,10 @@ def recommend_heat_pump(heat_load_kw: float, available_pumps: List[Dict]) -> Dic
     suitable_pumps = [p for p in available_pumps if p['heating_output_kw'] >= heat_load_kw]
     if not suitable_pumps:
         return None
-    # Sortiere nach Leistung und wähle die kleinste, die passt
-    return sorted(suitable_pumps, key=lambda p: p['heating_output_kw'])[0]
+    # Kleinste passende Leistung (min statt vollständiger Sortierung)
+    return min(suitable_pumps, key=lambda p: p['heating_output_kw'])
 
-def calculate_annual_energy_consumption(heat_load_kw: float, scop: float, heating_hours: int = 1800) -> float:
+def calculate_annual_energy_consumption(heat_load_kw: float, scop: float, heating_hours: Optional[int] = 1800) -> float:
     """
     Berechnet den jährlichen Stromverbrauch der Wärmepumpe.
 
@@ -66,12 +70,15 @@ def calculate_annual_energy_consumption(heat_load_kw: float, scop: float, heatin
         heat_load_kw (float): Die Heizlast des Gebäudes.
         scop (float): Die Jahresarbeitszahl der Pumpe.
         heating_hours (int): Angenommene jährliche Volllaststunden.
+            None = Volllaststunden aus dem Referenzjahr (Auslegung -12 °C / 20 °C innen).
 
     Returns:
         float: Der geschätzte jährliche Stromverbrauch in kWh.
     """
     if scop == 0:
         return 0.0
+    if heating_hours is None:
+        heating_hours = reference_full_load_hours()
     annual_heat_demand_kwh = heat_load_kw * heating_hours
     annual_electricity_consumption_kwh = annual_heat_demand_kwh / scop
     return annual_electricity_consumption_kwh
@@ -236,6 +243,251 @@ def estimate_heat_load_kw_from_annual_demand(annual_heat_demand_kwh: float, heat
         return 0.0
     return annual_heat_demand_kwh / float(heating_hours)
 
+# --- Stundensimulation mit Referenzjahr ---
+
+# Monatsmittel der Außentemperatur (°C) eines mitteldeutschen Testreferenzjahres
+REFERENCE_MONTHLY_MEAN_TEMP_C: Tuple[float, ...] = (
+    0.5, 1.4, 4.7, 9.2, 13.9, 16.9, 19.0, 18.6, 14.6, 9.8, 4.9, 1.7,
+)
+# Tagesgang (Amplitude in K) und Wetterschwankung (Standardabweichung in K, AR(1)-Prozess)
+REFERENCE_DIURNAL_AMPLITUDE_K = 3.5
+REFERENCE_WEATHER_SIGMA_K = 4.5
+REFERENCE_WEATHER_PERSISTENCE = 0.985
+REFERENCE_YEAR_SEED = 2015
+
+HOURS_PER_YEAR = 8760
+_DAYS_PER_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# Quellentemperaturen für erdgebundene Systeme (°C)
+SOURCE_TEMP_BRINE_C = 0.0
+SOURCE_TEMP_WATER_C = 10.0
+# Normpunkte für die COP-Angabe im Katalog (A2/W35, B0/W35, W10/W35)
+RATING_FLOW_TEMP_C = 35.0
+RATING_AIR_TEMP_C = 2.0
+# Leistungsabfall von Luft-Wärmepumpen je K unter dem Normpunkt
+AIR_CAPACITY_SLOPE_PER_K = 0.025
+MAX_COP = 8.0
+# Vorlauftemperatur der Heizkurve an der Heizgrenze (°C)
+HEATING_CURVE_BASE_FLOW_C = 28.0
+
+_REFERENCE_YEAR: Optional[np.ndarray] = None
+_SIMULATION_CACHE: Dict[Tuple, List[Dict[str, Any]]] = {}
+_SIMULATION_CACHE_MAX_ENTRIES = 64
+
+
+def reference_year_temperatures() -> np.ndarray:
+    """
+    Stündliche Außentemperaturen eines Referenzjahres (8760 Werte, °C).
+
+    Wird deterministisch aus den Monatsmitteln erzeugt (Jahresgang + Tagesgang +
+    Wetterschwankung mit festem Seed), damit keine Netzwerkabfrage nötig ist.
+    """
+    global _REFERENCE_YEAR
+    if _REFERENCE_YEAR is None:
+        hours = np.arange(HOURS_PER_YEAR, dtype=float)
+        # Monatsmittel auf Monatsmitte legen und stündlich (periodisch) interpolieren
+        month_starts = np.cumsum((0,) + _DAYS_PER_MONTH[:-1]) * 24.0
+        month_mids = month_starts + np.array(_DAYS_PER_MONTH) * 12.0
+        seasonal = np.interp(hours, month_mids, REFERENCE_MONTHLY_MEAN_TEMP_C, period=HOURS_PER_YEAR)
+        # Minimum gegen 5 Uhr, Maximum gegen 17 Uhr
+        diurnal = -REFERENCE_DIURNAL_AMPLITUDE_K * np.cos(2 * np.pi * ((hours % 24) - 5) / 24)
+        rng = np.random.default_rng(REFERENCE_YEAR_SEED)
+        shocks = rng.normal(0.0, REFERENCE_WEATHER_SIGMA_K * math.sqrt(1 - REFERENCE_WEATHER_PERSISTENCE ** 2),
+                            HOURS_PER_YEAR)
+        weather = np.empty(HOURS_PER_YEAR)
+        weather[0] = shocks[0]
+        for i in range(1, HOURS_PER_YEAR):
+            weather[i] = REFERENCE_WEATHER_PERSISTENCE * weather[i - 1] + shocks[i]
+        _REFERENCE_YEAR = seasonal + diurnal + weather
+        _REFERENCE_YEAR.setflags(write=False)
+    return _REFERENCE_YEAR
+
+
+def reference_full_load_hours(design_temp_c: float = -12.0, indoor_temp_c: float = 20.0,
+                              heating_limit_temp_c: float = 15.0) -> float:
+    """Heiz-Volllaststunden im Referenzjahr (Gradstunden unter der Heizgrenze / Auslegungsdifferenz)."""
+    temps = reference_year_temperatures()
+    degree_hours = np.clip(heating_limit_temp_c - temps, 0.0, None).sum()
+    design_delta = heating_limit_temp_c - design_temp_c
+    return float(degree_hours / design_delta) if design_delta > 0 else 0.0
+
+
+def parse_flow_temperature_c(system_temp: Any, default: float = 35.0) -> float:
+    """Vorlauftemperatur aus z.B. 'Radiatoren (55°C)' oder einer Zahl."""
+    if isinstance(system_temp, (int, float)):
+        return float(system_temp)
+    match = re.search(r"(\d+(?:[.,]\d+)?)\s*°?C", str(system_temp or ""))
+    return float(match.group(1).replace(",", ".")) if match else default
+
+
+def _temperature_or_default(value: Any, default: float) -> float:
+    # 0 °C ist eine gültige Temperatur; nur fehlende Werte fallen auf den Standard zurück
+    return default if value is None or value == '' else float(value)
+
+
+def building_profile_from_data(building_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Übersetzt building_data der Gebäudeanalyse in ein Simulationsprofil."""
+    area = float(building_data.get('area', building_data.get('living_area_m2', 150)) or 0)
+    return {
+        'heat_load_kw': float(building_data.get('heat_load_kw', 0) or 0),
+        'design_temp_c': _temperature_or_default(building_data.get('outside_temp'), -12.0),
+        'indoor_temp_c': _temperature_or_default(building_data.get('desired_temp'), 20.0),
+        'flow_temp_c': parse_flow_temperature_c(building_data.get('system_temp', 35)),
+        # Warmwasser: ca. 500 kWh pro 25 m² Wohnfläche und Jahr (Bewohnerzahl unbekannt)
+        'hot_water_kwh_per_year': float(building_data.get('hot_water_kwh_per_year', area * 20.0) or 0),
+    }
+
+
+def _normalized_profile(profile: Dict[str, Any]) -> Tuple[float, ...]:
+    return (
+        round(float(profile.get('heat_load_kw', 0) or 0), 3),
+        round(_temperature_or_default(profile.get('design_temp_c'), -12.0), 2),
+        round(_temperature_or_default(profile.get('indoor_temp_c'), 20.0), 2),
+        round(_temperature_or_default(profile.get('heating_limit_temp_c'), 15.0), 2),
+        round(float(profile.get('flow_temp_c', 35) or 35), 2),
+        round(float(profile.get('hot_water_kwh_per_year', 0) or 0), 1),
+        round(float(profile.get('hot_water_flow_temp_c', 50) or 50), 2),
+    )
+
+
+def _pump_row(pump: Dict[str, Any]) -> Tuple[float, float, float, float, str]:
+    """Katalogeintrag -> (Nennleistung kW, COP am Normpunkt, Preis, Quellentemperatur oder NaN für Luft, Typ)."""
+    output_kw = float(pump.get('heating_output_kw', pump.get('heating_power', pump.get('heating_power_kw', 0))) or 0)
+    scop = float(pump.get('scop', 0) or 0)
+    cop = float(pump.get('cop', pump.get('cop_rating', 0)) or 0)
+    if cop <= 0:
+        # Nur SCOP bekannt: SCOP bezieht sich auf mildere Mittelbedingungen als A2/W35
+        cop = scop * 0.9 if scop > 0 else 3.5
+        power_kw = float(pump.get('power_consumption_kw', 0) or 0)
+        if scop <= 0 and output_kw > 0 and power_kw > 0:
+            cop = output_kw / power_kw
+    pump_type = str(pump.get('type', '') or '').lower()
+    if 'sole' in pump_type or 'erd' in pump_type:
+        source = SOURCE_TEMP_BRINE_C
+    elif 'wasser-wasser' in pump_type:
+        source = SOURCE_TEMP_WATER_C
+    else:
+        source = float('nan')
+    return output_kw, cop, float(pump.get('price', 0) or 0), source, pump_type
+
+
+def simulate_heat_pumps(building_profile: Dict[str, Any], pumps: List[Dict[str, Any]],
+                        electricity_price_eur_kwh: float = 0.30, years: int = 20) -> List[Dict[str, Any]]:
+    """
+    Simuliert alle Katalog-Wärmepumpen stündlich über das Referenzjahr (ein NumPy-Durchlauf).
+
+    Args:
+        building_profile: heat_load_kw (Auslegung), design_temp_c, indoor_temp_c,
+            heating_limit_temp_c, flow_temp_c, hot_water_kwh_per_year
+        pumps: Katalogeinträge (heating_output_kw bzw. heating_power, cop, scop, price, type)
+        electricity_price_eur_kwh: Wärmepumpen-Strompreis
+        years: Betrachtungszeitraum für die Gesamtkosten
+
+    Returns:
+        Liste je Pumpe (Katalog-Reihenfolge) mit Jahresarbeitszahl (spf), Strombedarf,
+        Heizstab-Anteil, Deckungsgrad und Gesamtkosten.
+    """
+    design_load, design_temp, indoor, limit, flow_design, hot_water_kwh, hot_water_flow = _normalized_profile(building_profile)
+    temps = reference_year_temperatures()
+
+    # Gebäudekennlinie: linear zwischen Auslegungspunkt und Heizgrenze (innere/solare Gewinne)
+    space_load = design_load * np.clip((limit - temps) / max(limit - design_temp, 1.0), 0.0, None)
+    hot_water_load = np.full(HOURS_PER_YEAR, hot_water_kwh / HOURS_PER_YEAR)
+    # Witterungsgeführte Vorlauftemperatur: Auslegungswert bei design_temp, Fußpunkt an der Heizgrenze
+    flow_temp = np.clip(HEATING_CURVE_BASE_FLOW_C + (flow_design - HEATING_CURVE_BASE_FLOW_C)
+                        * (limit - temps) / max(limit - design_temp, 1.0),
+                        HEATING_CURVE_BASE_FLOW_C, max(flow_design, HEATING_CURVE_BASE_FLOW_C))
+
+    rows = [_pump_row(p) for p in pumps]
+    if not rows:
+        return []
+    output_kw = np.array([r[0] for r in rows])[:, None]
+    rated_cop = np.array([r[1] for r in rows])[:, None]
+    price = np.array([r[2] for r in rows])
+    fixed_source = np.array([r[3] for r in rows])[:, None]
+    is_air = np.isnan(fixed_source)
+    source_temp = np.where(is_air, temps[None, :], fixed_source)
+
+    # Gütegrad gegenüber Carnot aus dem Normpunkt kalibrieren
+    rating_source = np.where(is_air, RATING_AIR_TEMP_C, fixed_source)
+    rating_lift = (RATING_FLOW_TEMP_C + 273.15) / np.maximum(RATING_FLOW_TEMP_C - rating_source, 5.0)
+    carnot_quality = rated_cop / rating_lift
+
+    def cop_at(flow: np.ndarray) -> np.ndarray:
+        lift = np.maximum(flow - source_temp, 5.0)
+        return np.clip(carnot_quality * (flow + 273.15) / lift, 1.0, MAX_COP)
+
+    cop_space = cop_at(flow_temp[None, :])
+    cop_water = cop_at(np.full((1, HOURS_PER_YEAR), hot_water_flow))
+    capacity = output_kw * np.where(
+        is_air, np.clip(1 + AIR_CAPACITY_SLOPE_PER_K * (temps[None, :] - RATING_AIR_TEMP_C), 0.5, 1.3), 1.0)
+
+    # Warmwasser hat Vorrang, Restleistung für Raumwärme, Fehlbetrag über Heizstab
+    hp_water = np.minimum(hot_water_load[None, :], capacity)
+    hp_space = np.minimum(space_load[None, :], capacity - hp_water)
+    backup_heat = (hot_water_load.sum() + space_load.sum()) - (hp_water.sum(axis=1) + hp_space.sum(axis=1))
+    hp_electricity = (hp_water / cop_water).sum(axis=1) + (hp_space / cop_space).sum(axis=1)
+    total_heat = float(space_load.sum() + hot_water_load.sum())
+    total_electricity = hp_electricity + backup_heat
+
+    spf = np.divide(total_heat, total_electricity, out=np.zeros_like(total_electricity), where=total_electricity > 0)
+    coverage = 1.0 - np.divide(backup_heat, total_heat) if total_heat > 0 else np.ones(len(rows))
+    annual_cost = total_electricity * electricity_price_eur_kwh
+
+    return [
+        {
+            'pump': pumps[i],
+            'heating_output_kw': rows[i][0],
+            'spf': round(float(spf[i]), 2),
+            'annual_heat_demand_kwh': round(total_heat, 0),
+            'annual_electricity_kwh': round(float(total_electricity[i]), 0),
+            'backup_electricity_kwh': round(float(backup_heat[i]), 0),
+            'coverage_percent': round(float(coverage[i]) * 100, 1),
+            'annual_operating_cost': round(float(annual_cost[i]), 2),
+            'total_cost_of_ownership': round(float(price[i] + annual_cost[i] * years), 2),
+        }
+        for i in range(len(rows))
+    ]
+
+
+def rank_heat_pumps(building_profile: Dict[str, Any], pumps: List[Dict[str, Any]],
+                    electricity_price_eur_kwh: float = 0.30, years: int = 20,
+                    min_coverage_percent: float = 98.0) -> List[Dict[str, Any]]:
+    """
+    Gerankte Empfehlungen: Pumpen mit ausreichender Deckung nach Gesamtkosten,
+    danach unterdimensionierte Pumpen nach Deckungsgrad. Ergebnis wird je
+    Gebäudeprofil und Katalog gecacht.
+    """
+    # Quellentemperatur (NaN bei Luft) nicht in den Schlüssel: NaN != NaN
+    catalog_key = tuple(
+        (_pump_row(p)[:3], str(p.get('model_name', p.get('model', ''))), str(p.get('type', '')))
+        for p in pumps
+    )
+    cache_key = (_normalized_profile(building_profile), catalog_key,
+                 round(float(electricity_price_eur_kwh), 4), int(years), float(min_coverage_percent))
+    cached = _SIMULATION_CACHE.get(cache_key)
+    if cached is not None:
+        return [dict(entry) for entry in cached]
+
+    results = simulate_heat_pumps(building_profile, pumps, electricity_price_eur_kwh, years)
+    ranked = sorted(results, key=lambda r: (
+        r['coverage_percent'] < min_coverage_percent,
+        r['total_cost_of_ownership'] if r['coverage_percent'] >= min_coverage_percent else -r['coverage_percent'],
+    ))
+    for position, entry in enumerate(ranked, 1):
+        entry['rank'] = position
+
+    if len(_SIMULATION_CACHE) >= _SIMULATION_CACHE_MAX_ENTRIES:
+        _SIMULATION_CACHE.pop(next(iter(_SIMULATION_CACHE)))
+    _SIMULATION_CACHE[cache_key] = ranked
+    return [dict(entry) for entry in ranked]
+
+
+def clear_heatpump_simulation_cache() -> None:
+    """Leert den Empfehlungs-Cache (z.B. nach Änderungen am Wärmepumpen-Katalog)."""
+    _SIMULATION_CACHE.clear()
+
+
 # Test-Funktion
 if __name__ == "__main__":
     # Test der Berechnungen
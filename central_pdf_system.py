@@ -17,6 +17,8 @@ import os
 import json
 import re
 import io
+import threading
+import time
 from datetime import datetime
 
 # =============================================================================
@@ -25,11 +27,24 @@ from datetime import datetime
 
 class PDFSystemManager:
     """Zentrale Verwaltung aller PDF-Systeme"""
+
+    # Reihenfolge für Auto-Auswahl und Fallback: Mega Hybrid > TOM-90 > Standard
+    BACKEND_PRIORITY = ('mega_hybrid', 'tom90', 'standard')
+    # Circuit Breaker: nach so vielen Fehlschlägen in Folge wird ein System übersprungen,
+    # bis die Abkühlzeit abgelaufen ist (danach genau ein Probeversuch)
+    CIRCUIT_BREAKER_THRESHOLD = 3
+    CIRCUIT_BREAKER_COOLDOWN_S = 300.0
     
     def __init__(self):
         self.available_systems = {}
         self.fallback_functions = {}
+        self._capabilities: Dict[str, bool] = {}
+        self._backend_health: Dict[str, Dict[str, Any]] = {}
+        self._health_lock = threading.Lock()
+        # Versuchsprotokoll je Anfrage (Streamlit bedient Sessions in eigenen Threads)
+        self._request_local = threading.local()
         self._initialize_systems()
+        self._probe_capabilities()
     
     def _sanitize_xml_content(self, text: str) -> str:
         """Bereinigt Text von problematischen XML-Zeichen und -Strukturen"""
@@ -538,85 +553,171 @@ class PDFSystemManager:
     
     def get_best_available_system(self) -> str:
         """Gibt das beste verfügbare PDF-System zurück (intelligente Auto-Auswahl)"""
-        status = self.get_system_status()
-        
-        # Prioritätsreihenfolge: Mega Hybrid > TOM-90 > Standard
-        if status.get('mega_hybrid', False):
-            print(" Auto-Auswahl: Mega Hybrid System (beste Option)")
-            return 'mega_hybrid'
-        elif status.get('tom90', False):
-            print(" Auto-Auswahl: TOM-90 System (gute Option)")
-            return 'tom90'
-        elif status.get('standard', False):
-            print(" Auto-Auswahl: Standard System (Fallback)")
-            return 'standard'
-        else:
-            print(" Auto-Auswahl: Notfall-System")
-            return 'emergency'
+        for system_name in self.BACKEND_PRIORITY:
+            if self.can_render(system_name)[0]:
+                print(f" Auto-Auswahl: {system_name}")
+                return system_name
+        print(" Auto-Auswahl: Notfall-System")
+        return 'emergency'
+
+    def validate_request(self, *args, **kwargs) -> List[str]:
+        """Prüft die Eingaben vor jeder Generierung; liefert Problembeschreibungen (leer = ok)."""
+        problems: List[str] = []
+        project_data = kwargs.get('project_data', args[0] if args else None)
+        if not isinstance(project_data, dict):
+            problems.append("project_data fehlt oder ist kein Dictionary")
+        for key in ('analysis_results', 'company_info', 'inclusion_options', 'texts'):
+            value = kwargs.get(key)
+            if value is not None and not isinstance(value, dict):
+                problems.append(f"{key} ist kein Dictionary ({type(value).__name__})")
+        return problems
+
+    def can_render(self, system_name: str) -> tuple:
+        """Trockenprüfung ohne Rendering: (True, '') oder (False, Grund)."""
+        if not self._capabilities.get(system_name, False):
+            return False, "nicht verfügbar"
+        if not callable(self.available_systems.get(system_name)):
+            return False, "keine Generatorfunktion"
+        if self._is_circuit_open(system_name):
+            return False, "Circuit Breaker offen"
+        return True, ""
+
+    def _health_entry(self, system_name: str) -> Dict[str, Any]:
+        return self._backend_health.setdefault(system_name, {
+            'consecutive_failures': 0,
+            'opened_at': None,
+            'successes': 0,
+            'failures': 0,
+            'last_error': None,
+        })
+
+    def _is_circuit_open(self, system_name: str) -> bool:
+        with self._health_lock:
+            health = self._health_entry(system_name)
+            if health['consecutive_failures'] < self.CIRCUIT_BREAKER_THRESHOLD or health['opened_at'] is None:
+                return False
+            return (time.monotonic() - health['opened_at']) < self.CIRCUIT_BREAKER_COOLDOWN_S
+
+    def _register_outcome(self, system_name: str, success: bool, error: Optional[str] = None) -> None:
+        with self._health_lock:
+            health = self._health_entry(system_name)
+            if success:
+                health['successes'] += 1
+                health['consecutive_failures'] = 0
+                health['opened_at'] = None
+                return
+            health['failures'] += 1
+            health['consecutive_failures'] += 1
+            health['last_error'] = error
+            if health['consecutive_failures'] >= self.CIRCUIT_BREAKER_THRESHOLD:
+                # Auch ein fehlgeschlagener Probeversuch öffnet den Breaker erneut
+                health['opened_at'] = time.monotonic()
+
+    def _record_attempt(self, system_name: str, status: str, reason: str = "", duration_s: float = 0.0) -> None:
+        self._request_local.attempts.append({
+            'system': system_name,
+            'status': status,  # success | empty | error | skipped | invalid
+            'reason': reason,
+            'duration_s': round(duration_s, 4),
+        })
+
+    def get_last_attempts(self) -> List[Dict[str, Any]]:
+        """Versuchsprotokoll der letzten generate_pdf-Anfrage dieses Threads."""
+        return list(getattr(self._request_local, 'attempts', []))
+
+    def get_backend_health(self) -> Dict[str, Dict[str, Any]]:
+        """Zähler und Circuit-Breaker-Zustand je System."""
+        with self._health_lock:
+            snapshot = {name: dict(health) for name, health in self._backend_health.items()}
+        for name, health in snapshot.items():
+            health['circuit_open'] = self._is_circuit_open(name)
+        return snapshot
+
+    def reset_backend_health(self, system_name: Optional[str] = None) -> None:
+        """Setzt Circuit Breaker zurück (alle Systeme oder ein einzelnes)."""
+        with self._health_lock:
+            if system_name is None:
+                self._backend_health.clear()
+            else:
+                self._backend_health.pop(system_name, None)
     
     def generate_pdf(self, layout_choice: str, *args, **kwargs) -> Optional[bytes]:
-        """Zentrale PDF-Generierung mit intelligenter Systemauswahl"""
-        
+        """Zentrale PDF-Generierung mit intelligenter Systemauswahl
+
+        Jedes System wird pro Anfrage höchstens einmal versucht: zuerst das gewählte,
+        danach die übrigen in BACKEND_PRIORITY-Reihenfolge. Nicht verfügbare Systeme und
+        solche mit offenem Circuit Breaker werden ohne Rendering übersprungen.
+        """
+        self._request_local.attempts = []
+
+        problems = self.validate_request(*args, **kwargs)
+        if problems:
+            print(f" PDF-Anfrage ungültig: {'; '.join(problems)}")
+            self._record_attempt('input', 'invalid', '; '.join(problems))
+            return None
+
         # Bei Auto-Modus das beste System wählen
         if layout_choice == "auto":
             layout_choice = self.get_best_available_system()
             print(f"🤖 Automatische Systemauswahl: {layout_choice}")
-        
-        # System-spezifische Behandlung
-        if layout_choice == "mega_hybrid":
-            try:
-                system_func = self.get_system('mega_hybrid')
-                if system_func:
-                    print(" Verwende Mega Hybrid System...")
-                    result = system_func(*args, **kwargs)
-                    if result:
-                        print(" Mega Hybrid PDF erfolgreich generiert!")
-                        return result
-                    else:
-                        print(" Mega Hybrid lieferte keine Daten - verwende Fallback")
-            except Exception as e:
-                print(f" Mega Hybrid Fehler: {e}")
-        
-        elif layout_choice == "tom90_exact" or layout_choice == "tom90":
-            try:
-                system_func = self.get_system('tom90')
-                if system_func:
-                    print(" Verwende TOM-90 System...")
-                    result = system_func(*args, **kwargs)
-                    if result:
-                        print(" TOM-90 PDF erfolgreich generiert!")
-                        return result
-            except Exception as e:
-                print(f" TOM-90 Fehler: {e}")
-        
-        elif layout_choice == "standard":
+        elif layout_choice == "tom90_exact":
+            layout_choice = "tom90"
+
+        candidates = [layout_choice] + [name for name in self.BACKEND_PRIORITY if name != layout_choice]
+        for system_name in candidates:
+            if system_name == 'emergency':
+                continue
+            ok, reason = self.can_render(system_name)
+            if not ok:
+                self._record_attempt(system_name, 'skipped', reason)
+                continue
+            print(f" Verwende System {system_name}...")
+            started = time.perf_counter()
             try:
-                system_func = self.get_system('standard')
-                if system_func:
-                    print(" Verwende Standard System...")
-                    result = system_func(*args, **kwargs)
-                    if result:
-                        print(" Standard PDF erfolgreich generiert!")
-                        return result
+                result = self.available_systems[system_name](*args, **kwargs)
             except Exception as e:
-                print(f" Standard Fehler: {e}")
-        
-        # Fallback auf bestes verfügbares System
-        print(" Automatischer Fallback...")
-        best_system = self.get_best_available_system()
-        if best_system != layout_choice:  # Verhindere Endlosschleife
-            return self.generate_pdf(best_system, *args, **kwargs)
-        
+                print(f" {system_name} Fehler: {e}")
+                self._record_attempt(system_name, 'error', str(e), time.perf_counter() - started)
+                self._register_outcome(system_name, False, str(e))
+                continue
+            if result:
+                print(f" {system_name} PDF erfolgreich generiert!")
+                self._record_attempt(system_name, 'success', '', time.perf_counter() - started)
+                self._register_outcome(system_name, True)
+                return result
+            print(f" {system_name} lieferte keine Daten - verwende Fallback")
+            self._record_attempt(system_name, 'empty', 'keine Daten', time.perf_counter() - started)
+            self._register_outcome(system_name, False, 'keine Daten')
+
         # Letzter Fallback
         print(" Alle Systeme fehlgeschlagen - verwende Notfall-PDF")
-        return self._try_emergency_fallback(*args, **kwargs)
+        started = time.perf_counter()
+        result = self._try_emergency_fallback(*args, **kwargs)
+        self._record_attempt('emergency', 'success' if result else 'empty', '', time.perf_counter() - started)
+        return result
 
     def get_system(self, system_name: str):
         """Gibt das angeforderte PDF-System zurück"""
         return self.available_systems.get(system_name)
     
     def get_system_status(self) -> Dict[str, bool]:
-        """Gibt den Status aller Systeme zurück"""
+        """Gibt den Status aller Systeme zurück (einmalig beim Start ermittelt)"""
+        status = dict(self._capabilities)
+        # Preview prüfen
+        try:
+            status['preview'] = st.session_state.get('pdf_preview_available', False)
+        except:
+            pass
+        return status
+
+    def refresh_capabilities(self) -> Dict[str, bool]:
+        """Erneute Verfügbarkeitsprüfung, z.B. nach Installation eines Renderers."""
+        self._initialize_systems()
+        self._probe_capabilities()
+        return self.get_system_status()
+
+    def _probe_capabilities(self) -> None:
+        """Prüft einmalig, welche Systeme importierbar sind, und cacht das Ergebnis."""
         status = {
             'standard': True,  # Standard ist immer verfügbar
             'tom90': False,
@@ -643,9 +744,6 @@ class PDFSystemManager:
         # Mega Hybrid prüfen
         try:
             from mega_tom90_hybrid_pdf import MegaTOM90HybridPDFGenerator, generate_mega_hybrid_pdf
-            # Zusätzliche Validierung - teste ob die Klasse funktional ist
-            test_generator = MegaTOM90HybridPDFGenerator
-            test_function = generate_mega_hybrid_pdf
             status['mega_hybrid'] = True
             print(" MegaTOM90HybridPDFGenerator vollständig verfügbar")
         except ImportError as e:
@@ -660,14 +758,8 @@ class PDFSystemManager:
                 print(" MegaTOM90HybridPDFGenerator teilweise verfügbar")
             except:
                 status['mega_hybrid'] = False
-        
-        # Preview prüfen
-        try:
-            status['preview'] = st.session_state.get('pdf_preview_available', False)
-        except:
-            pass
-            
-        return status
+
+        self._capabilities = status
 
 # Globale Instanz des PDF-System-Managers
 PDF_MANAGER = PDFSystemManager()
@@ -1812,9 +1904,10 @@ class CentralPDFInterface:
         
         # Templates laden
         try:
-            title_templates = load_admin_setting_func('pdf_title_image_templates', [])
-            offer_templates = load_admin_setting_func('pdf_offer_title_templates', [])
-            letter_templates = load_admin_setting_func('pdf_cover_letter_templates', [])
+            from pdf_template_store import load_template_list, resolve_template_image
+            title_templates = load_template_list('pdf_title_image_templates', load_admin_setting_func)
+            offer_templates = load_template_list('pdf_offer_title_templates', load_admin_setting_func)
+            letter_templates = load_template_list('pdf_cover_letter_templates', load_admin_setting_func)
         except Exception:
             title_templates = offer_templates = letter_templates = []
         
@@ -1835,7 +1928,7 @@ class CentralPDFInterface:
                 # Finde das ausgewählte Template
                 for template in title_templates:
                     if template.get('name') == selected_title:
-                        selected_title_b64 = template.get('data')
+                        selected_title_b64 = resolve_template_image(template)
                         break
             else:
                 st.info("Keine Titelbilder verfügbar")
@@ -2089,6 +2182,7 @@ def get_central_pdf_status() -> Dict[str, Any]:
         "manager_initialized": PDF_MANAGER is not None,
         "ui_initialized": CENTRAL_PDF_UI is not None,
         "available_systems": PDF_MANAGER.get_system_status() if PDF_MANAGER else {},
+        "backend_health": PDF_MANAGER.get_backend_health() if PDF_MANAGER else {},
         "session_state_keys": [key for key in st.session_state.keys() if "central_pdf_" in key]
     }
 
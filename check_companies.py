@@ -71,25 +71,30 @@ if os.path.exists(DB_PATH):
             template_keys = cursor.fetchall()
             print(f'Template-Keys: {[key[0] for key in template_keys]}')
             
-            # Spezifische Template-Keys prüfen
-            template_checks = [
-                'pdf_title_image_templates',
-                'pdf_offer_title_templates', 
-                'pdf_cover_letter_templates'
-            ]
+            # Die Vorlagenlisten liegen in pdf_templates (pdf_template_store); in admin_settings bleiben
+            # höchstens noch nicht übernommene Listen oder deren Sicherung '<key>_legacy_backup'
+            template_checks = {
+                'pdf_title_image_templates': 'title_image',
+                'pdf_offer_title_templates': 'offer_title',
+                'pdf_cover_letter_templates': 'cover_letter'
+            }
+            has_template_table = 'pdf_templates' in [table[0] for table in tables]
             
-            for template_key in template_checks:
-                cursor.execute("SELECT value FROM admin_settings WHERE key = ?", (template_key,))
-                result = cursor.fetchone()
-                if result:
+            for template_key, template_type in template_checks.items():
+                if has_template_table:
+                    cursor.execute("SELECT COUNT(*) FROM pdf_templates WHERE template_type = ?", (template_type,))
+                    print(f'{template_key}: {cursor.fetchone()[0]} Templates in pdf_templates ({template_type})')
+                for legacy_key in (template_key, template_key + '_legacy_backup'):
+                    cursor.execute("SELECT value FROM admin_settings WHERE key = ?", (legacy_key,))
+                    result = cursor.fetchone()
+                    if not result:
+                        continue
                     import json
                     try:
                         templates = json.loads(result[0])
-                        print(f'{template_key}: {len(templates)} Templates')
+                        print(f'{legacy_key}: {len(templates)} Templates (Altliste in admin_settings)')
                     except:
-                        print(f'{template_key}: Fehler beim Parsen')
-                else:
-                    print(f'{template_key}: Nicht gefunden')
+                        print(f'{legacy_key}: Fehler beim Parsen')
         
         conn.close()
     except Exception as e:
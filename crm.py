@@ -145,6 +145,100 @@ def create_tables_crm(conn: sqlite3.Connection):
         )
     """)
     conn.commit()
+    ensure_crm_indexes(conn)
+
+
+# Indizes und Volltextsuche werden pro Datenbankdatei nur einmal angelegt
+_CRM_INDEXED_DATABASES: set = set()
+# Spaltenlisten je (Datenbankdatei, Tabelle), validiert über PRAGMA schema_version
+_TABLE_COLUMNS_CACHE: Dict[tuple, tuple] = {}
+
+_CRM_INDEX_STATEMENTS = (
+    "CREATE INDEX IF NOT EXISTS idx_projects_customer_id ON projects(customer_id, id)",
+    "CREATE INDEX IF NOT EXISTS idx_projects_status ON projects(project_status, id)",
+    "CREATE INDEX IF NOT EXISTS idx_projects_last_updated ON projects(last_updated)",
+    "CREATE INDEX IF NOT EXISTS idx_customers_name ON customers(last_name, first_name, id)",
+    "CREATE INDEX IF NOT EXISTS idx_customers_email ON customers(email)",
+    "CREATE INDEX IF NOT EXISTS idx_customers_creation_date ON customers(creation_date)",
+    "CREATE INDEX IF NOT EXISTS idx_customers_last_updated ON customers(last_updated)",
+)
+
+CRM_CUSTOMERS_PAGE_SIZE = 50
+CUSTOMER_SEARCH_COLUMNS = ('first_name', 'last_name', 'company_name', 'email', 'city', 'zip_code', 'phone_mobile', 'phone_landline')
+
+
+def _database_key(conn: sqlite3.Connection) -> str:
+    """Dateipfad der Hauptdatenbank; In-Memory-Datenbanken werden pro Verbindung unterschieden."""
+    try:
+        row = conn.execute("PRAGMA database_list").fetchone()
+        path = row[2] if row else ''
+    except sqlite3.Error:
+        path = ''
+    return path or f":memory:{id(conn)}"
+
+
+def _fts5_available(conn: sqlite3.Connection) -> bool:
+    try:
+        return bool(conn.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0])
+    except sqlite3.Error:
+        return False
+
+
+def _has_customers_fts(conn: sqlite3.Connection) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='customers_fts'").fetchone()
+    return row is not None
+
+
+def ensure_crm_indexes(conn: sqlite3.Connection) -> None:
+    """Legt die CRM-Indizes und den FTS5-Suchindex ``customers_fts`` an (idempotent).
+
+    Der Suchindex ist eine External-Content-Tabelle über ``customers`` und wird
+    per Trigger synchron gehalten. Ohne FTS5 fällt ``search_customers`` auf LIKE zurück.
+    """
+    key = _database_key(conn)
+    if key in _CRM_INDEXED_DATABASES:
+        return
+    try:
+        for statement in _CRM_INDEX_STATEMENTS:
+            conn.execute(statement)
+        if _fts5_available(conn) and not _has_customers_fts(conn):
+            columns = ', '.join(CUSTOMER_SEARCH_COLUMNS)
+            new_values = ', '.join(f"new.{c}" for c in CUSTOMER_SEARCH_COLUMNS)
+            old_values = ', '.join(f"old.{c}" for c in CUSTOMER_SEARCH_COLUMNS)
+            conn.execute(
+                f"CREATE VIRTUAL TABLE customers_fts USING fts5({columns}, "
+                "content='customers', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+            )
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS customers_fts_ai AFTER INSERT ON customers BEGIN "
+                f"INSERT INTO customers_fts(rowid, {columns}) VALUES (new.id, {new_values}); END"
+            )
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS customers_fts_ad AFTER DELETE ON customers BEGIN "
+                f"INSERT INTO customers_fts(customers_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+            )
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS customers_fts_au AFTER UPDATE ON customers BEGIN "
+                f"INSERT INTO customers_fts(customers_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+                f"INSERT INTO customers_fts(rowid, {columns}) VALUES (new.id, {new_values}); END"
+            )
+            conn.execute("INSERT INTO customers_fts(customers_fts) VALUES ('rebuild')")
+        conn.commit()
+        _CRM_INDEXED_DATABASES.add(key)
+    except sqlite3.Error as e:
+        print(f"CRM DB: Indizes konnten nicht angelegt werden: {e}")
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> tuple:
+    """Spaltennamen einer Tabelle, gecacht bis sich das Schema ändert."""
+    schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    cache_key = (_database_key(conn), table)
+    cached = _TABLE_COLUMNS_CACHE.get(cache_key)
+    if cached and cached[0] == schema_version:
+        return cached[1]
+    columns = tuple(info[1] for info in conn.execute(f"PRAGMA table_info({table})").fetchall())
+    _TABLE_COLUMNS_CACHE[cache_key] = (schema_version, columns)
+    return columns
 
 def save_customer(conn: sqlite3.Connection, customer_data: Dict[str, Any]) -> Optional[int]:
     cursor = conn.cursor()
@@ -162,8 +256,7 @@ def save_customer(conn: sqlite3.Connection, customer_data: Dict[str, Any]) -> Op
         if k in customer_data and customer_data[k] is not None:
             customer_data[k] = str(customer_data[k]).strip()
     
-    table_info_cursor = conn.execute(f"PRAGMA table_info(customers)").fetchall()
-    existing_db_columns = [info[1] for info in table_info_cursor]
+    existing_db_columns = _table_columns(conn, 'customers')
 
     data_to_save = {k: v for k, v in customer_data.items() if k in existing_db_columns}
 
@@ -208,8 +301,7 @@ def save_project(conn: sqlite3.Connection, project_data: Dict[str, Any]) -> Opti
     project_data['last_updated'] = now
     project_data['creation_date'] = project_data.get('creation_date', now)
 
-    table_info_cursor = conn.execute(f"PRAGMA table_info(projects)").fetchall()
-    existing_columns = [info[1] for info in table_info_cursor]
+    existing_columns = _table_columns(conn, 'projects')
     
     insert_data = {k: v for k, v in project_data.items() if k in existing_columns}
 
@@ -247,6 +339,104 @@ def load_projects_for_customer(conn: sqlite3.Connection, customer_id: int) -> Li
     return [dict(row) for row in rows]
 
 
+def list_customers_page(conn: sqlite3.Connection, limit: int = 50, after: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Eine Seite Kunden sortiert nach (Nachname, Vorname, ID) per Keyset-Pagination.
+
+    ``after`` ist der ``next_cursor`` der vorherigen Seite. Rückgabe:
+    ``{'items': [...], 'next_cursor': {...} oder None}``.
+    """
+    limit = max(1, int(limit))
+    if after:
+        cursor = conn.execute(
+            "SELECT * FROM customers WHERE (last_name, first_name, id) > (?, ?, ?) "
+            "ORDER BY last_name, first_name, id LIMIT ?",
+            (after.get('last_name', ''), after.get('first_name', ''), after.get('id', 0), limit + 1),
+        )
+    else:
+        cursor = conn.execute("SELECT * FROM customers ORDER BY last_name, first_name, id LIMIT ?", (limit + 1,))
+    items = [dict(row) for row in cursor.fetchall()]
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = {'last_name': last['last_name'], 'first_name': last['first_name'], 'id': last['id']}
+    return {'items': items, 'next_cursor': next_cursor}
+
+
+def list_projects_page(conn: sqlite3.Connection, customer_id: Optional[int] = None, status: Optional[str] = None,
+                       limit: int = 50, after_id: Optional[int] = None) -> Dict[str, Any]:
+    """Eine Seite Projekte nach ID, optional gefiltert nach Kunde und Status (Keyset-Pagination)."""
+    limit = max(1, int(limit))
+    conditions, params = [], []
+    if customer_id is not None:
+        conditions.append("customer_id = ?")
+        params.append(customer_id)
+    if status is not None:
+        conditions.append("project_status = ?")
+        params.append(status)
+    if after_id is not None:
+        conditions.append("id > ?")
+        params.append(after_id)
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    rows = conn.execute(f"SELECT * FROM projects {where}ORDER BY id LIMIT ?", (*params, limit + 1)).fetchall()
+    items = [dict(row) for row in rows]
+    next_after_id = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_after_id = items[-1]['id']
+    return {'items': items, 'next_cursor': next_after_id}
+
+
+def _fts_match_expression(query: str) -> str:
+    """Baut aus freier Eingabe eine sichere FTS5-Abfrage mit Präfixsuche je Wort."""
+    tokens = re.findall(r"\w+", query or "", flags=re.UNICODE)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_customers(query: str, limit: int = 20, conn: Optional[sqlite3.Connection] = None) -> List[Dict[str, Any]]:
+    """Volltextsuche über Name, Firma, E-Mail, Ort, PLZ und Telefon.
+
+    Nutzt den FTS5-Index ``customers_fts`` (Präfixsuche, nach bm25 sortiert);
+    ohne FTS5 wird mit LIKE gesucht. Ohne ``conn`` wird eine eigene Verbindung geöffnet.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection_safe_crm()
+        if conn is None:
+            return []
+    try:
+        ensure_crm_indexes(conn)
+        limit = max(1, int(limit))
+        if _has_customers_fts(conn):
+            match = _fts_match_expression(query)
+            if not match:
+                return []
+            rows = conn.execute(
+                "SELECT c.* FROM customers_fts f JOIN customers c ON c.id = f.rowid "
+                "WHERE customers_fts MATCH ? ORDER BY bm25(customers_fts) LIMIT ?",
+                (match, limit),
+            ).fetchall()
+        else:
+            tokens = re.findall(r"\w+", query or "", flags=re.UNICODE)
+            if not tokens:
+                return []
+            conditions, params = [], []
+            for token in tokens:
+                conditions.append('(' + ' OR '.join(f"{c} LIKE ?" for c in CUSTOMER_SEARCH_COLUMNS) + ')')
+                params.extend([f"%{token}%"] * len(CUSTOMER_SEARCH_COLUMNS))
+            rows = conn.execute(
+                f"SELECT * FROM customers WHERE {' AND '.join(conditions)} ORDER BY last_name, first_name, id LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+    except sqlite3.Error as e:
+        print(f"CRM: Kundensuche fehlgeschlagen: {e}")
+        return []
+    finally:
+        if own_conn:
+            conn.close()
+
+
 def render_crm(texts: Dict[str, str], get_db_connection_func: Callable[[], Optional[sqlite3.Connection]]):
     st.header(get_text_crm(texts, "menu_item_crm", "Kundenverwaltung (CRM - C)"))
 
@@ -270,11 +460,29 @@ def render_crm(texts: Dict[str, str], get_db_connection_func: Callable[[], Optio
             st.session_state['selected_project_id'] = None
             st.rerun()
 
-        customers = load_all_customers(conn)
+        search_term = st.text_input(get_text_crm(texts, "crm_search_customers_label", "Kunden suchen"), key="crm_customer_search")
+        # Keyset-Pagination: Cursor der bisher besuchten Seiten im Session State
+        page_cursors = st.session_state.setdefault('crm_customer_page_cursors', [None])
+        next_cursor = None
+        if search_term:
+            customers = search_customers(search_term, limit=CRM_CUSTOMERS_PAGE_SIZE, conn=conn)
+        else:
+            customer_page = list_customers_page(conn, limit=CRM_CUSTOMERS_PAGE_SIZE, after=page_cursors[-1])
+            customers, next_cursor = customer_page['items'], customer_page['next_cursor']
         if customers:
             df_customers = pd.DataFrame(customers)
             # KORREKTUR: hide_row_index durch hide_index ersetzen
             st.dataframe(df_customers, use_container_width=True, hide_index=True)
+
+            if not search_term:
+                col_prev, col_page, col_next = st.columns([1, 2, 1])
+                if col_prev.button(get_text_crm(texts, "crm_page_prev_button", "◀ Zurück"), key="crm_customers_prev", disabled=len(page_cursors) <= 1):
+                    page_cursors.pop()
+                    st.rerun()
+                col_page.caption(f"{get_text_crm(texts, 'crm_page_label', 'Seite')} {len(page_cursors)}")
+                if col_next.button(get_text_crm(texts, "crm_page_next_button", "Weiter ▶"), key="crm_customers_next", disabled=next_cursor is None):
+                    page_cursors.append(next_cursor)
+                    st.rerun()
             
             for customer in customers:
                 col_c_id, col_c_name, col_c_actions = st.columns([0.5, 2, 2])
@@ -472,11 +680,11 @@ def render_crm(texts: Dict[str, str], get_db_connection_func: Callable[[], Optio
             if uploaded_files:
                 for up in uploaded_files:
                     try:
-                        file_bytes = up.read()
                         display_name = up.name
                         doc_type = "offer_pdf" if display_name.lower().endswith(".pdf") else "file"
                         if callable(_add_customer_document_db):
-                            _add_customer_document_db(current_customer['id'], file_bytes, display_name=display_name, doc_type=doc_type, project_id=None, suggested_filename=display_name)
+                            # Upload-Objekt direkt übergeben: wird blockweise in den Dokumentspeicher gestreamt
+                            _add_customer_document_db(current_customer['id'], up, display_name=display_name, doc_type=doc_type, project_id=None, suggested_filename=display_name)
                     except Exception as e:
                         st.warning(f"Fehler beim Speichern von '{getattr(up, 'name', 'Datei')}' : {e}")
                 st.success(get_text_crm(texts, "crm_filevault_upload_success", "Dateien gespeichert."))
@@ -706,9 +914,9 @@ def render_crm(texts: Dict[str, str], get_db_connection_func: Callable[[], Optio
             st.write(f"**{get_text_crm(texts, 'storage_model_label', 'Speicher Modell')}:** {project_details.get('selected_storage_name', 'N/A')}")
             st.write(f"**{get_text_crm(texts, 'storage_capacity_manual_label', 'Speicherkapazität')}:** {project_details.get('selected_storage_storage_power_kw', 0.0)} kWh")
         
-        st.write(f"**{get_text_crm(texts, "visualize_roof_in_pdf_label", "Dachvisualisierung in PDF")}:** {'Ja' if project_details.get('visualize_roof_in_pdf') else 'Nein'}")
-        st.write(f"**{get_text_crm(texts, "latitude_label", "Breitengrad")}:** {project_details.get('latitude', 'N/A')}")
-        st.write(f"**{get_text_crm(texts, "longitude_label", "Längengrad")}:** {project_details.get('longitude', 'N/A')}")
+        st.write(f"**{get_text_crm(texts, 'visualize_roof_in_pdf_label', 'Dachvisualisierung in PDF')}:** {'Ja' if project_details.get('visualize_roof_in_pdf') else 'Nein'}")
+        st.write(f"**{get_text_crm(texts, 'latitude_label', 'Breitengrad')}:** {project_details.get('latitude', 'N/A')}")
+        st.write(f"**{get_text_crm(texts, 'longitude_label', 'Längengrad')}:** {project_details.get('longitude', 'N/A')}")
 
 
         col_view_p_buttons = st.columns(3)
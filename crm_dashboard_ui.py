@@ -24,6 +24,8 @@ try:
         get_db_connection
     )
     from locales import get_text
+    from crm import create_tables_crm, list_customers_page, search_customers
+    from crm_statistics import get_customer_type_counts, get_monthly_revenue, get_period_statistics, get_pipeline_kpis
     DATABASE_AVAILABLE = True
 except ImportError as e:
     st.error(f"Datenbankmodul nicht verfügbar: {e}")
@@ -133,39 +135,57 @@ def render_overview_section(texts: Dict[str, str]):
             with col_action:
                 st.write(f"**{activity['action']}** - {activity['details']}")
 
+CUSTOMERS_PAGE_SIZE = 50
+
+
+def _customer_display_rows(conn, customers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Bringt Zeilen aus der CRM-Tabelle ``customers`` in das Format der Dashboard-Ansicht.
+
+    Der Projektstatus wird für die ganze Seite mit einer Abfrage geladen (jeweils das zuletzt geänderte Projekt).
+    """
+    ids = [c['id'] for c in customers]
+    status_by_customer: Dict[int, Any] = {}
+    if ids:
+        placeholders = ', '.join('?' * len(ids))
+        for row in conn.execute(
+            f"SELECT customer_id, project_status FROM projects WHERE customer_id IN ({placeholders}) "
+            "ORDER BY last_updated", ids
+        ).fetchall():
+            status_by_customer[row[0]] = row[1]
+    rows = []
+    for c in customers:
+        street = ' '.join(p for p in (c.get('address'), c.get('house_number')) if p)
+        town = ' '.join(p for p in (c.get('zip_code'), c.get('city')) if p)
+        rows.append({
+            'id': c['id'],
+            'name': f"{c.get('first_name') or ''} {c.get('last_name') or ''}".strip(),
+            'email': c.get('email') or '',
+            'phone': c.get('phone_mobile') or c.get('phone_landline') or '',
+            'address': ', '.join(p for p in (street, town) if p),
+            'created_at': c.get('creation_date') or '',
+            'project_status': status_by_customer.get(c['id']) or '',
+        })
+    return rows
+
+
 def render_customers_section(texts: Dict[str, str]):
-    """Kunden-Sektion des CRM Dashboards"""
+    """Kunden-Sektion des CRM Dashboards (seitenweise Liste, Volltextsuche über den CRM-Index)"""
     
     st.subheader(" Kundenübersicht")
     
+    conn = None
     try:
-        customers = get_all_active_customers()
-        
-        if not customers:
-            st.info("Noch keine Kunden angelegt.")
+        conn = get_db_connection()
+        if conn is None:
+            st.error("Datenbankverbindung nicht verfügbar.")
             return
-        
-        # Kunden-Tabelle
-        df_customers = pd.DataFrame(customers)
-        
-        # Spalten-Mapping für bessere Darstellung
-        column_mapping = {
-            'name': 'Name',
-            'email': 'E-Mail',
-            'phone': 'Telefon',
-            'created_at': 'Erstellt am',
-            'project_status': 'Projektstatus'
-        }
-        
-        # Nur verfügbare Spalten anzeigen
-        available_columns = [col for col in column_mapping.keys() if col in df_customers.columns]
-        display_df = df_customers[available_columns].rename(columns=column_mapping)
+        create_tables_crm(conn)
         
         # Filter und Suche
         col_search, col_filter = st.columns([2, 1])
         
         with col_search:
-            search_term = st.text_input(" Kunde suchen...", placeholder="Name oder E-Mail eingeben")
+            search_term = st.text_input(" Kunde suchen...", placeholder="Name, E-Mail, Ort oder Telefon eingeben")
         
         with col_filter:
             status_filter = st.selectbox(
@@ -173,10 +193,30 @@ def render_customers_section(texts: Dict[str, str]):
                 options=["Alle", "Aktiv", "Interessent", "Abgeschlossen"]
             )
         
-        # Filter anwenden
+        # Keyset-Pagination: Stapel der Cursor bisheriger Seiten im Session State
+        cursors = st.session_state.setdefault('crm_dashboard_customer_cursors', [None])
+        next_cursor = None
         if search_term:
-            mask = display_df.astype(str).apply(lambda x: x.str.contains(search_term, case=False, na=False)).any(axis=1)
-            display_df = display_df[mask]
+            customers = search_customers(search_term, limit=CUSTOMERS_PAGE_SIZE, conn=conn)
+        else:
+            page = list_customers_page(conn, limit=CUSTOMERS_PAGE_SIZE, after=cursors[-1])
+            customers, next_cursor = page['items'], page['next_cursor']
+        
+        if not customers:
+            st.info("Keine passenden Kunden gefunden." if search_term else "Noch keine Kunden angelegt.")
+            return
+        
+        customer_rows = _customer_display_rows(conn, customers)
+        
+        # Spalten-Mapping für bessere Darstellung
+        column_mapping = {
+            'name': 'Name',
+            'email': 'E-Mail',
+            'phone': 'Telefon',
+            'created_at': 'Erstellt am',
+            'project_status': 'Projektstatus'
+        }
+        display_df = pd.DataFrame(customer_rows)[list(column_mapping.keys())].rename(columns=column_mapping)
         
         # Tabelle anzeigen
         st.dataframe(
@@ -185,20 +225,35 @@ def render_customers_section(texts: Dict[str, str]):
             hide_index=True
         )
         
+        if not search_term:
+            col_prev, col_page, col_next = st.columns([1, 2, 1])
+            with col_prev:
+                if st.button("◀ Zurück", key="crm_dashboard_customers_prev", disabled=len(cursors) <= 1):
+                    cursors.pop()
+                    st.rerun()
+            with col_page:
+                st.caption(f"Seite {len(cursors)}")
+            with col_next:
+                if st.button("Weiter ▶", key="crm_dashboard_customers_next", disabled=next_cursor is None):
+                    cursors.append(next_cursor)
+                    st.rerun()
+        
         # Kundendetails bei Auswahl
-        if len(display_df) > 0:
-            selected_customer = st.selectbox(
-                "Kunde für Details auswählen:",
-                options=display_df['Name'].tolist() if 'Name' in display_df.columns else []
-            )
-            
-            if selected_customer:
-                customer_details = next((c for c in customers if c.get('name') == selected_customer), None)
-                if customer_details:
-                    render_customer_details(customer_details, texts)
+        rows_by_id = {row['id']: row for row in customer_rows}
+        selected_customer_id = st.selectbox(
+            "Kunde für Details auswählen:",
+            options=list(rows_by_id.keys()),
+            format_func=lambda cid: rows_by_id[cid]['name'] or f"Kunde {cid}"
+        )
+        
+        if selected_customer_id is not None:
+            render_customer_details(rows_by_id[selected_customer_id], texts)
     
     except Exception as e:
         st.error(f"Fehler beim Laden der Kundendaten: {e}")
+    finally:
+        if conn is not None:
+            conn.close()
 
 def render_customer_details(customer: Dict[str, Any], texts: Dict[str, str]):
     """Detailansicht für einen Kunden"""
@@ -269,48 +324,63 @@ def render_projects_section(texts: Dict[str, str]):
     st.plotly_chart(fig, use_container_width=True)
 
 def render_revenue_section(texts: Dict[str, str]):
-    """Umsatz-Sektion des CRM Dashboards"""
+    """Umsatz-Sektion des CRM Dashboards (Kennzahlen aus den Pipeline-Summentabellen)"""
     
     st.subheader(" Umsatzanalyse")
     
+    conn = None
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            st.error("Datenbankverbindung nicht verfügbar.")
+            return
+        month_stats = get_period_statistics(conn, 'last_30_days')
+        year_stats = get_period_statistics(conn, 'this_year')
+        this_year = datetime.now().year
+        revenue_current = get_monthly_revenue(conn, this_year)
+        revenue_previous = get_monthly_revenue(conn, this_year - 1)
+    except Exception as e:
+        st.error(f"Fehler beim Laden der Umsatzdaten: {e}")
+        return
+    finally:
+        if conn is not None:
+            conn.close()
+    
     # Umsatz-KPIs
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Monatsumsatz", "85.000 €", "+12.5%")
+        st.metric("Umsatz (30 Tage)", f"{month_stats['won_value']:,.0f} €", f"{month_stats['won_deals']} Abschlüsse")
     
     with col2:
-        st.metric("Jahresumsatz", "920.000 €", "+18.2%")
+        st.metric("Jahresumsatz", f"{year_stats['won_value']:,.0f} €", f"{year_stats['won_deals']} Abschlüsse")
     
     with col3:
-        st.metric("Ø Projektgröße", "18.400 €", "+5.1%")
+        st.metric("Ø Projektgröße", f"{year_stats['avg_deal_size']:,.0f} €", f"{month_stats['deal_size_change']:+.1f}%")
     
     with col4:
-        st.metric("Conversion Rate", "68%", "+3%")
+        st.metric("Conversion Rate", f"{year_stats['conversion_rate']:.0f}%", f"{month_stats['conversion_change']:+.1f}%")
     
     # Umsatz-Chart
     st.subheader(" Umsatzentwicklung")
     
-    # Dummy-Daten für Umsatzentwicklung
     months = ['Jan', 'Feb', 'Mär', 'Apr', 'Mai', 'Jun', 'Jul', 'Aug', 'Sep', 'Okt', 'Nov', 'Dez']
-    revenue_2024 = [45000, 52000, 61000, 48000, 73000, 68000, 82000, 77000, 85000, 91000, 88000, 95000]
-    revenue_2023 = [38000, 41000, 45000, 42000, 58000, 55000, 62000, 59000, 64000, 69000, 71000, 75000]
     
     fig = go.Figure()
     
     fig.add_trace(go.Scatter(
         x=months,
-        y=revenue_2024,
+        y=revenue_current,
         mode='lines+markers',
-        name='2024',
+        name=str(this_year),
         line=dict(color='#1f77b4', width=3)
     ))
     
     fig.add_trace(go.Scatter(
         x=months,
-        y=revenue_2023,
+        y=revenue_previous,
         mode='lines+markers',
-        name='2023',
+        name=str(this_year - 1),
         line=dict(color='#ff7f0e', width=2, dash='dash')
     ))
     
@@ -324,56 +394,82 @@ def render_revenue_section(texts: Dict[str, str]):
     st.plotly_chart(fig, use_container_width=True)
 
 def render_statistics_section(texts: Dict[str, str]):
-    """Statistiken-Sektion des CRM Dashboards"""
+    """Statistiken-Sektion des CRM Dashboards (gruppierte SQL-Abfragen und Summentabellen)"""
     
     st.subheader(" Geschäftsstatistiken")
     
+    conn = None
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            st.error("Datenbankverbindung nicht verfügbar.")
+            return
+        create_tables_crm(conn)
+        customer_types = get_customer_type_counts(conn)
+        kpis = get_pipeline_kpis(conn)
+    except Exception as e:
+        st.error(f"Fehler beim Laden der Statistiken: {e}")
+        return
+    finally:
+        if conn is not None:
+            conn.close()
+    
     # Statistiken in zwei Spalten
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader(" Kundenverteilung")
         
-        # Pie Chart für Kundentypen
-        customer_types = ['Privatkunden', 'Gewerbekunden', 'Landwirtschaft', 'Öffentlich']
-        customer_counts = [45, 18, 12, 5]
-        
-        fig_pie = px.pie(
-            values=customer_counts,
-            names=customer_types,
-            title="Kundenverteilung nach Typ"
-        )
-        
-        st.plotly_chart(fig_pie, use_container_width=True)
+        if customer_types:
+            fig_pie = px.pie(
+                values=list(customer_types.values()),
+                names=list(customer_types.keys()),
+                title="Kundenverteilung nach Typ"
+            )
+            st.plotly_chart(fig_pie, use_container_width=True)
+        else:
+            st.info("Noch keine Kunden angelegt.")
     
     with col2:
-        st.subheader(" Anlagengrößen")
+        st.subheader(" Pipeline-Stufen")
         
-        # Histogram für Anlagengrößen
-        system_sizes = [5, 8, 10, 12, 15, 18, 20, 25, 30, 35, 8, 10, 12, 15, 18, 20, 25]
-        
-        fig_hist = px.histogram(
-            x=system_sizes,
-            nbins=10,
-            title="Verteilung der Anlagengrößen (kWp)",
-            labels={'x': 'Anlagengröße (kWp)', 'y': 'Anzahl Projekte'}
-        )
-        
-        st.plotly_chart(fig_hist, use_container_width=True)
+        leads_by_stage = kpis['leads_by_stage']
+        if leads_by_stage:
+            fig_bar = px.bar(
+                x=list(leads_by_stage.keys()),
+                y=list(leads_by_stage.values()),
+                title="Leads je Pipeline-Stufe",
+                labels={'x': 'Stufe', 'y': 'Anzahl Leads'}
+            )
+            st.plotly_chart(fig_bar, use_container_width=True)
+        else:
+            st.info("Noch keine Leads erfasst.")
     
     # Performance-Metriken
     st.subheader(" Performance-Metriken")
     
     metrics_data = {
         'Metrik': [
-            'Durchschnittliche Bearbeitungszeit',
-            'Kundenzufriedenheit',
-            'Weiterempfehlungsrate',
-            'Terminpünktlichkeit',
-            'Projektabschlussrate'
+            'Durchschnittlicher Verkaufszyklus',
+            'Abschlussquote (gewonnen / abgeschlossen)',
+            'Aktive Leads',
+            'Pipeline-Wert',
+            'Neue Leads diesen Monat'
+        ],
+        'Wert': [
+            f"{kpis['avg_sales_cycle']:.0f} Tage",
+            f"{kpis['conversion_rate']:.0f}%",
+            f"{kpis['active_leads']}",
+            f"{kpis['total_pipeline_value']:,.0f} €",
+            f"{kpis['new_leads_this_month']}"
         ],
-        'Wert': ['12 Tage', '4.8/5', '92%', '96%', '98%'],
-        'Trend': ['↓ -2 Tage', '↑ +0.2', '↑ +3%', '→ 0%', '↑ +1%']
+        'Trend': [
+            f"{kpis['cycle_trend']:+.0f} Tage zum Vormonat",
+            f"{kpis['monthly_conversion_change']:+.1f}% zum Vormonat",
+            '',
+            '',
+            ''
+        ]
     }
     
     df_metrics = pd.DataFrame(metrics_data)
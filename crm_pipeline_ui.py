@@ -9,6 +9,8 @@ from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 import json
 
+from crm_statistics import ensure_statistics_tables, get_period_statistics, get_pipeline_kpis
+
 try:
     from database import get_db_connection, get_all_active_customers
     DATABASE_AVAILABLE = True
@@ -125,7 +127,7 @@ class CRMPipeline:
         with col4:
             st.metric(
                 "Ø Verkaufszyklus",
-                f"{stats['avg_sales_cycle']} Tage",
+                f"{stats['avg_sales_cycle']:.0f} Tage",
                 delta=f"{stats['cycle_trend']:+.0f} Tage"
             )
         
@@ -515,37 +517,13 @@ class CRMPipeline:
     
     # Helper methods
     def _get_pipeline_statistics(self) -> Dict[str, Any]:
-        """Lädt Pipeline-Statistiken"""
+        """Lädt Pipeline-Statistiken aus den Summentabellen (siehe crm_statistics)"""
         try:
             conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # Basis-Statistiken
-            cursor.execute('SELECT COUNT(*) FROM crm_leads WHERE stage NOT IN ("won", "lost")')
-            active_leads = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(*) FROM crm_leads')
-            total_leads = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT SUM(estimated_value) FROM crm_leads WHERE stage NOT IN ("won", "lost")')
-            pipeline_value = cursor.fetchone()[0] or 0
-            
-            cursor.execute('SELECT AVG(estimated_value) FROM crm_leads')
-            avg_deal_value = cursor.fetchone()[0] or 0
-            
-            conn.close()
-            
-            return {
-                'total_leads': total_leads,
-                'active_leads': active_leads,
-                'total_pipeline_value': pipeline_value,
-                'avg_deal_value': avg_deal_value,
-                'conversion_rate': 25.5,  # Mock data
-                'new_leads_this_month': 12,  # Mock data
-                'monthly_conversion_change': 2.3,  # Mock data
-                'avg_sales_cycle': 45,  # Mock data
-                'cycle_trend': -3  # Mock data
-            }
+            try:
+                return get_pipeline_kpis(conn)
+            finally:
+                conn.close()
             
         except Exception as e:
             print(f"Fehler beim Laden der Pipeline-Statistiken: {e}")
@@ -561,26 +539,8 @@ class CRMPipeline:
             conn = get_db_connection()
             cursor = conn.cursor()
             
-            # Tabelle erstellen falls sie nicht existiert
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS crm_leads (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    company_name TEXT NOT NULL,
-                    contact_person TEXT NOT NULL,
-                    email TEXT,
-                    phone TEXT,
-                    address TEXT,
-                    lead_source TEXT,
-                    estimated_value REAL DEFAULT 0,
-                    probability INTEGER DEFAULT 50,
-                    expected_close_date DATE,
-                    stage TEXT DEFAULT 'lead',
-                    stage_changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    notes TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+            # Tabelle, Summentabellen und Trigger erstellen falls sie nicht existieren
+            ensure_statistics_tables(conn)
             
             cursor.execute('''
                 SELECT * FROM crm_leads 
@@ -709,6 +669,7 @@ class CRMPipeline:
         """Erstellt einen neuen Lead"""
         try:
             conn = get_db_connection()
+            ensure_statistics_tables(conn)
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -742,6 +703,7 @@ class CRMPipeline:
         """Aktualisiert die Pipeline-Stufe eines Leads"""
         try:
             conn = get_db_connection()
+            ensure_statistics_tables(conn)
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -762,6 +724,7 @@ class CRMPipeline:
         """Löscht einen Lead"""
         try:
             conn = get_db_connection()
+            ensure_statistics_tables(conn)
             cursor = conn.cursor()
             
             cursor.execute('DELETE FROM crm_leads WHERE id = ?', (lead_id,))
@@ -788,36 +751,21 @@ class CRMPipeline:
         return None
     
     def _get_analytics_data(self, period: str) -> Dict[str, Any]:
-        """Lädt Analytics-Daten für den gewählten Zeitraum"""
-        # Mock data für Demo-Zwecke
-        return {
-            'new_leads': 45,
-            'leads_growth': 12.5,
-            'won_deals': 8,
-            'won_value': 185000,
-            'conversion_rate': 18.2,
-            'conversion_change': 3.1,
-            'avg_deal_size': 23125,
-            'deal_size_change': 8.7,
-            'funnel_data': {
-                'lead': 45,
-                'qualified': 28,
-                'proposal': 15,
-                'negotiation': 12,
-                'won': 8
-            },
-            'trend_data': {
-                'Januar': {'new_leads': 12, 'won_deals': 2},
-                'Februar': {'new_leads': 18, 'won_deals': 4},
-                'März': {'new_leads': 15, 'won_deals': 2}
-            },
-            'source_performance': {
-                'Website': {'count': 18, 'conversion_rate': 22.2},
-                'Empfehlung': {'count': 12, 'conversion_rate': 33.3},
-                'Social Media': {'count': 8, 'conversion_rate': 12.5},
-                'Kaltakquise': {'count': 7, 'conversion_rate': 14.3}
+        """Lädt Analytics-Daten für den gewählten Zeitraum (gruppierte SQL-Abfragen, siehe crm_statistics)"""
+        try:
+            conn = get_db_connection()
+            try:
+                return get_period_statistics(conn, period)
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Fehler beim Laden der Analytics-Daten: {e}")
+            return {
+                'new_leads': 0, 'leads_growth': 0, 'won_deals': 0, 'won_value': 0,
+                'conversion_rate': 0, 'conversion_change': 0, 'avg_deal_size': 0,
+                'deal_size_change': 0, 'funnel_data': {}, 'trend_data': {},
+                'source_performance': {}
             }
-        }
 
 def render_crm_pipeline(texts: Dict[str, str], module_name: Optional[str] = None):
     """Haupt-Render-Funktion für CRM-Pipeline"""
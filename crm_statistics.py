@@ -0,0 +1,372 @@
+# crm_statistics.py
+"""
+Pipeline-Statistiken für die CRM-Dashboards
+
+Alle Kennzahlen werden per SQL berechnet statt in Python/pandas aggregiert:
+
+* ``crm_pipeline_summary`` (je Stufe) und ``crm_pipeline_monthly`` (je Monat)
+  sind Summentabellen, die per Trigger bei jedem INSERT/UPDATE/DELETE auf
+  ``crm_leads`` inkrementell nachgeführt werden. Dashboard-KPIs lesen daraus
+  nur wenige Zeilen über den Primärschlüssel (O(1) unabhängig von der Lead-Anzahl).
+* ``crm_lead_stage_events`` merkt sich, welche Stufen ein Lead erreicht hat;
+  daraus entsteht der Trichter eines Zeitraums in einer gruppierten Abfrage.
+* Zeitraumauswertungen (neue Leads, Abschlüsse, Umsatz, Verkaufszyklus,
+  jeweils inkl. Vorperiode) laufen als eine aggregierte Abfrage über indizierte Spalten.
+"""
+
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+FUNNEL_STAGES = ('lead', 'qualified', 'proposal', 'negotiation', 'won')
+CLOSED_STAGES = ('won', 'lost')
+PERIODS = ('last_30_days', 'last_90_days', 'this_year', 'all_time')
+MONTH_NAMES_DE = ('Januar', 'Februar', 'März', 'April', 'Mai', 'Juni', 'Juli',
+                  'August', 'September', 'Oktober', 'November', 'Dezember')
+
+LEADS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS crm_leads (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        company_name TEXT NOT NULL,
+        contact_person TEXT NOT NULL,
+        email TEXT,
+        phone TEXT,
+        address TEXT,
+        lead_source TEXT,
+        estimated_value REAL DEFAULT 0,
+        probability INTEGER DEFAULT 50,
+        expected_close_date DATE,
+        stage TEXT DEFAULT 'lead',
+        stage_changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        notes TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'  # wie CURRENT_TIMESTAMP (UTC)
+_FUNNEL_ORDER_SQL = 'CASE {col} ' + ' '.join(
+    f"WHEN '{stage}' THEN {i + 1}" for i, stage in enumerate(FUNNEL_STAGES)) + ' END'
+
+# Statistik-Tabellen werden pro Datenbankdatei nur einmal geprüft
+_PREPARED_DATABASES: set = set()
+
+
+def _month(expr: str) -> str:
+    return f"COALESCE(strftime('%Y-%m', {expr}), strftime('%Y-%m', 'now'))"
+
+
+def _cycle_days(row: str) -> str:
+    return (f"MAX(0, COALESCE(julianday({row}.stage_changed_at) - julianday({row}.created_at), 0))")
+
+
+def _contribution_sql(row: str, n: int) -> str:
+    """SQL, das den Beitrag einer Lead-Zeile (``new``/``old``) zu den Summentabellen addiert (n=1) bzw. abzieht (n=-1)."""
+    stage = f"COALESCE({row}.stage, 'lead')"
+    value = f"COALESCE({row}.estimated_value, 0)"
+    return f'''
+        INSERT INTO crm_pipeline_summary (stage, lead_count, value_sum, cycle_days_sum)
+        VALUES ({stage}, {n}, {n} * {value}, CASE WHEN {stage} = 'won' THEN {n} * {_cycle_days(row)} ELSE 0 END)
+        ON CONFLICT(stage) DO UPDATE SET
+            lead_count = lead_count + excluded.lead_count,
+            value_sum = value_sum + excluded.value_sum,
+            cycle_days_sum = cycle_days_sum + excluded.cycle_days_sum;
+        INSERT INTO crm_pipeline_monthly (month, new_leads, won_deals, won_value, lost_deals, cycle_days_sum)
+        VALUES ({_month(f'{row}.created_at')}, {n}, 0, 0, 0, 0)
+        ON CONFLICT(month) DO UPDATE SET new_leads = new_leads + excluded.new_leads;
+        INSERT INTO crm_pipeline_monthly (month, new_leads, won_deals, won_value, lost_deals, cycle_days_sum)
+        SELECT {_month(f'{row}.stage_changed_at')}, 0,
+               {n} * ({stage} = 'won'), CASE WHEN {stage} = 'won' THEN {n} * {value} ELSE 0 END,
+               {n} * ({stage} = 'lost'), CASE WHEN {stage} = 'won' THEN {n} * {_cycle_days(row)} ELSE 0 END
+        WHERE {stage} IN ('won', 'lost')
+        ON CONFLICT(month) DO UPDATE SET
+            won_deals = won_deals + excluded.won_deals,
+            won_value = won_value + excluded.won_value,
+            lost_deals = lost_deals + excluded.lost_deals,
+            cycle_days_sum = cycle_days_sum + excluded.cycle_days_sum;
+    '''
+
+
+def _utc_timestamp(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime(_TIMESTAMP_FORMAT)
+
+
+def ensure_statistics_tables(conn: sqlite3.Connection) -> None:
+    """Legt ``crm_leads``, die Summentabellen, Indizes und Trigger an (idempotent).
+
+    Beim ersten Anlegen der Trigger werden die Summen aus dem Bestand aufgebaut.
+    """
+    row = conn.execute("PRAGMA database_list").fetchone()
+    key = (row[2] if row else '') or f":memory:{id(conn)}"
+    if key in _PREPARED_DATABASES:
+        return
+    try:
+        conn.execute(LEADS_TABLE_SQL)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_crm_leads_stage ON crm_leads(stage)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_crm_leads_created_at ON crm_leads(created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_crm_leads_stage_changed_at ON crm_leads(stage_changed_at)")
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS crm_pipeline_summary (
+                stage TEXT PRIMARY KEY,
+                lead_count INTEGER NOT NULL DEFAULT 0,
+                value_sum REAL NOT NULL DEFAULT 0,
+                cycle_days_sum REAL NOT NULL DEFAULT 0
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS crm_pipeline_monthly (
+                month TEXT PRIMARY KEY,
+                new_leads INTEGER NOT NULL DEFAULT 0,
+                won_deals INTEGER NOT NULL DEFAULT 0,
+                won_value REAL NOT NULL DEFAULT 0,
+                lost_deals INTEGER NOT NULL DEFAULT 0,
+                cycle_days_sum REAL NOT NULL DEFAULT 0
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS crm_lead_stage_events (
+                lead_id INTEGER NOT NULL,
+                stage TEXT NOT NULL,
+                reached_at TIMESTAMP,
+                PRIMARY KEY (lead_id, stage)
+            ) WITHOUT ROWID
+        ''')
+        has_triggers = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='crm_leads_stats_ai'").fetchone()
+        if not has_triggers:
+            conn.execute(f'''
+                CREATE TRIGGER crm_leads_stats_ai AFTER INSERT ON crm_leads BEGIN
+                    {_contribution_sql('new', 1)}
+                    INSERT OR IGNORE INTO crm_lead_stage_events (lead_id, stage, reached_at)
+                    VALUES (new.id, COALESCE(new.stage, 'lead'), COALESCE(new.stage_changed_at, CURRENT_TIMESTAMP));
+                END
+            ''')
+            conn.execute(f'''
+                CREATE TRIGGER crm_leads_stats_au AFTER UPDATE ON crm_leads BEGIN
+                    {_contribution_sql('old', -1)}
+                    {_contribution_sql('new', 1)}
+                    INSERT OR IGNORE INTO crm_lead_stage_events (lead_id, stage, reached_at)
+                    VALUES (new.id, COALESCE(new.stage, 'lead'), COALESCE(new.stage_changed_at, CURRENT_TIMESTAMP));
+                END
+            ''')
+            conn.execute(f'''
+                CREATE TRIGGER crm_leads_stats_ad AFTER DELETE ON crm_leads BEGIN
+                    {_contribution_sql('old', -1)}
+                    DELETE FROM crm_lead_stage_events WHERE lead_id = old.id;
+                END
+            ''')
+            rebuild_pipeline_summary(conn)
+        conn.commit()
+        _PREPARED_DATABASES.add(key)
+    except sqlite3.Error as e:
+        print(f"CRM-Statistik: Tabellen konnten nicht vorbereitet werden: {e}")
+
+
+def rebuild_pipeline_summary(conn: sqlite3.Connection) -> None:
+    """Baut die Summentabellen vollständig aus ``crm_leads`` neu auf (Bestand/Reparatur)."""
+    conn.execute("DELETE FROM crm_pipeline_summary")
+    conn.execute("DELETE FROM crm_pipeline_monthly")
+    stage = "COALESCE(l.stage, 'lead')"
+    value = "COALESCE(l.estimated_value, 0)"
+    conn.execute(f'''
+        INSERT INTO crm_pipeline_summary (stage, lead_count, value_sum, cycle_days_sum)
+        SELECT {stage}, COUNT(*), SUM({value}), SUM(CASE WHEN {stage} = 'won' THEN {_cycle_days('l')} ELSE 0 END)
+        FROM crm_leads l GROUP BY {stage}
+    ''')
+    conn.execute(f'''
+        INSERT INTO crm_pipeline_monthly (month, new_leads, won_deals, won_value, lost_deals, cycle_days_sum)
+        SELECT month, SUM(new_leads), SUM(won_deals), SUM(won_value), SUM(lost_deals), SUM(cycle_days_sum) FROM (
+            SELECT {_month('l.created_at')} AS month, 1 AS new_leads, 0 AS won_deals, 0 AS won_value,
+                   0 AS lost_deals, 0 AS cycle_days_sum
+            FROM crm_leads l
+            UNION ALL
+            SELECT {_month('l.stage_changed_at')}, 0, {stage} = 'won',
+                   CASE WHEN {stage} = 'won' THEN {value} ELSE 0 END, {stage} = 'lost',
+                   CASE WHEN {stage} = 'won' THEN {_cycle_days('l')} ELSE 0 END
+            FROM crm_leads l WHERE {stage} IN ('won', 'lost')
+        ) GROUP BY month
+    ''')
+    conn.execute('''
+        INSERT OR IGNORE INTO crm_lead_stage_events (lead_id, stage, reached_at)
+        SELECT id, COALESCE(stage, 'lead'), COALESCE(stage_changed_at, created_at) FROM crm_leads
+    ''')
+    conn.commit()
+
+
+def _rate(part: float, total: float) -> float:
+    return (part / total * 100.0) if total else 0.0
+
+
+def _change(current: float, previous: float) -> float:
+    """Prozentuale Veränderung gegenüber der Vorperiode (0, wenn es keine Vorperiode gibt)."""
+    return ((current - previous) / previous * 100.0) if previous else 0.0
+
+
+def _month_key(value: datetime) -> str:
+    return value.strftime('%Y-%m')
+
+
+def _monthly_rows(conn: sqlite3.Connection, months: List[str]) -> Dict[str, sqlite3.Row]:
+    placeholders = ', '.join('?' * len(months))
+    cursor = conn.execute(
+        f"SELECT month, new_leads, won_deals, won_value, lost_deals, cycle_days_sum "
+        f"FROM crm_pipeline_monthly WHERE month IN ({placeholders})", months)
+    return {row[0]: row for row in cursor.fetchall()}
+
+
+def get_pipeline_kpis(conn: sqlite3.Connection, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Dashboard-KPIs aus den Summentabellen (liest höchstens sechs Stufen- und zwei Monatszeilen)."""
+    ensure_statistics_tables(conn)
+    now = (now or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    stages = {row[0]: row for row in conn.execute(
+        "SELECT stage, lead_count, value_sum, cycle_days_sum FROM crm_pipeline_summary").fetchall()}
+    total_leads = sum(row[1] for row in stages.values())
+    total_value = sum(row[2] for row in stages.values())
+    active = [row for stage, row in stages.items() if stage not in CLOSED_STAGES]
+    won = stages.get('won')
+    won_count = won[1] if won else 0
+    lost_count = stages['lost'][1] if 'lost' in stages else 0
+
+    this_month = _month_key(now)
+    last_month = _month_key(now.replace(day=1) - timedelta(days=1))
+    monthly = _monthly_rows(conn, [this_month, last_month])
+    current, previous = monthly.get(this_month), monthly.get(last_month)
+
+    def month_rate(row) -> float:
+        return _rate(row[2], row[2] + row[4]) if row else 0.0
+
+    def month_cycle(row) -> float:
+        return (row[5] / row[2]) if row and row[2] else 0.0
+
+    return {
+        'total_leads': total_leads,
+        'active_leads': sum(row[1] for row in active),
+        'total_pipeline_value': sum(row[2] for row in active),
+        'avg_deal_value': (total_value / total_leads) if total_leads else 0,
+        'conversion_rate': _rate(won_count, won_count + lost_count),
+        'new_leads_this_month': current[1] if current else 0,
+        'monthly_conversion_change': month_rate(current) - month_rate(previous) if current and previous else 0.0,
+        'avg_sales_cycle': (won[3] / won_count) if won_count else 0,
+        'cycle_trend': month_cycle(current) - month_cycle(previous) if current and previous else 0.0,
+        'leads_by_stage': {stage: row[1] for stage, row in stages.items() if row[1]},
+    }
+
+
+def _period_bounds(period: str, now: datetime) -> Tuple[str, str, str]:
+    """(Beginn, Ende, Beginn der gleich langen Vorperiode) als UTC-Zeitstempel."""
+    end = now + timedelta(seconds=1)
+    if period == 'last_30_days':
+        start = now - timedelta(days=30)
+    elif period == 'last_90_days':
+        start = now - timedelta(days=90)
+    elif period == 'this_year':
+        start = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    else:
+        start_ts = '0000-01-01 00:00:00'
+        return start_ts, _utc_timestamp(end), start_ts
+    return _utc_timestamp(start), _utc_timestamp(end), _utc_timestamp(start - (end - start))
+
+
+def get_period_statistics(conn: sqlite3.Connection, period: str = 'last_30_days',
+                          now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Analytics für einen Zeitraum im Format von ``CRMPipeline._get_analytics_data``.
+
+    Trichter, Abschlüsse, Umsatz und Zyklusdauer inkl. Vorperiodenvergleich kommen
+    aus je einer gruppierten Abfrage, der Monatstrend aus ``crm_pipeline_monthly``.
+    """
+    ensure_statistics_tables(conn)
+    now = (now or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    start, end, prev_start = _period_bounds(period, now)
+    bounds = {'start': start, 'end': end, 'prev_start': prev_start}
+
+    in_period = "{col} >= :start AND {col} < :end"
+    in_previous = "{col} >= :prev_start AND {col} < :start"
+    created, changed = 'created_at', 'stage_changed_at'
+    won_now = f"stage = 'won' AND {in_period.format(col=changed)}"
+    won_prev = f"stage = 'won' AND {in_previous.format(col=changed)}"
+    row = conn.execute(f'''
+        SELECT
+            COALESCE(SUM({in_period.format(col=created)}), 0),
+            COALESCE(SUM({in_previous.format(col=created)}), 0),
+            COALESCE(SUM({won_now}), 0),
+            COALESCE(SUM(CASE WHEN {won_now} THEN COALESCE(estimated_value, 0) END), 0),
+            COALESCE(SUM(stage = 'lost' AND {in_period.format(col=changed)}), 0),
+            COALESCE(SUM({won_prev}), 0),
+            COALESCE(SUM(CASE WHEN {won_prev} THEN COALESCE(estimated_value, 0) END), 0),
+            COALESCE(SUM(stage = 'lost' AND {in_previous.format(col=changed)}), 0),
+            COALESCE(SUM(CASE WHEN {won_now} THEN {_cycle_days('crm_leads')} END), 0)
+        FROM crm_leads
+        WHERE {created} >= :prev_start OR {changed} >= :prev_start
+    ''', bounds).fetchone()
+    new_leads, prev_new_leads, won_deals, won_value, lost_deals, prev_won, prev_won_value, prev_lost, cycle_days = row
+
+    funnel_counts = dict(conn.execute(f'''
+        SELECT reached, COUNT(*) FROM (
+            SELECT COALESCE(MAX({_FUNNEL_ORDER_SQL.format(col='e.stage')}), 1) AS reached
+            FROM crm_leads l LEFT JOIN crm_lead_stage_events e ON e.lead_id = l.id
+            WHERE l.created_at >= :start AND l.created_at < :end
+            GROUP BY l.id
+        ) GROUP BY reached
+    ''', bounds).fetchall())
+    funnel_data = {stage: sum(count for reached, count in funnel_counts.items() if reached >= i + 1)
+                   for i, stage in enumerate(FUNNEL_STAGES)}
+
+    source_performance = {}
+    for source, count, won in conn.execute('''
+        SELECT COALESCE(lead_source, 'Sonstiges'), COUNT(*), SUM(stage = 'won')
+        FROM crm_leads WHERE created_at >= :start AND created_at < :end
+        GROUP BY 1 ORDER BY 2 DESC
+    ''', bounds).fetchall():
+        source_performance[source] = {'count': count, 'conversion_rate': _rate(won, count)}
+
+    trend_data = {}
+    for month, month_new, month_won in conn.execute(
+            "SELECT month, new_leads, won_deals FROM crm_pipeline_monthly "
+            "WHERE month >= ? AND month <= ? ORDER BY month", (start[:7], end[:7])).fetchall():
+        if month_new or month_won:
+            year, month_no = month.split('-')
+            trend_data[f"{MONTH_NAMES_DE[int(month_no) - 1]} {year}"] = {'new_leads': month_new, 'won_deals': month_won}
+
+    conversion = _rate(won_deals, won_deals + lost_deals)
+    prev_conversion = _rate(prev_won, prev_won + prev_lost)
+    avg_deal_size = (won_value / won_deals) if won_deals else 0.0
+    prev_avg_deal_size = (prev_won_value / prev_won) if prev_won else 0.0
+    return {
+        'new_leads': new_leads,
+        'leads_growth': _change(new_leads, prev_new_leads),
+        'won_deals': won_deals,
+        'won_value': won_value,
+        'lost_deals': lost_deals,
+        'conversion_rate': conversion,
+        'conversion_change': conversion - prev_conversion if (prev_won + prev_lost) else 0.0,
+        'avg_deal_size': avg_deal_size,
+        'deal_size_change': _change(avg_deal_size, prev_avg_deal_size),
+        'avg_sales_cycle': (cycle_days / won_deals) if won_deals else 0.0,
+        'funnel_data': funnel_data,
+        'trend_data': trend_data,
+        'source_performance': source_performance,
+    }
+
+
+def get_monthly_revenue(conn: sqlite3.Connection, year: int) -> List[float]:
+    """Gewonnener Auftragswert je Monat eines Jahres (12 Werte) aus ``crm_pipeline_monthly``."""
+    ensure_statistics_tables(conn)
+    revenue = [0.0] * 12
+    for month, value in conn.execute(
+            "SELECT month, won_value FROM crm_pipeline_monthly WHERE month BETWEEN ? AND ?",
+            (f"{year}-01", f"{year}-12")).fetchall():
+        revenue[int(month[5:7]) - 1] = value or 0.0
+    return revenue
+
+
+def get_customer_type_counts(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Privat- und Gewerbekunden aus der CRM-Tabelle ``customers`` in einer gruppierten Abfrage."""
+    try:
+        rows = conn.execute('''
+            SELECT CASE WHEN TRIM(COALESCE(company_name, '')) = '' THEN 'Privatkunden' ELSE 'Gewerbekunden' END,
+                   COUNT(*)
+            FROM customers GROUP BY 1
+        ''').fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    return {kind: count for kind, count in rows}
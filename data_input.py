@@ -9,7 +9,6 @@ from typing import Dict, Any, Optional, List, Callable, Tuple
 import json
 import traceback
 from datetime import datetime
-import requests
 import base64
 
 # Import streamlit_shadcn_ui with fallback
@@ -99,36 +98,23 @@ def parse_full_address_string(full_address: str, texts: Dict[str, str]) -> Dict[
 
 
 def get_coordinates_from_address_google(address: str, city: str, zip_code: str, api_key: Optional[str], texts: Dict[str, str]) -> Optional[Dict[str, float]]:
-    # ... (Funktion bleibt unverändert) ...
-    if not api_key or api_key == "" or api_key == "PLATZHALTER_HIER_IHREN_KEY_EINFUEGEN":
+    # Anfragen laufen über geocoding.GeocodingService: wiederholte Adressen kommen aus dem persistenten Cache.
+    # Anbieter wie beim Kundenimport (admin_settings 'geocoding_provider'), damit dessen Vorab-Geokodierung trifft
+    try:
+        from geocoding import resolve_provider_name
+        provider_name = resolve_provider_name()
+    except Exception:
+        provider_name = "google"
+    if provider_name == "google" and (not api_key or api_key == "" or api_key == "PLATZHALTER_HIER_IHREN_KEY_EINFUEGEN"):
         # print(get_text_di(texts, "geocode_google_api_key_missing_or_placeholder_terminal", "FEHLER: Google API Key fehlt oder ist Platzhalter. Geocoding nicht möglich.")) # Logging
         # st.warning(get_text_di(texts, "geocode_google_api_key_missing_or_placeholder_ui", "Google API Key nicht konfiguriert. Geocoding deaktiviert.")) # Nur bei Bedarf im UI
         return None
     if not address or not city:
         # st.warning(get_text_di(texts, "geocode_missing_address_city", "Für Geocoding werden Straße und Ort benötigt.")) # Nur bei Bedarf im UI
         return None
-    full_query_address = f"{address}, {zip_code} {city}"
-    base_url = "https://maps.googleapis.com/maps/api/geocode/json"
-    params = {"address": full_query_address, "key": api_key}
     try:
-        response = requests.get(base_url, params=params, timeout=10)
-        response.raise_for_status() 
-        data = response.json()
-        if data.get("status") == "OK" and data.get("results"):
-            location = data["results"][0].get("geometry", {}).get("location", {})
-            lat, lng = location.get("lat"), location.get("lng")
-            if lat is not None and lng is not None:
-                # st.success(get_text_di(texts, "geolocation_success_google_api", f"Koordinaten via Google API: Lat {lat:.6f}, Lon {lng:.6f}")) # Nur bei Bedarf im UI
-                return {"latitude": float(lat), "longitude": float(lng)}
-            # else: st.warning(get_text_di(texts, "geolocation_google_api_no_coords", "Google API: Keine Koordinaten in der Antwort gefunden.")) # Nur bei Bedarf
-        # else: st.warning(get_text_di(texts, "geolocation_google_api_status_error", f"Google API Fehler: {data.get('status')} - {data.get('error_message', '')}")) # Nur bei Bedarf
-        return None
-    except requests.exceptions.Timeout:
-        # st.error(get_text_di(texts, "geolocation_google_api_timeout", "Google Geocoding API Zeitüberschreitung.")) # Nur bei Bedarf
-        return None
-    except requests.exceptions.RequestException as e:
-        # st.error(get_text_di(texts, "geolocation_google_api_request_error", f"Google Geocoding API Anfragefehler: {e}")) # Nur bei Bedarf
-        return None
+        from geocoding import get_geocoding_service
+        return get_geocoding_service(api_key, provider_name=provider_name).geocode(address, zip_code, city)
     except Exception as e:
         # st.error(f"{get_text_di(texts, 'geolocation_api_unknown_error', 'Unbekannter Fehler beim Geocoding:')} {e}") # Nur bei Bedarf
         return None
@@ -331,9 +317,12 @@ def render_data_input(texts: Dict[str, str]) -> None:
                            inputs['project_details'].get('satellite_image_for_pdf_url_source') != st.session_state.satellite_image_url_di:
                             try:
                                 with st.spinner("Lade Satellitenbild für PDF..."): # Spinner ist gut für UI-Feedback
-                                    response = requests.get(st.session_state.satellite_image_url_di, timeout=15)
-                                    response.raise_for_status()
-                                    inputs['project_details']['satellite_image_base64_data'] = base64.b64encode(response.content).decode('utf-8')
+                                    # Bildcache nach Koordinaten/Zoom: gleiches Objekt wird nicht erneut bei Google abgerufen
+                                    from geocoding import get_geocoding_service
+                                    image_bytes = get_geocoding_service(EFFECTIVE_GOOGLE_API_KEY, provider_name="google").satellite_image(current_lat, current_lon)
+                                    if not image_bytes:
+                                        raise ValueError("Satellitenbild nicht verfügbar")
+                                    inputs['project_details']['satellite_image_base64_data'] = base64.b64encode(image_bytes).decode('utf-8')
                                     inputs['project_details']['satellite_image_for_pdf_url_source'] = st.session_state.satellite_image_url_di
                                     # st.success("Satellitenbild für PDF vorbereitet.") # Optional
                             except Exception as e_sat_download:
@@ -3,7 +3,12 @@ import sqlite3
 import os
 import traceback
 import json
-from typing import List, Dict, Any, Optional, Union
+import gzip
+import hashlib
+import shutil
+import tempfile
+import threading
+from typing import List, Dict, Any, Optional, Union, Callable, BinaryIO
 from datetime import datetime
 import io
 
@@ -61,6 +66,10 @@ def init_db(conn: Optional[sqlite3.Connection] = None) -> Optional[sqlite3.Conne
         return None
 
 # --- CRM Kunden-Dokumente (Kundenakte) Helper auf Modulebene ---
+# Dateiinhalte liegen inhaltsadressiert (SHA-256) unter customer_docs/blobs/<xx>/<sha256>;
+# customer_documents verweist per content_sha256 darauf, customer_document_blobs zählt die Referenzen.
+CUSTOMER_DOC_STREAM_CHUNK_SIZE = 1024 * 1024
+
 def _create_customer_documents_table(conn: sqlite3.Connection) -> None:
     try:
         cur = conn.cursor()
@@ -75,10 +84,27 @@ def _create_customer_documents_table(conn: sqlite3.Connection) -> None:
                 file_name TEXT,
                 absolute_file_path TEXT,
                 uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                content_sha256 TEXT,
                 FOREIGN KEY(customer_id) REFERENCES customers(id)
             )
             """
         )
+        existing_columns = [row[1] for row in cur.execute("PRAGMA table_info(customer_documents)").fetchall()]
+        if "content_sha256" not in existing_columns:
+            cur.execute("ALTER TABLE customer_documents ADD COLUMN content_sha256 TEXT")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_customer_documents_customer ON customer_documents(customer_id, uploaded_at)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_customer_documents_sha256 ON customer_documents(content_sha256)")
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS customer_document_blobs (
+                sha256 TEXT PRIMARY KEY,
+                size_bytes INTEGER NOT NULL,
+                relative_path TEXT NOT NULL,
+                ref_count INTEGER NOT NULL DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
         conn.commit()
     except Exception as e:
         print(f"DB Fehler _create_customer_documents_table: {e}")
@@ -92,41 +118,150 @@ def ensure_customer_documents_table() -> None:
     finally:
         conn.close()
 
-def add_customer_document(customer_id: int, file_bytes: bytes, display_name: str, doc_type: str = "other", project_id: Optional[int] = None, suggested_filename: Optional[str] = None) -> Optional[int]:
-    """Speichert eine Datei im Kundenakte-Ordner und erfasst sie in der DB. Gibt Dokument-ID zurück."""
+def _customer_blob_relative_path(sha256: str) -> str:
+    return os.path.relpath(os.path.join(CUSTOMER_DOCS_BASE_DIR, "blobs", sha256[:2], sha256), DATA_DIR)
+
+def _write_customer_blob(source: Union[bytes, bytearray, BinaryIO]) -> Optional[Dict[str, Any]]:
+    """Schreibt Inhalt gestreamt in eine Temp-Datei im Blob-Verzeichnis und berechnet dabei SHA-256.
+
+    Gibt {'sha256', 'size_bytes', 'temp_path'} zurück (None bei leerem Inhalt). Die Temp-Datei
+    wird von _store_customer_blob an ihren endgültigen Ort verschoben oder verworfen.
+    """
+    blob_root = os.path.join(CUSTOMER_DOCS_BASE_DIR, "blobs")
+    os.makedirs(blob_root, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".upload-", dir=blob_root)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f_out:
+            if isinstance(source, (bytes, bytearray)):
+                digest.update(source)
+                f_out.write(source)
+                size = len(source)
+            else:
+                while True:
+                    chunk = source.read(CUSTOMER_DOC_STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    f_out.write(chunk)
+                    size += len(chunk)
+    except Exception:
+        _remove_quietly(temp_path)
+        raise
+    if size == 0:
+        _remove_quietly(temp_path)
+        return None
+    return {"sha256": digest.hexdigest(), "size_bytes": size, "temp_path": temp_path}
+
+def _store_customer_blob(conn: sqlite3.Connection, source: Union[bytes, bytearray, BinaryIO]) -> Optional[Dict[str, Any]]:
+    """Legt den Inhalt im inhaltsadressierten Speicher ab und erhöht dessen Referenzzähler.
+
+    Identische Inhalte werden nur einmal gespeichert. Prüfen und Ablegen der Datei geschehen
+    erst nach BEGIN IMMEDIATE, also unter derselben Schreibsperre wie _release_customer_blob.
+    Commit übernimmt der Aufrufer; bei Rollback entfernt _discard_customer_blob eine hier neu
+    angelegte Datei wieder.
+    """
+    written = _write_customer_blob(source)
+    if written is None:
+        return None
+    sha256 = written["sha256"]
+    relative_path = _customer_blob_relative_path(sha256)
+    final_path = os.path.join(DATA_DIR, relative_path)
     try:
-        if not isinstance(file_bytes, (bytes, bytearray)) or len(file_bytes) == 0:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT ref_count FROM customer_document_blobs WHERE sha256 = ?", (sha256,)).fetchone()
+        referenced = bool(row and row[0] > 0)
+        if os.path.exists(final_path) and os.path.getsize(final_path) == written["size_bytes"]:
+            _remove_quietly(written["temp_path"])
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(written["temp_path"], final_path)
+    except Exception:
+        _remove_quietly(written["temp_path"])
+        raise
+    conn.execute(
+        """
+        INSERT INTO customer_document_blobs (sha256, size_bytes, relative_path, ref_count)
+        VALUES (?, ?, ?, 1)
+        ON CONFLICT(sha256) DO UPDATE SET ref_count = ref_count + 1
+        """,
+        (sha256, written["size_bytes"], relative_path),
+    )
+    return {"sha256": sha256, "size_bytes": written["size_bytes"], "relative_path": relative_path,
+            "new_file": not referenced}
+
+def _discard_customer_blob(blob: Optional[Dict[str, Any]]) -> None:
+    """Entfernt nach einem Rollback die Datei eines Blobs, der vorher von keinem Dokument referenziert war."""
+    if blob and blob.get("new_file"):
+        _remove_quietly(os.path.join(DATA_DIR, blob["relative_path"]))
+
+def _release_customer_blob(conn: sqlite3.Connection, sha256: str) -> None:
+    """Verringert den Referenzzähler; nicht mehr referenzierte Inhalte werden entfernt.
+
+    Scheitert das Löschen der Datei, bleibt der Eintrag mit ref_count 0 stehen und wird
+    von cleanup_orphaned_files nachgeholt.
+    """
+    conn.execute("UPDATE customer_document_blobs SET ref_count = ref_count - 1 WHERE sha256 = ?", (sha256,))
+    row = conn.execute("SELECT relative_path, ref_count FROM customer_document_blobs WHERE sha256 = ?", (sha256,)).fetchone()
+    if row and row[1] <= 0:
+        abs_path = os.path.join(DATA_DIR, row[0])
+        try:
+            if os.path.exists(abs_path):
+                os.remove(abs_path)
+            conn.execute("DELETE FROM customer_document_blobs WHERE sha256 = ? AND ref_count <= 0", (sha256,))
+        except Exception as e_rm:
+            print(f"DB Warnung: Datei konnte nicht gelöscht werden ({abs_path}): {e_rm}")
+
+def add_customer_document(customer_id: int, file_bytes: Union[bytes, bytearray, BinaryIO], display_name: str, doc_type: str = "other", project_id: Optional[int] = None, suggested_filename: Optional[str] = None) -> Optional[int]:
+    """Speichert eine Datei in der Kundenakte und erfasst sie in der DB. Gibt Dokument-ID zurück.
+
+    ``file_bytes`` darf auch ein geöffnetes Binär-Dateiobjekt sein; es wird dann blockweise
+    gelesen. Gleiche Inhalte (z. B. erneut versendete Angebote) belegen nur einmal Speicher.
+    """
+    conn = None
+    blob = None
+    try:
+        if isinstance(file_bytes, (bytes, bytearray)):
+            if len(file_bytes) == 0:
+                return None
+        elif not callable(getattr(file_bytes, "read", None)):
             return None
         conn = get_db_connection()
         if not conn:
             return None
         _create_customer_documents_table(conn)
 
-        # Sichere Dateinamenserstellung
+        # Sichere Dateinamenserstellung (Name für Anzeige und Download; Inhalt liegt im Blob-Speicher)
         safe_name = suggested_filename or f"{display_name or 'dokument'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.bin"
         safe_name = safe_name.replace("/", "_").replace("\\", "_")
-        # Ordner für Kunden
-        customer_dir = os.path.join(CUSTOMER_DOCS_BASE_DIR, f"customer_{customer_id}")
-        os.makedirs(customer_dir, exist_ok=True)
-        abs_path = os.path.join(customer_dir, safe_name)
-        with open(abs_path, "wb") as f:
-            f.write(file_bytes)
+
+        blob = _store_customer_blob(conn, file_bytes)
+        if blob is None:
+            conn.rollback()
+            return None
 
         cur = conn.cursor()
         cur.execute(
             """
-            INSERT INTO customer_documents (customer_id, project_id, doc_type, display_name, file_name, absolute_file_path)
-            VALUES (?, ?, ?, ?, ?, ?)
+            INSERT INTO customer_documents (customer_id, project_id, doc_type, display_name, file_name, absolute_file_path, content_sha256)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
-            (customer_id, project_id, doc_type, display_name or safe_name, safe_name, os.path.relpath(abs_path, DATA_DIR))
+            (customer_id, project_id, doc_type, display_name or safe_name, safe_name, blob["relative_path"], blob["sha256"])
         )
         conn.commit()
-        doc_id = cur.lastrowid
-        conn.close()
-        return doc_id
+        return cur.lastrowid
     except Exception as e:
         print(f"DB Fehler add_customer_document: {e}")
+        if conn:
+            # Vor dem Rollback, solange die Schreibsperre noch gehalten wird
+            _discard_customer_blob(blob)
+            conn.rollback()
         return None
+    finally:
+        if conn:
+            conn.close()
 
 def list_customer_documents(customer_id: int, project_id: Optional[int] = None) -> List[Dict[str, Any]]:
     try:
@@ -185,23 +320,30 @@ def delete_customer_document(document_id: int) -> bool:
         conn = get_db_connection()
         if not conn:
             return False
+        _create_customer_documents_table(conn)
+        # Schreibsperre vor dem Lesen, damit kein paralleles _store_customer_blob dazwischenkommt
+        conn.execute("BEGIN IMMEDIATE")
         # get path first
         cur = conn.cursor()
-        cur.execute("SELECT absolute_file_path FROM customer_documents WHERE id = ?", (document_id,))
+        cur.execute("SELECT absolute_file_path, content_sha256 FROM customer_documents WHERE id = ?", (document_id,))
         row = cur.fetchone()
         if not row:
             conn.close()
             return False
-        rel_path = row[0]
-        abs_path = os.path.join(DATA_DIR, rel_path)
-        try:
-            if os.path.exists(abs_path):
-                os.remove(abs_path)
-        except Exception as e_rm:
-            print(f"DB Warnung: Datei konnte nicht gelöscht werden ({abs_path}): {e_rm}")
+        rel_path, sha256 = row[0], row[1]
         cur.execute("DELETE FROM customer_documents WHERE id = ?", (document_id,))
-        conn.commit()
         success = cur.rowcount > 0
+        if sha256:
+            _release_customer_blob(conn, sha256)
+        else:
+            # Altbestand vor dem Blob-Speicher: eigene Datei je Dokument
+            abs_path = os.path.join(DATA_DIR, rel_path)
+            try:
+                if os.path.exists(abs_path):
+                    os.remove(abs_path)
+            except Exception as e_rm:
+                print(f"DB Warnung: Datei konnte nicht gelöscht werden ({abs_path}): {e_rm}")
+        conn.commit()
         conn.close()
         return success
     except Exception as e:
@@ -321,33 +463,236 @@ def get_pdf_template_by_name(template_type: str, name: str) -> Optional[Dict[str
         if conn: 
             conn.close()
 
-def backup_database(backup_path: str) -> bool:
+# --- Backups über die SQLite Online-Backup-API ---
+# Seiten werden in Blöcken kopiert; zwischen den Blöcken können andere Verbindungen schreiben,
+# die App friert also auch bei großen Datenbanken (Bilder, Matrix-Blobs) nicht ein.
+BACKUP_DIR = os.path.join(DATA_DIR, 'backups')
+BACKUP_PAGES_PER_STEP = 1024
+BACKUP_STEP_SLEEP_S = 0.005
+# Inkrementelle Snapshots: DB-Datei in Blöcke zerlegt, Blöcke inhaltsadressiert (SHA-256) abgelegt
+BACKUP_CHUNK_SIZE = 4 * 1024 * 1024
+BACKUP_KEEP_SNAPSHOTS = 7
+# Blöcke schreiben, Manifest ablegen und Rotation laufen unter einer Sperre: sonst löscht die
+# Rotation eines Snapshots Blöcke, die ein paralleler Snapshot schon geschrieben bzw.
+# wiederverwendet, aber noch in keinem Manifest eingetragen hat
+_INCREMENTAL_BACKUP_LOCK = threading.Lock()
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def _online_backup(source_path: str, target_path: str, progress_callback: Optional[ProgressCallback] = None,
+                   pages_per_step: int = BACKUP_PAGES_PER_STEP) -> None:
+    """Konsistente Kopie source -> target über sqlite3.Connection.backup (blockweise)."""
+    def _progress(status: int, remaining: int, total: int) -> None:
+        if progress_callback:
+            progress_callback(total - remaining, total)
+
+    src = sqlite3.connect(source_path)
     try:
-        import shutil
-        if os.path.exists(DB_PATH):
-            shutil.copy2(DB_PATH, backup_path)
-            print(f"DB: Backup erfolgreich erstellt: {backup_path}")
-            return True
+        dst = sqlite3.connect(target_path)
+        try:
+            src.backup(dst, pages=pages_per_step, progress=_progress, sleep=BACKUP_STEP_SLEEP_S)
+        finally:
+            dst.close()
+    finally:
+        src.close()
+
+
+def _temp_path_next_to(path: str, suffix: str = ".tmp") -> str:
+    directory = os.path.dirname(os.path.abspath(path)) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=suffix, dir=directory)
+    os.close(fd)
+    return temp_path
+
+
+def _remove_quietly(path: Optional[str]) -> None:
+    if path and os.path.exists(path):
+        try: os.remove(path)
+        except OSError: pass
+
+
+def _integrity_ok(db_path: str) -> bool:
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            row = conn.execute("PRAGMA integrity_check").fetchone()
+            return bool(row) and row[0] == "ok"
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+
+
+def backup_database(backup_path: str, progress_callback: Optional[ProgressCallback] = None,
+                    compress: Optional[bool] = None) -> bool:
+    """Erstellt ein Backup der laufenden Datenbank über die Online-Backup-API.
+
+    compress=None komprimiert automatisch, wenn backup_path auf '.gz' endet.
+    Die Zieldatei wird erst nach vollständigem Backup atomar ersetzt.
+    """
+    if not os.path.exists(DB_PATH):
+        print(f"DB: Quelldatei {DB_PATH} existiert nicht für Backup.")
+        return False
+    if compress is None:
+        compress = backup_path.endswith(".gz")
+    snapshot_path = output_tmp = None
+    try:
+        snapshot_path = _temp_path_next_to(backup_path, ".db")
+        _online_backup(DB_PATH, snapshot_path, progress_callback)
+        if compress:
+            output_tmp = _temp_path_next_to(backup_path, ".gz")
+            with open(snapshot_path, "rb") as f_in, gzip.open(output_tmp, "wb", compresslevel=6) as f_out:
+                shutil.copyfileobj(f_in, f_out, BACKUP_CHUNK_SIZE)
+            os.replace(output_tmp, backup_path)
         else:
-            print(f"DB: Quelldatei {DB_PATH} existiert nicht für Backup.")
-            return False
+            os.replace(snapshot_path, backup_path)
+        print(f"DB: Backup erfolgreich erstellt: {backup_path}")
+        return True
     except Exception as e:
         print(f"DB Fehler backup_database: {e}")
         return False
+    finally:
+        _remove_quietly(snapshot_path)
+        _remove_quietly(output_tmp)
+
 
-def restore_database(backup_path: str) -> bool:
+def create_incremental_backup(backup_dir: Optional[str] = None, keep: int = BACKUP_KEEP_SNAPSHOTS,
+                              progress_callback: Optional[ProgressCallback] = None,
+                              chunk_size: int = BACKUP_CHUNK_SIZE) -> Optional[Dict[str, Any]]:
+    """Snapshot über die Online-Backup-API, gespeichert als Manifest + inhaltsadressierte Blöcke.
+
+    Unveränderte Blöcke früherer Snapshots werden wiederverwendet, es werden nur geänderte
+    Blöcke (gzip-komprimiert) neu geschrieben. Danach werden nur die letzten `keep`
+    Snapshots behalten und nicht mehr referenzierte Blöcke gelöscht.
+
+    Returns:
+        Manifest-Infos ({'manifest_path', 'chunks_total', 'chunks_new', 'bytes_new', ...}) oder None.
+    """
+    backup_dir = backup_dir or BACKUP_DIR
+    chunks_dir = os.path.join(backup_dir, "chunks")
+    snapshot_path = None
     try:
-        import shutil
-        if os.path.exists(backup_path):
-            shutil.copy2(backup_path, DB_PATH)
-            print(f"DB: Wiederherstellung erfolgreich von: {backup_path}")
-            return True
-        else:
-            print(f"DB: Backup-Datei {backup_path} existiert nicht.")
+        if not os.path.exists(DB_PATH):
+            print(f"DB: Quelldatei {DB_PATH} existiert nicht für Backup.")
+            return None
+        os.makedirs(chunks_dir, exist_ok=True)
+        snapshot_path = _temp_path_next_to(os.path.join(backup_dir, "snapshot"), ".db")
+        _online_backup(DB_PATH, snapshot_path, progress_callback)
+
+        with _INCREMENTAL_BACKUP_LOCK:
+            chunk_hashes: List[str] = []
+            chunks_new = bytes_new = 0
+            with open(snapshot_path, "rb") as f:
+                while True:
+                    block = f.read(chunk_size)
+                    if not block:
+                        break
+                    digest = hashlib.sha256(block).hexdigest()
+                    chunk_hashes.append(digest)
+                    chunk_path = os.path.join(chunks_dir, digest + ".gz")
+                    if not os.path.exists(chunk_path):
+                        chunk_tmp = chunk_path + ".tmp"
+                        with gzip.open(chunk_tmp, "wb", compresslevel=6) as f_out:
+                            f_out.write(block)
+                        os.replace(chunk_tmp, chunk_path)
+                        chunks_new += 1
+                        bytes_new += os.path.getsize(chunk_path)
+
+            created_at = datetime.now()
+            manifest = {
+                "created_at": created_at.isoformat(timespec="seconds"),
+                "schema_version": DB_SCHEMA_VERSION,
+                "size": os.path.getsize(snapshot_path),
+                "chunk_size": chunk_size,
+                "chunks": chunk_hashes,
+            }
+            manifest_path = os.path.join(backup_dir, f"snapshot_{created_at.strftime('%Y%m%d_%H%M%S_%f')}.json")
+            with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+            os.replace(manifest_path + ".tmp", manifest_path)
+
+            removed = _rotate_incremental_backups(backup_dir, keep)
+        print(f"DB: Snapshot {os.path.basename(manifest_path)} erstellt ({chunks_new}/{len(chunk_hashes)} Blöcke neu)")
+        return {"manifest_path": manifest_path, "chunks_total": len(chunk_hashes), "chunks_new": chunks_new,
+                "bytes_new": bytes_new, "snapshots_removed": removed}
+    except Exception as e:
+        print(f"DB Fehler create_incremental_backup: {e}")
+        return None
+    finally:
+        _remove_quietly(snapshot_path)
+
+
+def list_incremental_backups(backup_dir: Optional[str] = None) -> List[str]:
+    """Manifest-Pfade der Snapshots, älteste zuerst."""
+    backup_dir = backup_dir or BACKUP_DIR
+    if not os.path.isdir(backup_dir):
+        return []
+    return sorted(os.path.join(backup_dir, name) for name in os.listdir(backup_dir)
+                  if name.startswith("snapshot_") and name.endswith(".json"))
+
+
+def _rotate_incremental_backups(backup_dir: str, keep: int) -> int:
+    manifests = list_incremental_backups(backup_dir)
+    expired = manifests[:-keep] if keep > 0 else []
+    for manifest_path in expired:
+        _remove_quietly(manifest_path)
+    referenced = set()
+    for manifest_path in manifests[len(expired):]:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            referenced.update(json.load(f).get("chunks", []))
+    chunks_dir = os.path.join(backup_dir, "chunks")
+    for name in os.listdir(chunks_dir):
+        if name.endswith(".gz") and name[:-3] not in referenced:
+            _remove_quietly(os.path.join(chunks_dir, name))
+    return len(expired)
+
+
+def _materialize_backup(backup_path: str, target_path: str) -> None:
+    """Schreibt ein Backup (.db, .db.gz oder Snapshot-Manifest .json) als DB-Datei nach target_path."""
+    if backup_path.endswith(".json"):
+        with open(backup_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        chunks_dir = os.path.join(os.path.dirname(backup_path), "chunks")
+        with open(target_path, "wb") as f_out:
+            for digest in manifest["chunks"]:
+                with gzip.open(os.path.join(chunks_dir, digest + ".gz"), "rb") as f_in:
+                    block = f_in.read()
+                if hashlib.sha256(block).hexdigest() != digest:
+                    raise ValueError(f"Backup-Block {digest[:12]} ist beschädigt")
+                f_out.write(block)
+    elif backup_path.endswith(".gz"):
+        with gzip.open(backup_path, "rb") as f_in, open(target_path, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out, BACKUP_CHUNK_SIZE)
+    else:
+        shutil.copyfile(backup_path, target_path)
+
+
+def restore_database(backup_path: str, progress_callback: Optional[ProgressCallback] = None) -> bool:
+    """Stellt die Datenbank aus einem Backup wieder her (.db, .db.gz oder Snapshot-Manifest).
+
+    Das Backup wird zuerst in eine temporäre Datei entpackt und per PRAGMA integrity_check
+    geprüft. Erst dann wird es über die Backup-API in einem Schritt (eine Transaktion) in die
+    laufende Datenbank kopiert – offene Verbindungen sehen entweder den alten oder den neuen Stand.
+    """
+    if not os.path.exists(backup_path):
+        print(f"DB: Backup-Datei {backup_path} existiert nicht.")
+        return False
+    restored_tmp = None
+    try:
+        restored_tmp = _temp_path_next_to(DB_PATH, ".restore")
+        _materialize_backup(backup_path, restored_tmp)
+        if not _integrity_ok(restored_tmp):
+            print(f"DB Fehler restore_database: Integritätsprüfung für {backup_path} fehlgeschlagen, Datenbank unverändert.")
             return False
+        _online_backup(restored_tmp, DB_PATH, progress_callback, pages_per_step=-1)
+        print(f"DB: Wiederherstellung erfolgreich von: {backup_path}")
+        return True
     except Exception as e:
         print(f"DB Fehler restore_database: {e}")
         return False
+    finally:
+        _remove_quietly(restored_tmp)
 
 def export_admin_settings() -> Dict[str, Any]:
     conn = get_db_connection()
@@ -367,6 +712,13 @@ def export_admin_settings() -> Dict[str, Any]:
                     settings[key] = value
             else:
                 settings[key] = value
+        # PDF-Vorlagen liegen in pdf_templates; exportiert im Listenformat ihrer früheren Schlüssel,
+        # import_admin_settings übernimmt sie über save_admin_setting wieder in die Tabelle
+        try:
+            from pdf_template_store import export_setting_templates
+            settings.update(export_setting_templates())
+        except Exception as e:
+            print(f"DB Warnung: PDF-Vorlagen konnten nicht exportiert werden: {e}")
         return settings
     except Exception as e:
         print(f"DB Fehler export_admin_settings: {e}")
@@ -430,51 +782,21 @@ def load_admin_setting(key: str, default: Any = None) -> Any:
         conn.close()
 
 def get_brand_logo(brand_name: str) -> Optional[str]:
-    """Liefert Base64-Logo für Marke aus admin_settings (key: brand_logo_<name>) oder brand_logos Tabelle."""
+    """Liefert Base64-Logo für Marke aus admin_settings (key: brand_logo_<name>) oder brand_logos Tabelle.
+
+    Reihenfolge der Quellen: brand_logo_<name>, Map 'brand_logos', Tabelle brand_logos; jeweils exakt,
+    über Aliase, ohne Groß/Klein, ohne Leer-/Trennzeichen und ohne funktionale Suffixe. Die Auflösung
+    läuft über den Logo-Index in brand_logo_db, der alle Quellen einmal zusammenführt.
+    """
     if not brand_name:
         return None
-    
-    # Normalisiere den Brand-Namen für konsistente Suche (entferne Leerzeichen am Anfang/Ende)
-    normalized_brand = brand_name.strip()
-    
-    # Erst in admin_settings suchen
-    key = f"brand_logo_{normalized_brand}"
-    val = load_admin_setting(key, None)
-    if isinstance(val, str) and val.strip():
-        return val
-    
-    # Fallback: zentrale Map 'brand_logos' {brand: base64}
-    logos = load_admin_setting("brand_logos", {})
-    if isinstance(logos, dict):
-        # Exakte Suche zuerst
-        v = logos.get(normalized_brand)
-        if isinstance(v, str) and v.strip():
-            return v
-        
-        # Falls nicht gefunden, versuche case-insensitive Suche ohne Datennamen zu ändern
-        for existing_brand, logo_data in logos.items():
-            if existing_brand and normalized_brand.lower() == existing_brand.lower():
-                if isinstance(logo_data, str) and logo_data.strip():
-                    return logo_data
-    
-    # Neuer Fallback: brand_logos Tabelle
     try:
-        from brand_logo_db import get_brand_logo as brand_db_get_logo
-        logo_data = brand_db_get_logo(normalized_brand)
-        if logo_data and logo_data.get('logo_base64'):
-            return logo_data['logo_base64']
-        
-        # Falls exakte Suche in DB fehlschlägt, versuche case-insensitive ohne Daten zu ändern
-        from brand_logo_db import get_all_brand_logos
-        all_logos = get_all_brand_logos()
-        for logo in all_logos:
-            if logo.get('brand_name', '').lower() == normalized_brand.lower():
-                return logo.get('logo_base64')
-                
-    except Exception:
-        pass
-    
-    return None
+        from brand_logo_db import resolve_brand_logo
+        entry = resolve_brand_logo(brand_name.strip())
+    except Exception as e:
+        print(f"DB Warnung: Logo-Index nicht verfügbar: {e}")
+        return None
+    return entry.get('logo_base64') if entry else None
 
 def import_admin_settings(settings: Dict[str, Any]) -> bool:
     success_count = 0
@@ -684,15 +1006,56 @@ def delete_heat_pump(conn, id):
 #     create_heat_pumps_table(conn) # HIER HINZUFÜGEN
 #     ...
 
+def _sweep_customer_document_blobs(cleanup_results: Dict[str, Any]) -> None:
+    """Referenzzähler-Sweep für den Kundendokument-Speicher (ohne Verzeichnisscan).
+
+    Zähler werden aus customer_documents neu berechnet (korrigiert Abweichungen nach
+    Abbrüchen), danach werden alle Inhalte ohne Referenz gelöscht.
+    """
+    conn = get_db_connection()
+    if not conn:
+        cleanup_results["errors"].append("Keine Datenbankverbindung")
+        return
+    try:
+        _create_customer_documents_table(conn)
+        conn.execute(
+            """
+            UPDATE customer_document_blobs SET ref_count = (
+                SELECT COUNT(*) FROM customer_documents d WHERE d.content_sha256 = customer_document_blobs.sha256
+            )
+            """
+        )
+        orphans = conn.execute("SELECT sha256, relative_path, size_bytes FROM customer_document_blobs WHERE ref_count <= 0").fetchall()
+        for sha256, relative_path, size_bytes in orphans:
+            abs_path = os.path.join(DATA_DIR, relative_path)
+            try:
+                if os.path.exists(abs_path):
+                    os.remove(abs_path)
+                conn.execute("DELETE FROM customer_document_blobs WHERE sha256 = ?", (sha256,))
+                cleanup_results["blobs_removed"] += 1
+                cleanup_results["bytes_freed"] += size_bytes or 0
+                cleanup_results["removed_files"].append(relative_path)
+                print(f"DB Cleanup: Nicht referenziertes Kundendokument entfernt: {relative_path}")
+            except Exception as e:
+                cleanup_results["errors"].append(f"Fehler beim Löschen von {relative_path}: {str(e)}")
+        conn.commit()
+    finally:
+        conn.close()
+
 def cleanup_orphaned_files() -> Dict[str, Any]:
     cleanup_results = {
         "files_checked": 0,
         "files_removed": 0,
+        "blobs_removed": 0,
+        "bytes_freed": 0,
         "errors": [],
         "removed_files": []
     }
     
     try:
+        # Kundendokumente: Sweep über die Referenzzähler
+        _sweep_customer_document_blobs(cleanup_results)
+
         # Company Documents Verzeichnis prüfen
         if not os.path.exists(COMPANY_DOCS_BASE_DIR):
             return cleanup_results
@@ -1149,6 +1512,41 @@ def load_admin_setting(key: str, default: Any = None) -> Any:
     finally:
         if conn: conn.close()
 
+def _invalidate_admin_setting_caches(key: str) -> None:
+    """Caches verwerfen, die aus der geänderten Admin-Einstellung abgeleitet sind."""
+    if key == 'feed_in_tariffs':
+        try:
+            from feed_in_tariffs import invalidate_tariff_cache
+            invalidate_tariff_cache()
+        except Exception as e:
+            print(f"DB Warnung: Tarif-Cache konnte nicht invalidiert werden: {e}")
+    elif key in ('payment_terms_config', 'comprehensive_payment_config'):
+        try:
+            from payment_terms import invalidate_payment_terms_cache
+            invalidate_payment_terms_cache()
+        except Exception as e:
+            print(f"DB Warnung: Zahlungsbedingungs-Cache konnte nicht invalidiert werden: {e}")
+    elif key == 'module_pdf_alias_map':
+        try:
+            from product_attributes import invalidate_alias_index
+            invalidate_alias_index()
+        except Exception as e:
+            print(f"DB Warnung: Alias-Index konnte nicht invalidiert werden: {e}")
+    elif key.startswith('brand_logo'):
+        # brand_logo_<Marke>, brand_logos, brand_logo_aliases fließen in den Logo-Index ein
+        try:
+            from brand_logo_db import invalidate_brand_logo_index
+            invalidate_brand_logo_index()
+        except Exception as e:
+            print(f"DB Warnung: Logo-Index konnte nicht invalidiert werden: {e}")
+    elif key in ('pdf_title_image_templates', 'pdf_offer_title_templates', 'pdf_cover_letter_templates'):
+        # Vorlagen liegen in pdf_templates; als Liste gespeicherte Werte (Altcode) werden übernommen
+        try:
+            from pdf_template_store import import_setting_templates
+            import_setting_templates(key)
+        except Exception as e:
+            print(f"DB Warnung: PDF-Vorlagen konnten nicht übernommen werden: {e}")
+
 def save_admin_setting(key: str, value: Any) -> bool:
     conn = get_db_connection()
     if conn is None:
@@ -1176,6 +1574,7 @@ def save_admin_setting(key: str, value: Any) -> bool:
         print(f"DB DEBUG: save_admin_setting - Versuche SQL auszuführen für Key '{key}'. Wert None? {params_for_sql[1] is None}")
         cursor.execute(sql_query, params_for_sql)
         conn.commit()
+        _invalidate_admin_setting_caches(key)
         print(f"DB ERFOLG: save_admin_setting - Einstellung '{key}' erfolgreich gespeichert.")
         return True
     except Exception as e: 
@@ -1487,6 +1886,11 @@ def add_company_document(company_id: int, display_name: str, document_type: str,
     relative_path_for_db = os.path.join(str(company_id), final_safe_filename)
     absolute_path_on_disk = os.path.join(company_specific_docs_dir, final_safe_filename)
     try:
+        # PDFs einmalig beim Upload optimieren (Anhänge werden in jedes Angebot übernommen)
+        try:
+            from pdf_attachment_cache import optimize_attachment_upload
+            file_content_bytes = optimize_attachment_upload(original_filename, file_content_bytes)
+        except Exception as e_opt: print(f"DB: Optimierung von {original_filename} übersprungen: {e_opt}")
         with open(absolute_path_on_disk, "wb") as f: f.write(file_content_bytes)
         cursor = conn.cursor()
         cursor.execute("""
@@ -154,6 +154,19 @@ class DatabaseBridge:
         except sqlite3.OperationalError:
             pass
         
+        # Catalog version counter (same schema as product_db.create_catalog_version_tracking),
+        # bumped by triggers so caches in the app process see writes made here
+        cursor.execute("CREATE TABLE IF NOT EXISTS product_catalog_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL DEFAULT 0)")
+        cursor.execute("INSERT OR IGNORE INTO product_catalog_version (id, version) VALUES (1, 0)")
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_products_catalog_version_{event.lower()}
+                AFTER {event} ON products
+                BEGIN
+                    UPDATE product_catalog_version SET version = version + 1 WHERE id = 1;
+                END
+            """)
+        
         conn.commit()
     
     def create_brand_logos_table(self, conn: sqlite3.Connection):
@@ -72,6 +72,25 @@ try:
 except (ImportError, ModuleNotFoundError): pass
 except Exception: pass
 
+try:
+    from pdf_template_store import load_template_list, resolve_template_image
+except ImportError:
+    def load_template_list(setting_key, fallback_loader=None):
+        value = fallback_loader(setting_key, []) if callable(fallback_loader) else []
+        return value if isinstance(value, list) else []
+
+    def resolve_template_image(entry):
+        return entry.get('data') if isinstance(entry, dict) else None
+
+try:
+    from session_blob_store import offload_session_value, resolve as resolve_session_blob
+except ImportError:
+    def offload_session_value(slot, value, **kwargs):
+        return value
+
+    def resolve_session_blob(value, default=None):
+        return value
+
 # --- Hilfsfunktionen ---
 def get_text_pdf_ui(texts_dict: Dict[str, str], key: str, fallback_text: Optional[str] = None) -> str:
     if not isinstance(texts_dict, dict):
@@ -198,7 +217,9 @@ def render_pdf_ui(
         for source in potential_sources:
             source_data = st.session_state.get(source)
             if source_data and isinstance(source_data, dict) and len(source_data) > 0:
-                analysis_results = source_data
+                # Alias als eigenen Slot registrieren, damit die ausgelagerten Blobs erhalten bleiben,
+                # wenn die Quelle (z.B. calculation_results) neu berechnet wird
+                analysis_results = offload_session_value('analysis_results', source_data)
                 st.session_state.analysis_results = analysis_results
                 st.success(f" Analyseergebnisse aus '{source}' wiederhergestellt")
                 break
@@ -1864,9 +1885,10 @@ def render_pdf_ui(
         st.warning("Keine aktive Firma ausgewählt. PDF verwendet Fallback-Daten für Firmeninformationen."); company_info_for_pdf = {"name": "Ihre Firma (Fallback)"}; active_company_id_for_docs = 0
 
     try:
-        title_image_templates = load_admin_setting_func('pdf_title_image_templates', [])
-        offer_title_templates = load_admin_setting_func('pdf_offer_title_templates', [])
-        cover_letter_templates = load_admin_setting_func('pdf_cover_letter_templates', [])
+        # Vorlagen aus pdf_templates: nur Metadaten, Titelbilder werden erst bei Auswahl geladen
+        title_image_templates = load_template_list('pdf_title_image_templates', load_admin_setting_func)
+        offer_title_templates = load_template_list('pdf_offer_title_templates', load_admin_setting_func)
+        cover_letter_templates = load_template_list('pdf_cover_letter_templates', load_admin_setting_func)
         if not isinstance(title_image_templates, list): title_image_templates = []
         if not isinstance(offer_title_templates, list): offer_title_templates = []
         if not isinstance(cover_letter_templates, list): cover_letter_templates = []
@@ -1907,7 +1929,7 @@ def render_pdf_ui(
             value=st.session_state.pdf_inclusion_options.get("append_additional_pages_after_main6", False),
             help="Erzeugt zuerst das 6-Seiten-Haupttemplate und hängt anschließend weitere Seiten aus dem klassischen Generator an."
         )
-        title_image_options = {t.get('name', f"Bild {i+1}"): t.get('data') for i, t in enumerate(title_image_templates) if isinstance(t, dict) and t.get('name')}
+        title_image_options = {t.get('name', f"Bild {i+1}"): t for i, t in enumerate(title_image_templates) if isinstance(t, dict) and t.get('name')}
         if not title_image_options:
             title_image_options = {get_text_pdf_ui(texts, "no_title_images_available", "Keine Titelbilder verfügbar"): None}
         title_image_keys = list(title_image_options.keys())
@@ -1923,7 +1945,7 @@ def render_pdf_ui(
             key="pdf_title_image_select_v12_form"
         )
         st.session_state.selected_title_image_name_doc_output = selected_title_image_name
-        st.session_state.selected_title_image_b64_data_doc_output = title_image_options.get(selected_title_image_name)
+        st.session_state.selected_title_image_b64_data_doc_output = resolve_template_image(title_image_options.get(selected_title_image_name))
 
         offer_title_options = {t.get('name', f"Titel {i+1}"): t.get('content') for i, t in enumerate(offer_title_templates) if isinstance(t, dict) and t.get('name')}
         if not offer_title_options:
@@ -2232,7 +2254,7 @@ def render_pdf_ui(
                             warnings=validation_result['warnings'],
                             texts=texts
                         )
-                        st.session_state.generated_pdf_bytes_for_download_v1 = pdf_bytes
+                        st.session_state.generated_pdf_bytes_for_download_v1 = offload_session_value('generated_pdf_bytes_for_download_v1', pdf_bytes)
                         st.success(" Fallback-PDF erfolgreich erstellt!")
                         return
                     else:
@@ -2354,7 +2376,7 @@ def render_pdf_ui(
                         db_list_company_documents_func=db_list_company_documents_func,
                         active_company_id=active_company_id_for_docs, texts=texts
                     )
-            st.session_state.generated_pdf_bytes_for_download_v1 = pdf_bytes
+            st.session_state.generated_pdf_bytes_for_download_v1 = offload_session_value('generated_pdf_bytes_for_download_v1', pdf_bytes)
         except Exception as e_gen_final_outer:
             st.error(f"{get_text_pdf_ui(texts, 'pdf_generation_exception_outer', 'Kritischer Fehler im PDF-Prozess (pdf_ui.py):')} {e_gen_final_outer}")
             st.text_area("Traceback PDF Erstellung (pdf_ui.py):", traceback.format_exc(), height=250)
@@ -2365,7 +2387,8 @@ def render_pdf_ui(
             st.rerun() 
 
     if 'generated_pdf_bytes_for_download_v1' in st.session_state:
-        pdf_bytes_to_download = st.session_state.pop('generated_pdf_bytes_for_download_v1') 
+        pdf_bytes_to_download = resolve_session_blob(st.session_state.pop('generated_pdf_bytes_for_download_v1'), None)
+        offload_session_value('generated_pdf_bytes_for_download_v1', None)  # Slot und Blob-Datei freigeben
         if pdf_bytes_to_download and isinstance(pdf_bytes_to_download, bytes):
             customer_name_for_file = customer_data_pdf.get('last_name', 'Angebot')
             if not customer_name_for_file or not str(customer_name_for_file).strip(): customer_name_for_file = "Photovoltaik_Angebot"
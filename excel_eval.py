@@ -6,6 +6,13 @@ import math
 import csv
 import json
 import contextlib
+import hashlib
+import hmac
+import os
+import pickle
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 from pathlib import Path
@@ -119,18 +126,228 @@ class ExcelEngineXlwings:
 
 # ------------------------------ Headless (xlcalculator) ----------------------
 
+# Kompilierte xlcalculator-Modelle werden gepickelt und über den SHA-256 der
+# Arbeitsmappe wiederverwendet (Parity-Checks nach jeder Matrix-/Tarifänderung
+# kompilieren sonst jedes Mal dieselben unveränderten Rechner neu).
+# Pickles im Cache-Verzeichnis tragen eine HMAC-SHA256 (Schlüssel je Benutzer, 0600)
+# über Arbeitsmappen-Hash + Pickle; ohne gültige Signatur wird nicht entpickelt.
+MODEL_CACHE_DIR = Path(os.environ.get("EXCEL_EVAL_CACHE_DIR") or (Path.home() / ".cache" / "excel_eval"))
+_MODEL_MEMO_SIZE = 4
+# Arbeitsmappen-Hash -> geprüfte Pickle-Bytes (jeder Aufruf entpickelt ein eigenes Modell)
+_model_memo: "OrderedDict[str, bytes]" = OrderedDict()
+_KEY_FILE_NAME = "cache.key"
+
+def workbook_hash(path: str | Path) -> str:
+    """SHA-256 des Dateiinhalts (Cache-Schlüssel für kompilierte Modelle)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _model_cache_file(digest: str, cache_dir: Path) -> Path:
+    # Version von xlcalculator/Python im Namen: alte Pickles werden nie mit neuer Lib geladen
+    try:
+        from importlib.metadata import version
+        lib_version = version("xlcalculator")
+    except Exception:
+        lib_version = "unknown"
+    return cache_dir / f"{digest}-xlc{lib_version}-py{sys.version_info[0]}{sys.version_info[1]}.pkl"
+
+def _cache_key(cache_dir: Path) -> bytes:
+    """Signaturschlüssel des Cache-Verzeichnisses (wird beim ersten Aufruf mit Rechten 0600 angelegt)."""
+    cache_dir.mkdir(parents=True, exist_ok=True, mode=0o700)
+    key_file = cache_dir / _KEY_FILE_NAME
+    with contextlib.suppress(FileExistsError):
+        fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(os.urandom(32))
+    key = key_file.read_bytes()
+    if len(key) != 32:
+        raise ValueError(f"Ungültiger Cache-Schlüssel: {key_file}")
+    return key
+
+def _signature(key: bytes, digest: str, payload: bytes) -> bytes:
+    return hmac.new(key, digest.encode("ascii") + b"\0" + payload, hashlib.sha256).digest()
+
+def _read_cached_model(cache_file: Path, digest: str, key: bytes) -> Optional[bytes]:
+    """Pickle-Bytes aus dem Cache, nur wenn die Signatur zu Schlüssel und Arbeitsmappen-Hash passt."""
+    try:
+        data = cache_file.read_bytes()
+    except OSError:
+        return None
+    signature, payload = data[:32], data[32:]
+    if not hmac.compare_digest(signature, _signature(key, digest, payload)):
+        return None
+    return payload
+
+def _write_cached_model(cache_file: Path, digest: str, key: bytes, payload: bytes) -> None:
+    tmp = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+    with tmp.open("wb") as f:
+        f.write(_signature(key, digest, payload))
+        f.write(payload)
+    os.replace(tmp, cache_file)
+
+def load_compiled_model(path: str | Path, cache_dir: str | Path | None = None, use_cache: bool = True):
+    """
+    Liefert ein kompiliertes xlcalculator-Modell der Arbeitsmappe.
+    Reihenfolge: Prozess-Memo -> signiertes Pickle im Cache-Verzeichnis -> ModelCompiler
+    (danach gepickelt). Jeder Aufruf liefert eine eigene Kopie, da der Evaluator
+    berechnete Werte in die Zellen des Modells schreibt.
+    """
+    from xlcalculator import ModelCompiler
+    if not use_cache:
+        return ModelCompiler().read_and_parse_archive(str(path))
+    digest = workbook_hash(path)
+    payload = _model_memo.get(digest)
+    if payload is not None:
+        _model_memo.move_to_end(digest)
+        return pickle.loads(payload)
+    cache_dir = Path(cache_dir) if cache_dir is not None else MODEL_CACHE_DIR
+    cache_file = _model_cache_file(digest, cache_dir)
+    key = None
+    with contextlib.suppress(Exception):
+        key = _cache_key(cache_dir)
+    model = None
+    if key is not None:
+        payload = _read_cached_model(cache_file, digest, key)
+        if payload is not None:
+            with contextlib.suppress(Exception):
+                model = pickle.loads(payload)
+    if model is None:
+        model = ModelCompiler().read_and_parse_archive(str(path))
+        payload = pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+        if key is not None:
+            with contextlib.suppress(Exception):
+                _write_cached_model(cache_file, digest, key, payload)
+    _model_memo[digest] = payload
+    while len(_model_memo) > _MODEL_MEMO_SIZE:
+        _model_memo.popitem(last=False)
+    return model
+
+def _to_native(v: Any) -> Any:
+    """xlcalculator-Typen (Number/Text/Boolean/Blank/Fehler) in Python-Werte umwandeln."""
+    try:
+        from xlcalculator.xlfunctions import func_xltypes, xlerrors
+    except Exception:
+        return v
+    if isinstance(v, xlerrors.ExcelError):
+        return str(v.value)
+    if isinstance(v, func_xltypes.Blank):
+        return None
+    if isinstance(v, func_xltypes.ExcelType) and hasattr(v, "value"):
+        return v.value
+    return v
+
+_MISSING = object()
+
+class _EvaluationFailed:
+    __slots__ = ("error",)
+
+    def __init__(self, error: Exception):
+        self.error = error
+
 class ExcelEngineHeadless:
     """
     Headless-Auswertung mit xlcalculator (ohne Excel).
+    Das Modell kommt aus dem Modell-Cache (eigene Kopie je Engine); jede Zelle wird
+    pro Engine genau einmal berechnet (gemeinsames Memo statt neuer Evaluator-Kontexte
+    je Präzedenzzelle).
     """
-    def __init__(self, path: str | Path):
-        from xlcalculator import ModelCompiler, Model
-        comp = ModelCompiler()
-        parsed_model = comp.read_and_parse_archive(str(path))
-        self._model = Model(parsed_model)
+    def __init__(self, path: str | Path, cache_dir: str | Path | None = None, use_cache: bool = True):
+        from xlcalculator import Evaluator
+        from xlcalculator.evaluator import EvaluatorContext
+        self._model = load_compiled_model(path, cache_dir=cache_dir, use_cache=use_cache)
+        self._evaluator = Evaluator(self._model)
+        self._memo: Dict[str, Any] = {}
+        self._stack: List[str] = []
+        engine = self
+
+        class _MemoContext(EvaluatorContext):
+            def eval_cell(self, addr):
+                return engine._eval_cell(addr)
+
+        self._context_cls = _MemoContext
+
+    def _eval_cell(self, addr: str) -> Any:
+        cached = self._memo.get(addr, _MISSING)
+        if cached is not _MISSING:
+            if isinstance(cached, _EvaluationFailed):
+                raise cached.error
+            return cached
+        if addr in self._stack:
+            raise RuntimeError(f"Cycle detected for {addr}:\n- " + "\n- ".join(self._stack))
+        self._stack.append(addr)
+        try:
+            value = self._evaluator.evaluate(addr, self._context_cls(self._evaluator, addr))
+        except Exception as e:
+            self._memo[addr] = _EvaluationFailed(e)
+            raise
+        finally:
+            self._stack.pop()
+        self._memo[addr] = value
+        return value
+
+    def _precedents(self, addr: str) -> List[str]:
+        cell = self._model.cells.get(addr)
+        formula = getattr(cell, "formula", None)
+        if formula is None:
+            return []
+        out: List[str] = []
+        for term in formula.terms:
+            target = self._model.defined_names.get(term)
+            if target is not None:
+                term = getattr(target, "address", None) or getattr(target, "address_str", None) or term
+            rng = self._model.ranges.get(term)
+            if rng is not None:
+                out.extend(a for row in rng.cells for a in row)
+            elif term in self._model.cells:
+                out.append(term)
+        return out
+
+    def dependency_order(self, refs: Iterable[str]) -> List[str]:
+        """Formelzellen, von denen ``refs`` abhängen, topologisch sortiert (Präzedenzen zuerst)."""
+        order: List[str] = []
+        done: set = set()
+        for root in refs:
+            if root in done:
+                continue
+            stack = [(root, iter(self._precedents(root)))]
+            visiting = {root}
+            while stack:
+                node, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    stack.pop()
+                    visiting.discard(node)
+                    done.add(node)
+                    cell = self._model.cells.get(node)
+                    if getattr(cell, "formula", None) is not None:
+                        order.append(node)
+                elif child not in done and child not in visiting:
+                    visiting.add(child)
+                    stack.append((child, iter(self._precedents(child))))
+        return order
 
     def evaluate(self, ref: str) -> Any:
-        return self._model.evaluate(ref)
+        return _to_native(self._eval_cell(ref))
+
+    def evaluate_many(self, refs: List[str]) -> List[Any]:
+        """
+        Wertet alle Referenzen in Abhängigkeitsreihenfolge aus: gemeinsame Präzedenzen
+        werden einmal berechnet, die Rekursionstiefe bleibt auch bei langen Ketten flach.
+        Fehler werden je Zelle als "#ERR:..." geliefert.
+        """
+        for addr in self.dependency_order(refs):
+            with contextlib.suppress(Exception):
+                self._eval_cell(addr)
+        values: List[Any] = []
+        for ref in refs:
+            try:
+                values.append(self.evaluate(ref))
+            except Exception as e:
+                values.append(f"#ERR:{type(e).__name__}:{e}")
+        return values
 
 # ------------------------- Engine-Factory & Utilities ------------------------
 
@@ -176,14 +393,16 @@ def _evaluate_many(path: str | Path, refs: List[Tuple[str, str, str]],
         raise ValueError("engine must be auto|xlwings|headless")
 
     try:
-        for (sheet, address, formula) in refs:
-            try:
-                if engine_name == "xlwings":
-                    v = eng.value(sheet, address)
-                else:
-                    v = eng.evaluate(f"{sheet}!{address}")
-            except Exception as e:
-                v = f"#ERR:{type(e).__name__}:{e}"
+        if engine_name == "xlwings":
+            values = []
+            for (sheet, address, _formula) in refs:
+                try:
+                    values.append(eng.value(sheet, address))
+                except Exception as e:
+                    values.append(f"#ERR:{type(e).__name__}:{e}")
+        else:
+            values = eng.evaluate_many([f"{sheet}!{address}" for (sheet, address, _formula) in refs])
+        for (sheet, address, formula), v in zip(refs, values):
             rows.append(FormulaRow(
                 sheet=sheet,
                 address=address,
@@ -237,6 +456,21 @@ def export_formulas_to_xlsx(path: str | Path, out_xlsx: str | Path,
 
 # ============================== BATCH ========================================
 
+def _run_tasks(func, tasks: List[Any], workers: Optional[int]) -> List[Any]:
+    """Führt ``func`` je Task aus – seriell oder (workers > 1) im Prozesspool, Reihenfolge bleibt erhalten."""
+    if workers and workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            return list(pool.map(func, tasks))
+    return [func(t) for t in tasks]
+
+def _export_one(task: Tuple[Path, Path, Optional[int], str, str]) -> Tuple[Path, Path]:
+    infile, out_file, limit, engine, to = task
+    if to == "csv":
+        export_formulas_to_csv(infile, out_file, limit=limit, engine=engine)
+    else:
+        export_formulas_to_xlsx(infile, out_file, limit=limit, engine=engine)
+    return infile, out_file
+
 def batch_export(
     base: str | Path,
     pattern: str = "**/*.xlsx",
@@ -244,14 +478,16 @@ def batch_export(
     limit: Optional[int] = None,
     engine: str = "auto",
     to: str = "csv",   # "csv" | "xlsx"
+    workers: Optional[int] = None,
 ) -> List[Tuple[Path, Path]]:
     """
     Sucht Dateien via Glob und exportiert pro Datei die Formel-Ergebnisse.
+    workers > 1: Arbeitsmappen parallel in einem Prozesspool (je Prozess eigene Engine).
     Rückgabe: Liste [(infile, outfile), ...]
     """
     base = Path(base)
     out_dir = Path(out_dir)
-    results: List[Tuple[Path, Path]] = []
+    tasks: List[Tuple[Path, Path, Optional[int], str, str]] = []
     for p in base.rglob("*"):
         if not p.is_file():
             continue
@@ -265,12 +501,10 @@ def batch_export(
         out_subdir.mkdir(parents=True, exist_ok=True)
         if to == "csv":
             out_file = out_subdir / f"{stem}_formulas.csv"
-            export_formulas_to_csv(p, out_file, limit=limit, engine=engine)
         else:
             out_file = out_subdir / f"{stem}_formulas.xlsx"
-            export_formulas_to_xlsx(p, out_file, limit=limit, engine=engine)
-        results.append((p, out_file))
-    return results
+        tasks.append((p, out_file, limit, engine, to))
+    return _run_tasks(_export_one, tasks, workers)
 
 # ============================ SAFETY-CHECK ===================================
 
@@ -355,6 +589,30 @@ def safety_check_parity(
 
     return summary
 
+def _parity_one(task: Tuple[Path, Optional[int], float, float, Optional[Path]]) -> Dict[str, Any]:
+    path, sample_limit, abs_tol, rel_tol, report = task
+    return safety_check_parity(path, sample_limit=sample_limit, abs_tol=abs_tol,
+                               rel_tol=rel_tol, out_report_csv=report)
+
+def safety_check_parity_many(
+    paths: Iterable[str | Path],
+    sample_limit: Optional[int] = 1000,
+    abs_tol: float = 1e-9,
+    rel_tol: float = 1e-9,
+    report_dir: Optional[str | Path] = None,
+    workers: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    safety_check_parity für mehrere Arbeitsmappen; mit workers > 1 parallel im Prozesspool.
+    Reports (optional) landen als <stem>_parity.csv in report_dir.
+    """
+    tasks = []
+    for path in paths:
+        path = Path(path)
+        report = Path(report_dir) / f"{path.stem}_parity.csv" if report_dir else None
+        tasks.append((path, sample_limit, abs_tol, rel_tol, report))
+    return _run_tasks(_parity_one, tasks, workers)
+
 # ========================== Minimal-CLI (optional) ===========================
 
 def _print_json(obj):
@@ -364,8 +622,9 @@ def main_cli():
     """
     Kleine CLI:
     python -m excel_eval export --in file.xlsx --out out.csv --engine auto --limit 0
-    python -m excel_eval batch --base ./input --out ./exports --to csv
+    python -m excel_eval batch --base ./input --out ./exports --to csv --workers 4
     python -m excel_eval safety --in file.xlsx --abs 1e-9 --rel 1e-9 --report report.csv
+    python -m excel_eval safety --in a.xlsx b.xlsx --report ./reports --workers 4
     """
     import argparse
     p = argparse.ArgumentParser("excel_eval")
@@ -385,13 +644,15 @@ def main_cli():
     p_bat.add_argument("--engine", choices=["auto","xlwings","headless"], default="auto")
     p_bat.add_argument("--to", choices=["csv","xlsx"], default="csv")
     p_bat.add_argument("--limit", type=int, default=None)
+    p_bat.add_argument("--workers", type=int, default=None)
 
     p_saf = sub.add_parser("safety")
-    p_saf.add_argument("--in", dest="infile", required=True)
+    p_saf.add_argument("--in", dest="infiles", nargs="+", required=True)
     p_saf.add_argument("--abs", dest="abs_tol", type=float, default=1e-9)
     p_saf.add_argument("--rel", dest="rel_tol", type=float, default=1e-9)
     p_saf.add_argument("--limit", type=int, default=1000)
-    p_saf.add_argument("--report", default=None)
+    p_saf.add_argument("--report", default=None, help="CSV-Datei (eine Mappe) bzw. Verzeichnis (mehrere)")
+    p_saf.add_argument("--workers", type=int, default=None)
 
     args = p.parse_args()
     if args.cmd == "export":
@@ -403,13 +664,18 @@ def main_cli():
 
     elif args.cmd == "batch":
         res = batch_export(args.base, pattern=args.pattern, out_dir=args.outdir,
-                           limit=args.limit, engine=args.engine, to=args.to)
+                           limit=args.limit, engine=args.engine, to=args.to, workers=args.workers)
         _print_json({"count": len(res), "outputs": [(str(i), str(o)) for i,o in res]})
 
     elif args.cmd == "safety":
-        summ = safety_check_parity(args.infile, sample_limit=args.limit,
-                                   abs_tol=args.abs_tol, rel_tol=args.rel_tol,
-                                   out_report_csv=args.report)
+        if len(args.infiles) == 1:
+            summ = safety_check_parity(args.infiles[0], sample_limit=args.limit,
+                                       abs_tol=args.abs_tol, rel_tol=args.rel_tol,
+                                       out_report_csv=args.report)
+        else:
+            summ = safety_check_parity_many(args.infiles, sample_limit=args.limit,
+                                            abs_tol=args.abs_tol, rel_tol=args.rel_tol,
+                                            report_dir=args.report, workers=args.workers)
         _print_json(summ)
 
 if __name__ == "__main__":
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Einspeisevergütung – eine gemeinsame Quelle für Berechnung, PDF-Platzhalter und Live-Vorschau
+
+- Die Admin-Tabelle ``feed_in_tariffs`` ({"parts": [...], "full": [...]}) wird einmal zu einem
+  sortierten Intervall-Index kompiliert (obere kWp-Grenzen je Modus); die Suche erfolgt per
+  bisect bzw. ``numpy.searchsorted`` für ganze kWp-Arrays
+- Regel: es gilt die Stufe mit der kleinsten Obergrenze >= kWp; Lücken zwischen Stufen
+  (10,0 → 10,01) fallen in die nächsthöhere Stufe, oberhalb der letzten Stufe gilt die letzte
+- Werte > 1 gelten als ct/kWh, sonst als €/kWh; intern wird in €/kWh gerechnet
+- Der kompilierte Index wird invalidiert, sobald ``database.save_admin_setting('feed_in_tariffs', ...)``
+  aufgerufen wird; zusätzlich wird höchstens alle ``_REVALIDATE_SECONDS`` die Zeile in
+  ``admin_settings`` geprüft (``last_modified`` und Hash des Werts), damit auch Schreibzugriffe
+  anderer Prozesse (z. B. update_tariffs.py per Roh-SQL) greifen
+- EEG-Degression: optionaler Block ``"degression": {"valid_from": "2025-08-01",
+  "percent_per_step": 1.0, "interval_months": 6}`` – der Tarif eines Inbetriebnahmedatums
+  ergibt sich aus den Tabellenwerten minus 1 % je vollendetem Halbjahr seit ``valid_from``
+  (auf 0,01 ct gerundet) und bleibt dann für den EEG-Zeitraum fest
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+MODES = ("parts", "full")
+DEFAULT_PARTS_UNDER_10_EUR_PER_KWH = 0.0786
+DEFAULT_EEG_PERIOD_YEARS = 20
+DEFAULT_POST_EEG_EUR_PER_KWH = 0.03
+_MAX_CACHED_TABLES = 16
+# Gecachte Tabellen werden höchstens so oft gegen die Quelle geprüft (Sekunden)
+_REVALIDATE_SECONDS = 5.0
+
+DateLike = Union[date, datetime, str, np.datetime64]
+
+
+def _to_float(value: Any, default: float = 0.0) -> float:
+    try:
+        return float(str(value).replace(",", "."))
+    except Exception:
+        return default
+
+
+def normalize_tariff_to_eur_per_kwh(value: Any) -> Optional[float]:
+    """ct/kWh (> 1) bzw. €/kWh (<= 1) in €/kWh umrechnen; None bei leerem Wert."""
+    if value in (None, ""):
+        return None
+    v = _to_float(value)
+    if v == 0.0:
+        return 0.0
+    return v / 100.0 if v > 1.0 else v
+
+
+def normalize_mode(mode: Any) -> str:
+    """'parts'/'Teileinspeisung' → 'parts', 'full'/'Volleinspeisung' → 'full' (Standard: 'parts')."""
+    text = str(mode or "").strip().lower()
+    if text == "full" or text.startswith("voll"):
+        return "full"
+    return "parts"
+
+
+def _to_datetime64(value: DateLike) -> np.datetime64:
+    if isinstance(value, np.datetime64):
+        return value.astype("datetime64[D]")
+    if isinstance(value, datetime):
+        value = value.date()
+    return np.datetime64(value, "D")
+
+
+@dataclass(frozen=True)
+class DegressionSchedule:
+    """Halbjährliche (allgemein: alle ``interval_months``) Absenkung um ``percent_per_step`` ab ``valid_from``."""
+
+    valid_from: Optional[np.datetime64] = None
+    percent_per_step: float = 1.0
+    interval_months: int = 6
+
+    @classmethod
+    def from_config(cls, config: Any) -> "DegressionSchedule":
+        if not isinstance(config, dict) or not config.get("valid_from"):
+            return cls()
+        try:
+            valid_from = _to_datetime64(str(config["valid_from"])[:10])
+        except Exception:
+            return cls()
+        return cls(
+            valid_from=valid_from,
+            percent_per_step=_to_float(config.get("percent_per_step", 1.0), 1.0),
+            interval_months=max(1, int(_to_float(config.get("interval_months", 6), 6))),
+        )
+
+    def steps(self, commissioning_dates: Any) -> np.ndarray:
+        """Anzahl Degressionsschritte seit ``valid_from`` (negativ für frühere Daten) – vektorisiert."""
+        dates = np.atleast_1d(np.asarray(
+            [_to_datetime64(d) for d in np.atleast_1d(np.asarray(commissioning_dates, dtype=object))],
+            dtype="datetime64[D]"))
+        if self.valid_from is None:
+            return np.zeros(dates.shape, dtype=np.int64)
+        months = (dates.astype("datetime64[M]") - self.valid_from.astype("datetime64[M]")).astype(np.int64)
+        day_of_month = (dates - dates.astype("datetime64[M]").astype("datetime64[D]")).astype(np.int64)
+        base_day = int((self.valid_from - self.valid_from.astype("datetime64[M]").astype("datetime64[D]")).astype(np.int64))
+        months -= (day_of_month < base_day).astype(np.int64)
+        return np.floor_divide(months, self.interval_months)
+
+    def factors(self, commissioning_dates: Any) -> np.ndarray:
+        return (1.0 - self.percent_per_step / 100.0) ** self.steps(commissioning_dates)
+
+
+class FeedInTariffTable:
+    """Kompilierter Intervall-Index einer Admin-Tariftabelle (je Modus sortierte Obergrenzen und Sätze)."""
+
+    def __init__(self, block: Any):
+        self.upper_bounds: Dict[str, np.ndarray] = {}
+        self._bounds_lists: Dict[str, List[float]] = {}
+        self.rates_eur: Dict[str, np.ndarray] = {}
+        block = block if isinstance(block, dict) else {}
+        for mode in MODES:
+            entries: List[Tuple[float, float]] = []
+            for entry in block.get(mode) or []:
+                if not isinstance(entry, dict):
+                    continue
+                rate = normalize_tariff_to_eur_per_kwh(entry.get("ct_per_kwh"))
+                if rate is None:
+                    continue
+                upper = entry.get("kwp_max")
+                upper_f = float("inf") if upper in (None, "") else _to_float(upper, float("inf"))
+                entries.append((upper_f, rate))
+            entries.sort(key=lambda item: item[0])
+            self.upper_bounds[mode] = np.array([upper for upper, _ in entries], dtype=float)
+            self.rates_eur[mode] = np.array([rate for _, rate in entries], dtype=float)
+            self._bounds_lists[mode] = [upper for upper, _ in entries]
+        self.degression = DegressionSchedule.from_config(block.get("degression"))
+
+    def has_rates(self, mode: str = "parts") -> bool:
+        return len(self.rates_eur.get(normalize_mode(mode), ())) > 0
+
+    def lookup(self, kwp: float, mode: str = "parts", commissioning_date: Optional[DateLike] = None) -> Optional[float]:
+        """Tarif in €/kWh für eine Anlagengröße (None, wenn die Tabelle für den Modus leer ist)."""
+        mode = normalize_mode(mode)
+        bounds = self._bounds_lists[mode]
+        if not bounds:
+            return None
+        index = min(bisect_left(bounds, float(kwp)), len(bounds) - 1)
+        rate = float(self.rates_eur[mode][index])
+        if commissioning_date is not None and self.degression.valid_from is not None:
+            rate = self._degress(np.array([rate]), self.degression.factors(commissioning_date))[0]
+        return rate
+
+    def lookup_many(self, kwps: Sequence[float], mode: str = "parts",
+                    commissioning_dates: Optional[Any] = None) -> Optional[np.ndarray]:
+        """Vektorisierte Variante von ``lookup`` für Arrays von kWp-Werten (und optional Inbetriebnahmedaten)."""
+        mode = normalize_mode(mode)
+        bounds = self.upper_bounds[mode]
+        if not len(bounds):
+            return None
+        values = np.asarray(kwps, dtype=float)
+        indices = np.minimum(np.searchsorted(bounds, values, side="left"), len(bounds) - 1)
+        rates = self.rates_eur[mode][indices]
+        if commissioning_dates is not None and self.degression.valid_from is not None:
+            rates = self._degress(rates, self.degression.factors(commissioning_dates))
+        return rates
+
+    @staticmethod
+    def _degress(rates_eur: np.ndarray, factors: np.ndarray) -> np.ndarray:
+        # EEG: Sätze werden auf zwei Nachkommastellen in ct/kWh gerundet
+        return np.round(rates_eur * 100.0 * factors, 2) / 100.0
+
+
+class _TariffCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Ladefunktion -> (Stand der admin_settings-Zeile, Zeitpunkt der letzten Prüfung, Tabelle)
+        self.tables: Dict[Any, Tuple[Any, float, FeedInTariffTable]] = {}
+        self.version = 0
+        self.stale_reloads = 0
+
+    def clear(self) -> None:
+        with self.lock:
+            self.tables.clear()
+            self.version += 1
+
+
+_CACHE = _TariffCache()
+
+
+def _default_load_admin_setting() -> Optional[Callable[..., Any]]:
+    try:
+        from database import load_admin_setting
+        return load_admin_setting
+    except Exception:
+        return None
+
+
+def _reads_database(load_func: Optional[Callable[..., Any]]) -> bool:
+    """Nur für database.load_admin_setting sagt der Stand der admin_settings-Zeile etwas über die Quelle aus."""
+    try:
+        import database
+        return load_func is database.load_admin_setting
+    except Exception:
+        return False
+
+
+def _settings_stamp() -> Any:
+    """Stand der Zeile 'feed_in_tariffs' in admin_settings (eine Zeile, nur lesend); None ohne Datenbank."""
+    try:
+        import database
+        db_path = database.DB_PATH
+    except Exception:
+        return None
+    if not db_path or not os.path.exists(db_path):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        try:
+            row = conn.execute("SELECT last_modified, value FROM admin_settings WHERE key = 'feed_in_tariffs'").fetchone()
+        except sqlite3.OperationalError:
+            # Ältere Schemata ohne last_modified
+            row = conn.execute("SELECT NULL, value FROM admin_settings WHERE key = 'feed_in_tariffs'").fetchone()
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+    if row is None:
+        return (db_path,)
+    # Hash statt Wertvergleich: update_tariffs.py setzt last_modified nicht immer
+    value = row[1] if isinstance(row[1], bytes) else str(row[1]).encode("utf-8")
+    return db_path, row[0], hashlib.blake2b(value, digest_size=16).hexdigest()
+
+
+def invalidate_tariff_cache() -> None:
+    """Kompilierte Tariftabellen verwerfen (wird beim Speichern von 'feed_in_tariffs' aufgerufen)."""
+    _CACHE.clear()
+
+
+def get_tariff_table(load_admin_setting_func: Optional[Callable[..., Any]] = None,
+                     tariffs_block: Optional[Dict[str, Any]] = None) -> FeedInTariffTable:
+    """Kompilierte Tariftabelle, je Ladefunktion gecacht.
+
+    Innerhalb von ``_REVALIDATE_SECONDS`` wird die gecachte Tabelle ohne Datenbankzugriff geliefert;
+    danach prüft die Standard-Ladefunktion den Stand der admin_settings-Zeile, andere Ladefunktionen
+    werden erneut aufgerufen. ``save_admin_setting`` invalidiert sofort.
+    Mit ``tariffs_block`` wird eine bereits geladene Tabelle kompiliert (ohne Cache).
+    """
+    if tariffs_block is not None:
+        return FeedInTariffTable(tariffs_block)
+    load_func = load_admin_setting_func or _default_load_admin_setting()
+    now = time.monotonic()
+    with _CACHE.lock:
+        cached = _CACHE.tables.get(load_func)
+        if cached is not None and now - cached[1] < _REVALIDATE_SECONDS:
+            return cached[2]
+        version = _CACHE.version
+    stamp = _settings_stamp() if _reads_database(load_func) else None
+    if cached is not None and stamp is not None:
+        with _CACHE.lock:
+            if cached[0] == stamp and _CACHE.version == version:
+                _CACHE.tables[load_func] = (stamp, now, cached[2])
+                return cached[2]
+            _CACHE.stale_reloads += 1
+    block: Any = {}
+    if load_func is not None:
+        try:
+            block = load_func("feed_in_tariffs", {}) or {}
+        except Exception:
+            block = {}
+    table = FeedInTariffTable(block)
+    with _CACHE.lock:
+        # Nur speichern, wenn zwischenzeitlich nicht invalidiert wurde (sonst evtl. alter Stand)
+        if _CACHE.version == version:
+            if len(_CACHE.tables) >= _MAX_CACHED_TABLES:
+                _CACHE.tables.clear()  # z. B. bei ständig neuen Lambda-Ladefunktionen
+            _CACHE.tables[load_func] = (stamp, now, table)
+    return table
+
+
+def resolve_feed_in_tariff(kwp: float, mode: str = "parts",
+                           load_admin_setting_func: Optional[Callable[..., Any]] = None,
+                           commissioning_date: Optional[DateLike] = None,
+                           fallback_eur_per_kwh: Optional[float] = None) -> Optional[float]:
+    """Einspeisevergütung in €/kWh für eine Anlage; ``fallback_eur_per_kwh`` ohne passende Tabelle."""
+    rate = get_tariff_table(load_admin_setting_func).lookup(kwp, mode, commissioning_date)
+    return fallback_eur_per_kwh if rate is None else rate
+
+
+def resolve_feed_in_tariffs(kwps: Sequence[float], mode: str = "parts",
+                            load_admin_setting_func: Optional[Callable[..., Any]] = None,
+                            commissioning_dates: Optional[Any] = None,
+                            fallback_eur_per_kwh: float = DEFAULT_PARTS_UNDER_10_EUR_PER_KWH) -> np.ndarray:
+    """Vektorisiert: Tarife in €/kWh für viele Anlagengrößen (z. B. Szenario-Batches)."""
+    rates = get_tariff_table(load_admin_setting_func).lookup_many(kwps, mode, commissioning_dates)
+    if rates is None:
+        return np.full(np.shape(np.asarray(kwps, dtype=float)), float(fallback_eur_per_kwh))
+    return rates
+
+
+def annual_tariff_series(tariff_eur_per_kwh: float, years: int,
+                         eeg_period_years: int = DEFAULT_EEG_PERIOD_YEARS,
+                         post_eeg_eur_per_kwh: float = DEFAULT_POST_EEG_EUR_PER_KWH) -> np.ndarray:
+    """Tarif je Simulationsjahr: fest im EEG-Zeitraum, danach Marktwert."""
+    years_idx = np.arange(1, max(0, int(years)) + 1)
+    return np.where(years_idx <= int(eeg_period_years), float(tariff_eur_per_kwh), float(post_eeg_eur_per_kwh))
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    with _CACHE.lock:
+        return {"tables": len(_CACHE.tables), "invalidations": _CACHE.version, "stale_reloads": _CACHE.stale_reloads}
@@ -0,0 +1,505 @@
+# geocoding.py
+# Geokodierung und Satellitenbilder mit persistentem Cache
+# Adressen werden normalisiert und mit TTL in der Tabelle geocode_cache abgelegt (auch Fehltreffer,
+# mit kürzerer TTL); Satellitenbilder landen als Dateien unter <DATA_DIR>/geo_tiles, Schlüssel
+# sind gerundete Koordinaten, Zoom und Bildgröße. Anbieter (Google, Nominatim, Offline) sind austauschbar.
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from typing import Optional, Dict, Any, Iterable, List, Tuple, Union
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+try:
+    import requests
+except ImportError:
+    requests = None  # type: ignore
+
+try:
+    import database as _database
+    from database import get_db_connection
+except Exception as e:
+    _database = None  # type: ignore
+    get_db_connection = None  # type: ignore
+    print(f"geocoding.py: WARN - database.get_db_connection nicht verfügbar: {e}")
+
+API_KEY_PLACEHOLDER = "PLATZHALTER_HIER_IHREN_KEY_EINFUEGEN"
+GEOCODING_PROVIDER_SETTING_KEY = "geocoding_provider"
+
+DEFAULT_TTL_SECONDS = 180 * 24 * 3600
+DEFAULT_NEGATIVE_TTL_SECONDS = 24 * 3600
+DEFAULT_IMAGE_TTL_SECONDS = 90 * 24 * 3600
+# 6 Nachkommastellen ~ 0,1 m; feiner unterscheidet kein Kartenanbieter
+_COORD_DECIMALS = 6
+# Obergrenze des Prozess-Caches je Dienst (Einträge; der persistente Cache ist unbegrenzt)
+_MEMO_MAX_ENTRIES = 4096
+
+Coordinates = Tuple[float, float]
+AddressInput = Union[str, Dict[str, Any], Tuple[str, ...]]
+
+_cache_lock = threading.Lock()
+_ENSURED_DATABASES: set = set()
+_SERVICES: Dict[Tuple[str, str], "GeocodingService"] = {}
+
+
+def _db_cache_key() -> str:
+    return str(getattr(_database, "DB_PATH", "") or "")
+
+
+def _ensure_tables(conn: sqlite3.Connection) -> None:
+    db_key = _db_cache_key()
+    if db_key and db_key in _ENSURED_DATABASES:
+        return
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS geocode_cache (
+            query_key TEXT NOT NULL,
+            provider TEXT NOT NULL,
+            latitude REAL,
+            longitude REAL,
+            created_at REAL NOT NULL,
+            PRIMARY KEY(provider, query_key)
+        )
+        """
+    )
+    conn.commit()
+    if db_key:
+        _ENSURED_DATABASES.add(db_key)
+
+
+# --- Adressnormalisierung ---
+
+_STREET_SUFFIX_RE = re.compile(r"(str\.|strasse|straße)(?=\s|$)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_address(address: str = "", zip_code: str = "", city: str = "", country: str = "") -> str:
+    """Normalisierter Cache-Schlüssel: Kleinschreibung, NFKC, 'Str./Straße' vereinheitlicht, Kommas und Leerraum reduziert.
+
+    Eine Adresse als ein String ("Straße 1, 12345 Ort") ergibt denselben Schlüssel wie in Teilen.
+    """
+    text = " ".join(str(part or "") for part in (address, zip_code, city, country))
+    text = unicodedata.normalize("NFKC", text).lower().replace(",", " ")
+    text = _STREET_SUFFIX_RE.sub("strasse", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def format_query(address: str = "", zip_code: str = "", city: str = "", country: str = "") -> str:
+    """Lesbare Anfrage für den Anbieter (Format wie bisher in data_input)."""
+    query = f"{address}, {zip_code} {city}".strip().strip(",").strip()
+    return f"{query}, {country}" if country else query
+
+
+def _address_parts(item: AddressInput) -> Tuple[str, str, str, str]:
+    if isinstance(item, dict):
+        return (
+            str(item.get("address") or item.get("street") or ""),
+            str(item.get("zip_code") or item.get("zip") or ""),
+            str(item.get("city") or ""),
+            str(item.get("country") or ""),
+        )
+    if isinstance(item, (tuple, list)):
+        padded = [str(p or "") for p in item] + ["", "", "", ""]
+        return padded[0], padded[1], padded[2], padded[3]
+    return str(item or ""), "", "", ""
+
+
+# --- Anbieter ---
+
+class GeocodingProvider(ABC):
+    """Schnittstelle für Geokodierungsanbieter."""
+
+    name = "base"
+    # Maximal gleichzeitige Anfragen (Nutzungsbedingungen des Anbieters)
+    max_concurrency = 4
+    # Mindestabstand zwischen zwei Anfragen in Sekunden (Nutzungsbedingungen des Anbieters)
+    min_interval_seconds = 0.0
+
+    def __init__(self):
+        self._throttle_lock = threading.Lock()
+        self._next_request_at = 0.0
+
+    def wait_for_slot(self) -> None:
+        """Blockiert, bis der Mindestabstand zur vorigen Anfrage dieses Anbieters eingehalten ist."""
+        if self.min_interval_seconds <= 0:
+            return
+        with self._throttle_lock:
+            now = time.monotonic()
+            if now < self._next_request_at:
+                time.sleep(self._next_request_at - now)
+                now = time.monotonic()
+            self._next_request_at = now + self.min_interval_seconds
+
+    @abstractmethod
+    def geocode(self, query: str) -> Optional[Coordinates]:
+        """Koordinaten (lat, lng) zur Adresse oder None, falls nicht gefunden."""
+
+    def static_image_url(self, latitude: float, longitude: float, zoom: int, width: int, height: int) -> Optional[str]:
+        """URL eines Satellitenbilds oder None, falls der Anbieter keine Bilder liefert."""
+        return None
+
+
+class GoogleGeocodingProvider(GeocodingProvider):
+    """Google Geocoding API und Static Maps (maptype=satellite)."""
+
+    name = "google"
+    max_concurrency = 8
+    GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+    STATIC_MAP_URL = "https://maps.googleapis.com/maps/api/staticmap?"
+
+    def __init__(self, api_key: str, timeout: float = 10):
+        super().__init__()
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def geocode(self, query: str) -> Optional[Coordinates]:
+        if requests is None:
+            return None
+        response = requests.get(self.GEOCODE_URL, params={"address": query, "key": self.api_key}, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        if data.get("status") == "OK" and data.get("results"):
+            location = data["results"][0].get("geometry", {}).get("location", {})
+            lat, lng = location.get("lat"), location.get("lng")
+            if lat is not None and lng is not None:
+                return float(lat), float(lng)
+        return None
+
+    def static_image_url(self, latitude: float, longitude: float, zoom: int, width: int, height: int) -> Optional[str]:
+        params = {"center": f"{latitude},{longitude}", "zoom": str(zoom), "size": f"{width}x{height}", "maptype": "satellite", "key": self.api_key}
+        return self.STATIC_MAP_URL + "&".join(f"{k}={v}" for k, v in params.items())
+
+
+class NominatimGeocodingProvider(GeocodingProvider):
+    """OpenStreetMap Nominatim (ohne Satellitenbilder, eine Anfrage gleichzeitig, höchstens eine je Sekunde)."""
+
+    name = "nominatim"
+    max_concurrency = 1
+    min_interval_seconds = 1.0
+
+    def __init__(self, base_url: str = "https://nominatim.openstreetmap.org/search", user_agent: str = "kakerlake-solar/1.0", timeout: float = 10):
+        super().__init__()
+        self.base_url = base_url
+        self.user_agent = user_agent
+        self.timeout = timeout
+
+    def geocode(self, query: str) -> Optional[Coordinates]:
+        if requests is None:
+            return None
+        response = requests.get(
+            self.base_url,
+            params={"q": query, "format": "json", "limit": 1},
+            headers={"User-Agent": self.user_agent},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        results = response.json()
+        if results:
+            return float(results[0]["lat"]), float(results[0]["lon"])
+        return None
+
+
+class OfflineGeocodingProvider(GeocodingProvider):
+    """Ersatzanbieter ohne Netzwerk: feste Tabelle normalisierter Adressen (Tests, Offline-Betrieb)."""
+
+    name = "offline"
+    max_concurrency = 1
+
+    def __init__(self, table: Optional[Dict[str, Coordinates]] = None, images: Optional[Dict[Tuple[float, float, int], bytes]] = None):
+        super().__init__()
+        self.table = {normalize_address(k): (float(v[0]), float(v[1])) for k, v in (table or {}).items()}
+        self.images = dict(images or {})
+        self.calls = 0
+
+    def geocode(self, query: str) -> Optional[Coordinates]:
+        self.calls += 1
+        return self.table.get(normalize_address(query))
+
+    def fetch_image(self, latitude: float, longitude: float, zoom: int) -> Optional[bytes]:
+        self.calls += 1
+        return self.images.get((round(latitude, _COORD_DECIMALS), round(longitude, _COORD_DECIMALS), zoom))
+
+
+def build_provider(provider_name: Optional[str] = None, api_key: Optional[str] = None) -> Optional[GeocodingProvider]:
+    """Erzeugt den Anbieter; Google nur mit gültigem API-Key."""
+    name = (provider_name or "google").strip().lower()
+    if name == "nominatim":
+        return NominatimGeocodingProvider()
+    if name == "offline":
+        return OfflineGeocodingProvider()
+    if api_key and api_key.strip() and api_key != API_KEY_PLACEHOLDER:
+        return GoogleGeocodingProvider(api_key.strip())
+    return None
+
+
+# --- Dienst ---
+
+class GeocodingService:
+    """Geokodierung und Satellitenbilder mit persistentem Cache vor einem austauschbaren Anbieter."""
+
+    def __init__(
+        self,
+        provider: Optional[GeocodingProvider],
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        negative_ttl_seconds: float = DEFAULT_NEGATIVE_TTL_SECONDS,
+        image_ttl_seconds: float = DEFAULT_IMAGE_TTL_SECONDS,
+        image_dir: Optional[str] = None,
+    ):
+        self.provider = provider
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.image_ttl_seconds = image_ttl_seconds
+        self._image_dir = image_dir
+        self._memo: "OrderedDict[Tuple[str, str], Tuple[Optional[Coordinates], float]]" = OrderedDict()
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def provider_name(self) -> str:
+        return self.provider.name if self.provider is not None else "none"
+
+    @property
+    def image_dir(self) -> str:
+        if self._image_dir:
+            return self._image_dir
+        db_path = _db_cache_key()
+        base = os.path.dirname(db_path) if db_path else getattr(_database, "DATA_DIR", "data")
+        return os.path.join(base, "geo_tiles")
+
+    # --- Koordinaten ---
+
+    def _is_fresh(self, coords: Optional[Coordinates], created_at: float) -> bool:
+        ttl = self.ttl_seconds if coords is not None else self.negative_ttl_seconds
+        return time.time() - created_at < ttl
+
+    def _read_cache(self, key: str) -> Tuple[bool, Optional[Coordinates]]:
+        memo_key = (_db_cache_key(), key)
+        with self._lock:
+            hit = self._memo.get(memo_key)
+            if hit is not None:
+                self._memo.move_to_end(memo_key)
+        if hit is not None and self._is_fresh(*hit):
+            return True, hit[0]
+        if get_db_connection is None:
+            return False, None
+        conn = get_db_connection()
+        if conn is None:
+            return False, None
+        try:
+            _ensure_tables(conn)
+            row = conn.execute(
+                "SELECT latitude, longitude, created_at FROM geocode_cache WHERE provider = ? AND query_key = ?",
+                (self.provider_name, key),
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"geocoding.py: Fehler beim Lesen des Geocode-Caches: {e}")
+            return False, None
+        finally:
+            conn.close()
+        if row is None:
+            return False, None
+        coords = (float(row[0]), float(row[1])) if row[0] is not None and row[1] is not None else None
+        created_at = float(row[2])
+        if not self._is_fresh(coords, created_at):
+            return False, None
+        self._remember(memo_key, coords, created_at)
+        return True, coords
+
+    def _remember(self, memo_key: Tuple[str, str], coords: Optional[Coordinates], created_at: float) -> None:
+        with self._lock:
+            self._memo[memo_key] = (coords, created_at)
+            self._memo.move_to_end(memo_key)
+            while len(self._memo) > _MEMO_MAX_ENTRIES:
+                self._memo.popitem(last=False)
+
+    def _write_cache(self, key: str, coords: Optional[Coordinates]) -> None:
+        created_at = time.time()
+        self._remember((_db_cache_key(), key), coords, created_at)
+        if get_db_connection is None:
+            return
+        conn = get_db_connection()
+        if conn is None:
+            return
+        try:
+            _ensure_tables(conn)
+            conn.execute(
+                "INSERT OR REPLACE INTO geocode_cache (query_key, provider, latitude, longitude, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, self.provider_name, coords[0] if coords else None, coords[1] if coords else None, created_at),
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"geocoding.py: Fehler beim Schreiben des Geocode-Caches: {e}")
+        finally:
+            conn.close()
+
+    def geocode(self, address: str = "", zip_code: str = "", city: str = "", country: str = "") -> Optional[Dict[str, float]]:
+        """Koordinaten als {'latitude', 'longitude'} oder None; wiederholte Adressen kommen aus dem Cache."""
+        key = normalize_address(address, zip_code, city, country)
+        if not key or self.provider is None:
+            return None
+        found, coords = self._read_cache(key)
+        if not found:
+            # Gleichzeitige Anfragen derselben Adresse teilen sich einen Anbieteraufruf
+            with self._lock:
+                event = self._inflight.get(key)
+                owner = event is None
+                if owner:
+                    event = self._inflight[key] = threading.Event()
+            if not owner:
+                event.wait()
+                found, coords = self._read_cache(key)
+            else:
+                try:
+                    coords, ok = self._fetch(format_query(address, zip_code, city, country))
+                    if ok:
+                        self._write_cache(key, coords)
+                finally:
+                    with self._lock:
+                        self._inflight.pop(key, None)
+                    event.set()
+        if coords is None:
+            return None
+        return {"latitude": coords[0], "longitude": coords[1]}
+
+    def _fetch(self, query: str) -> Tuple[Optional[Coordinates], bool]:
+        # Netzwerkfehler (ok=False) werden nicht als Fehltreffer gecacht
+        try:
+            self.provider.wait_for_slot()
+            return self.provider.geocode(query), True
+        except Exception as e:
+            print(f"geocoding.py: Geokodierung fehlgeschlagen ({self.provider_name}): {e}")
+            return None, False
+
+    def geocode_many(self, items: Iterable[AddressInput], max_workers: Optional[int] = None) -> List[Optional[Dict[str, float]]]:
+        """
+        Geokodiert viele Adressen (Strings, (Straße, PLZ, Ort[, Land]) oder Dicts mit address/street,
+        zip_code/zip, city, country). Gleiche Adressen werden einmal angefragt; die Zahl gleichzeitiger
+        Anbieteraufrufe ist durch max_workers und die Grenze des Anbieters beschränkt.
+        """
+        parts_list = [_address_parts(item) for item in items]
+        unique: Dict[str, Tuple[str, str, str, str]] = {}
+        keys = []
+        for parts in parts_list:
+            key = normalize_address(*parts)
+            keys.append(key)
+            if key and key not in unique:
+                unique[key] = parts
+        results: Dict[str, Optional[Dict[str, float]]] = {}
+        if unique and self.provider is not None:
+            limit = max(1, min(max_workers or self.provider.max_concurrency, self.provider.max_concurrency, len(unique)))
+            if limit == 1:
+                for key, parts in unique.items():
+                    results[key] = self.geocode(*parts)
+            else:
+                with ThreadPoolExecutor(max_workers=limit) as executor:
+                    futures = {key: executor.submit(self.geocode, *parts) for key, parts in unique.items()}
+                    results = {key: future.result() for key, future in futures.items()}
+        return [dict(results[key]) if results.get(key) else None for key in keys]
+
+    # --- Satellitenbilder ---
+
+    def image_path(self, latitude: float, longitude: float, zoom: int = 20, width: int = 600, height: int = 400) -> str:
+        lat, lon = round(float(latitude), _COORD_DECIMALS), round(float(longitude), _COORD_DECIMALS)
+        name = f"{self.provider_name}_{lat:.{_COORD_DECIMALS}f}_{lon:.{_COORD_DECIMALS}f}_z{int(zoom)}_{int(width)}x{int(height)}.png"
+        return os.path.join(self.image_dir, name)
+
+    def satellite_image_url(self, latitude: float, longitude: float, zoom: int = 20, width: int = 600, height: int = 400) -> Optional[str]:
+        if self.provider is None:
+            return None
+        return self.provider.static_image_url(latitude, longitude, zoom, width, height)
+
+    def satellite_image(self, latitude: float, longitude: float, zoom: int = 20, width: int = 600, height: int = 400) -> Optional[bytes]:
+        """Satellitenbild als Bytes; innerhalb der TTL aus dem Dateicache statt vom Anbieter."""
+        if self.provider is None:
+            return None
+        path = self.image_path(latitude, longitude, zoom, width, height)
+        try:
+            if time.time() - os.path.getmtime(path) < self.image_ttl_seconds:
+                with open(path, "rb") as f:
+                    return f.read()
+        except OSError:
+            pass
+        content = self._fetch_image(latitude, longitude, zoom, width, height)
+        if not content:
+            return None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"geocoding.py: Satellitenbild konnte nicht gecacht werden: {e}")
+        return content
+
+    def _fetch_image(self, latitude: float, longitude: float, zoom: int, width: int, height: int) -> Optional[bytes]:
+        fetch_image = getattr(self.provider, "fetch_image", None)
+        try:
+            # Erst prüfen, ob der Anbieter überhaupt Bilder liefert; nur echte Anfragen belegen einen Slot
+            if fetch_image is None:
+                url = self.provider.static_image_url(latitude, longitude, zoom, width, height)
+                if not url or requests is None:
+                    return None
+            self.provider.wait_for_slot()
+            if fetch_image is not None:
+                return fetch_image(round(float(latitude), _COORD_DECIMALS), round(float(longitude), _COORD_DECIMALS), int(zoom))
+            response = requests.get(url, timeout=15)
+            response.raise_for_status()
+            return response.content
+        except Exception as e:
+            print(f"geocoding.py: Satellitenbild konnte nicht geladen werden ({self.provider_name}): {e}")
+            return None
+
+    def clear_memory_cache(self) -> None:
+        with self._lock:
+            self._memo.clear()
+
+
+def purge_expired(max_age_seconds: float = DEFAULT_TTL_SECONDS) -> int:
+    """Entfernt veraltete Einträge aus geocode_cache; gibt die Anzahl gelöschter Zeilen zurück."""
+    if get_db_connection is None:
+        return 0
+    conn = get_db_connection()
+    if conn is None:
+        return 0
+    try:
+        _ensure_tables(conn)
+        cur = conn.execute("DELETE FROM geocode_cache WHERE created_at < ?", (time.time() - max_age_seconds,))
+        conn.commit()
+        return cur.rowcount
+    except sqlite3.Error as e:
+        print(f"geocoding.py: Fehler beim Bereinigen des Geocode-Caches: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+def resolve_provider_name(provider_name: Optional[str] = None) -> str:
+    """Name des zu verwendenden Anbieters: explizit übergeben, sonst admin_settings['geocoding_provider'], sonst Google."""
+    if provider_name is None and _database is not None:
+        try:
+            provider_name = _database.load_admin_setting(GEOCODING_PROVIDER_SETTING_KEY, "google")
+        except Exception:
+            provider_name = None
+    return str(provider_name or "google").strip().lower()
+
+
+def get_geocoding_service(api_key: Optional[str] = None, provider_name: Optional[str] = None) -> GeocodingService:
+    """
+    Gemeinsamer Dienst je Anbieter (bei Google zusätzlich je API-Key); der Anbieter kommt ohne
+    provider_name aus resolve_provider_name. Ein Dienst je Anbieter heißt auch eine gemeinsame
+    Drosselung (z.B. Nominatim: eine Anfrage je Sekunde für den ganzen Prozess).
+    """
+    name = resolve_provider_name(provider_name)
+    key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16] if name == "google" else ""
+    with _cache_lock:
+        service = _SERVICES.get((name, key_hash))
+        if service is None:
+            service = _SERVICES[(name, key_hash)] = GeocodingService(build_provider(name, api_key))
+        return service
@@ -26,7 +26,9 @@ try:
     calculate_heatpump_economics,
     estimate_annual_heat_demand_kwh_from_consumption,
     estimate_heat_load_kw_from_annual_demand,
-    get_default_heating_system_efficiency
+    get_default_heating_system_efficiency,
+    building_profile_from_data,
+    rank_heat_pumps,
     )
     from locales import get_text
     HEATPUMP_MODULES_AVAILABLE = True
@@ -401,6 +403,17 @@ def render_heatpump_selection(texts: Dict[str, str], building_data: Dict[str, An
             if suitable:
                 suitable = sorted(suitable, key=lambda hp: hp.get('heating_power', 0))
                 recommended_list = suitable
+                # Ranking nach Stundensimulation im Referenzjahr (JAZ, Heizstab-Anteil, Gesamtkosten)
+                try:
+                    ranked = rank_heat_pumps(building_profile_from_data(building_data), suitable,
+                                             min_coverage_percent=0.0)
+                    recommended_list = [
+                        dict(r['pump'], spf=r['spf'], annual_electricity_kwh=r['annual_electricity_kwh'],
+                             coverage_percent=r['coverage_percent'])
+                        for r in ranked
+                    ]
+                except Exception as sim_error:
+                    st.warning(f"Jahressimulation nicht möglich, sortiere nach Leistung: {sim_error}")
             else:
                 # Fallback: nächstgrößte Abweichung (unterdimensioniert)
                 candidates = sorted(candidates, key=lambda hp: abs(hp.get('heating_power', 0) - required_kw))
@@ -424,6 +437,10 @@ def render_heatpump_selection(texts: Dict[str, str], building_data: Dict[str, An
                 with col_hp2:
                     st.metric("COP (A2/W35)", f"{top_heatpump['cop']:.1f}")
                     st.metric("SCOP", f"{top_heatpump['scop']:.1f}")
+                    if 'spf' in top_heatpump:
+                        st.metric("JAZ (Referenzjahr)", f"{top_heatpump['spf']:.2f}",
+                                  help=f"Strombedarf: {top_heatpump['annual_electricity_kwh']:,.0f} kWh/Jahr, "
+                                       f"Deckung ohne Heizstab: {top_heatpump['coverage_percent']:.1f} %")
                     st.write(f"Schallpegel: {top_heatpump['noise_level']} dB(A)")
                 
                 with col_hp3:
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Inkrementelle Neuberechnung für die Live-Preisvorschau
+
+Kleiner Datenflussgraph über die Ergebnis-Schlüssel von perform_calculations:
+- Eingänge sind einzelne Ergebniswerte (Ertrag, Verbrauch, Investition, ...) und
+  die Preismodifikationen der Slider (Rabatt, Aufpreis, Pauschalen)
+- Abgeleitete Knoten werden nur neu berechnet, wenn sich einer ihrer Eingänge ändert
+- Eine Slider-Änderung betrifft damit nur Endpreis, Amortisation, ROI und Cashflow;
+  Energieflüsse, Stromtarif und Preissteigerungsfaktoren bleiben gecacht
+"""
+
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+try:
+    import streamlit as st
+except ImportError:  # pragma: no cover - Bridge läuft auch ohne Streamlit
+    st = None
+
+
+class DependencyGraph:
+    """Gerichteter azyklischer Graph mit Eingängen und lazy berechneten Knoten."""
+
+    def __init__(self):
+        self._inputs: Set[str] = set()
+        self._nodes: Dict[str, Tuple[Callable[..., Any], Tuple[str, ...]]] = {}
+        self._dependents: Dict[str, List[str]] = {}
+        self._values: Dict[str, Any] = {}
+        self._dirty: Set[str] = set()
+        self.recompute_counts: Dict[str, int] = {}
+
+    def add_input(self, name: str, default: Any = None) -> None:
+        self._inputs.add(name)
+        self._values[name] = default
+        self._dependents.setdefault(name, [])
+
+    def add_node(self, name: str, func: Callable[..., Any], deps: Sequence[str]) -> None:
+        """Registriert einen Knoten; func erhält die Werte von deps als Positionsargumente."""
+        for dep in deps:
+            if dep not in self._inputs and dep not in self._nodes:
+                raise KeyError(f"Unbekannte Abhängigkeit '{dep}' für Knoten '{name}'")
+            self._dependents.setdefault(dep, []).append(name)
+        self._nodes[name] = (func, tuple(deps))
+        self._dependents.setdefault(name, [])
+        self._dirty.add(name)
+        self.recompute_counts[name] = 0
+
+    def set_inputs(self, values: Dict[str, Any]) -> Set[str]:
+        """Setzt Eingänge; nur tatsächlich geänderte Werte invalidieren ihre Nachfolger."""
+        changed = set()
+        for name, value in values.items():
+            if name not in self._inputs:
+                raise KeyError(f"'{name}' ist kein Eingang des Graphen")
+            if _same_value(self._values.get(name), value):
+                continue
+            self._values[name] = value
+            changed.add(name)
+        self._invalidate(changed)
+        return changed
+
+    def _invalidate(self, names: Iterable[str]) -> None:
+        stack = list(names)
+        while stack:
+            for dependent in self._dependents.get(stack.pop(), []):
+                if dependent not in self._dirty:
+                    self._dirty.add(dependent)
+                    stack.append(dependent)
+
+    def get(self, name: str) -> Any:
+        if name in self._nodes and name in self._dirty:
+            func, deps = self._nodes[name]
+            self._values[name] = func(*(self.get(dep) for dep in deps))
+            self._dirty.discard(name)
+            self.recompute_counts[name] += 1
+        return self._values[name]
+
+    def evaluate(self, names: Iterable[str]) -> Dict[str, Any]:
+        return {name: self.get(name) for name in names}
+
+
+def _same_value(old: Any, new: Any) -> bool:
+    if type(old) is not type(new):
+        return False
+    try:
+        return bool(old == new)
+    except (TypeError, ValueError):
+        return False
+
+
+def _to_float(value: Any, default: float = 0.0) -> float:
+    try:
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+# Eingänge aus den Ergebnissen von perform_calculations (Schlüssel -> Standardwert)
+RESULT_INPUTS: Dict[str, float] = {
+    'annual_pv_production_kwh': 0.0,
+    'annual_consumption_kwh': 0.0,
+    'monthly_electricity_cost': 0.0,
+    'self_supply_rate_percent': 0.0,
+    'battery_capacity_kwh': 0.0,
+    'feed_in_tariff_ct_kwh': 8.2,  # Admin-Bereich Wert
+    'electricity_price_increase_rate_effective_percent': 4.0,
+    'simulation_period_years_effective': 20.0,
+    'total_investment_netto': 0.0,
+    'vat_rate_percent': 19.0,
+    'annual_financial_benefit_year1': 0.0,
+}
+
+# Eingänge aus den Preismodifikationen (siehe _collect_pricing_modifications_from_session)
+MODIFICATION_INPUTS: Tuple[str, ...] = ('discount_percent', 'surcharge_percent', 'special_discount', 'additional_costs')
+
+LIVE_VALUE_KEYS: Tuple[str, ...] = (
+    'stromtarif_ct_kwh',
+    'stromkosten_ohne_pv_total',
+    'stromkosten_mit_pv_total',
+    'gesamtersparnis_total',
+    'jaehrliche_einspeiseverguetung',
+    'jaehrliche_gesamtersparnis',
+    'amortisationszeit_jahre',
+    'direct_consumption_kwh',
+    'surplus_for_feed_in_kwh',
+    'battery_charged_kwh',
+    'remaining_consumption_kwh',
+)
+
+PRICING_KEYS: Tuple[str, ...] = (
+    'final_price_netto',
+    'final_price_brutto',
+    'total_discount_amount',
+    'total_surcharge_amount',
+    'final_amortization_years',
+    'final_roi_percent',
+    'final_cumulative_cash_flows',
+)
+
+
+def _escalation_factors(increase_percent: float, years: float) -> np.ndarray:
+    # Faktor (1 + p)^(Jahr - 1) für Jahr 1..N
+    return np.power(1 + increase_percent / 100, np.arange(int(years), dtype=float))
+
+
+def _energy_split(production: float, consumption: float, autarkie_percent: float, battery_kwh: float) -> Dict[str, float]:
+    direct = consumption * (autarkie_percent / 100)
+    battery = min(battery_kwh * 365, production - direct) if battery_kwh > 0 else 0
+    surplus = max(0, production - direct - battery)
+    return {
+        'direct_consumption_kwh': direct,
+        'battery_charged_kwh': battery,
+        'surplus_for_feed_in_kwh': surplus,
+        'remaining_consumption_kwh': consumption - direct,
+    }
+
+
+def _final_price(base_netto: float, vat_rate_percent: float, discount_percent: float, surcharge_percent: float,
+                 special_discount: float, additional_costs: float) -> Dict[str, float]:
+    # Gleiche Formel wie perform_calculations: total_investment_netto ist bereits Matrixpreis + Zubehör - Bonus
+    from calculations import _calculate_final_price_with_correct_formula
+    return _calculate_final_price_with_correct_formula(
+        base_matrix_price=base_netto,
+        additional_costs=0.0,
+        pricing_modifications={
+            'discount_percent': discount_percent,
+            'surcharge_percent': surcharge_percent,
+            'special_discount': special_discount,
+            'additional_costs': additional_costs,
+        },
+        vat_rate_percent=vat_rate_percent,
+    )
+
+
+def build_live_pricing_graph() -> DependencyGraph:
+    """Graph für calculate_correct_live_values und die Preis-Slider."""
+    graph = DependencyGraph()
+    for name, default in RESULT_INPUTS.items():
+        graph.add_input(name, default)
+    graph.add_input('total_investment_brutto', 0.0)
+    for name in MODIFICATION_INPUTS:
+        graph.add_input(name, 0.0)
+
+    # Stufe 1: unabhängig von den Preis-Slidern
+    graph.add_node('escalation_factors', _escalation_factors,
+                   ['electricity_price_increase_rate_effective_percent', 'simulation_period_years_effective'])
+    graph.add_node('stromtarif_ct_kwh',
+                   lambda monthly, consumption: (monthly * 12 * 100) / consumption if consumption > 0 else 0,
+                   ['monthly_electricity_cost', 'annual_consumption_kwh'])
+    graph.add_node('energy_split', _energy_split,
+                   ['annual_pv_production_kwh', 'annual_consumption_kwh', 'self_supply_rate_percent', 'battery_capacity_kwh'])
+    graph.add_node('stromkosten_ohne_pv_total',
+                   lambda monthly, factors: float(monthly * 12 * factors.sum()),
+                   ['monthly_electricity_cost', 'escalation_factors'])
+    graph.add_node('jaehrliche_einspeiseverguetung',
+                   lambda split, tariff: split['surplus_for_feed_in_kwh'] * (tariff / 100),
+                   ['energy_split', 'feed_in_tariff_ct_kwh'])
+    graph.add_node('stromkosten_mit_pv_total',
+                   lambda split, tarif, factors, feed_in, years: max(
+                       0, float(split['remaining_consumption_kwh'] * (tarif / 100) * factors.sum()) - feed_in * years),
+                   ['energy_split', 'stromtarif_ct_kwh', 'escalation_factors', 'jaehrliche_einspeiseverguetung',
+                    'simulation_period_years_effective'])
+    graph.add_node('gesamtersparnis_total', lambda without_pv, with_pv: without_pv - with_pv,
+                   ['stromkosten_ohne_pv_total', 'stromkosten_mit_pv_total'])
+    graph.add_node('jaehrliche_gesamtersparnis',
+                   lambda split, tarif, feed_in: split['direct_consumption_kwh'] * (tarif / 100) + feed_in,
+                   ['energy_split', 'stromtarif_ct_kwh', 'jaehrliche_einspeiseverguetung'])
+    graph.add_node('amortisationszeit_jahre',
+                   lambda brutto, savings: brutto / savings if savings > 0 else 0,
+                   ['total_investment_brutto', 'jaehrliche_gesamtersparnis'])
+
+    # Stufe 2: hängt von den Preis-Slidern ab
+    graph.add_node('final_price', _final_price,
+                   ['total_investment_netto', 'vat_rate_percent', *MODIFICATION_INPUTS])
+    graph.add_node('final_amortization_years',
+                   lambda price, benefit: price['final_price_netto'] / benefit if benefit > 0 else 0.0,
+                   ['final_price', 'annual_financial_benefit_year1'])
+    graph.add_node('final_roi_percent',
+                   lambda price, benefit: (benefit / price['final_price_netto'] * 100) if price['final_price_netto'] > 0 else 0.0,
+                   ['final_price', 'annual_financial_benefit_year1'])
+    graph.add_node('final_cumulative_cash_flows',
+                   lambda price, benefit, factors: (
+                       np.cumsum(benefit * factors) - price['final_price_netto']).tolist(),
+                   ['final_price', 'annual_financial_benefit_year1', 'escalation_factors'])
+    return graph
+
+
+class LivePricingEngine:
+    """
+    Hält einen Live-Preis-Graphen und übersetzt Ergebnisse/Modifikationen in Eingänge.
+
+    Der Graph ist zustandsbehaftet: Eingänge setzen und Werte lesen gehört unter self.lock,
+    sonst sieht ein paralleler Aufruf (Script-Thread, Bridge) fremde Zwischenwerte.
+    """
+
+    def __init__(self):
+        self.graph = build_live_pricing_graph()
+        self.lock = threading.RLock()
+
+    def load_results(self, results: Dict[str, Any]) -> Set[str]:
+        values = {name: _to_float(results.get(name, default), default) for name, default in RESULT_INPUTS.items()}
+        netto = values['total_investment_netto']
+        values['total_investment_brutto'] = _to_float(
+            results.get('total_investment_brutto', netto * 1.19 if netto > 0 else 0))
+        return self.graph.set_inputs(values)
+
+    def set_modifications(self, modifications: Optional[Dict[str, Any]]) -> Set[str]:
+        modifications = modifications or {}
+        return self.graph.set_inputs({name: _to_float(modifications.get(name, 0.0)) for name in MODIFICATION_INPUTS})
+
+    def live_values(self) -> Dict[str, Any]:
+        values = self.graph.evaluate(LIVE_VALUE_KEYS[:7])
+        values.update(self.graph.get('energy_split'))
+        return values
+
+    def pricing(self) -> Dict[str, Any]:
+        values = {key: self.graph.get('final_price')[key] for key in PRICING_KEYS[:4]}
+        values.update(self.graph.evaluate(PRICING_KEYS[4:]))
+        # Kopie: die gecachte Liste des Graphen darf der Aufrufer nicht verändern
+        values['final_cumulative_cash_flows'] = list(values['final_cumulative_cash_flows'])
+        return values
+
+
+_FALLBACK_ENGINE: Optional[LivePricingEngine] = None
+_FALLBACK_ENGINE_LOCK = threading.Lock()
+
+
+def get_live_pricing_engine() -> LivePricingEngine:
+    """Engine der aktuellen Streamlit-Session (ohne Session: prozessweit)."""
+    global _FALLBACK_ENGINE
+    try:
+        engine = st.session_state.get('_live_pricing_engine') if st is not None else None
+        if engine is None and st is not None:
+            engine = LivePricingEngine()
+            st.session_state['_live_pricing_engine'] = engine
+        if engine is not None:
+            return engine
+    except Exception:
+        pass
+    with _FALLBACK_ENGINE_LOCK:
+        if _FALLBACK_ENGINE is None:
+            _FALLBACK_ENGINE = LivePricingEngine()
+        return _FALLBACK_ENGINE
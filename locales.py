@@ -1,7 +1,12 @@
 # locales.py
 import json
 import os
-from typing import Dict, List, Optional, Tuple
+import threading
+import time
+from collections import Counter
+from string import Formatter
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
 
 # Importiere die globale Fehlerliste aus app_status.py
 try:
@@ -12,54 +17,143 @@ except ImportError:
     global_import_errors: List[str] = []
 
 
-# Funktion zum Laden der Übersetzungen
-def load_translations(lang_code: str = 'de') -> Optional[Dict[str, str]]:
-    """Lädt Übersetzungsdaten aus einer JSON-Datei für den gegebenen Sprachcode."""
-    # KORREKTUR: `global_import_errors` ist jetzt direkt verfügbar, kein erneuter Import von `gui` nötig.
-    # from gui import import_errors as global_import_errors # Entfernt
+# Katalog-Cache: pro Sprache einmal geladen (unveränderliches Mapping), Neuladen bei geänderter mtime.
+# Die mtime wird höchstens alle _RELOAD_CHECK_INTERVAL_S Sekunden geprüft; LOCALES_HOT_RELOAD=0 schaltet das ab.
+_RELOAD_CHECK_INTERVAL_S = 2.0
+_HOT_RELOAD = os.environ.get("LOCALES_HOT_RELOAD", "1").lower() not in {"0", "false", "no", "off"}
+_CATALOGS: Dict[str, "_Catalog"] = {}
+_CATALOG_LOCK = threading.Lock()
+_MISSING_KEYS: Counter = Counter()
+
+_DEFAULT_TEXTS = {
+    "app_title": "Ömers Solar Kakerlake",
+    "error_loading_translations": "Fehler beim Laden der Übersetzungen.",
+    "language_file_not_found": "Sprachdatei nicht gefunden: {filepath}",
+    # Füge hier weitere absolut notwendige Fallback-Texte hinzu,
+    # die benötigt werden, BEVOR die Haupt-TEXTS-Variable in gui.py gefüllt ist.
+}
+
+
+class _Template:
+    """Vorkompilierter Formattext: Platzhalter werden einmal beim Laden ermittelt."""
+    __slots__ = ("text", "fields")
+
+    def __init__(self, text: str):
+        self.text = text
+        try:
+            self.fields = frozenset(
+                name.split(".")[0].split("[")[0] for _, name, _, _ in Formatter().parse(text) if name
+            )
+        except ValueError:
+            self.fields = None  # ungültiges Format -> Text unverändert zurückgeben
+
+    def render(self, kwargs: Dict[str, object]) -> str:
+        # Auch ohne Platzhalter formatieren: escapte Klammern ({{ }}) werden dabei aufgelöst
+        if self.fields is None or not self.fields.issubset(kwargs):
+            return self.text
+        try:
+            return self.text.format_map(kwargs)
+        except (KeyError, ValueError, IndexError, AttributeError):
+            return self.text
+
+
+class _Catalog:
+    __slots__ = ("texts", "templates", "mtime", "checked_at")
+
+    def __init__(self, texts: Dict[str, str], mtime: Optional[float]):
+        self.texts: Mapping[str, str] = MappingProxyType(dict(texts))
+        self.templates: Dict[str, _Template] = {}
+        self.mtime = mtime
+        self.checked_at = time.monotonic()
 
+    def template(self, key: str, text: str) -> _Template:
+        compiled = self.templates.get(key)
+        if compiled is None or compiled.text is not text:
+            compiled = self.templates[key] = _Template(text)
+        return compiled
+
+
+def _translation_path(lang_code: str) -> str:
     current_dir = os.path.dirname(os.path.abspath(__file__))
-    file_path = os.path.join(current_dir, f"{lang_code}.json")
-    default_texts = {
-        "app_title": "Ömers Solar Kakerlake",
-        "error_loading_translations": "Fehler beim Laden der Übersetzungen.",
-        "language_file_not_found": "Sprachdatei nicht gefunden: {filepath}",
-        # Füge hier weitere absolut notwendige Fallback-Texte hinzu,
-        # die benötigt werden, BEVOR die Haupt-TEXTS-Variable in gui.py gefüllt ist.
-    }
+    return os.path.join(current_dir, f"{lang_code}.json")
+
+
+def _file_mtime(file_path: str) -> Optional[float]:
+    try:
+        return os.stat(file_path).st_mtime
+    except OSError:
+        return None
 
+
+def _report_error(error_msg: str) -> None:
+    print(f"LOCALES FEHLER: {error_msg}")
+    if global_import_errors is not None: # Sicherstellen, dass die Liste existiert
+        global_import_errors.append(error_msg)
+
+
+def _read_translations(lang_code: str) -> Dict[str, str]:
+    """Liest die JSON-Datei (ohne Cache); bei Fehlern die Default-Texte."""
+    file_path = _translation_path(lang_code)
     try:
         if not os.path.exists(file_path):
-            error_msg = default_texts["language_file_not_found"].format(filepath=file_path)
-            print(f"LOCALES FEHLER: {error_msg}")
-            if global_import_errors is not None: # Sicherstellen, dass die Liste existiert
-                global_import_errors.append(error_msg)
-            return default_texts
+            _report_error(_DEFAULT_TEXTS["language_file_not_found"].format(filepath=file_path))
+            return _DEFAULT_TEXTS
 
         with open(file_path, 'r', encoding='utf-8') as f:
             texts = json.load(f)
             if not isinstance(texts, dict):
                 raise ValueError("Übersetzungsdatei hat kein Dictionary-Format.")
-            # print(f"LOCALES INFO: Übersetzungen für '{lang_code}' erfolgreich geladen aus {file_path}")
             return texts
     except FileNotFoundError: # Sollte durch obigen Check abgedeckt sein, aber zur Sicherheit
-        error_msg = default_texts["language_file_not_found"].format(filepath=file_path)
-        print(f"LOCALES FEHLER: {error_msg}")
-        if global_import_errors is not None:
-           global_import_errors.append(error_msg)
-        return default_texts
+        _report_error(_DEFAULT_TEXTS["language_file_not_found"].format(filepath=file_path))
+        return _DEFAULT_TEXTS
     except json.JSONDecodeError as e_json:
-        error_msg = f"JSON-Dekodierungsfehler in {file_path}: {e_json}"
-        print(f"LOCALES FEHLER: {error_msg}")
-        if global_import_errors is not None:
-           global_import_errors.append(error_msg)
-        return default_texts
+        _report_error(f"JSON-Dekodierungsfehler in {file_path}: {e_json}")
+        return _DEFAULT_TEXTS
     except Exception as e:
-        error_msg = f"Allgemeiner Fehler beim Laden von {file_path}: {e}"
-        print(f"LOCALES FEHLER: {error_msg}")
-        if global_import_errors is not None:
-            global_import_errors.append(error_msg)
-        return default_texts
+        _report_error(f"Allgemeiner Fehler beim Laden von {file_path}: {e}")
+        return _DEFAULT_TEXTS
+
+
+def get_catalog(lang_code: str = 'de') -> Mapping[str, str]:
+    """Unveränderliches Übersetzungs-Mapping der Sprache (gecacht, Hot-Reload per mtime)."""
+    return _get_catalog(lang_code).texts
+
+
+def _get_catalog(lang_code: str) -> _Catalog:
+    catalog = _CATALOGS.get(lang_code)
+    if catalog is not None:
+        if not _HOT_RELOAD or time.monotonic() - catalog.checked_at < _RELOAD_CHECK_INTERVAL_S:
+            return catalog
+        catalog.checked_at = time.monotonic()
+        if _file_mtime(_translation_path(lang_code)) == catalog.mtime:
+            return catalog
+    with _CATALOG_LOCK:
+        current = _CATALOGS.get(lang_code)
+        mtime = _file_mtime(_translation_path(lang_code))
+        if current is not None and current is not catalog and current.mtime == mtime:
+            return current  # parallel bereits neu geladen
+        # mtime vor dem Lesen erfassen: eine Änderung während des Lesens löst den nächsten Reload aus
+        catalog = _Catalog(_read_translations(lang_code), mtime)
+        _CATALOGS[lang_code] = catalog
+        return catalog
+
+
+def clear_translation_cache() -> None:
+    """Verwirft alle geladenen Kataloge (nächster Zugriff liest die Dateien neu)."""
+    with _CATALOG_LOCK:
+        _CATALOGS.clear()
+
+
+# Funktion zum Laden der Übersetzungen
+def load_translations(lang_code: str = 'de') -> Optional[Dict[str, str]]:
+    """Lädt Übersetzungsdaten aus einer JSON-Datei für den gegebenen Sprachcode.
+
+    Liefert eine veränderbare Kopie des gecachten Katalogs; die Datei wird nur beim
+    ersten Zugriff bzw. nach einer Änderung neu gelesen.
+    """
+    return dict(_get_catalog(lang_code).texts)
+
 
 def get_text(key: str, locale: str = 'de', fallback: str = None, **kwargs) -> str:
     """
@@ -74,17 +168,26 @@ def get_text(key: str, locale: str = 'de', fallback: str = None, **kwargs) -> st
     Returns:
         str: Übersetzter oder Fallback-Text
     """
-    # Lade Übersetzungen
-    translations = load_translations(locale)
-    
-    # Hol den Text oder verwende Fallback
-    text = translations.get(key, fallback or key)
-    
-    # Formatiere mit kwargs wenn vorhanden
-    try:
-        return text.format(**kwargs) if kwargs else text
-    except (KeyError, ValueError):
+    catalog = _get_catalog(locale)
+    text = catalog.texts.get(key)
+    if text is None:
+        _MISSING_KEYS[(locale, key)] += 1
+        text = fallback or key
+    if not kwargs:
+        return text
+    # Formatiere mit kwargs (Platzhalter sind vorkompiliert; fehlende Parameter -> Text unverändert)
+    if not isinstance(text, str):
         return text
+    return catalog.template(key, text).render(kwargs)
+
+
+def get_missing_key_counts(locale: Optional[str] = None) -> Dict[Tuple[str, str], int]:
+    """Zähler der nicht gefundenen Schlüssel als {(locale, key): Anzahl}."""
+    return {k: v for k, v in _MISSING_KEYS.items() if locale is None or k[0] == locale}
+
+
+def reset_missing_key_counts() -> None:
+    _MISSING_KEYS.clear()
 
 if __name__ == '__main__':
     # Testen der Ladefunktion
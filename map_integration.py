@@ -1,5 +1,6 @@
 # map_integration.py (Placeholder Modul)
 # Imports für zukünftige Funktionen
+import os
 import streamlit as st # Importiere streamlit, da st.warning verwendet wird.
 # import requests
 from typing import Optional, Tuple, List, Dict # KORREKTUR: Optional, Tuple, List, Dict hinzugefügt
@@ -9,12 +10,20 @@ from typing import Optional, Tuple, List, Dict # KORREKTUR: Optional, Tuple, Lis
 # sondern Funktionen bereitstellen, die von data_input oder analysis aufgerufen werden.
 # Beispiel: eine Funktion zur Adress-Geokodierung oder zur Anzeige einer Karte
 def get_coordinates_from_address(address: str) -> Optional[Tuple[float, float]]:
-    """Placeholder Funktion zur Geokodierung einer Adresse."""
-    print(f"map_integration: Placeholder get_coordinates_from_address called for: {address}") # Debugging
-    st.warning("Geokodierungsfunktion ist ein Platzhalter.") # Info für den Nutzer
-    # Hier kommt später die echte API-Anbindung (Google Maps, OpenStreetMap Nominatim etc.)
-    # Für jetzt gib immer None zurück
-    return None # (latitude, longitude) oder None bei Fehler
+    """Geokodiert eine Adresse über geocoding.GeocodingService (mit persistentem Cache)."""
+    try:
+        from geocoding import get_geocoding_service
+        from database import load_admin_setting
+    except ImportError as e:
+        print(f"map_integration: geocoding nicht verfügbar: {e}")
+        return None
+    api_key = os.environ.get("Maps_API_KEY") or load_admin_setting("Maps_api_key", None)
+    service = get_geocoding_service(api_key)
+    if service.provider is None:
+        st.warning("Kein Geokodierungsanbieter konfiguriert (Google API Key oder 'geocoding_provider').") # Info für den Nutzer
+        return None
+    coords = service.geocode(address)
+    return (coords["latitude"], coords["longitude"]) if coords else None # (latitude, longitude) oder None bei Fehler
 
 # Funktion zur Anzeige einer Karte/Luftbild (könnte von data_input aufgerufen werden)
 def render_interactive_map(lat: float, lon: float, zoom: int = 15):
@@ -6,14 +6,114 @@ price matrices from both CSV and Excel formats with comprehensive validation.
 """
 
 import pandas as pd
+import numpy as np
 import io
+import os
+import json
 import hashlib
-from typing import Optional, List, Tuple, Dict, Any, Union
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, List, Tuple, Dict, Any, Union, Iterable
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Compiled binary form of parsed matrices: <sha256>.npy (float64 values, memory-mapped
+# on load) plus <sha256>.json (row/column labels, dtypes, validation messages).
+# The Excel/CSV upload in admin_settings stays the source of record.
+COMPILED_FORMAT_VERSION = 1
+DEFAULT_COMPILED_DIR = Path(
+    os.environ.get("PRICE_MATRIX_COMPILED_DIR")
+    or Path(__file__).resolve().parent / "data" / "price_matrix_compiled"
+)
+# Parsed matrices kept in memory per loader (least recently used are dropped first)
+MAX_CACHED_MATRICES = 8
+
+
+def _json_label(value: Any) -> Any:
+    """Convert numpy scalars to plain Python values; unknown types become strings."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def save_compiled_matrix(directory: Union[str, Path], source_hash: str, df: pd.DataFrame,
+                         source: str, errors: List[str]) -> Path:
+    """
+    Persist a parsed matrix in the compiled binary format.
+
+    Files are written to temporary names and renamed; the JSON label file is
+    written last and marks the entry as complete.
+
+    Returns:
+        Path of the label file
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    values_path = directory / f"{source_hash}.npy"
+    labels_path = directory / f"{source_hash}.json"
+    suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+
+    tmp_values = directory / f"{source_hash}.npy{suffix}"
+    with open(tmp_values, "wb") as f:
+        np.save(f, np.ascontiguousarray(df.to_numpy(dtype=np.float64)))
+    os.replace(tmp_values, values_path)
+
+    labels = {
+        "format_version": COMPILED_FORMAT_VERSION,
+        "source": source,
+        "shape": list(df.shape),
+        "index_name": _json_label(df.index.name),
+        "index": [_json_label(v) for v in df.index],
+        "columns": [_json_label(c) for c in df.columns],
+        "dtypes": [str(dt) for dt in df.dtypes],
+        "errors": list(errors),
+        "created_at": datetime.now().isoformat(),
+    }
+    tmp_labels = directory / f"{source_hash}.json{suffix}"
+    with open(tmp_labels, "w", encoding="utf-8") as f:
+        json.dump(labels, f, ensure_ascii=False)
+    os.replace(tmp_labels, labels_path)
+    return labels_path
+
+
+def load_compiled_matrix(directory: Union[str, Path],
+                         source_hash: str) -> Optional[Tuple[pd.DataFrame, str, List[str]]]:
+    """
+    Load a compiled matrix; the values are memory-mapped read-only.
+
+    Returns:
+        Tuple of (DataFrame, source_type, errors) or None if no valid entry exists
+    """
+    directory = Path(directory)
+    labels_path = directory / f"{source_hash}.json"
+    values_path = directory / f"{source_hash}.npy"
+    if not labels_path.exists() or not values_path.exists():
+        return None
+    try:
+        with open(labels_path, "r", encoding="utf-8") as f:
+            labels = json.load(f)
+        if labels.get("format_version") != COMPILED_FORMAT_VERSION:
+            return None
+        values = np.load(values_path, mmap_mode="r")
+        if list(values.shape) != labels["shape"]:
+            logger.warning(f"Compiled matrix {source_hash[:8]}... has inconsistent shape, ignoring it")
+            return None
+        index = pd.Index(labels["index"], name=labels.get("index_name"))
+        df = pd.DataFrame(values, index=index, columns=pd.RangeIndex(values.shape[1]), copy=False)
+        restore = {i: dt for i, dt in enumerate(labels["dtypes"]) if dt != "float64"}
+        if restore:
+            df = df.astype(restore)
+        df.columns = pd.Index(labels["columns"])
+        return df, labels.get("source", "Unknown"), list(labels.get("errors", []))
+    except Exception as e:
+        logger.warning(f"Could not load compiled matrix {source_hash[:8]}...: {e}")
+        return None
+
 
 class MatrixLoader:
     """
@@ -23,10 +123,22 @@ class MatrixLoader:
     with support for both CSV (semicolon-separated) and Excel formats.
     """
     
-    def __init__(self):
-        """Initialize MatrixLoader with empty cache."""
-        self._cache: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, compiled_dir: Optional[Union[str, Path]] = None,
+                 max_entries: int = MAX_CACHED_MATRICES):
+        """
+        Initialize MatrixLoader with empty cache.
+        
+        Args:
+            compiled_dir: Directory for the compiled binary matrices. If set, parsed
+                matrices are persisted there and later loads memory-map them
+                instead of parsing Excel/CSV again. None disables the binary store.
+            max_entries: Maximum number of parsed matrices kept in memory
+        """
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.max_entries = max(1, int(max_entries))
         self._cache_keys: Dict[str, str] = {}
+        self.compiled_dir = Path(compiled_dir) if compiled_dir is not None else None
         
     def _hash_bytes(self, data: Optional[bytes]) -> Optional[str]:
         """
@@ -324,8 +436,127 @@ class MatrixLoader:
             errors.append(f"Error parsing Excel: {e}")
             return None, errors
     
+    def _cached(self, source_hash: str) -> Optional[Dict[str, Any]]:
+        """Cache entry for a source hash (marked as most recently used) or None."""
+        with self._cache_lock:
+            entry = self._cache.get(source_hash)
+            if entry is None or entry.get("dataframe") is None:
+                return None
+            self._cache.move_to_end(source_hash)
+            return entry
+    
+    def _remember(self, source_hash: str, entry: Dict[str, Any]) -> None:
+        """Put an entry into the in-process cache, dropping the least recently used ones."""
+        with self._cache_lock:
+            self._cache[source_hash] = entry
+            self._cache.move_to_end(source_hash)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+    
+    def _forget(self, source_hash: str) -> None:
+        """Drop a source hash from the in-process cache."""
+        with self._cache_lock:
+            self._cache.pop(source_hash, None)
+    
+    def _load_compiled(self, source_hash: str) -> Optional[Tuple[pd.DataFrame, str, List[str]]]:
+        """Memory-map a compiled matrix and put it into the in-process cache."""
+        if self.compiled_dir is None:
+            return None
+        compiled = load_compiled_matrix(self.compiled_dir, source_hash)
+        if compiled is None:
+            return None
+        df, source, errors = compiled
+        self._remember(source_hash, {
+            "dataframe": df,
+            "source": source,
+            "timestamp": datetime.now(),
+            "errors": errors,
+        })
+        logger.debug(f"Using compiled {source} matrix (hash: {source_hash[:8]}...)")
+        return df, source, list(errors)
+    
+    def _store_compiled(self, source_hash: str, df: pd.DataFrame, source: str, errors: List[str]) -> None:
+        """Persist a freshly parsed matrix in the binary store (best effort)."""
+        if self.compiled_dir is None:
+            return
+        try:
+            save_compiled_matrix(self.compiled_dir, source_hash, df, source, errors)
+        except Exception as e:
+            logger.warning(f"Could not persist compiled {source} matrix: {e}")
+    
+    def source_hashes(self, excel_bytes: Optional[bytes] = None,
+                      csv_data: Optional[str] = None) -> List[str]:
+        """Hashes identifying the given sources in the caches and the binary store."""
+        hashes = [self._hash_bytes(excel_bytes) if excel_bytes else None,
+                  self._hash_text(csv_data) if csv_data else None]
+        return [h for h in hashes if h]
+    
+    def compile_matrix(self, excel_bytes: Optional[bytes] = None,
+                       csv_data: Optional[str] = None) -> Tuple[bool, List[str]]:
+        """
+        Validate stored matrix sources and make sure their compiled form exists.
+        
+        Excel and CSV are compiled independently so either one can be served
+        from the binary store. Matrices already parsed for an upload preview
+        (``persist=False``) are written from the in-process cache.
+        
+        Args:
+            excel_bytes: Excel file content as bytes (optional)
+            csv_data: CSV content as string (optional)
+            
+        Returns:
+            Tuple of (is_valid, error_messages)
+        """
+        is_valid = True
+        errors: List[str] = []
+        if excel_bytes:
+            excel_valid, excel_errors = self.validate_matrix_file(excel_bytes=excel_bytes)
+            is_valid = is_valid and excel_valid
+            errors.extend(excel_errors)
+        if csv_data and csv_data.strip():
+            csv_valid, csv_errors = self.validate_matrix_file(csv_data=csv_data)
+            is_valid = is_valid and csv_valid
+            errors.extend(csv_errors)
+        if self.compiled_dir is not None:
+            for source_hash in self.source_hashes(excel_bytes, csv_data):
+                entry = self._cached(source_hash)
+                if entry is not None and not (self.compiled_dir / f"{source_hash}.json").exists():
+                    self._store_compiled(source_hash, entry["dataframe"], entry["source"],
+                                         list(entry.get("errors", [])))
+        return is_valid, errors
+    
+    def prune_compiled(self, keep_hashes: Iterable[str]) -> int:
+        """
+        Remove compiled matrices whose source is no longer stored.
+        
+        Args:
+            keep_hashes: Hashes of the sources still in use
+            
+        Returns:
+            Number of removed entries
+        """
+        if self.compiled_dir is None or not self.compiled_dir.exists():
+            return 0
+        keep = set(keep_hashes)
+        removed = 0
+        for labels_path in self.compiled_dir.glob("*.json"):
+            source_hash = labels_path.stem
+            if source_hash in keep:
+                continue
+            for path in (labels_path, self.compiled_dir / f"{source_hash}.npy"):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Could not remove compiled matrix file {path}: {e}")
+            self._forget(source_hash)
+            removed += 1
+        return removed
+    
     def load_matrix(self, excel_bytes: Optional[bytes] = None, 
-                   csv_data: Optional[str] = None) -> Tuple[Optional[pd.DataFrame], str, List[str]]:
+                   csv_data: Optional[str] = None,
+                   persist: bool = True) -> Tuple[Optional[pd.DataFrame], str, List[str]]:
         """
         Load matrix with caching based on data hash.
         
@@ -334,6 +565,8 @@ class MatrixLoader:
         Args:
             excel_bytes: Excel file content as bytes (optional)
             csv_data: CSV content as string (optional)
+            persist: Write freshly parsed matrices to the binary store. Upload
+                previews pass False so unsaved files leave nothing on disk.
             
         Returns:
             Tuple of (DataFrame, source_type, error_messages)
@@ -350,14 +583,16 @@ class MatrixLoader:
         # Try Excel first (higher priority)
         if excel_hash:
             # Check cache
-            if (excel_hash in self._cache and 
-                self._cache[excel_hash].get("dataframe") is not None):
-                
-                cached_entry = self._cache[excel_hash]
+            cached_entry = self._cached(excel_hash)
+            if cached_entry is not None:
                 logger.debug(f"Using cached Excel matrix (hash: {excel_hash[:8]}...)")
                 return (cached_entry["dataframe"], 
                        cached_entry["source"], 
-                       cached_entry.get("errors", []))
+                       list(cached_entry.get("errors", [])))
+            
+            compiled = self._load_compiled(excel_hash)
+            if compiled is not None:
+                return compiled
             
             # Parse Excel data
             df_excel, excel_errors = self._parse_excel(excel_bytes)
@@ -369,31 +604,34 @@ class MatrixLoader:
                 all_errors.extend([f"Excel validation: {err}" for err in validation_errors])
                 
                 # Cache the result (even with validation warnings)
-                self._cache[excel_hash] = {
+                self._remember(excel_hash, {
                     "dataframe": df_excel,
                     "source": "Excel",
                     "timestamp": datetime.now(),
                     "errors": excel_errors + validation_errors
-                }
+                })
+                if persist:
+                    self._store_compiled(excel_hash, df_excel, "Excel", excel_errors + validation_errors)
                 
                 logger.info(f"Loaded Excel matrix with shape: {df_excel.shape}")
                 return df_excel, "Excel", all_errors
             else:
                 # Excel parsing failed, invalidate cache
-                if excel_hash in self._cache:
-                    del self._cache[excel_hash]
+                self._forget(excel_hash)
         
         # Try CSV if Excel failed or not provided
         if csv_hash:
             # Check cache
-            if (csv_hash in self._cache and 
-                self._cache[csv_hash].get("dataframe") is not None):
-                
-                cached_entry = self._cache[csv_hash]
+            cached_entry = self._cached(csv_hash)
+            if cached_entry is not None:
                 logger.debug(f"Using cached CSV matrix (hash: {csv_hash[:8]}...)")
                 return (cached_entry["dataframe"], 
                        cached_entry["source"], 
-                       cached_entry.get("errors", []))
+                       list(cached_entry.get("errors", [])))
+            
+            compiled = self._load_compiled(csv_hash)
+            if compiled is not None:
+                return compiled
             
             # Parse CSV data
             df_csv, csv_errors = self._parse_csv(csv_data)
@@ -405,19 +643,20 @@ class MatrixLoader:
                 all_errors.extend([f"CSV validation: {err}" for err in validation_errors])
                 
                 # Cache the result (even with validation warnings)
-                self._cache[csv_hash] = {
+                self._remember(csv_hash, {
                     "dataframe": df_csv,
                     "source": "CSV",
                     "timestamp": datetime.now(),
                     "errors": csv_errors + validation_errors
-                }
+                })
+                if persist:
+                    self._store_compiled(csv_hash, df_csv, "CSV", csv_errors + validation_errors)
                 
                 logger.info(f"Loaded CSV matrix with shape: {df_csv.shape}")
                 return df_csv, "CSV", all_errors
             else:
                 # CSV parsing failed, invalidate cache
-                if csv_hash in self._cache:
-                    del self._cache[csv_hash]
+                self._forget(csv_hash)
         
         # Neither Excel nor CSV could be loaded
         if not excel_bytes and not csv_data:
@@ -439,7 +678,9 @@ class MatrixLoader:
             "entries": []
         }
         
-        for hash_key, entry in self._cache.items():
+        with self._cache_lock:
+            entries = list(self._cache.items())
+        for hash_key, entry in entries:
             cache_info["entries"].append({
                 "hash": hash_key[:8] + "...",
                 "source": entry.get("source", "Unknown"),
@@ -452,23 +693,26 @@ class MatrixLoader:
     
     def clear_cache(self) -> None:
         """Clear all cached matrix data."""
-        self._cache.clear()
+        with self._cache_lock:
+            self._cache.clear()
         self._cache_keys.clear()
         logger.info("Matrix cache cleared")
     
     def validate_matrix_file(self, excel_bytes: Optional[bytes] = None, 
-                           csv_data: Optional[str] = None) -> Tuple[bool, List[str]]:
+                           csv_data: Optional[str] = None,
+                           persist: bool = True) -> Tuple[bool, List[str]]:
         """
         Validate matrix file without caching (for upload validation).
         
         Args:
             excel_bytes: Excel file content as bytes (optional)
             csv_data: CSV content as string (optional)
+            persist: Write the parsed matrix to the binary store (see load_matrix)
             
         Returns:
             Tuple of (is_valid, error_messages)
         """
-        df, source, errors = self.load_matrix(excel_bytes, csv_data)
+        df, source, errors = self.load_matrix(excel_bytes, csv_data, persist=persist)
         
         is_valid = df is not None and not df.empty
         
@@ -488,4 +732,22 @@ class MatrixLoader:
             if critical_errors:
                 is_valid = False
         
-        return is_valid, errors
\ No newline at end of file
+        return is_valid, errors
+
+
+_shared_loader: Optional[MatrixLoader] = None
+_shared_loader_lock = threading.Lock()
+
+
+def get_price_matrix_loader() -> MatrixLoader:
+    """
+    Process-wide MatrixLoader backed by the compiled binary store.
+    
+    Workers and CLI bridges memory-map the compiled matrix instead of parsing
+    the stored Excel/CSV on every cold start.
+    """
+    global _shared_loader
+    with _shared_loader_lock:
+        if _shared_loader is None:
+            _shared_loader = MatrixLoader(compiled_dir=DEFAULT_COMPILED_DIR)
+        return _shared_loader
@@ -15,6 +15,12 @@ import re
 from typing import Dict, List, Any
 import traceback
 
+try:
+    from session_blob_store import offload_session_value
+except ImportError:
+    def offload_session_value(slot, value, **kwargs):
+        return value
+
 try:
     from tqdm import tqdm
 except ImportError:
@@ -35,6 +41,7 @@ try:
     from calculations import perform_calculations, calculate_offer_details
     from pdf_generator import generate_offer_pdf_with_main_templates as generate_offer_pdf, create_offer_pdf, merge_pdfs
     from product_db import get_product_by_id, list_products
+    from storage_model_resolver import StorageModelResolver
     
     # PDF Output Directory - lokale Definition statt Import
     PDF_OUTPUT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "pdf_output")
@@ -88,6 +95,9 @@ class MultiCompanyOfferGenerator:
                     categorized["inverter"].append(p)
                 elif "speicher" in cat or "battery" in cat:
                     categorized["storage"].append(p)
+            # Speicher-Namen aller Rotations-Varianten vorab auflösen (kein DB-Zugriff je Firma)
+            if categorized["storage"] and callable(get_product_by_id):
+                StorageModelResolver().prewarm(categorized["storage"], get_product_by_id)
             return categorized
         except Exception as e:
             st.warning(f"Konnte Produkte nicht laden: {e}")
@@ -1045,12 +1055,17 @@ class MultiCompanyOfferGenerator:
                 # PDF-Templates aus Admin-Einstellungen laden
                 try:
                     # Templates laden (falls verfügbar)
-                    title_image_templates = load_admin_setting("pdf_title_image_templates", []) if callable(load_admin_setting) else []
-                    offer_title_templates = load_admin_setting("pdf_offer_title_templates", []) if callable(load_admin_setting) else []
-                    cover_letter_templates = load_admin_setting("pdf_cover_letter_templates", []) if callable(load_admin_setting) else []
+                    # Nur Metadaten laden; Bilddaten werden ausschließlich für das verwendete Titelbild geholt
+                    from pdf_template_store import load_template_list, resolve_template_image
+                    fallback_loader = load_admin_setting if callable(load_admin_setting) else None
+                    title_image_templates = load_template_list("pdf_title_image_templates", fallback_loader)
+                    offer_title_templates = load_template_list("pdf_offer_title_templates", fallback_loader)
+                    cover_letter_templates = load_template_list("pdf_cover_letter_templates", fallback_loader)
                     
                     # Erstes verfügbares Template verwenden
-                    selected_title_image = title_image_templates[0] if title_image_templates else None
+                    selected_title_image = None
+                    if title_image_templates:
+                        selected_title_image = {"name": title_image_templates[0].get("name"), "data": resolve_template_image(title_image_templates[0])}
                     selected_offer_title = offer_title_templates[0] if offer_title_templates else None
                     selected_cover_letter = cover_letter_templates[0] if cover_letter_templates else None
                     
@@ -1212,7 +1227,8 @@ def render_multi_offer_generator(texts, project_data_doc=None, calc_results_doc=
     
     # Berechungsergebnisse übernehmen falls vorhanden
     if calc_results_doc:
-        st.session_state.multi_offer_calc_results = calc_results_doc
+        # Eigener Slot: behält die ausgelagerten Diagramm-Bytes, auch wenn calculation_results neu belegt wird
+        st.session_state.multi_offer_calc_results = offload_session_value('multi_offer_calc_results', calc_results_doc)
     
     # UI rendern
     try:
@@ -103,8 +103,13 @@ formatiert.
 
 from __future__ import annotations
 
+import copy
 import json
-from typing import Any, Dict, List, Optional, Tuple
+import threading
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
 
 from database import load_admin_setting, save_admin_setting
 
@@ -127,30 +132,27 @@ class PaymentTermsManager:
     def __init__(self):
         self.legacy_config = None
         self.comprehensive_config = None
+        self._compiled: Optional[CompiledPaymentTerms] = None
         self._load_configs()
     
     def _load_configs(self):
-        """Lädt beide Konfigurationen (Legacy und Umfassend)."""
-        self.legacy_config = get_payment_terms_config()
-        self.comprehensive_config = self.get_comprehensive_payment_config()
+        """Lädt beide Konfigurationen (Legacy und Umfassend).
+
+        Die Konfigurationen kommen aus dem kompilierten Cache; der Manager
+        erhält eigene Kopien, damit Änderungen am Manager den Cache nicht
+        verfälschen.
+        """
+        compiled = get_compiled_payment_terms()
+        self.legacy_config = copy.deepcopy(compiled.legacy_config)
+        self.comprehensive_config = copy.deepcopy(compiled.comprehensive_config)
+        self._compiled = CompiledPaymentTerms(self.legacy_config, self.comprehensive_config)
     
     def get_comprehensive_payment_config(self) -> Dict[str, Any]:
         """Lädt die umfassende Zahlungsmodalitätskonfiguration."""
-        config = load_admin_setting(COMPREHENSIVE_PAYMENT_KEY, None)
-        if not config:
-            # Erstelle Standard-Konfiguration
-            default_config = self._get_default_comprehensive_config()
-            save_admin_setting(COMPREHENSIVE_PAYMENT_KEY, default_config)
-            return default_config
-        
-        if isinstance(config, str):
-            try:
-                return json.loads(config)
-            except:
-                return self._get_default_comprehensive_config()
-        return config
+        return copy.deepcopy(get_compiled_payment_terms().comprehensive_config)
     
-    def _get_default_comprehensive_config(self) -> Dict[str, Any]:
+    @staticmethod
+    def _get_default_comprehensive_config() -> Dict[str, Any]:
         """Standardkonfiguration für umfassende Zahlungsmodalitäten."""
         return {
             "payment_options": [
@@ -318,32 +320,15 @@ class PaymentTermsManager:
     
     def _get_payment_option(self, option_id: str) -> Optional[Dict[str, Any]]:
         """Ermittelt Zahlungsoption anhand der ID."""
-        for option in self.comprehensive_config.get("payment_options", []):
-            if option.get("id") == option_id:
-                return option
-        return None
+        return self._compiled.options_by_id.get(option_id)
     
     def _calculate_quantity_discount(self, amount: float) -> float:
         """Berechnet Mengenrabatt basierend auf Auftragswert."""
-        discount_rules = self.comprehensive_config.get("discount_rules", {}).get("quantity_discounts", [])
-        applicable_discount = 0.0
-        
-        for rule in sorted(discount_rules, key=lambda x: x.get("min_amount", 0), reverse=True):
-            if amount >= rule.get("min_amount", 0):
-                applicable_discount = rule.get("discount_percent", 0)
-                break
-                
-        return applicable_discount
+        return self._compiled.quantity_discount(amount)
     
     def _calculate_seasonal_discount(self, month: int) -> float:
         """Berechnet Saisonrabatt basierend auf Monat."""
-        discount_rules = self.comprehensive_config.get("discount_rules", {}).get("seasonal_discounts", [])
-        
-        for rule in discount_rules:
-            if month in rule.get("months", []):
-                return rule.get("discount_percent", 0)
-        
-        return 0.0
+        return self._compiled.seasonal_discounts.get(month, 0.0)
     
     def generate_payment_schedule_text(self, payment_option_id: str, amount: float) -> str:
         """Generiert Beschreibungstext für Zahlungsplan."""
@@ -387,7 +372,9 @@ class PaymentTermsManager:
         """Speichert die umfassende Zahlungskonfiguration."""
         success = save_admin_setting(COMPREHENSIVE_PAYMENT_KEY, config)
         if success:
+            invalidate_payment_terms_cache()
             self.comprehensive_config = config
+            self._compiled = CompiledPaymentTerms(self.legacy_config, config)
         return success
 
 
@@ -447,28 +434,179 @@ DEFAULT_PAYMENT_TERMS_CONFIG: Dict[str, Any] = {
 }
 
 
+def _parse_config(config: Any) -> Optional[Dict[str, Any]]:
+    """JSON-Strings aus admin_settings in ein dict umwandeln (None bei Fehlern)."""
+    if isinstance(config, str):
+        try:
+            config = json.loads(config)
+        except Exception:
+            return None
+    return config if isinstance(config, dict) else None
+
+
+class _CompiledVariant:
+    """Zahlungsvariante mit vorberechneten Segment-Arrays für die Zahlungsplan-Berechnung."""
+
+    __slots__ = ("variant", "keys", "labels", "fixed_keys", "fixed_amounts",
+                 "percents", "is_percent", "fixed_total")
+
+    def __init__(self, variant: Dict[str, Any]):
+        self.variant = variant
+        segments = [seg for seg in variant.get("segments", []) or [] if isinstance(seg, dict)]
+        self.keys = [seg.get("key") for seg in segments]
+        self.labels = [seg.get("label", seg.get("key")) for seg in segments]
+        self.fixed_keys = {seg.get("key") for seg in segments if seg.get("amount") is not None}
+        fixed_amounts: List[float] = []
+        percents: List[float] = []
+        is_percent: List[bool] = []
+        fixed_total = 0.0
+        for seg in segments:
+            amount = seg.get("amount")
+            percent = seg.get("percent")
+            if amount is not None:
+                try:
+                    amount_val = float(amount)
+                except Exception:
+                    amount_val = 0.0
+                # Der ungerundete Festbetrag wird vom Gesamtbetrag abgezogen
+                fixed_total += amount_val
+                fixed_amounts.append(round(amount_val, 2))
+                percents.append(0.0)
+                is_percent.append(False)
+            else:
+                fixed_amounts.append(0.0)
+                percents.append(float(percent) if percent is not None else 0.0)
+                is_percent.append(percent is not None)
+        self.fixed_amounts = np.array(fixed_amounts, dtype=float)
+        self.percents = np.array(percents, dtype=float)
+        self.is_percent = np.array(is_percent, dtype=bool)
+        self.fixed_total = fixed_total
+
+    def amounts_and_percents(self, totals: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Beträge und Prozentanteile je Segment für viele Gesamtbeträge (Zeile = Betrag)."""
+        totals = np.asarray(totals, dtype=float).reshape(-1)
+        portions = np.round((self.percents / 100.0) * totals[:, None], 2)
+        amounts = np.where(self.is_percent, portions, self.fixed_amounts)
+        remaining = totals - self.fixed_total - np.where(self.is_percent, portions, 0.0).sum(axis=1)
+        # Rundungsrest bzw. nicht verteilter Betrag geht auf das letzte Segment
+        adjust = np.abs(remaining) > 0.01
+        amounts[adjust, -1] = np.round(amounts[adjust, -1] + remaining[adjust], 2)
+        percents = np.zeros_like(amounts)
+        nonzero = totals != 0
+        percents[nonzero] = np.round(amounts[nonzero] / totals[nonzero, None] * 100.0, 2)
+        return amounts, percents
+
+    def schedules(self, totals: Sequence[float]) -> List[List[Dict[str, Any]]]:
+        if not self.keys:
+            return [[] for _ in range(len(totals))]
+        amounts, percents = self.amounts_and_percents(np.asarray(totals, dtype=float))
+        return [
+            [
+                {"key": key, "label": label, "percent": float(percent), "amount": float(amount)}
+                for key, label, percent, amount in zip(self.keys, self.labels, row_percents, row_amounts)
+            ]
+            for row_amounts, row_percents in zip(amounts.tolist(), percents.tolist())
+        ]
+
+
+class CompiledPaymentTerms:
+    """Einmal geladene und indizierte Zahlungskonfiguration (Legacy-Varianten und umfassende Optionen)."""
+
+    def __init__(self, legacy_config: Dict[str, Any], comprehensive_config: Dict[str, Any]):
+        self.legacy_config = legacy_config
+        self.comprehensive_config = comprehensive_config
+        self.variants: Dict[str, _CompiledVariant] = {}
+        for variant in legacy_config.get("variants", []) or []:
+            if isinstance(variant, dict):
+                # Bei doppelten IDs gilt wie bisher die erste Variante
+                self.variants.setdefault(variant.get("id"), _CompiledVariant(variant))
+        self.options_by_id: Dict[str, Dict[str, Any]] = {}
+        for option in comprehensive_config.get("payment_options", []) or []:
+            self.options_by_id.setdefault(option.get("id"), option)
+        rules = comprehensive_config.get("discount_rules", {}) or {}
+        thresholds: Dict[float, float] = {}
+        for rule in rules.get("quantity_discounts", []) or []:
+            thresholds.setdefault(rule.get("min_amount", 0), rule.get("discount_percent", 0))
+        self._quantity_thresholds = sorted(thresholds)
+        self._quantity_discounts = [thresholds[t] for t in self._quantity_thresholds]
+        self.seasonal_discounts: Dict[int, float] = {}
+        for rule in rules.get("seasonal_discounts", []) or []:
+            for month in rule.get("months", []) or []:
+                self.seasonal_discounts.setdefault(month, rule.get("discount_percent", 0))
+
+    def quantity_discount(self, amount: float) -> float:
+        """Rabatt der höchsten Mengenstaffel, deren Mindestbetrag erreicht ist."""
+        index = bisect_right(self._quantity_thresholds, amount)
+        return self._quantity_discounts[index - 1] if index else 0.0
+
+
+class _PaymentTermsCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.compiled: Optional[CompiledPaymentTerms] = None
+        self.version = 0
+
+    def clear(self) -> None:
+        with self.lock:
+            self.compiled = None
+            self.version += 1
+
+
+_CACHE = _PaymentTermsCache()
+
+
+def invalidate_payment_terms_cache() -> None:
+    """Kompilierte Zahlungskonfiguration verwerfen (beim Speichern der Konfigurationen)."""
+    _CACHE.clear()
+
+
+def _load_legacy_config() -> Dict[str, Any]:
+    config = load_admin_setting(PAYMENT_TERMS_KEY, None)
+    if not config:
+        # Noch nichts gespeichert – Standardwert persistieren
+        save_admin_setting(PAYMENT_TERMS_KEY, DEFAULT_PAYMENT_TERMS_CONFIG)
+        return copy.deepcopy(DEFAULT_PAYMENT_TERMS_CONFIG)
+    return _parse_config(config) or copy.deepcopy(DEFAULT_PAYMENT_TERMS_CONFIG)
+
+
+def _load_comprehensive_config() -> Dict[str, Any]:
+    config = load_admin_setting(COMPREHENSIVE_PAYMENT_KEY, None)
+    if not config:
+        # Erstelle Standard-Konfiguration
+        default_config = PaymentTermsManager._get_default_comprehensive_config()
+        save_admin_setting(COMPREHENSIVE_PAYMENT_KEY, default_config)
+        return default_config
+    return _parse_config(config) or PaymentTermsManager._get_default_comprehensive_config()
+
+
+def get_compiled_payment_terms() -> CompiledPaymentTerms:
+    """Kompilierte Zahlungskonfiguration; wird bis zur nächsten Invalidierung nur einmal geladen.
+
+    Die zurückgegebenen Konfigurationen sind geteilt und dürfen nicht verändert werden.
+    """
+    with _CACHE.lock:
+        compiled, version = _CACHE.compiled, _CACHE.version
+    if compiled is not None:
+        return compiled
+    compiled = CompiledPaymentTerms(_load_legacy_config(), _load_comprehensive_config())
+    with _CACHE.lock:
+        # Nicht cachen, wenn während des Ladens gespeichert wurde
+        if _CACHE.version == version:
+            _CACHE.compiled = compiled
+    return compiled
+
+
 def get_payment_terms_config() -> Dict[str, Any]:
     """Lädt die Zahlungsmodalitätskonfiguration aus der Datenbank.
 
     Falls noch keine Konfiguration vorhanden ist, wird die
-    Standardkonfiguration gespeichert und zurückgegeben.
+    Standardkonfiguration gespeichert und zurückgegeben. Die Konfiguration
+    stammt aus dem kompilierten Cache; zurückgegeben wird eine Kopie.
 
     Returns:
         Dict[str, Any]: Konfiguration mit Variantenliste.
     """
-    config = load_admin_setting(PAYMENT_TERMS_KEY, None)
-    if not config:
-        # Noch nichts gespeichert – Standardwert persistieren
-        save_admin_setting(PAYMENT_TERMS_KEY, DEFAULT_PAYMENT_TERMS_CONFIG)
-        return json.loads(json.dumps(DEFAULT_PAYMENT_TERMS_CONFIG))
-    # Gewährleistet, dass ein dict zurückgegeben wird
-    if isinstance(config, str):
-        try:
-            config_dict = json.loads(config)
-        except Exception:
-            config_dict = DEFAULT_PAYMENT_TERMS_CONFIG
-        return config_dict
-    return config
+    return copy.deepcopy(get_compiled_payment_terms().legacy_config)
 
 
 def save_payment_terms_config(config: Dict[str, Any]) -> bool:
@@ -480,7 +618,9 @@ def save_payment_terms_config(config: Dict[str, Any]) -> bool:
     Returns:
         bool: True bei Erfolg, False sonst.
     """
-    return save_admin_setting(PAYMENT_TERMS_KEY, config)
+    success = save_admin_setting(PAYMENT_TERMS_KEY, config)
+    invalidate_payment_terms_cache()
+    return success
 
 
 def compute_payment_schedule(variant_id: str, total_amount: float) -> List[Dict[str, Any]]:
@@ -500,50 +640,39 @@ def compute_payment_schedule(variant_id: str, total_amount: float) -> List[Dict[
     Returns:
         List[Dict[str, Any]]: Liste von Segmenten mit berechneten Beträgen.
     """
-    config = get_payment_terms_config()
-    variants: List[Dict[str, Any]] = config.get("variants", [])
-    variant = next((v for v in variants if v.get("id") == variant_id), None)
-    if not variant:
-        return []
-    schedule: List[Dict[str, Any]] = []
-    remaining = float(total_amount)
-    # Zuerst feste Beträge verarbeiten
-    for seg in variant.get("segments", []):
-        seg_key = seg.get("key")
-        amount = seg.get("amount")
-        percent = seg.get("percent")
-        entry: Dict[str, Any] = {
-            "key": seg_key,
-            "label": seg.get("label", seg_key),
-            "percent": None,
-            "amount": None,
-        }
-        if amount is not None:
-            try:
-                amount_val = float(amount)
-            except Exception:
-                amount_val = 0.0
-            entry["amount"] = round(amount_val, 2)
-            remaining -= amount_val
-        elif percent is not None:
-            # Prozentsatz wird später berechnet
-            entry["percent"] = float(percent)
-        schedule.append(entry)
-    # Jetzt Prozentwerte berechnen (zweiter Durchlauf, um feste Beträge abgezogen zu haben)
-    for entry in schedule:
-        if entry["percent"] is not None:
-            portion = (entry["percent"] / 100.0) * total_amount
-            portion = round(portion, 2)
-            entry["amount"] = portion
-            remaining -= portion
-    # Falls nach Rundung ein Rest übrig ist, dem letzten Segment hinzufügen
-    if schedule and abs(remaining) > 0.01:
-        schedule[-1]["amount"] = round(schedule[-1]["amount"] + remaining, 2) if schedule[-1]["amount"] else round(remaining, 2)
-    # Prozent neu berechnen basierend auf den endgültigen Beträgen
-    for entry in schedule:
-        amount_val = entry.get("amount", 0.0)
-        entry["percent"] = round((amount_val / total_amount) * 100.0, 2) if total_amount else 0.0
-    return schedule
+    return compute_payment_schedules(variant_id, [total_amount])[0]
+
+
+def compute_payment_schedules(variant_ids: Union[str, Sequence[str]],
+                              amounts: Sequence[float]) -> List[List[Dict[str, Any]]]:
+    """Berechnet Zahlungspläne für viele Beträge in einem Durchgang.
+
+    Für Angebotsvergleiche und Szenario-Tabellen: Gleiche Varianten werden
+    gruppiert und vektorisiert berechnet. ``variant_ids`` ist entweder eine
+    Varianten-ID für alle Beträge oder eine Liste gleicher Länge wie
+    ``amounts``.
+
+    Returns:
+        List[List[Dict[str, Any]]]: Ein Zahlungsplan je Betrag (leer bei
+        unbekannter Variante), in der Reihenfolge der Eingabe.
+    """
+    amounts = [float(amount) for amount in amounts]
+    if isinstance(variant_ids, str):
+        variant_ids = [variant_ids] * len(amounts)
+    elif len(variant_ids) != len(amounts):
+        raise ValueError("variant_ids und amounts müssen gleich lang sein")
+    compiled = get_compiled_payment_terms()
+    positions: Dict[str, List[int]] = {}
+    for position, variant_id in enumerate(variant_ids):
+        positions.setdefault(variant_id, []).append(position)
+    results: List[List[Dict[str, Any]]] = [[] for _ in amounts]
+    for variant_id, indices in positions.items():
+        variant = compiled.variants.get(variant_id)
+        if variant is None:
+            continue
+        for index, schedule in zip(indices, variant.schedules([amounts[i] for i in indices])):
+            results[index] = schedule
+    return results
 
 
 def get_payment_terms_text(variant_id: str, schedule: List[Dict[str, Any]]) -> str:
@@ -562,12 +691,10 @@ def get_payment_terms_text(variant_id: str, schedule: List[Dict[str, Any]]) -> s
         str: Formattierter Text. Falls keine Vorlage existiert, wird
         eine einfache Aufzählung der Teilbeträge zurückgegeben.
     """
-    config = get_payment_terms_config()
-    variants: List[Dict[str, Any]] = config.get("variants", [])
-    variant = next((v for v in variants if v.get("id") == variant_id), None)
-    if not variant:
+    compiled_variant = get_compiled_payment_terms().variants.get(variant_id)
+    if compiled_variant is None:
         return ""
-    template = variant.get("text_template", "") or ""
+    template = compiled_variant.variant.get("text_template", "") or ""
     # Mapping aus schedule zusammensetzen
     fmt_map: Dict[str, str] = {}
     for seg in schedule:
@@ -575,8 +702,7 @@ def get_payment_terms_text(variant_id: str, schedule: List[Dict[str, Any]]) -> s
         amount = seg.get("amount") or 0.0
         percent = seg.get("percent") or 0.0
         # Eurobetrag hat Vorrang vor Prozent, wenn explizit gesetzt
-        original_seg = next((s for s in variant.get("segments", []) if s.get("key") == key), None)
-        if original_seg and original_seg.get("amount") is not None:
+        if key in compiled_variant.fixed_keys:
             fmt_map[key] = f"{amount:,.2f} €".replace(",", ".")  # deutsches Format
         else:
             fmt_map[key] = f"{percent:.0f} %"
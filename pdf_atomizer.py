@@ -10,11 +10,16 @@ Kompatibel ab Python 3.9. Getestet unter PyMuPDF ≥ 1.23, pikepdf ≥ 8.7.
 # >>>>>>> REBUILD <<<<<<<<
 # python pdf_atomizer.py input.pdf --rebuild output.pdf
 
+# >>>>>>> STREAMING (JSON Lines, Seiten parallel, Cache je SHA-256) <<<<<<<
+# python pdf_atomizer.py input.pdf --jsonl atoms.jsonl --workers 4 [--raw] [--no-cache]
+
 
 
 from pathlib import Path
 from datetime import datetime
-import json, sys, tempfile, shutil, hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import json, sys, tempfile, shutil, hashlib, base64, math, os
 
 import fitz                         # PyMuPDF
 import pikepdf                      # low‑level Objekt‑Zugriff
@@ -33,6 +38,20 @@ def log(msg: str):  # einfache farbige Konsole
 def sha256(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
 
+def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+# Version des JSONL-Formats (Teil des Cache-Keys)
+ATOMS_FORMAT_VERSION = 1
+# Neben dem Modul statt relativ zum Arbeitsverzeichnis (in .gitignore)
+DEFAULT_CACHE_DIR = Path(os.environ.get("PDF_ATOM_CACHE_DIR", Path(__file__).resolve().parent / ".pdf_atoms_cache"))
+# Unterhalb dieser Seitenzahl lohnt sich der Start von Worker-Prozessen nicht
+PARALLEL_MIN_PAGES = 8
+
 # ---------------------------------------------------------------------------
 # 2. Datenklassen – Atomare Repräsentationen
 # ---------------------------------------------------------------------------
@@ -66,34 +85,182 @@ class PDFAtoms(dict):
 # 3. Hauptklasse – Atomizer
 # ---------------------------------------------------------------------------
 
+def _add_record(atoms: PDFAtoms, record: dict) -> None:
+    """Fügt einen JSONL-Datensatz in eine PDFAtoms-Struktur ein."""
+    section = record.get("section")
+    if section in ("pages", "raw"):
+        atoms[section][record["key"]] = record["data"]
+    elif section in atoms:
+        atoms[section] = record["data"]
+
+
+def load_atoms_jsonl(path: Path) -> PDFAtoms:
+    """Liest eine mit --jsonl geschriebene Datei wieder als PDFAtoms ein."""
+    atoms = PDFAtoms()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                _add_record(atoms, json.loads(line))
+    return atoms
+
+
+def _extract_page_range(src: str, start: int, stop: int) -> list:
+    """Worker-Prozess: extrahiert die Seiten [start, stop) mit eigenen pikepdf/fitz-Handles."""
+    atomizer = PDFAatomizer(Path(src))
+    with pikepdf.open(src) as pdf, fitz.open(src) as doc:
+        return [(i, atomizer._extract_page(pdf, doc, i)) for i in range(start, stop)]
+
+
 class PDFAatomizer:
-    def __init__(self, src: Path):
+    # (Sektion, Extraktor) vor bzw. nach den Seiten – Reihenfolge wie in explode()
+    _SECTIONS_BEFORE_PAGES = (
+        ("header", "_extract_header"),
+        ("xref", "_extract_xref"),
+        ("trailer", "_extract_trailer"),
+        ("catalog", "_extract_catalog"),
+    )
+    _SECTIONS_AFTER_PAGES = (
+        ("embeds", "_extract_embedded_files"),
+        ("js", "_extract_js"),
+        ("signatures", "_extract_signatures"),
+        ("encrypt", "_extract_encrypt"),
+    )
+
+    def __init__(self, src: Path, include_raw: bool = False):
         self.src = Path(src).expanduser().resolve()
         if not self.src.exists():
             raise FileNotFoundError(self.src)
+        # Rohe Objekt-Streams nur auf Wunsch (groß, selten gebraucht)
+        self.include_raw = include_raw
         self.atoms = PDFAtoms()
 
     # -----------------------------------------------------------------------
     # 3.1 High‑level Public API
     # -----------------------------------------------------------------------
 
-    def explode(self):
+    def explode(self, workers: int = None):
+        """
+        Zerlegt die PDF in ihre Atome. Ergebnisse → self.atoms (workers wie bei iter_atoms)
+        """
+        atoms = PDFAtoms()
+        for record in self.iter_atoms(workers=workers):
+            _add_record(atoms, record)
+        self.atoms = atoms
+        log(f"Parsed {len(atoms['pages'])} pages")
+
+    def iter_atoms(self, workers: int = None, cache_dir: Path = None):
         """
-        Zerlegt die PDF in ihre Atome. Ergebnisse → self.atoms
+        Liefert die Atome als einzelne Datensätze {"section", ["key"], "data"}, sobald sie extrahiert sind.
+
+        Erster Datensatz ist "document" (Quelle, SHA-256, Seitenzahl). Seiten werden bei workers > 1 in
+        Worker-Prozessen extrahiert und in Seitenreihenfolge geliefert. Mit cache_dir werden die Datensätze
+        unter <cache_dir>/<sha256>.jsonl abgelegt und bei unveränderter Quelle von dort gelesen.
+        """
+        if cache_dir is None:
+            yield from self._iter_extracted(workers)
+            return
+        source_sha256 = sha256_file(self.src)
+        cache_path = self.cache_path(cache_dir, source_sha256)
+        if cache_path.exists():
+            log(f"Atoms aus Cache {cache_path}")
+            with open(cache_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            return
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+        completed = False
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record in self._iter_extracted(workers, source_sha256=source_sha256):
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    yield record
+            os.replace(tmp_path, cache_path)
+            completed = True
+        finally:
+            if not completed:
+                try:
+                    tmp_path.unlink()
+                except OSError:
+                    pass
+
+    def cache_path(self, cache_dir: Path, source_sha256: str = None) -> Path:
+        suffix = "-raw" if self.include_raw else ""
+        return Path(cache_dir) / f"{source_sha256 or sha256_file(self.src)}{suffix}.v{ATOMS_FORMAT_VERSION}.jsonl"
+
+    def write_jsonl(self, out: Path, workers: int = None, cache_dir: Path = None, collect: bool = False) -> int:
         """
+        Schreibt die Atome zeilenweise (ein Datensatz je Zeile); gibt die Anzahl Datensätze zurück.
+
+        Mit collect=True werden die Datensätze zugleich in self.atoms übernommen (wie explode()),
+        sodass --jsonl zusammen mit --explode/--json/--rebuild nur einmal extrahiert.
+        """
+        out = Path(out)
+        atoms = PDFAtoms() if collect else None
+        count = 0
+        with open(out, "w", encoding="utf-8") as f:
+            for record in self.iter_atoms(workers=workers, cache_dir=cache_dir):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                if atoms is not None:
+                    _add_record(atoms, record)
+                count += 1
+        if atoms is not None:
+            self.atoms = atoms
+        log(f"Wrote {out} ({count} records)")
+        return count
+
+    def _iter_extracted(self, workers: int = None, source_sha256: str = None):
+        if workers is None:
+            workers = min(4, os.cpu_count() or 1)
         log(f"Opening {self.src}")
-        with pikepdf.open(self.src, allow_overwriting_input=True) as pdf:
-            self._extract_header(pdf)
-            self._extract_xref(pdf)
-            self._extract_trailer(pdf)
-            self._extract_catalog(pdf)
-            self._extract_pages(pdf)
-            self._extract_embedded_files(pdf)
-            self._extract_js(pdf)
-            self._extract_signatures(pdf)
-            self._extract_encrypt(pdf)
-            # Fallback: rohe Objekt‑Streams speichern
-            self._dump_raw_objects(pdf)
+        with pikepdf.open(self.src) as pdf:
+            page_count = len(pdf.pages)
+            yield {"section": "document", "data": {
+                "source": str(self.src),
+                "sha256": source_sha256 or sha256_file(self.src),
+                "page_count": page_count,
+                "format_version": ATOMS_FORMAT_VERSION,
+            }}
+            for section, extractor in self._SECTIONS_BEFORE_PAGES:
+                yield from self._section_record(section, extractor, pdf)
+            for i, pg in self._iter_pages(pdf, page_count, workers):
+                yield {"section": "pages", "key": i, "data": pg}
+            for section, extractor in self._SECTIONS_AFTER_PAGES:
+                yield from self._section_record(section, extractor, pdf)
+            if self.include_raw:
+                for n, data in self._iter_raw_objects(pdf):
+                    yield {"section": "raw", "key": n, "data": data}
+
+    def _section_record(self, section: str, extractor: str, pdf: pikepdf.Pdf):
+        getattr(self, extractor)(pdf)
+        data = self.atoms[section]
+        # Sektion nicht im Speicher halten – der Aufrufer bekommt sie als Datensatz
+        self.atoms[section] = {}
+        yield {"section": section, "data": data}
+
+    def _iter_pages(self, pdf: pikepdf.Pdf, page_count: int, workers: int):
+        if workers <= 1 or page_count < PARALLEL_MIN_PAGES:
+            with fitz.open(self.src) as doc:  # einmal öffnen (Performance)
+                for i in range(page_count):
+                    yield i, self._extract_page(pdf, doc, i)
+            return
+        # Seitenblöcke auf Worker verteilen; höchstens 2 Blöcke je Worker in Arbeit (begrenzter Speicher)
+        chunk = max(1, math.ceil(page_count / (workers * 4)))
+        ranges = iter([(start, min(start + chunk, page_count)) for start in range(0, page_count, chunk)])
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for _ in range(workers * 2):
+                block = next(ranges, None)
+                if block is None:
+                    break
+                pending.append(executor.submit(_extract_page_range, str(self.src), *block))
+            while pending:
+                for item in pending.popleft().result():
+                    yield item
+                block = next(ranges, None)
+                if block is not None:
+                    pending.append(executor.submit(_extract_page_range, str(self.src), *block))
 
     def rebuild(self, dst: Path):
         """
@@ -112,6 +279,7 @@ class PDFAatomizer:
         log(f"Wrote {dst}")
 
     def to_json(self, out: Path):
+        # Hält alle Atome im Speicher – für große Dateien write_jsonl verwenden
         log("Serializing atoms → JSON …")
         out.write_text(json.dumps(self.atoms, indent=2, ensure_ascii=False), encoding="utf-8")
 
@@ -214,43 +382,38 @@ class PDFAatomizer:
 
 
 
-    def _extract_pages(self, pdf: pikepdf.Pdf):
-        with fitz.open(self.src) as doc:  # einmal öffnen (Performance)
-            for i, page in enumerate(pdf.pages):
-                pg = {}
-                pg_dict = page.obj
-
-                pg["dict"] = self._snapshot(pg_dict)
-                try:
-                    res = pg_dict.Resources or {}
-                except Exception:
-                    res = {}
-                pg["resources"] = self._snapshot(res)
-
-                p = doc.load_page(i)
-                pg["text"] = self._extract_text_positions(p)
-
-                images = []
-                for img in p.get_images(full=True):
-                    xref = img[0]
-                    try:
-                        raw = doc.extract_image(xref)
-                        images.append(dict(xref=xref, sha=sha256(raw["image"])))
-                    except Exception:
-                        images.append(dict(xref=xref, sha=None))
-                pg["images"] = images
+    def _extract_page(self, pdf: pikepdf.Pdf, doc, i: int) -> dict:
+        pg = {}
+        pg_dict = pdf.pages[i].obj
 
-                pg["annots"] = []
-                try:
-                    if "Annots" in pg_dict:
-                        for a in pg_dict.Annots:
-                            pg["annots"].append(self._snapshot(a))
-                except Exception:
-                    pass
-
-                self.atoms["pages"][i] = pg
-
-        log(f"Parsed {len(self.atoms['pages'])} pages")
+        pg["dict"] = self._snapshot(pg_dict)
+        try:
+            res = pg_dict.Resources or {}
+        except Exception:
+            res = {}
+        pg["resources"] = self._snapshot(res)
+
+        p = doc.load_page(i)
+        pg["text"] = self._extract_text_positions(p)
+
+        images = []
+        for img in p.get_images(full=True):
+            xref = img[0]
+            try:
+                raw = doc.extract_image(xref)
+                images.append(dict(xref=xref, sha=sha256(raw["image"])))
+            except Exception:
+                images.append(dict(xref=xref, sha=None))
+        pg["images"] = images
+
+        pg["annots"] = []
+        try:
+            if "Annots" in pg_dict:
+                for a in pg_dict.Annots:
+                    pg["annots"].append(self._snapshot(a))
+        except Exception:
+            pass
+        return pg
 
 
         # -------------------------------------------------------------------
@@ -320,16 +483,16 @@ class PDFAatomizer:
             self.atoms["encrypt"] = self._snapshot(pdf.encryption)
             log("Encryption dictionary stored")
 
-    def _dump_raw_objects(self, pdf: pikepdf.Pdf):
-      #  raw = {}
-      #  for obj in pdf.objects:
-       #     try:
-        #        raw[obj.n] = obj.read_bytes()
-        #    except pikepdf.PdfError:
-        #        continue
-       # self.atoms["raw"] = raw
-      #  log(f"Dumped {len(raw)} raw objects")
-        return
+    def _iter_raw_objects(self, pdf: pikepdf.Pdf):
+        """Dekodierte Stream-Inhalte je Objektnummer (Base64, damit JSON-fähig)."""
+        for obj in pdf.objects:
+            if not isinstance(obj, pikepdf.Stream):
+                continue
+            try:
+                data = obj.read_bytes()
+            except pikepdf.PdfError:
+                continue
+            yield obj.objgen[0], {"b64": base64.b64encode(data).decode("ascii"), "length": len(data)}
     # -----------------------------------------------------------------------
     # 3.3 Re‑Injection Stub
     # -----------------------------------------------------------------------
@@ -393,14 +556,24 @@ def main():
     ap.add_argument("--rebuild", metavar="ZIEL", help="PDF rekonstruieren")
     ap.add_argument("--json", metavar="DATEI", help="Atoms als JSON speichern")
     ap.add_argument("--yaml", metavar="DATEI", help="Text-Koordinaten als YAML")   # ← HIER
+    ap.add_argument("--jsonl", metavar="DATEI", help="Atoms zeilenweise (JSON Lines) streamen")
+    ap.add_argument("--workers", type=int, default=None, help="Worker-Prozesse für Seiten (Standard: min(4, CPUs))")
+    ap.add_argument("--raw", action="store_true", help="Rohe Objekt-Streams mit ausgeben")
+    ap.add_argument("--cache-dir", metavar="DIR", default=str(DEFAULT_CACHE_DIR), help="Cache je SHA-256 der Quelle")
+    ap.add_argument("--no-cache", action="store_true", help="Cache nicht verwenden")
     args = ap.parse_args()
 
 
 
-    atom = PDFAatomizer(Path(args.pdf))
+    atom = PDFAatomizer(Path(args.pdf), include_raw=args.raw)
 
-    if args.explode or args.json or args.rebuild:
-        atom.explode()
+    needs_atoms = args.explode or args.json or args.rebuild
+    if args.jsonl:
+        atom.write_jsonl(Path(args.jsonl), workers=args.workers,
+                         cache_dir=None if args.no_cache else Path(args.cache_dir),
+                         collect=bool(needs_atoms))
+    elif needs_atoms:
+        atom.explode(workers=args.workers)
 
     if args.json:
         atom.to_json(Path(args.json))
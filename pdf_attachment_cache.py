@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Cache für PDF-Anhänge (Produktdatenblätter, Firmendokumente)
+
+- Geparste PdfReader werden prozessweit gehalten, Schlüssel ist (Pfad, mtime, Größe);
+  eine geänderte Datei erzeugt automatisch einen neuen Eintrag
+- append_attachments hängt jede Datei nur einmal an und fasst identische Ressourcen
+  (Fonts, Bilder, die mehrere Datenblätter gemeinsam nutzen) im Writer zusammen
+- optimize_attachment_pdf wird beim Upload aufgerufen: Content-Streams komprimieren,
+  Formularfelder flachklopfen, doppelte Objekte entfernen – einmal statt pro Angebot
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    _PYPDF_AVAILABLE = True
+except ImportError:  # pragma: no cover - Anhänge sind ohne pypdf deaktiviert
+    PdfReader = PdfWriter = None  # type: ignore
+    _PYPDF_AVAILABLE = False
+
+# Summe der Dateigrößen aller gecachten Anhänge (älteste Einträge fliegen zuerst raus)
+DEFAULT_MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+_FileKey = Tuple[str, int, int]
+
+
+def _file_key(path: str) -> Optional[_FileKey]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+class AttachmentCache:
+    """Prozessweiter LRU-Cache geparster Anhang-PDFs."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[_FileKey, Any]]" = OrderedDict()
+        self._cached_bytes = 0
+        # Ein Reader teilt sich einen Stream: Seiten nur unter Lock in einen Writer übernehmen
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_reader(self, path: str) -> Optional[Any]:
+        """Geparster Reader für path oder None (fehlende/defekte Datei)."""
+        if not _PYPDF_AVAILABLE:
+            return None
+        key = _file_key(path)
+        if key is None:
+            return None
+        with self.lock:
+            entry = self._entries.get(key[0])
+            if entry is not None and entry[0] == key:
+                self._entries.move_to_end(key[0])
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            self._drop(key[0])
+            try:
+                with open(key[0], "rb") as f:
+                    data = f.read()
+                reader = PdfReader(io.BytesIO(data))
+                len(reader.pages)  # Seitenbaum einmal auflösen
+            except Exception:
+                return None
+            self._entries[key[0]] = (key, reader)
+            self._cached_bytes += key[2]
+            while self._cached_bytes > self.max_bytes and len(self._entries) > 1:
+                self._drop(next(iter(self._entries)))
+            return reader
+
+    def _drop(self, abs_path: str) -> None:
+        entry = self._entries.pop(abs_path, None)
+        if entry is not None:
+            self._cached_bytes -= entry[0][2]
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Einzelne Datei (z.B. nach Upload/Löschen) oder alles verwerfen."""
+        with self.lock:
+            if path is None:
+                self._entries.clear()
+                self._cached_bytes = 0
+            else:
+                self._drop(os.path.abspath(path))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'entries': len(self._entries),
+                'cached_bytes': self._cached_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+_ATTACHMENT_CACHE = AttachmentCache()
+
+
+def get_attachment_cache() -> AttachmentCache:
+    return _ATTACHMENT_CACHE
+
+
+def append_attachments(writer: Any, paths: Iterable[str], cache: Optional[AttachmentCache] = None) -> List[str]:
+    """
+    Hängt die PDFs aus paths an writer an und liefert die erfolgreich angehängten Pfade.
+
+    Doppelte Pfade werden nur einmal angehängt. Anschließend werden identische Objekte
+    (gemeinsame Fonts/Bilder verschiedener Datenblätter) im Writer zusammengefasst.
+    """
+    cache = cache or _ATTACHMENT_CACHE
+    appended: List[str] = []
+    seen = set()
+    for path in paths:
+        abs_path = os.path.abspath(path)
+        if abs_path in seen:
+            continue
+        seen.add(abs_path)
+        with cache.lock:
+            reader = cache.get_reader(abs_path)
+            if reader is None:
+                continue
+            try:
+                for page in reader.pages:
+                    writer.add_page(page)
+            except Exception:
+                continue
+        appended.append(path)
+    if len(appended) > 1:
+        try:
+            writer.compress_identical_objects()
+        except Exception:
+            pass
+    return appended
+
+
+def optimize_attachment_pdf(pdf_bytes: bytes) -> bytes:
+    """
+    Einmalige Optimierung beim Upload: komprimiert Content-Streams, klopft
+    Formularfelder flach und entfernt doppelte/verwaiste Objekte.
+
+    Liefert die Originalbytes, wenn die Datei kein lesbares PDF ist oder das
+    Ergebnis nicht kleiner wird.
+    """
+    if not _PYPDF_AVAILABLE or not pdf_bytes:
+        return pdf_bytes
+    try:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        writer = PdfWriter(clone_from=reader)
+        text_fields = {name: value for name, value in (reader.get_form_text_fields() or {}).items() if value}
+        if text_fields:
+            try:
+                # Feldwerte als Seiteninhalt einbrennen, danach Widgets entfernen
+                writer.update_page_form_field_values(None, text_fields, auto_regenerate=False, flatten=True)
+                writer.remove_annotations("/Widget")
+            except Exception:
+                pass
+        for page in writer.pages:
+            try:
+                page.compress_content_streams()
+            except Exception:
+                pass
+        writer.compress_identical_objects()
+        out = io.BytesIO()
+        writer.write(out)
+        optimized = out.getvalue()
+    except Exception:
+        return pdf_bytes
+    return optimized if len(optimized) < len(pdf_bytes) else pdf_bytes
+
+
+def optimize_attachment_upload(filename: str, content: bytes) -> bytes:
+    """Wrapper für Upload-Pfade: optimiert nur PDF-Dateien."""
+    if str(filename or '').lower().endswith('.pdf'):
+        return optimize_attachment_pdf(content)
+    return content
@@ -19,6 +19,7 @@ from datetime import datetime
 from typing import Any, Dict, List, Optional, Union, Callable
 from pathlib import Path
 from theming.pdf_styles import get_theme
+from pdf_attachment_cache import append_attachments
 
 # Optional PDF Templates import
 try:
@@ -348,8 +349,30 @@ def generate_main_template_pdf_bytes(
     Nutzt pdf_template_engine: liest YML-Koordinaten, erstellt Text-Overlay nach
     Platzhalter-Mapping und fusioniert mit den sechs statischen Template-PDFs.
     """
+    total_pages = 7
+    if additional_pdf:
+        try:
+            from pdf_template_engine import read_pdf
+            add_reader = read_pdf(additional_pdf)
+            total_pages = 7 + (len(add_reader.pages) if add_reader is not None else 0)
+        except Exception:
+            total_pages = 7
+    document = build_main_template_document(project_data, analysis_results, company_info, total_pages=total_pages)
+    return document.to_bytes() if document is not None else None
+
+
+def build_main_template_document(
+    project_data: Dict[str, Any],
+    analysis_results: Optional[Dict[str, Any]],
+    company_info: Dict[str, Any],
+    total_pages: int = 7,
+) -> Optional[Any]:
+    """Baut die 7 Hauptseiten als OfferDocument (ein Writer, noch nicht serialisiert).
+
+    total_pages ist die Gesamtseitenzahl inkl. späterer Zusatzseiten ("Seite x von XX").
+    """
     try:
-        from pdf_template_engine import build_dynamic_data, generate_overlay, merge_with_background
+        from pdf_template_engine import build_dynamic_data, generate_overlay, merged_background_pages, OfferDocument, read_pdf
     except Exception as e:
         print(f"pdf_template_engine nicht verfügbar: {e}")
         return None
@@ -388,57 +411,30 @@ def generate_main_template_pdf_bytes(
         print(f"[TEMPLATE] build_dynamic_data done keys={len(dyn_data)}")
     # Haupt-PDF mit korrekter "Seite x von XX"-Nummerierung, aber ohne Zusatzseiten anhängen
     try:
-        total_pages = 7
-        if additional_pdf:
-            try:
-                from pypdf import PdfReader
-                import io as _io
-                total_pages = 7 + len(PdfReader(_io.BytesIO(additional_pdf)).pages)
-            except Exception:
-                total_pages = 7
-        
         # Seitenzahl-Information in dynamische Daten injizieren für spezifische Placeholders
         dyn_data["page_number_with_total"] = f"Seite 3 von {total_pages}"
         dyn_data["total_pages"] = str(total_pages)
         
         if debug_templates:
             print(f"[TEMPLATE] generate_overlay call total_pages={total_pages}")
-        # Overlay für PV Standard
-        overlay_parts: list[bytes] = []
+        # Overlay-Seiten PV/WP direkt aneinanderreihen (jedes Overlay wird genau einmal geparst)
+        overlay_pages: list = []
         if 'Photovoltaik' in segment_order:
             overlay_bytes_pv = generate_overlay(coords_dir_pv, dyn_data, total_pages=total_pages)
-            overlay_parts.append(overlay_bytes_pv)
+            overlay_pages.extend(read_pdf(overlay_bytes_pv).pages)
         if 'Wärmepumpe' in segment_order and wp_coords_available:
             # Für Wärmepumpe separate dyn_data (eigene Firmeninfo? project_data.company_information_wp)
             wp_company = project_data.get('company_information_wp') or company_info
             dyn_data_wp = build_dynamic_data(project_data, analysis_results, wp_company)
             overlay_bytes_wp = generate_overlay(coords_dir_wp, dyn_data_wp, total_pages=total_pages)
-            overlay_parts.append(overlay_bytes_wp)
-        # Merge Overlay Streams sequenziell (einfaches Aneinanderfügen der Seiten)
-        if len(overlay_parts) == 1:
-            overlay_bytes = overlay_parts[0]
-        else:
-            try:
-                from pypdf import PdfReader, PdfWriter
-                import io as _io
-                writer = PdfWriter()
-                for part in overlay_parts:
-                    r = PdfReader(_io.BytesIO(part))
-                    for pg in r.pages:
-                        writer.add_page(pg)
-                buf = _io.BytesIO()
-                writer.write(buf)
-                buf.seek(0)
-                overlay_bytes = buf.getvalue()
-            except Exception:
-                # Fallback: nimm ersten
-                overlay_bytes = overlay_parts[0] if overlay_parts else b""
+            overlay_pages.extend(read_pdf(overlay_bytes_wp).pages)
         if debug_templates:
-            print(f"[TEMPLATE] overlay size={len(overlay_bytes)} bytes")
-        fused = merge_with_background(overlay_bytes, bg_dir)
+            print(f"[TEMPLATE] overlay pages={len(overlay_pages)}")
+        document = OfferDocument()
+        document.add_pages(merged_background_pages(overlay_pages, bg_dir))
         if debug_templates:
-            print(f"[TEMPLATE] fused main7 size={len(fused)} bytes")
-        return fused
+            print(f"[TEMPLATE] main7 pages={document.page_count}")
+        return document
     except Exception as e_gen:
         import traceback, sys
         print(f"[TEMPLATE] Fehler bei Overlay/Merge der 7-Seiten-PDF: {e_gen}")
@@ -448,6 +444,95 @@ def generate_main_template_pdf_bytes(
             print("[TEMPLATE] (Traceback konnte nicht ausgegeben werden)")
         return None
 
+
+def _finalize_offer_document(document: Any, size_profile: Optional[str] = None) -> bytes:
+    """Serialisiert das Angebot, optional mit Größenoptimierung; Bericht landet im Log."""
+    pdf_bytes = document.to_bytes(optimize_profile=size_profile)
+    report = getattr(document, 'optimization_report', None)
+    if size_profile and report:
+        if report.get('error'):
+            print(f"[PDF OPTIMIZE] Optimierung übersprungen: {report['error']}")
+        else:
+            details = ", ".join(f"{k}={v}" for k, v in report['saved'].items())
+            print(f"[PDF OPTIMIZE] Profil {report['profile']}: {report['bytes_after']} Bytes, gespart {report['saved_total']} ({details})")
+    return pdf_bytes
+
+
+def _footer_bar_hex() -> str:
+    """Primärfarbe leicht in Richtung Blau geschoben (+16 Blauanteil)."""
+    _hex = str(PRIMARY_COLOR_HEX).strip()
+    if _hex.startswith('#') and len(_hex) == 7:
+        r = int(_hex[1:3], 16); g = int(_hex[3:5], 16); b = int(_hex[5:7], 16)
+        b = min(255, b + 16)
+        return f"#{r:02X}{g:02X}{b:02X}"
+    return _hex
+
+
+def _make_additional_page_footer(start_number: int, total_pages: int, start_index: int,
+                                 logo_b64: Optional[str] = None, footer_left_text: Optional[str] = None) -> Callable:
+    """Zeichenfunktion für OfferDocument.stamp_pages: Footer "Angebot, <Datum>" und "Seite x von XX"
+    auf den Zusatzseiten. Logo und Farben werden einmal vorbereitet und für alle Seiten genutzt."""
+    from reportlab.lib.colors import white, HexColor, Color
+    from datetime import datetime as _dt
+    date_text = f"Angebot, {_dt.now().strftime('%d.%m.%Y')}"
+    accent = Color(27/255.0, 54/255.0, 112/255.0)
+    try:
+        footer_color = HexColor(_footer_bar_hex())
+    except Exception:
+        # Fallback dunkelblau
+        footer_color = HexColor('#1B3670')
+    logo_img = None
+    if logo_b64:
+        try:
+            logo_img = ImageReader(io.BytesIO(base64.b64decode(logo_b64)))
+        except Exception:
+            logo_img = None
+    font_name = "Helvetica-Bold"; font_size = 9
+    bar_height = 36
+
+    def _draw(canv, pw: float, ph: float, page_index: int) -> None:
+        # Dekoratives Dreieck oben rechts (wie Hauptseiten)
+        canv.saveState()
+        try:
+            canv.setFillColor(accent)
+            canv.setStrokeColor(accent)
+            size = 36.0
+            p = canv.beginPath()
+            p.moveTo(pw, ph)
+            p.lineTo(pw - size, ph)
+            p.lineTo(pw, ph - size)
+            p.close()
+            canv.drawPath(p, stroke=0, fill=1)
+        finally:
+            canv.restoreState()
+        # Footer-Hintergrundleiste
+        canv.setFillColor(footer_color)
+        canv.setStrokeColor(HexColor('#000000'))
+        canv.rect(0, 0, pw, bar_height, stroke=0, fill=1)
+        # Footer-Text-Style (weiß)
+        canv.setFillColor(white)
+        canv.setFont(font_name, font_size)
+        # Firmenlogo oben links (optional), 20pt vom linken und oberen Rand
+        if logo_img is not None:
+            try:
+                max_w, max_h = 120, 50
+                canv.drawImage(logo_img, 20, ph - 20 - max_h, width=max_w, height=max_h, preserveAspectRatio=True, mask='auto')
+            except Exception:
+                pass
+        # Zentrierter Datums-Text (vertikal mittig in der Leiste)
+        center_y = float(bar_height) / 2.0
+        tw = canv.stringWidth(date_text, font_name, font_size)
+        canv.drawString((pw - tw) / 2.0, center_y, date_text)
+        # Linker Footer-Text: Kundenname, falls vorhanden
+        if footer_left_text:
+            canv.drawString(20, center_y, str(footer_left_text))
+        # Rechte Nummer "Seite x von XX"
+        right_text = f"Seite {start_number + page_index - start_index} von {total_pages}"
+        tw_r = canv.stringWidth(right_text, font_name, font_size)
+        canv.drawString(pw - 18 - tw_r, center_y, right_text)
+
+    return _draw
+
 def generate_offer_pdf_with_main_templates(
     project_data: Dict[str, Any],
     analysis_results: Optional[Dict[str, Any]],
@@ -534,19 +619,26 @@ def generate_offer_pdf_with_main_templates(
             use_modern_design=use_modern_design, disable_main_template_combiner=True,
             **{k: v for k, v in (kwargs or {}).items() if k != 'disable_main_template_combiner'},
         )
-        # Debug-Ausgabe zur Analyse, warum evtl. keine Zusatzseiten erscheinen
+
+    # Zusatz-PDF genau einmal parsen: Seitenzahl für "Seite x von XX" und Seiten zum Anhängen
+    add_reader = None
+    if additional_pdf and _PYPDF_AVAILABLE:
         try:
-            if additional_pdf and _PYPDF_AVAILABLE:
-                from pypdf import PdfReader as _DbgReader
-                _dbg_pages = len(_DbgReader(io.BytesIO(additional_pdf)).pages)
-                print(f"[PDF EXTENDED] Zusatz-PDF erzeugt: {_dbg_pages} Seiten (append_after_main7=True)")
-            else:
-                print("[PDF EXTENDED] Zusatz-PDF leer oder pypdf nicht verfügbar – keine zusätzlichen Seiten angehängt")
-        except Exception as _dbg_e:
-            print(f"[PDF EXTENDED] Debug-Auswertung Zusatz-PDF fehlgeschlagen: {_dbg_e}")
+            from pdf_template_engine import read_pdf
+            add_reader = read_pdf(additional_pdf)
+        except Exception:
+            add_reader = None
+    add_page_count = len(add_reader.pages) if add_reader is not None else 0
+    total_pages = 7 + add_page_count
+    # Debug-Ausgabe zur Analyse, warum evtl. keine Zusatzseiten erscheinen
+    if append_after_main7:
+        if add_page_count:
+            print(f"[PDF EXTENDED] Zusatz-PDF erzeugt: {add_page_count} Seiten (append_after_main7=True)")
+        else:
+            print("[PDF EXTENDED] Zusatz-PDF leer oder pypdf nicht verfügbar – keine zusätzlichen Seiten angehängt")
 
-    main7 = generate_main_template_pdf_bytes(safe_project_data, safe_analysis_results, company_info, additional_pdf=additional_pdf)
-    if main7 is None:
+    document = build_main_template_document(safe_project_data, safe_analysis_results, company_info, total_pages=total_pages)
+    if document is None:
         # Fallback: Nur die alte Generierung
         return generate_offer_pdf(
             project_data, analysis_results, company_info, company_logo_base64,
@@ -556,151 +648,45 @@ def generate_offer_pdf_with_main_templates(
             db_list_company_documents_func, active_company_id, texts,
             use_modern_design=use_modern_design, **kwargs,
         )
+    main_page_count = document.page_count
+    # Optionale Größenoptimierung der fertigen Ausgabe ("email" / "print", None = aus)
+    size_profile = (inclusion_options or {}).get('pdf_size_profile') or None
+    if not add_page_count:
+        return _finalize_offer_document(document, size_profile)
 
-    # Hilfsfunktion: Zusatzseiten mit Footer "Angebot, <Datum>" und "Seite x von XX" versehen
-    def _overlay_footer_page_numbers(pdf_bytes: bytes, start_number: int, total_pages: int, logo_b64: Optional[str] = None, footer_left_text: Optional[str] = None) -> bytes:
+    try:
+        # Zusatzseiten mit Footer versehen: Startnummer = 8 (da Seiten 1-7 schon vorhanden)
+        logo_b64 = None
         try:
-            if not pdf_bytes:
-                return pdf_bytes
-            # ReportLab/PyPDF verfügbar?
-            if not _PYPDF_AVAILABLE or not _REPORTLAB_AVAILABLE:
-                return pdf_bytes
-            reader = PdfReader(io.BytesIO(pdf_bytes))
-            writer = PdfWriter()
-            # Erstelle einmal einen leeren Overlay-Buffer; pro Seite neu befüllen
-            from reportlab.pdfgen import canvas as _rl_canvas
-            from reportlab.lib.colors import black, white, HexColor, Color
-            from datetime import datetime as _dt
-            date_text = f"Angebot, {_dt.now().strftime('%d.%m.%Y')}"
-            for idx, page in enumerate(reader.pages):
-                # Seitengröße erfassen
-                box = page.mediabox
-                pw = float(box.width)
-                ph = float(box.height)
-                # Overlay-PDF mit gleicher Seitengröße erzeugen
-                overlay_buf = io.BytesIO()
-                canv = _rl_canvas.Canvas(overlay_buf, pagesize=(pw, ph))
-                # Dekoratives Dreieck oben rechts (wie Hauptseiten)
-                try:
-                    tri = _rl_canvas.Path()
-                except Exception:
-                    tri = None
-                accent = Color(27/255.0, 54/255.0, 112/255.0)
-                try:
-                    canv.saveState()
-                    canv.setFillColor(accent)
-                    canv.setStrokeColor(accent)
-                    size = 36.0
-                    x0, y0 = pw, ph
-                    p = canv.beginPath()
-                    p.moveTo(x0, y0)
-                    p.lineTo(x0 - size, y0)
-                    p.lineTo(x0, y0 - size)
-                    p.close()
-                    canv.drawPath(p, stroke=0, fill=1)
-                finally:
-                    try:
-                        canv.restoreState()
-                    except Exception:
-                        pass
-
-                # Footer-Hintergrundleiste (minimal bläulicher als Primärfarbe)
-                bar_height = 36
-                try:
-                    # Primärfarbe leicht in Richtung Blau schieben
-                    _hex = str(PRIMARY_COLOR_HEX).strip()
-                    if _hex.startswith('#') and len(_hex) == 7:
-                        r = int(_hex[1:3], 16); g = int(_hex[3:5], 16); b = int(_hex[5:7], 16)
-                        b = min(255, b + 16)  # +16 Blauanteil
-                        footer_hex = f"#{r:02X}{g:02X}{b:02X}"
-                    else:
-                        footer_hex = _hex
-                    canv.setFillColor(HexColor(footer_hex))
-                except Exception:
-                    # Fallback dunkelblau
-                    canv.setFillColor(HexColor('#1B3670'))
-                canv.setStrokeColor(HexColor('#000000'))
-                canv.rect(0, 0, pw, bar_height, stroke=0, fill=1)
-                # Footer-Text-Style (weiß)
-                font_name = "Helvetica-Bold"; font_size = 9
-                canv.setFillColor(white)
-                canv.setFont(font_name, font_size)
-                # Firmenlogo oben links (optional)
-                if logo_b64:
-                    try:
-                        img_bytes = base64.b64decode(logo_b64)
-                        img = ImageReader(io.BytesIO(img_bytes))
-                        max_w, max_h = 120, 50
-                        # Position: 20pt vom linken Rand, 20pt vom oberen Rand (unterhalb)
-                        canv.drawImage(img, 20, ph - 20 - max_h, width=max_w, height=max_h, preserveAspectRatio=True, mask='auto')
-                    except Exception:
-                        pass
-                # Zentrierter Datums-Text (vertikal mittig in der Leiste)
-                center_y = float(bar_height) / 2.0
-                tw = canv.stringWidth(date_text, font_name, font_size)
-                canv.drawString((pw - tw) / 2.0, center_y, date_text)
-                # Linker Footer-Text: Kundenname, falls vorhanden
-                if footer_left_text:
-                    try:
-                        canv.drawString(20, center_y, str(footer_left_text))
-                    except Exception:
-                        pass
-                # Rechte Nummer "Seite x von XX"
-                page_num = start_number + idx
-                right_text = f"Seite {page_num} von {total_pages}"
-                tw_r = canv.stringWidth(right_text, font_name, font_size)
-                canv.drawString(pw - 18 - tw_r, center_y, right_text)
-                canv.showPage(); canv.save()
-                # Overlay zurück an den Anfang und mergen
-                overlay_buf.seek(0)
-                ov_reader = PdfReader(overlay_buf)
-                ov_page = ov_reader.pages[0]
-                try:
-                    page.merge_page(ov_page)
-                except Exception:
-                    # Fallback für ältere PyPDF2 APIs
-                    page.mergePage(ov_page)  # type: ignore
-                writer.add_page(page)
-            out_buf = io.BytesIO(); writer.write(out_buf)
-            return out_buf.getvalue()
+            logo_b64 = company_logo_base64 or (company_info.get('logo_base64') if isinstance(company_info, dict) else None)
         except Exception:
-            return pdf_bytes
-
-    try:
-        from pypdf import PdfReader, PdfWriter
-        # BUGFIX: Ehemals main6 (Altbezeichnung) -> korrekt main7
-        base_reader = PdfReader(io.BytesIO(main7))
-        writer = PdfWriter()
-        for p in base_reader.pages: writer.add_page(p)
-        if additional_pdf:
-            # Seitenanzahl ermitteln (gesamt = 7 + n)
-            tmp_reader = PdfReader(io.BytesIO(additional_pdf))
-            total_pages = 7 + len(tmp_reader.pages)
-            # Zusatzseiten mit Footer versehen: Startnummer = 8 (da Seiten 1-7 schon vorhanden)
-            logo_b64 = None
-            try:
-                logo_b64 = company_logo_base64 or (company_info.get('logo_base64') if isinstance(company_info, dict) else None)
-            except Exception:
-                logo_b64 = company_logo_base64
-            # Kundenname für linken Footer
+            logo_b64 = company_logo_base64
+        # Kundenname für linken Footer
+        try:
+            cust = (project_data or {}).get('customer_data', {})
+            first = str(cust.get('first_name') or '').strip()
+            last = str(cust.get('last_name') or '').strip()
+            sal = str(cust.get('salutation') or '').strip()
+            title = str(cust.get('title') or '').strip()
+            name_parts = [p for p in [sal, title, first, last] if p]
+            footer_left = ' '.join(name_parts)
+        except Exception:
+            footer_left = None
+        document.add_pages(add_reader.pages)
+        if _REPORTLAB_AVAILABLE:
             try:
-                cust = (project_data or {}).get('customer_data', {})
-                first = str(cust.get('first_name') or '').strip()
-                last = str(cust.get('last_name') or '').strip()
-                sal = str(cust.get('salutation') or '').strip()
-                title = str(cust.get('title') or '').strip()
-                name_parts = [p for p in [sal, title, first, last] if p]
-                footer_left = ' '.join(name_parts)
-            except Exception:
-                footer_left = None
-            additional_pdf = _overlay_footer_page_numbers(additional_pdf, start_number=8, total_pages=total_pages, logo_b64=logo_b64, footer_left_text=footer_left)
-            add_reader = PdfReader(io.BytesIO(additional_pdf))
-            for p in add_reader.pages: writer.add_page(p)
-        buf = io.BytesIO(); writer.write(buf)
-        return buf.getvalue()
+                document.stamp_pages(
+                    _make_additional_page_footer(8, total_pages, main_page_count, logo_b64=logo_b64, footer_left_text=footer_left),
+                    start_index=main_page_count,
+                )
+            except Exception as e_footer:
+                # Footer ist Kosmetik: Zusatzseiten bleiben ohne Footer erhalten
+                print(f"[PDF EXTENDED] Footer für Zusatzseiten fehlgeschlagen: {e_footer}")
+        return _finalize_offer_document(document, size_profile)
     except Exception:
         # Falls Zusammenführen fehlschlägt, gib die 7 Seiten zurück
-        return main7
+        main7 = build_main_template_document(safe_project_data, safe_analysis_results, company_info, total_pages=total_pages)
+        return _finalize_offer_document(main7, size_profile) if main7 is not None else None
 
 _PDF_GENERATOR_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Da pdf_generator.py im selben Verzeichnis wie der data/ Ordner liegt, ist der Basis-Pfad korrekt
@@ -2881,15 +2867,11 @@ def generate_offer_pdf(
     except Exception as e_read_main:
         return main_pdf_bytes 
 
-    successfully_appended = 0
-    for pdf_path in paths_to_append:
-        try:
-            datasheet_reader = PdfReader(pdf_path)
-            for page in datasheet_reader.pages: 
-                pdf_writer.add_page(page)
-            successfully_appended += 1
-        except Exception as e_append_ds:
-            pass  # Fehler beim Anhängen werden still behandelt
+    # Anhänge aus dem prozessweiten Cache (geparst je Pfad/mtime/Größe), gemeinsame Ressourcen dedupliziert
+    successfully_appended = append_attachments(pdf_writer, paths_to_append)
+    debug_info['successfully_appended'] = len(successfully_appended)
+    if not successfully_appended:
+        return main_pdf_bytes  # nichts angehängt: Angebots-PDF nicht neu schreiben
     
     final_buffer = io.BytesIO()
     try:
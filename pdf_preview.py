@@ -23,6 +23,15 @@ try:
 except ImportError:
     PDF_PREVIEW_AVAILABLE = False
 
+try:
+    from session_blob_store import offload_session_value, resolve as resolve_session_blob
+except ImportError:
+    def offload_session_value(slot, value, **kwargs):
+        return value
+
+    def resolve_session_blob(value, default=None):
+        return value
+
 class PDFPreviewEngine:
     """Engine für PDF-Vorschau mit Cache und Optimierungen"""
     
@@ -225,7 +234,7 @@ def render_pdf_preview_interface(
                 )
                 
                 if pdf_bytes:
-                    st.session_state.preview_pdf_bytes = pdf_bytes
+                    st.session_state.preview_pdf_bytes = offload_session_value('preview_pdf_bytes', pdf_bytes)
                     st.success(" Vorschau aktualisiert")
                 else:
                     st.error(" Fehler bei der PDF-Generierung")
@@ -233,8 +242,13 @@ def render_pdf_preview_interface(
         
         # Vorschau anzeigen
         if 'preview_pdf_bytes' in st.session_state:
-            pdf_bytes = st.session_state.preview_pdf_bytes
-            
+            pdf_bytes = resolve_session_blob(st.session_state.preview_pdf_bytes, None)
+            if pdf_bytes is None:
+                # Ausgelagerte Vorschau ist abgelaufen (Session-TTL/Kontingent)
+                del st.session_state['preview_pdf_bytes']
+                st.info(" Die Vorschau ist abgelaufen – bitte neu erzeugen.")
+        
+        if 'preview_pdf_bytes' in st.session_state:
             with preview_container:
                 if preview_mode == "Schnellvorschau":
                     # Erste Seiten als Bilder anzeigen
@@ -313,7 +327,7 @@ def render_pdf_preview_interface(
             st.markdown("---")
             st.download_button(
                 label=" Vorschau-PDF herunterladen",
-                data=st.session_state.preview_pdf_bytes,
+                data=resolve_session_blob(st.session_state.preview_pdf_bytes),
                 file_name=f"Vorschau_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
                 mime="application/pdf",
                 use_container_width=True
@@ -325,7 +339,7 @@ def render_pdf_preview_interface(
         # In einer echten Implementierung würde hier ein Timer laufen
         pass
     
-    return st.session_state.get('preview_pdf_bytes')
+    return resolve_session_blob(st.session_state.get('preview_pdf_bytes'))
 
 def create_preview_thumbnail(pdf_bytes: bytes, page_num: int = 0, size: tuple = (200, 280)) -> Optional[bytes]:
     """Erstellt ein Thumbnail-Bild einer PDF-Seite"""
@@ -4,6 +4,8 @@ pdf_template_engine
 Öffentliche API zum Erzeugen der 7-seitigen Haupt-PDF mittels Templates:
 - build_dynamic_data: erzeugt dynamische Werte aus App-Daten
 - generate_custom_offer_pdf: erstellt Overlay, merged mit Templates, hängt optional weitere Seiten an
+- OfferDocument / build_offer_document: Zusammenbau in einem Writer, Serialisierung nur am Ende
+- optimize_pdf_bytes: optionale Größenoptimierung (Profile "email" / "print")
 """
 
 from pathlib import Path
@@ -15,7 +17,11 @@ from .dynamic_overlay import (
 	merge_with_background,
 	append_additional_pages,
 	generate_custom_offer_pdf,
+	build_offer_document,
+	merged_background_pages,
 )
+from .assembly import OfferDocument, read_pdf
+from .optimizer import PROFILES as PDF_SIZE_PROFILES, optimize_pdf_bytes
 
 __all__ = [
 	"build_dynamic_data",
@@ -24,4 +30,10 @@ __all__ = [
 	"merge_with_background",
 	"append_additional_pages",
 	"generate_custom_offer_pdf",
+	"build_offer_document",
+	"merged_background_pages",
+	"OfferDocument",
+	"read_pdf",
+	"PDF_SIZE_PROFILES",
+	"optimize_pdf_bytes",
 ]
@@ -0,0 +1,100 @@
+"""
+pdf_template_engine/assembly.py
+
+Einheitlicher Zusammenbau eines Angebots-PDFs in einem einzigen PdfWriter:
+- Seiten aus Overlay/Hintergrund und Zusatz-PDFs werden direkt übernommen
+  (jede Eingabe wird genau einmal geparst)
+- Fußzeilen/Stempel für beliebig viele Seiten entstehen in EINEM mehrseitigen
+  ReportLab-Canvas, der einmal geparst und seitenweise gemergt wird
+- Serialisierung erfolgt genau einmal am Ende (to_bytes), optional mit
+  Größenoptimierung (Profil "email" oder "print", siehe optimizer.py)
+"""
+
+from __future__ import annotations
+
+import io
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+
+from pypdf import PdfReader, PdfWriter
+from reportlab.pdfgen import canvas
+
+# draw_page(canvas, page_width, page_height, page_index) zeichnet den Stempel einer Seite
+PageStampFunc = Callable[[canvas.Canvas, float, float, int], None]
+
+
+def read_pdf(pdf: Union[bytes, PdfReader, None]) -> Optional[PdfReader]:
+    """Parst PDF-Bytes einmalig; bereits geparste Reader werden durchgereicht."""
+    if pdf is None or isinstance(pdf, PdfReader):
+        return pdf
+    if not pdf:
+        return None
+    try:
+        return PdfReader(io.BytesIO(pdf))
+    except Exception:
+        return None
+
+
+class OfferDocument:
+    """Ein Angebotsdokument, das bis zur Ausgabe in einem PdfWriter bleibt."""
+
+    def __init__(self):
+        self.writer = PdfWriter()
+        self.optimization_report: Optional[Dict[str, Any]] = None
+
+    @property
+    def page_count(self) -> int:
+        return len(self.writer.pages)
+
+    def add_pages(self, pages: Iterable) -> int:
+        """Hängt Seitenobjekte an; liefert die Anzahl angehängter Seiten."""
+        added = 0
+        for page in pages:
+            self.writer.add_page(page)
+            added += 1
+        return added
+
+    def add_pdf(self, pdf: Union[bytes, PdfReader, None]) -> int:
+        """Hängt alle Seiten eines PDFs (Bytes oder Reader) an."""
+        reader = read_pdf(pdf)
+        return self.add_pages(reader.pages) if reader is not None else 0
+
+    def stamp_pages(self, draw_page: PageStampFunc, start_index: int = 0, end_index: Optional[int] = None) -> None:
+        """
+        Legt einen Stempel (z.B. Fußzeile) über die Seiten [start_index, end_index).
+
+        Alle Stempel entstehen in einem mehrseitigen Canvas mit der jeweiligen
+        Seitengröße; das Ergebnis wird einmal geparst und Seite für Seite gemergt.
+        """
+        targets = list(self.writer.pages)[start_index:end_index]
+        if not targets:
+            return
+        buffer = io.BytesIO()
+        stamp_canvas = canvas.Canvas(buffer)
+        for offset, page in enumerate(targets):
+            width = float(page.mediabox.width)
+            height = float(page.mediabox.height)
+            stamp_canvas.setPageSize((width, height))
+            draw_page(stamp_canvas, width, height, start_index + offset)
+            stamp_canvas.showPage()
+        stamp_canvas.save()
+        stamps = PdfReader(io.BytesIO(buffer.getvalue())).pages
+        for page, stamp in zip(targets, stamps):
+            page.merge_page(stamp)
+
+    def to_bytes(self, optimize_profile: Optional[str] = None) -> bytes:
+        """
+        Serialisiert das Dokument (einmalig am Ende aufrufen).
+
+        Mit optimize_profile ("email"/"print") läuft vorher die Größenoptimierung;
+        der Bericht (eingesparte Bytes je Kategorie) liegt danach in optimization_report.
+        """
+        if optimize_profile:
+            from .optimizer import optimize_writer
+            try:
+                pdf_bytes, self.optimization_report = optimize_writer(self.writer, optimize_profile)
+                return pdf_bytes
+            except Exception as e:
+                self.optimization_report = {"profile": optimize_profile, "error": str(e)}
+        out = io.BytesIO()
+        self.writer.write(out)
+        return out.getvalue()
@@ -10,7 +10,7 @@ from __future__ import annotations
 import io
 import re
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Sequence, Union
 
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
@@ -18,7 +18,7 @@ import base64
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.colors import Color
 from reportlab.lib import colors  # für add_page3_elements (colors.black)
-from pypdf import PdfReader, PdfWriter, Transformation
+from pypdf import PdfReader, Transformation
 try:
     # PageObject ist optional (ältere pypdf-Versionen können es anders exportieren)
     from pypdf import PageObject  # type: ignore
@@ -27,6 +27,7 @@ except Exception:  # pragma: no cover
 from pathlib import Path
 
 from .placeholders import PLACEHOLDER_MAPPING
+from .assembly import OfferDocument, read_pdf
 
 # Optional: Admin-Settings laden, um Overlay-Verhalten dynamisch zu steuern
 try:
@@ -1256,8 +1257,14 @@ def _remove_text_from_page(page, texts_to_remove: list[str]):
 
 def merge_with_background(overlay_bytes: bytes, bg_dir: Path) -> bytes:
     """Verschmilzt das Overlay mit nt_nt_01.pdf … nt_nt_07.pdf aus bg_dir."""
-    overlay_reader = PdfReader(io.BytesIO(overlay_bytes))
-    writer = PdfWriter()
+    document = OfferDocument()
+    document.add_pages(merged_background_pages(read_pdf(overlay_bytes).pages, bg_dir))
+    return document.to_bytes()
+
+
+def merged_background_pages(overlay_pages: Sequence[Any], bg_dir: Path) -> List[Any]:
+    """Seitenobjekte der sieben Hauptseiten (Hintergrund + Overlay), ohne Serialisierung."""
+    pages: List[Any] = []
     for page_num in range(1, 8):
         # Unterstütze beide Muster: nt_nt_XX.pdf und nt_XX.pdf
         candidates = [bg_dir / f"nt_nt_{page_num:02d}.pdf", bg_dir / f"nt_{page_num:02d}.pdf"]
@@ -1271,7 +1278,7 @@ def merge_with_background(overlay_bytes: bytes, bg_dir: Path) -> bytes:
                 except Exception:
                     continue
         # Fallback: Wenn kein Hintergrund vorhanden/lesbar ist, füge nur Overlay-Seite ein
-        ov_page = overlay_reader.pages[page_num - 1]
+        ov_page = overlay_pages[page_num - 1]
 
         # Optional: Auf Seite 1 zusätzlich eine weitere statische PDF (haus.pdf) mergen
         # Reihenfolge: Basis (nt_nt_01.pdf) -> haus.pdf -> Overlay
@@ -1323,7 +1330,7 @@ def merge_with_background(overlay_bytes: bytes, bg_dir: Path) -> bytes:
                         pass
             # Overlay über den zusammengesetzten Hintergrund legen
             base_page.merge_page(ov_page)
-            writer.add_page(base_page)
+            pages.append(base_page)
         else:
             # Kein Standard-Hintergrund: nur haus.pdf (falls vorhanden) als Basis, skaliert, dann Overlay
             if extra_bg_page is not None and PageObject is not None:
@@ -1343,31 +1350,42 @@ def merge_with_background(overlay_bytes: bytes, bg_dir: Path) -> bytes:
                     t = Transformation().scale(scale, scale).translate(tx, ty)
                     base.merge_transformed_page(extra_bg_page, t)
                     base.merge_page(ov_page)
-                    writer.add_page(base)
+                    pages.append(base)
                     continue
                 except Exception:
                     pass
             # Fallback: nur Overlay
-            writer.add_page(ov_page)
-    out = io.BytesIO()
-    writer.write(out)
-    return out.getvalue()
+            pages.append(ov_page)
+    return pages
 
 
 def append_additional_pages(base_pdf: bytes, additional_pdf: Optional[bytes]) -> bytes:
     """Hängt optional weitere Seiten hinten an."""
     if not additional_pdf:
         return base_pdf
-    base_reader = PdfReader(io.BytesIO(base_pdf))
-    add_reader = PdfReader(io.BytesIO(additional_pdf))
-    writer = PdfWriter()
-    for p in base_reader.pages:
-        writer.add_page(p)
-    for p in add_reader.pages:
-        writer.add_page(p)
-    out = io.BytesIO()
-    writer.write(out)
-    return out.getvalue()
+    document = OfferDocument()
+    document.add_pdf(base_pdf)
+    document.add_pdf(additional_pdf)
+    return document.to_bytes()
+
+
+def build_offer_document(
+    coords_dir: Path,
+    bg_dir: Path,
+    dynamic_data: Dict[str, str],
+    additional_pdf: Union[bytes, PdfReader, None] = None,
+) -> OfferDocument:
+    """Overlay -> Hintergrund -> Zusatzseiten in einem Writer, ohne Zwischen-Serialisierung."""
+    # Zusatz-PDF nur einmal parsen: Seitenzahl für die Fußzeile und Seiten zum Anhängen
+    add_reader = read_pdf(additional_pdf)
+    total_pages = 7 + (len(add_reader.pages) if add_reader is not None else 0)
+
+    overlay_bytes = generate_overlay(coords_dir, dynamic_data, total_pages=total_pages)
+    document = OfferDocument()
+    document.add_pages(merged_background_pages(read_pdf(overlay_bytes).pages, bg_dir))
+    if add_reader is not None:
+        document.add_pages(add_reader.pages)
+    return document
 
 
 def generate_custom_offer_pdf(
@@ -1377,14 +1395,4 @@ def generate_custom_offer_pdf(
     additional_pdf: Optional[bytes] = None,
 ) -> bytes:
     """End-to-End-Erzeugung des Angebots: Overlay -> Merge -> Optional anhängen."""
-    # Bestimme Gesamtseiten für Fußzeile (7 + ggf. Zusatzseiten)
-    total_pages = 7
-    if additional_pdf:
-        try:
-            add_reader = PdfReader(io.BytesIO(additional_pdf))
-            total_pages = 7 + len(add_reader.pages)
-        except Exception:
-            total_pages = 7
-
-
-
+    return build_offer_document(coords_dir, bg_dir, dynamic_data, additional_pdf).to_bytes()
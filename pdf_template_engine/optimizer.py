@@ -0,0 +1,449 @@
+"""
+pdf_template_engine/optimizer.py
+
+Optionale Nachbearbeitung fertiger Angebots-PDFs zur Größenreduktion:
+- doppelte XObjects (Bilder/Formulare mit identischem Inhalt) zusammenführen
+- Bilder oberhalb der Ziel-DPI herunterrechnen; Fotos als JPEG, Diagramme/Grafiken
+  mit wenigen Farben als indizierte Flate-Bilder (wie optimiertes PNG)
+- Content-Streams komprimieren, identische Objekte entfernen
+- über pikepdf (Rohdaten der Streams): ASCII85-Kodierung (ReportLab-Standard, +25 % Größe)
+  entfernen und komprimierte Objekt-Streams schreiben
+
+Auf pypdf-Seite wird nur die öffentliche API genutzt (get_data/set_data, decode_as_image);
+gespeicherte Größen stammen aus /Length der eingelesenen Streams.
+
+Profile: "email" (klein, 150 DPI) und "print" (hohe Qualität, 300 DPI).
+Der Bericht enthält die eingesparten Bytes je Kategorie.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import math
+import time
+import zlib
+from base64 import a85decode
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import (ArrayObject, ByteStringObject, ContentStream, DecodedStreamObject, EncodedStreamObject,
+                           IndirectObject, NameObject, NumberObject, StreamObject)
+
+try:
+    from PIL import Image
+    _PIL_AVAILABLE = True
+except ImportError:  # pragma: no cover - ohne Pillow keine Bildneukodierung
+    Image = None  # type: ignore
+    _PIL_AVAILABLE = False
+
+try:
+    import pikepdf
+    _PIKEPDF_AVAILABLE = True
+except ImportError:  # pragma: no cover - ohne pikepdf kein ASCII85-Entfernen und keine Objekt-Streams
+    pikepdf = None  # type: ignore
+    _PIKEPDF_AVAILABLE = False
+
+
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "email": {"target_dpi": 150, "jpeg_quality": 75, "object_streams": True},
+    "print": {"target_dpi": 300, "jpeg_quality": 90, "object_streams": True},
+}
+
+SAVING_CATEGORIES: Tuple[str, ...] = ("ascii85", "xobject_dedupe", "images", "content_streams", "object_streams")
+
+# Erst ab diesem Faktor über der Ziel-DPI wird neu abgetastet (vermeidet Qualitätsverlust für ~0 Ersparnis)
+_DPI_TOLERANCE = 1.2
+# Bilder mit höchstens so vielen Farben gelten als Grafik/Diagramm (verlustfrei, indiziert)
+_MAX_PALETTE_COLORS = 256
+
+
+def _xobject_dicts(writer: PdfWriter) -> List[Any]:
+    """Alle /XObject-Ressourcen der Seiten inkl. verschachtelter Formulare."""
+    result: List[Any] = []
+    seen_forms = set()
+
+    def visit(resources: Any) -> None:
+        if resources is None:
+            return
+        xobjects = resources.get_object().get("/XObject")
+        if xobjects is None:
+            return
+        xobjects = xobjects.get_object()
+        result.append(xobjects)
+        for ref in xobjects.values():
+            obj = ref.get_object()
+            if obj.get("/Subtype") == "/Form" and id(obj) not in seen_forms:
+                seen_forms.add(id(obj))
+                visit(obj.get("/Resources"))
+
+    for page in writer.pages:
+        visit(page.get("/Resources"))
+    return result
+
+
+def _a85decode(data: bytes) -> bytes:
+    """Schnelles ASCII85-Dekodieren (vektorisiert; base64.a85decode ist reines Python)."""
+    body = data.strip()
+    if body.startswith(b"<~"):
+        body = body[2:]
+    end = body.find(b"~>")
+    if end >= 0:
+        body = body[:end]
+    body = bytes(body).translate(None, b" \t\r\n\x00\x0c").replace(b"z", b"!!!!!")
+    if not body:
+        return b""
+    pad = -len(body) % 5
+    chars = np.frombuffer(body + b"u" * pad, dtype=np.uint8)
+    if chars.min() < 33 or chars.max() > 117:
+        return a85decode(data, adobe=data.strip().startswith(b"<~"))
+    groups = (chars.reshape(-1, 5).astype(np.uint64) - 33) @ (85 ** np.arange(4, -1, -1, dtype=np.uint64))
+    decoded = groups.astype(">u4").tobytes()
+    return decoded[: len(decoded) - pad] if pad else decoded
+
+
+def _stored_length(obj: StreamObject) -> int:
+    """Gespeicherte (kodierte) Größe eines Streams: /Length eingelesener Streams, sonst die Rohdaten."""
+    if isinstance(obj, EncodedStreamObject):
+        length = obj.get("/Length")
+        if length is not None:
+            try:
+                return int(length.get_object())
+            except (TypeError, ValueError):
+                pass
+    return len(obj.get_data() or b"")
+
+
+def _stream_hash(obj: StreamObject) -> str:
+    # Über die dekodierten Daten: gleiche Inhalte mit unterschiedlicher Kodierung gelten als gleich
+    digest = hashlib.sha256(obj.get_data() or b"")
+    for key in sorted(k for k in obj.keys() if k not in ("/Length", "/Filter", "/DecodeParms")):
+        value = obj[key]
+        if isinstance(value, IndirectObject):
+            target = value.get_object()
+            value = _stream_hash(target) if isinstance(target, StreamObject) else repr(target)
+        digest.update(f"{key}={value!r};".encode("utf-8", "replace"))
+    return digest.hexdigest()
+
+
+def _merge_duplicate_xobjects(writer: PdfWriter) -> Tuple[int, int]:
+    """Verweist inhaltsgleiche XObjects auf ein gemeinsames Objekt; liefert (Anzahl, Bytes)."""
+    canonical: Dict[str, Any] = {}
+    counted = set()
+    merged = 0
+    saved = 0
+    for xobjects in _xobject_dicts(writer):
+        for name, ref in list(xobjects.items()):
+            if not isinstance(ref, IndirectObject):
+                continue
+            obj = ref.get_object()
+            if not isinstance(obj, StreamObject):
+                continue
+            key = _stream_hash(obj)
+            first = canonical.setdefault(key, ref)
+            if first.idnum != ref.idnum:
+                xobjects[NameObject(name)] = first
+                if ref.idnum not in counted:
+                    counted.add(ref.idnum)
+                    merged += 1
+                    saved += _stored_length(obj)
+    return merged, saved
+
+
+def _image_placements(writer: PdfWriter) -> Dict[int, Tuple[float, float]]:
+    """Größte dargestellte Größe (pt) je Bildobjekt, ermittelt aus cm/Do der Seiteninhalte."""
+    placements: Dict[int, Tuple[float, float]] = {}
+    for page in writer.pages:
+        resources = page.get("/Resources")
+        xobjects = resources.get_object().get("/XObject") if resources is not None else None
+        contents = page.get_contents()
+        if xobjects is None or contents is None:
+            continue
+        xobjects = xobjects.get_object()
+        ctm = [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]
+        stack: List[List[float]] = []
+        try:
+            operations = ContentStream(contents, writer).operations
+        except Exception:
+            continue
+        for operands, operator in operations:
+            if operator == b"q":
+                stack.append(list(ctm))
+            elif operator == b"Q":
+                ctm = stack.pop() if stack else [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]
+            elif operator == b"cm" and len(operands) == 6:
+                a, b, c, d, e, f = (float(x) for x in operands)
+                ctm = [
+                    a * ctm[0] + b * ctm[2], a * ctm[1] + b * ctm[3],
+                    c * ctm[0] + d * ctm[2], c * ctm[1] + d * ctm[3],
+                    e * ctm[0] + f * ctm[2] + ctm[4], e * ctm[1] + f * ctm[3] + ctm[5],
+                ]
+            elif operator == b"Do" and operands:
+                ref = xobjects.get(operands[0])
+                if isinstance(ref, IndirectObject):
+                    width = math.hypot(ctm[0], ctm[1])
+                    height = math.hypot(ctm[2], ctm[3])
+                    old = placements.get(ref.idnum, (0.0, 0.0))
+                    placements[ref.idnum] = (max(old[0], width), max(old[1], height))
+    return placements
+
+
+def _decode_image(obj: StreamObject) -> Optional[Any]:
+    """Dekodiert ein Bild-XObject über pypdf in ein PIL-Bild (ohne SMask)."""
+    try:
+        return obj.decode_as_image()
+    except Exception:
+        return None
+
+
+def _palette_of(image: Any) -> Optional[Any]:
+    """Palettenbild mit exakt den Farben von image (nur bei <= 256 Farben), sonst None."""
+    colors = image.getcolors(_MAX_PALETTE_COLORS) if image.mode == "RGB" else None
+    if not colors:
+        return None
+    palette = Image.new("P", (1, 1))
+    flat = [channel for _, color in colors for channel in color]
+    palette.putpalette(flat + flat[-3:] * (256 - len(colors)))
+    return palette
+
+
+def _flate_image(image: Any, palette: Optional[Any] = None) -> Tuple[Dict[str, Any], bytes]:
+    """Verlustfrei: indizierte Palette bei wenigen Farben, sonst RGB/Grau mit Flate."""
+    if palette is not None and image.mode == "RGB":
+        # Auf die Originalfarben zurückführen (Resampling erzeugt Zwischentöne)
+        indexed = image.quantize(palette=palette, dither=Image.Dither.NONE)
+        used = max(indexed.getextrema()[1], 0) + 1
+        color_space = ArrayObject([NameObject("/Indexed"), NameObject("/DeviceRGB"),
+                                   NumberObject(used - 1), ByteStringObject(bytes(palette.getpalette()[: 3 * used]))])
+        return {"/ColorSpace": color_space}, zlib.compress(indexed.tobytes(), 9)
+    color_space = NameObject("/DeviceGray" if image.mode == "L" else "/DeviceRGB")
+    return {"/ColorSpace": color_space}, zlib.compress(image.tobytes(), 9)
+
+
+def _recompress_images(writer: PdfWriter, profile: Dict[str, Any]) -> Tuple[int, int]:
+    """Rechnet Bilder auf Ziel-DPI herunter und kodiert Fotos als JPEG; liefert (Anzahl, Bytes)."""
+    if not _PIL_AVAILABLE:
+        return 0, 0
+    placements = _image_placements(writer)
+    page_sizes = [(float(p.mediabox.width), float(p.mediabox.height)) for p in writer.pages]
+    fallback_box = (max(w for w, _ in page_sizes), max(h for _, h in page_sizes)) if page_sizes else (595.0, 842.0)
+    target_dpi = float(profile["target_dpi"])
+    replaced: Dict[int, Any] = {}
+    count = 0
+    saved = 0
+
+    for xobjects in _xobject_dicts(writer):
+        for name, ref in list(xobjects.items()):
+            if not isinstance(ref, IndirectObject):
+                continue
+            if ref.idnum in replaced:
+                xobjects[NameObject(name)] = replaced[ref.idnum]
+                continue
+            obj = ref.get_object()
+            if obj.get("/Subtype") != "/Image" or obj.get("/ImageMask") or obj.get("/Mask") is not None:
+                continue
+            if obj.get("/BitsPerComponent", 8) != 8:
+                continue
+            old_size = _stored_length(obj)
+            image = _decode_image(obj)
+            if image is None or image.mode not in ("RGB", "L", "RGBA", "LA"):
+                continue
+            image = image.convert("RGB" if image.mode in ("RGB", "RGBA") else "L")
+
+            # Ziel-Pixelgröße aus dargestellter Größe (pt -> Zoll) und Ziel-DPI
+            shown_w, shown_h = placements.get(ref.idnum) or fallback_box
+            scale = min(1.0, (shown_w / 72.0 * target_dpi) / image.width, (shown_h / 72.0 * target_dpi) / image.height)
+            if scale < 1.0 / _DPI_TOLERANCE:
+                new_size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            else:
+                new_size = image.size
+
+            smask_ref = obj.get("/SMask")
+            palette = _palette_of(image)
+            is_graphic = smask_ref is not None or palette is not None
+            if new_size == image.size and (is_graphic or obj.get("/Filter") == "/DCTDecode"):
+                continue
+            if new_size != image.size:
+                image = image.resize(new_size, Image.LANCZOS)
+
+            new_obj = DecodedStreamObject()
+            new_obj.update({
+                NameObject("/Type"): NameObject("/XObject"),
+                NameObject("/Subtype"): NameObject("/Image"),
+                NameObject("/Width"): NumberObject(image.width),
+                NameObject("/Height"): NumberObject(image.height),
+                NameObject("/BitsPerComponent"): NumberObject(8),
+            })
+            if is_graphic:
+                extra, data = _flate_image(image, palette)
+                new_obj.update({NameObject(k): v for k, v in extra.items()})
+                new_obj[NameObject("/Filter")] = NameObject("/FlateDecode")
+            else:
+                buffer = io.BytesIO()
+                image.save(buffer, format="JPEG", quality=int(profile["jpeg_quality"]), optimize=True)
+                data = buffer.getvalue()
+                new_obj[NameObject("/ColorSpace")] = NameObject("/DeviceGray" if image.mode == "L" else "/DeviceRGB")
+                new_obj[NameObject("/Filter")] = NameObject("/DCTDecode")
+            new_total = len(data)
+
+            if smask_ref is not None:
+                mask = _decode_image(smask_ref.get_object())
+                if mask is None:
+                    continue
+                mask = mask.convert("L")
+                if mask.size != image.size:
+                    mask = mask.resize(image.size, Image.LANCZOS)
+                smask = DecodedStreamObject()
+                smask.update({
+                    NameObject("/Type"): NameObject("/XObject"),
+                    NameObject("/Subtype"): NameObject("/Image"),
+                    NameObject("/Width"): NumberObject(mask.width),
+                    NameObject("/Height"): NumberObject(mask.height),
+                    NameObject("/BitsPerComponent"): NumberObject(8),
+                    NameObject("/ColorSpace"): NameObject("/DeviceGray"),
+                    NameObject("/Filter"): NameObject("/FlateDecode"),
+                })
+                smask_data = zlib.compress(mask.tobytes(), 9)
+                smask.set_data(smask_data)
+                new_total += len(smask_data)
+                old_size += _stored_length(smask_ref.get_object())
+                new_obj[NameObject("/SMask")] = writer._add_object(smask)
+
+            if new_total >= old_size:
+                continue
+            new_obj.set_data(data)
+            new_ref = writer._add_object(new_obj)
+            replaced[ref.idnum] = new_ref
+            xobjects[NameObject(name)] = new_ref
+            count += 1
+            saved += old_size - new_total
+    return count, saved
+
+
+def _content_streams(page: Any) -> List[StreamObject]:
+    contents = page.get("/Contents")
+    if contents is None:
+        return []
+    contents = contents.get_object()
+    streams = contents if isinstance(contents, ArrayObject) else [contents]
+    return [stream.get_object() for stream in streams]
+
+
+def _compress_content_streams(writer: PdfWriter) -> int:
+    """Flate-komprimiert die Seiteninhalte (z.B. nach merge_page unkomprimiert); liefert Bytes."""
+    saved = 0
+    for page in writer.pages:
+        before = sum(_stored_length(stream) for stream in _content_streams(page))
+        try:
+            page.compress_content_streams(level=9)
+        except Exception:
+            continue
+        # pypdf komprimiert mit zlib Stufe 9; /Length der neuen Streams ist erst beim Schreiben gesetzt
+        after = sum(len(zlib.compress(stream.get_data(), 9)) for stream in _content_streams(page))
+        saved += max(0, before - after)
+    return saved
+
+
+def _strip_ascii85(pdf: Any) -> int:
+    """Entfernt ASCII85 als äußersten Filter aller Streams (pikepdf-Rohdaten); liefert Bytes."""
+    saved = 0
+    for obj in pdf.objects:
+        if not isinstance(obj, pikepdf.Stream):
+            continue
+        filters = obj.get("/Filter")
+        filter_list = list(filters) if isinstance(filters, pikepdf.Array) else [filters]
+        if filters is None or filter_list[0] != pikepdf.Name.ASCII85Decode:
+            continue
+        parms = obj.get("/DecodeParms")
+        parm_list = list(parms) if isinstance(parms, pikepdf.Array) else [parms]
+        if parm_list[0] is not None:
+            continue
+        raw = obj.read_raw_bytes()
+        try:
+            data = _a85decode(raw)
+        except Exception:
+            continue
+        rest = filter_list[1:]
+        rest_parms = parm_list[1:] if len(parm_list) == len(filter_list) else [None] * len(rest)
+        if rest and any(p is not None for p in rest_parms):
+            decode_parms = pikepdf.Array([p if p is not None else pikepdf.Dictionary() for p in rest_parms])
+            decode_parms = decode_parms[0] if len(rest) == 1 else decode_parms
+        else:
+            decode_parms = None
+        obj.write(data, filter=(rest[0] if len(rest) == 1 else pikepdf.Array(rest)) if rest else None,
+                  decode_parms=decode_parms, type_check=False)
+        saved += len(raw) - len(data)
+    return saved
+
+
+def _finish_with_pikepdf(pdf_bytes: bytes, object_streams: bool) -> Tuple[bytes, int, int]:
+    """ASCII85 entfernen und (optional) Objekt-Streams schreiben; liefert (Bytes, ascii85, object_streams)."""
+    if not _PIKEPDF_AVAILABLE:
+        return pdf_bytes, 0, 0
+    try:
+        with pikepdf.open(io.BytesIO(pdf_bytes)) as pdf:
+            ascii85 = _strip_ascii85(pdf)
+            out = io.BytesIO()
+            mode = pikepdf.ObjectStreamMode.generate if object_streams else pikepdf.ObjectStreamMode.preserve
+            pdf.save(out, compress_streams=True, object_stream_mode=mode)
+            result = out.getvalue()
+    except Exception:
+        return pdf_bytes, 0, 0
+    if len(result) >= len(pdf_bytes):
+        return pdf_bytes, 0, 0
+    ascii85 = min(ascii85, len(pdf_bytes) - len(result))
+    return result, ascii85, len(pdf_bytes) - len(result) - ascii85
+
+
+def optimize_writer(writer: PdfWriter, profile: Union[str, Dict[str, Any]] = "email") -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Optimiert den Inhalt von writer und serialisiert ihn.
+
+    Returns:
+        (pdf_bytes, report) – report enthält 'saved' (Bytes je Kategorie),
+        'bytes_after', 'profile' und 'duration_s'.
+    """
+    started = time.perf_counter()
+    profile_name = profile if isinstance(profile, str) else str(profile.get("name", "custom"))
+    settings = PROFILES.get(profile_name, PROFILES["email"]) if isinstance(profile, str) else {**PROFILES["email"], **profile}
+    saved = {category: 0 for category in SAVING_CATEGORIES}
+
+    merged, saved["xobject_dedupe"] = _merge_duplicate_xobjects(writer)
+    images, saved["images"] = _recompress_images(writer, settings)
+    saved["content_streams"] = _compress_content_streams(writer)
+    try:
+        writer.compress_identical_objects()
+    except Exception:
+        pass
+
+    out = io.BytesIO()
+    writer.write(out)
+    pdf_bytes = out.getvalue()
+    pdf_bytes, saved["ascii85"], saved["object_streams"] = _finish_with_pikepdf(
+        pdf_bytes, bool(settings.get("object_streams")))
+
+    report = {
+        "profile": profile_name,
+        "saved": saved,
+        "saved_total": sum(saved.values()),
+        "bytes_after": len(pdf_bytes),
+        "xobjects_merged": merged,
+        "images_recompressed": images,
+        "duration_s": round(time.perf_counter() - started, 3),
+    }
+    return pdf_bytes, report
+
+
+def optimize_pdf_bytes(pdf_bytes: bytes, profile: Union[str, Dict[str, Any]] = "email") -> Tuple[bytes, Dict[str, Any]]:
+    """Optimiert ein fertiges PDF; bei Fehlern oder ohne Ersparnis bleiben die Originalbytes erhalten."""
+    try:
+        writer = PdfWriter(clone_from=PdfReader(io.BytesIO(pdf_bytes)))
+        optimized, report = optimize_writer(writer, profile)
+    except Exception as e:
+        return pdf_bytes, {"profile": profile, "error": str(e), "bytes_before": len(pdf_bytes), "bytes_after": len(pdf_bytes)}
+    report["bytes_before"] = len(pdf_bytes)
+    if len(optimized) >= len(pdf_bytes):
+        report["bytes_after"] = len(pdf_bytes)
+        return pdf_bytes, report
+    return optimized, report
@@ -9,7 +9,6 @@ für die PDF-Overlays zu erzeugen.
 from __future__ import annotations
 from typing import Dict, Any, List, Callable, Optional
 import re
-from functools import lru_cache
 import math
 
 try:
@@ -23,6 +22,11 @@ except Exception:
         sys.path.insert(0, _PARENT)
     from calculations import perform_calculations  # noqa: E402
 
+try:
+    from feed_in_tariffs import resolve_feed_in_tariff
+except Exception:
+    resolve_feed_in_tariff = None  # Fallback: analysis_results bzw. Default-Tarif
+
 def USE_PERFORM_CALCULATIONS(context: Dict[str, Any]) -> Dict[str, Any]:
     """
     DEF Block:
@@ -79,7 +83,6 @@ def _normalize_tariff_to_eur_per_kwh(val: Any) -> float | None:
         return 0.0
     return v / 100.0 if v > 1.0 else v
 
-@lru_cache(maxsize=128)
 def resolve_feed_in_tariff_eur_per_kwh(
     anlage_kwp: float,
     mode: str,
@@ -88,25 +91,14 @@ def resolve_feed_in_tariff_eur_per_kwh(
     project_data_snapshot: tuple | None = None,
     default_parts_under_10_eur_per_kwh: float = 0.0786,
 ) -> float:
-    """Neue robuste Einspeisetarif-Ermittlung (€/kWh). Nutzt Admin-Settings, sonst analysis_results, sonst Default."""
+    """Neue robuste Einspeisetarif-Ermittlung (€/kWh). Nutzt Admin-Settings, sonst analysis_results, sonst Default.
+
+    Die Admin-Tabelle wird über feed_in_tariffs einmal kompiliert und bis zur nächsten Änderung wiederverwendet.
+    """
     try:
-        mode_l = (mode or "parts").strip().lower()
-        if mode_l not in ("parts", "full"):
-            mode_l = "parts"
-        tariffs_data = {}
-        try:
-            tariffs_data = load_admin_setting_func("feed_in_tariffs", {}) or {}
-        except Exception:
-            tariffs_data = {}
-        tariffs_list = tariffs_data.get(mode_l, []) if isinstance(tariffs_data, dict) else []
         chosen = None
-        for trf in tariffs_list or []:
-            try:
-                if _fit_to_float(trf.get("kwp_min",0)) <= anlage_kwp <= _fit_to_float(trf.get("kwp_max",999)):
-                    chosen = _normalize_tariff_to_eur_per_kwh(trf.get("ct_per_kwh"))
-                    break
-            except Exception:
-                continue
+        if resolve_feed_in_tariff is not None:
+            chosen = resolve_feed_in_tariff(float(anlage_kwp), mode, load_admin_setting_func)
         if chosen is None and analysis_results_snapshot:
             # Snapshot tuple: (einspeiseverguetung_eur_per_kwh, ... ) – wir übergeben hier nur einen Wert bei Bedarf
             try:
@@ -1355,6 +1347,14 @@ def build_dynamic_data(project_data: Dict[str, Any] | None,
         except Exception:
             return {}
 
+    # Attribute der gewählten Komponenten (Modul, WR, Speicher) in einer Abfrage vorladen;
+    # die Einzelabfragen unten werden dann aus dem Prozess-Cache bedient
+    try:
+        from product_attributes import get_attributes_bulk as _prefetch_attrs
+        _prefetch_attrs(project_details.get(k) for k in ("selected_module_id", "selected_inverter_id", "selected_storage_id"))
+    except Exception:
+        pass
+
     # Modul
     module_name = as_str(project_details.get("selected_module_name") or "").strip()
     module_id = project_details.get("selected_module_id")
@@ -1535,8 +1535,7 @@ def build_dynamic_data(project_data: Dict[str, Any] | None,
         try:
             if not all(result.get(k) for k in ("module_cell_technology", "module_structure", "module_cell_type", "module_version")):
                 from product_db import get_product_id_by_model_name as _get_pid
-                from product_attributes import get_attribute_value as _get_attr, list_attributes as _list_attrs
-                from database import load_admin_setting as _load_admin_setting  # optional
+                from product_attributes import get_attributes_bulk as _get_attrs_bulk, get_module_alias_index as _get_alias_index
                 pid = None
                 # Nutze bevorzugt die ausgewählte ID
                 if module_id not in (None, ""):
@@ -1562,52 +1561,31 @@ def build_dynamic_data(project_data: Dict[str, Any] | None,
                     except Exception:
                         pid = None
                 if pid:
-                    # Admin-Alias-Map laden und reverse (kanonisch -> Aliasliste) normalisiert aufbauen
-                    alias_map = None
+                    # Vorkompilierter Admin-Alias-Index (kanonisch -> Aliasliste, normalisiert)
                     try:
-                        alias_map = _load_admin_setting("module_pdf_alias_map", {}) or {}
+                        alias_index = _get_alias_index()
                     except Exception:
-                        alias_map = None
-                    rev: Dict[str, list] = {}
-                    if alias_map:
-                        for src_key, dst_key in alias_map.items():
-                            if not src_key or not dst_key:
-                                continue
-                            can = _norm_key(dst_key)
-                            rev.setdefault(can, []).append(str(src_key).strip())
-                    # Alle Attribute einmalig listen für normalisierte Suche
-                    attrs = []
+                        alias_index = None
+                    # Alle Attribute des Moduls in einer Abfrage (gecacht) für exakte und normalisierte Suche
                     try:
-                        attrs = _list_attrs(int(pid)) or []
+                        attr_values = _get_attrs_bulk([int(pid)]).get(int(pid)) or {}
                     except Exception:
-                        attrs = []
+                        attr_values = {}
                     attrs_norm_map: Dict[str, Any] = {}
-                    for a in attrs:
-                        k = _norm_key(a.get("attribute_key"))
+                    for a_key, a_val in attr_values.items():
+                        k = _norm_key(a_key)
                         if k and k not in attrs_norm_map:
-                            attrs_norm_map[k] = a.get("attribute_value")
+                            attrs_norm_map[k] = a_val
 
                     def _resolve_attr(canonical: str, syns: list[str]) -> str:
-                        # 1) exakt über get_attribute_value
-                        val = _get_attr(int(pid), canonical)
-                        if val not in (None, ""):
-                            return str(val)
-                        # 2) Synonyme direkt
-                        for s in syns:
-                            val2 = _get_attr(int(pid), s)
-                            if val2 not in (None, ""):
-                                return str(val2)
-                        # 3) Admin-Aliase (reverse)
-                        can_n = _norm_key(canonical)
-                        for alias_key in rev.get(can_n, []) or []:
-                            val3 = _get_attr(int(pid), alias_key)
-                            if val3 not in (None, ""):
-                                return str(val3)
-                        # 4) Normalisierte Suche in allen Attributen
-                        cand_keys = [_norm_key(canonical)] + [_norm_key(x) for x in syns]
-                        # Admin-Aliase auch normalisiert ergänzen
-                        for alias_key in rev.get(can_n, []) or []:
-                            cand_keys.append(_norm_key(alias_key))
+                        aliases = alias_index.aliases_for(canonical) if alias_index else []
+                        # 1) exakt, 2) Synonyme direkt, 3) Admin-Aliase (reverse)
+                        for cand in [canonical, *syns, *aliases]:
+                            val = attr_values.get(cand)
+                            if val not in (None, ""):
+                                return str(val)
+                        # 4) Normalisierte Suche in allen Attributen (inkl. Admin-Aliase)
+                        cand_keys = [_norm_key(canonical)] + [_norm_key(x) for x in syns] + [_norm_key(x) for x in aliases]
                         for ck in cand_keys:
                             if ck in attrs_norm_map and attrs_norm_map[ck] not in (None, ""):
                                 return str(attrs_norm_map[ck])
@@ -2711,38 +2689,12 @@ def build_dynamic_data(project_data: Dict[str, Any] | None,
         # Hersteller aus Projektdaten extrahieren (Roh)
         brands_by_category = extract_brands_from_project_data(project_data)
 
-        # Fallback-Varianten ohne funktionale Suffixe für besseren DB-Match vorbereiten
-        def _brand_logo_key_variants(b: str) -> list[str]:
-            import re
-            if not b:
-                return []
-            variants = []
-            base = b
-            attached = re.compile(r"^(.*?)(pv|wr|speicher|batterie|akku|ess|stromspeicher)$", re.IGNORECASE)
-            prev = None
-            while base and base != prev:
-                prev = base
-                m = attached.match(base)
-                if m and m.group(1).strip():
-                    base = m.group(1).strip()
-                    variants.append(base)
-                else:
-                    break
-            variants_norm = list({v for v in variants if v and v.lower() != b.lower()})
-            return variants_norm
-        
     # (Frühere Dummy-Placeholder "logo_*_placeholder" entfernt – direkte Nutzung der echten Keys)
         
         # Logos aus Datenbank holen
         if brands_by_category:
-            brand_names_raw = list(brands_by_category.values())
-            extended = []
-            for b in brand_names_raw:
-                extended.append(b)
-                for v in _brand_logo_key_variants(b):
-                    if v not in extended:
-                        extended.append(v)
-            unique_brands = list(set(extended))
+            # Varianten (Aliase, Groß/Klein, funktionale Suffixe wie PV/WR/SPEICHER) löst der Logo-Index auf
+            unique_brands = list(dict.fromkeys(brands_by_category.values()))
 
             logos_data = get_logos_for_brands(unique_brands)
 
@@ -2756,14 +2708,7 @@ def build_dynamic_data(project_data: Dict[str, Any] | None,
                 logo_key = logo_mapping.get(category)
                 if not logo_key:
                     continue
-                chosen = None
-                if brand_name in logos_data:
-                    chosen = logos_data[brand_name]
-                else:
-                    for v in _brand_logo_key_variants(brand_name):
-                        if v in logos_data:
-                            chosen = logos_data[v]
-                            break
+                chosen = logos_data.get(brand_name)
                 if chosen:
                     result[logo_key] = chosen.get('logo_base64', '')
                     result[f"{logo_key}_format"] = chosen.get('logo_format', 'PNG')
@@ -0,0 +1,447 @@
+# pdf_template_store.py
+# PDF-Vorlagen (Titelbilder, Angebotstitel, Anschreiben) in der Tabelle pdf_templates
+# Bilder liegen inhaltsadressiert (SHA-256) in pdf_template_blobs mit Referenzzähler; Listen liefern nur
+# Metadaten, Bilder werden bei Bedarf per ID geladen und im Prozess-Cache (LRU nach Hash) gehalten.
+# Die bisherigen JSON-Listen in admin_settings werden beim ersten Zugriff übernommen und entfernt;
+# Listen, die nicht übernommen werden (Typ schon belegt), bleiben unter '<key>_legacy_backup' erhalten.
+# export_admin_settings exportiert die Vorlagen wieder in diesem Listenformat (export_setting_templates);
+# beim Import über save_admin_setting landen sie erneut in pdf_templates.
+from __future__ import annotations
+from typing import Optional, Dict, Any, Callable, List
+from collections import OrderedDict
+from datetime import datetime
+import base64
+import binascii
+import hashlib
+import json
+import sqlite3
+import threading
+import traceback
+
+try:
+    import database as _database
+    from database import get_db_connection
+except Exception as e:
+    _database = None  # type: ignore
+    get_db_connection = None  # type: ignore
+    print(f"pdf_template_store.py: WARN - database.get_db_connection nicht verfügbar: {e}")
+
+# admin_settings-Schlüssel der bisherigen Listen -> template_type in pdf_templates
+TEMPLATE_SETTING_KEYS: Dict[str, str] = {
+    "pdf_title_image_templates": "title_image",
+    "pdf_offer_title_templates": "offer_title",
+    "pdf_cover_letter_templates": "cover_letter",
+}
+IMAGE_TEMPLATE_TYPES = ("title_image",)
+LEGACY_BACKUP_SUFFIX = "_legacy_backup"
+
+_TEMPLATE_COLUMNS = ("id", "template_type", "name", "content", "content_sha256", "sort_order", "created_at", "updated_at")
+_SELECT_TEMPLATES = f"SELECT {', '.join('t.' + c for c in _TEMPLATE_COLUMNS)}, b.size_bytes FROM pdf_templates t LEFT JOIN pdf_template_blobs b ON b.sha256 = t.content_sha256"
+# Obergrenze des Bild-Caches (Summe der Rohdaten)
+_IMAGE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+_cache_lock = threading.Lock()
+_ENSURED_DATABASES: set = set()
+_IMAGE_CACHE: "OrderedDict[str, bytes]" = OrderedDict()
+_image_cache_bytes = 0
+
+
+def _db_cache_key() -> str:
+    return str(getattr(_database, "DB_PATH", "") or "")
+
+
+def _ensure_tables(conn: sqlite3.Connection) -> None:
+    db_key = _db_cache_key()
+    if db_key and db_key in _ENSURED_DATABASES:
+        return
+    cur = conn.cursor()
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pdf_templates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, template_type TEXT NOT NULL, name TEXT NOT NULL,
+            content TEXT, image_data BLOB, created_at TEXT NOT NULL, updated_at TEXT NOT NULL
+        )
+        """
+    )
+    columns = {row[1] for row in cur.execute("PRAGMA table_info(pdf_templates)").fetchall()}
+    if "content_sha256" not in columns:
+        cur.execute("ALTER TABLE pdf_templates ADD COLUMN content_sha256 TEXT")
+    if "sort_order" not in columns:
+        cur.execute("ALTER TABLE pdf_templates ADD COLUMN sort_order INTEGER DEFAULT 0")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_pdf_templates_type ON pdf_templates (template_type)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pdf_template_blobs (
+            sha256 TEXT PRIMARY KEY,
+            data BLOB NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            ref_count INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    conn.commit()
+    _migrate_admin_setting_lists(conn)
+    if db_key:
+        _ENSURED_DATABASES.add(db_key)
+
+
+def _connect() -> Optional[sqlite3.Connection]:
+    if get_db_connection is None:
+        return None
+    conn = get_db_connection()
+    if conn is None:
+        return None
+    try:
+        _ensure_tables(conn)
+    except sqlite3.Error as e:
+        print(f"pdf_template_store.py: Tabellen konnten nicht angelegt werden: {e}")
+        conn.close()
+        return None
+    return conn
+
+
+def _row_to_dict(row: Any) -> Dict[str, Any]:
+    record = dict(zip(_TEMPLATE_COLUMNS + ("size_bytes",), tuple(row)))
+    if record["template_type"] in IMAGE_TEMPLATE_TYPES:
+        record.pop("content", None)
+    return record
+
+
+# --- Blobs ---
+
+def _decode_b64(data_b64: Any) -> Optional[bytes]:
+    if not data_b64 or not isinstance(data_b64, str):
+        return None
+    if data_b64.startswith("data:") and "," in data_b64:
+        data_b64 = data_b64.split(",", 1)[1]
+    try:
+        return base64.b64decode(data_b64)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def _acquire_blob(conn: sqlite3.Connection, data: bytes) -> str:
+    sha256 = hashlib.sha256(data).hexdigest()
+    conn.execute(
+        """
+        INSERT INTO pdf_template_blobs (sha256, data, size_bytes, ref_count) VALUES (?, ?, ?, 1)
+        ON CONFLICT(sha256) DO UPDATE SET ref_count = ref_count + 1
+        """,
+        (sha256, sqlite3.Binary(data), len(data)),
+    )
+    return sha256
+
+
+def _release_blob(conn: sqlite3.Connection, sha256: Optional[str]) -> None:
+    if not sha256:
+        return
+    conn.execute("UPDATE pdf_template_blobs SET ref_count = ref_count - 1 WHERE sha256 = ?", (sha256,))
+    conn.execute("DELETE FROM pdf_template_blobs WHERE sha256 = ? AND ref_count <= 0", (sha256,))
+
+
+def _cache_image(sha256: str, data: bytes) -> None:
+    global _image_cache_bytes
+    if len(data) > _IMAGE_CACHE_MAX_BYTES:
+        return
+    with _cache_lock:
+        if sha256 in _IMAGE_CACHE:
+            _IMAGE_CACHE.move_to_end(sha256)
+            return
+        _IMAGE_CACHE[sha256] = data
+        _image_cache_bytes += len(data)
+        while _image_cache_bytes > _IMAGE_CACHE_MAX_BYTES and _IMAGE_CACHE:
+            _, evicted = _IMAGE_CACHE.popitem(last=False)
+            _image_cache_bytes -= len(evicted)
+
+
+def clear_image_cache() -> None:
+    global _image_cache_bytes
+    with _cache_lock:
+        _IMAGE_CACHE.clear()
+        _image_cache_bytes = 0
+
+
+# --- Übernahme der admin_settings-Listen ---
+
+def _insert_templates(conn: sqlite3.Connection, template_type: str, entries: List[Any]) -> int:
+    now = datetime.now().isoformat()
+    inserted = 0
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not str(entry.get("name") or "").strip():
+            continue
+        content = None
+        sha256 = None
+        if template_type in IMAGE_TEMPLATE_TYPES:
+            data = _decode_b64(entry.get("data"))
+            if data:
+                sha256 = _acquire_blob(conn, data)
+        else:
+            content = entry.get("content")
+        conn.execute(
+            "INSERT INTO pdf_templates (template_type, name, content, content_sha256, sort_order, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (template_type, str(entry["name"]).strip(), content, sha256, position, now, now),
+        )
+        inserted += 1
+    return inserted
+
+
+def _load_setting_list(conn: sqlite3.Connection, setting_key: str) -> Optional[List[Any]]:
+    try:
+        row = conn.execute("SELECT value FROM admin_settings WHERE key = ?", (setting_key,)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    if row is None or row[0] is None:
+        return None
+    try:
+        value = json.loads(row[0])
+    except (TypeError, ValueError):
+        return None
+    return value if isinstance(value, list) else None
+
+
+def _migrate_admin_setting_lists(conn: sqlite3.Connection) -> None:
+    """
+    Übernimmt vorhandene JSON-Listen aus admin_settings (nur, solange der Typ noch leer ist).
+
+    Ist der Typ bereits belegt, wird die Liste nicht übernommen, sondern unter
+    '<key>_legacy_backup' umbenannt, damit sie nicht verloren geht.
+    """
+    for setting_key, template_type in TEMPLATE_SETTING_KEYS.items():
+        entries = _load_setting_list(conn, setting_key)
+        if entries is None:
+            continue
+        try:
+            existing = conn.execute("SELECT COUNT(*) FROM pdf_templates WHERE template_type = ?", (template_type,)).fetchone()[0]
+            if not existing:
+                _insert_templates(conn, template_type, entries)
+                conn.execute("DELETE FROM admin_settings WHERE key = ?", (setting_key,))
+            else:
+                backup_key = setting_key + LEGACY_BACKUP_SUFFIX
+                conn.execute("DELETE FROM admin_settings WHERE key = ?", (backup_key,))
+                conn.execute("UPDATE admin_settings SET key = ? WHERE key = ?", (backup_key, setting_key))
+                print(f"pdf_template_store.py: '{setting_key}' nicht übernommen ({template_type} bereits vorhanden), gesichert als '{backup_key}'.")
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"pdf_template_store.py: Übernahme von '{setting_key}' fehlgeschlagen: {e}")
+
+
+def import_setting_templates(setting_key: str) -> bool:
+    """Ersetzt die Vorlagen eines Typs durch eine (von Altcode) in admin_settings gespeicherte Liste."""
+    template_type = TEMPLATE_SETTING_KEYS.get(setting_key)
+    if template_type is None:
+        return False
+    conn = _connect()
+    if conn is None:
+        return False
+    try:
+        entries = _load_setting_list(conn, setting_key)
+        if entries is None:
+            return False
+        for (sha256,) in conn.execute("SELECT content_sha256 FROM pdf_templates WHERE template_type = ?", (template_type,)).fetchall():
+            _release_blob(conn, sha256)
+        conn.execute("DELETE FROM pdf_templates WHERE template_type = ?", (template_type,))
+        _insert_templates(conn, template_type, entries)
+        conn.execute("DELETE FROM admin_settings WHERE key = ?", (setting_key,))
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"pdf_template_store.py: Import von '{setting_key}' fehlgeschlagen: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def export_setting_templates() -> Dict[str, List[Dict[str, Any]]]:
+    """Alle Vorlagen als {admin_settings-Schlüssel: [{'name', 'content' | 'data'}]} (Bilder Base64)."""
+    conn = _connect()
+    if conn is None:
+        return {}
+    try:
+        rows = conn.execute(
+            "SELECT t.template_type, t.name, t.content, b.data FROM pdf_templates t "
+            "LEFT JOIN pdf_template_blobs b ON b.sha256 = t.content_sha256 ORDER BY t.sort_order, t.id"
+        ).fetchall()
+    except sqlite3.Error as e:
+        print(f"pdf_template_store.py: Fehler export_setting_templates: {e}")
+        return {}
+    finally:
+        conn.close()
+    exported: Dict[str, List[Dict[str, Any]]] = {key: [] for key in TEMPLATE_SETTING_KEYS}
+    key_by_type = {template_type: key for key, template_type in TEMPLATE_SETTING_KEYS.items()}
+    for template_type, name, content, data in rows:
+        setting_key = key_by_type.get(template_type)
+        if setting_key is None:
+            continue
+        if template_type in IMAGE_TEMPLATE_TYPES:
+            entry = {"name": name, "data": base64.b64encode(bytes(data)).decode("utf-8") if data else None}
+        else:
+            entry = {"name": name, "content": content}
+        exported[setting_key].append(entry)
+    return exported
+
+
+# --- Öffentliche API ---
+
+def _query_templates(template_type: str) -> Optional[List[Dict[str, Any]]]:
+    # None, wenn die Tabelle nicht erreichbar ist (im Unterschied zu einer leeren Liste)
+    conn = _connect()
+    if conn is None:
+        return None
+    try:
+        rows = conn.execute(f"{_SELECT_TEMPLATES} WHERE t.template_type = ? ORDER BY t.sort_order, t.id", (template_type,)).fetchall()
+        return [_row_to_dict(r) for r in rows]
+    except sqlite3.Error as e:
+        print(f"pdf_template_store.py: Fehler list_templates: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def list_templates(template_type: str) -> List[Dict[str, Any]]:
+    """Vorlagen eines Typs in Anzeigereihenfolge; nur Metadaten (bei Bildern ohne Bilddaten)."""
+    return _query_templates(template_type) or []
+
+
+def get_template(template_id: int) -> Optional[Dict[str, Any]]:
+    conn = _connect()
+    if conn is None:
+        return None
+    try:
+        row = conn.execute(f"{_SELECT_TEMPLATES} WHERE t.id = ?", (int(template_id),)).fetchone()
+        return _row_to_dict(row) if row else None
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        print(f"pdf_template_store.py: Fehler get_template: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def get_template_image(template_id: int) -> Optional[bytes]:
+    """Bilddaten einer Vorlage; wiederholte Zugriffe kommen aus dem Cache (Schlüssel: Inhalts-Hash)."""
+    conn = _connect()
+    if conn is None:
+        return None
+    try:
+        row = conn.execute("SELECT content_sha256 FROM pdf_templates WHERE id = ?", (int(template_id),)).fetchone()
+        sha256 = row[0] if row else None
+        if not sha256:
+            return None
+        with _cache_lock:
+            cached = _IMAGE_CACHE.get(sha256)
+            if cached is not None:
+                _IMAGE_CACHE.move_to_end(sha256)
+                return cached
+        blob_row = conn.execute("SELECT data FROM pdf_template_blobs WHERE sha256 = ?", (sha256,)).fetchone()
+        if blob_row is None or blob_row[0] is None:
+            return None
+        data = bytes(blob_row[0])
+        _cache_image(sha256, data)
+        return data
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        print(f"pdf_template_store.py: Fehler get_template_image: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def get_template_image_b64(template_id: int) -> Optional[str]:
+    data = get_template_image(template_id)
+    return base64.b64encode(data).decode("utf-8") if data else None
+
+
+def save_template(template_type: str, name: str, content: Optional[str] = None, image_data: Optional[bytes] = None,
+                  template_id: Optional[int] = None) -> Optional[int]:
+    """
+    Legt eine Vorlage an oder aktualisiert sie (template_id). Bei Bildvorlagen bleibt das
+    bisherige Bild erhalten, wenn image_data None ist.
+    """
+    name = str(name or "").strip()
+    if not name:
+        return None
+    conn = _connect()
+    if conn is None:
+        return None
+    now = datetime.now().isoformat()
+    try:
+        if template_id is None:
+            sha256 = _acquire_blob(conn, image_data) if image_data else None
+            next_order = conn.execute("SELECT COALESCE(MAX(sort_order), -1) + 1 FROM pdf_templates WHERE template_type = ?", (template_type,)).fetchone()[0]
+            cur = conn.execute(
+                "INSERT INTO pdf_templates (template_type, name, content, content_sha256, sort_order, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (template_type, name, content, sha256, next_order, now, now),
+            )
+            new_id = cur.lastrowid
+        else:
+            row = conn.execute("SELECT content_sha256 FROM pdf_templates WHERE id = ?", (int(template_id),)).fetchone()
+            if row is None:
+                return None
+            sha256 = row[0]
+            if image_data:
+                new_sha256 = _acquire_blob(conn, image_data)
+                _release_blob(conn, sha256)
+                sha256 = new_sha256
+            conn.execute(
+                "UPDATE pdf_templates SET name = ?, content = ?, content_sha256 = ?, updated_at = ? WHERE id = ?",
+                (name, content, sha256, now, int(template_id)),
+            )
+            new_id = int(template_id)
+        conn.commit()
+        return new_id
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"pdf_template_store.py: Fehler save_template: {e}")
+        traceback.print_exc()
+        return None
+    finally:
+        conn.close()
+
+
+def delete_template(template_id: int) -> bool:
+    conn = _connect()
+    if conn is None:
+        return False
+    try:
+        row = conn.execute("SELECT content_sha256 FROM pdf_templates WHERE id = ?", (int(template_id),)).fetchone()
+        if row is None:
+            return False
+        conn.execute("DELETE FROM pdf_templates WHERE id = ?", (int(template_id),))
+        _release_blob(conn, row[0])
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"pdf_template_store.py: Fehler delete_template: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def load_template_list(setting_key: str, fallback_loader: Optional[Callable[[str, Any], Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Vorlagenliste für die PDF-Oberflächen: [{'id', 'name', 'content'}] aus pdf_templates.
+
+    Bildvorlagen enthalten keine 'data'; die Bilddaten liefert resolve_template_image. Ist die
+    Tabelle nicht erreichbar, wird die alte Liste über fallback_loader geladen.
+    """
+    template_type = TEMPLATE_SETTING_KEYS.get(setting_key)
+    if template_type is not None:
+        templates = _query_templates(template_type)
+        if templates is not None:
+            return templates
+    if callable(fallback_loader):
+        value = fallback_loader(setting_key, [])
+        return value if isinstance(value, list) else []
+    return []
+
+
+def resolve_template_image(entry: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Base64-Bilddaten eines Listeneintrags (alte Einträge tragen sie direkt, neue per ID)."""
+    if not isinstance(entry, dict):
+        return None
+    if entry.get("data"):
+        return entry["data"]
+    if entry.get("id") is not None and entry.get("content_sha256"):
+        return get_template_image_b64(entry["id"])
+    return None
@@ -41,6 +41,25 @@ try:
 except (ImportError, ModuleNotFoundError): pass 
 except Exception: pass
 
+try:
+    from pdf_template_store import load_template_list, resolve_template_image
+except ImportError:
+    def load_template_list(setting_key, fallback_loader=None):
+        value = fallback_loader(setting_key, []) if callable(fallback_loader) else []
+        return value if isinstance(value, list) else []
+
+    def resolve_template_image(entry):
+        return entry.get('data') if isinstance(entry, dict) else None
+
+try:
+    from session_blob_store import offload_session_value, resolve as resolve_session_blob
+except ImportError:
+    def offload_session_value(slot, value, **kwargs):
+        return value
+
+    def resolve_session_blob(value, default=None):
+        return value
+
 # PDF-VORSCHAU INTEGRATION (NEU)
 try:
     from pdf_preview import show_pdf_preview_interface, create_pdf_template_presets
@@ -191,6 +210,8 @@ def render_pdf_ui(
             # NEU: Zusatzseiten (ab Seite 7) nur optional anhängen
             "append_additional_pages_after_main6": False,
             "append_additional_pages_after_main7": False,
+            # Größenoptimierung der fertigen PDF: None (aus), "email" oder "print"
+            "pdf_size_profile": None,
             # Wärmepumpen-spezifische dynamische Blöcke (Standard aktiv)
             "include_hp_line_items": True,
             "include_hp_total_price_block": True,
@@ -348,9 +369,10 @@ def render_pdf_ui(
     # Vorlagen und Presets laden
     title_image_templates, offer_title_templates, cover_letter_templates, pdf_presets = [], [], [], []
     try:
-        title_image_templates = load_admin_setting_func('pdf_title_image_templates', [])
-        offer_title_templates = load_admin_setting_func('pdf_offer_title_templates', [])
-        cover_letter_templates = load_admin_setting_func('pdf_cover_letter_templates', [])
+        # Vorlagen aus pdf_templates: nur Metadaten, Titelbilder werden erst bei Auswahl geladen
+        title_image_templates = load_template_list('pdf_title_image_templates', load_admin_setting_func)
+        offer_title_templates = load_template_list('pdf_offer_title_templates', load_admin_setting_func)
+        cover_letter_templates = load_template_list('pdf_cover_letter_templates', load_admin_setting_func)
         
         # KORREKTUR: `load_admin_setting_func` gibt bereits eine Liste zurück, wenn der Wert als JSON-Array gespeichert wurde.
         # Kein erneutes `json.loads` nötig.
@@ -381,7 +403,7 @@ def render_pdf_ui(
     
     # ... (Rest der Funktion render_pdf_ui wie in der vorherigen Antwort) ...    # (Initialisierung Session State für Vorlagenauswahl, Definitionen für "Alles auswählen/abwählen", Callbacks, UI-Elemente)
     if "selected_title_image_name_doc_output" not in st.session_state: st.session_state.selected_title_image_name_doc_output = title_image_templates[0]['name'] if title_image_templates and isinstance(title_image_templates[0], dict) else None
-    if "selected_title_image_b64_data_doc_output" not in st.session_state: st.session_state.selected_title_image_b64_data_doc_output = title_image_templates[0]['data'] if title_image_templates and isinstance(title_image_templates[0], dict) else None
+    if "selected_title_image_b64_data_doc_output" not in st.session_state: st.session_state.selected_title_image_b64_data_doc_output = resolve_template_image(title_image_templates[0]) if title_image_templates and isinstance(title_image_templates[0], dict) else None
     if "selected_offer_title_name_doc_output" not in st.session_state: st.session_state.selected_offer_title_name_doc_output = offer_title_templates[0]['name'] if offer_title_templates and isinstance(offer_title_templates[0], dict) else None
     if "selected_offer_title_text_content_doc_output" not in st.session_state: st.session_state.selected_offer_title_text_content_doc_output = offer_title_templates[0]['content'] if offer_title_templates and isinstance(offer_title_templates[0], dict) else ""
     if "selected_cover_letter_name_doc_output" not in st.session_state: st.session_state.selected_cover_letter_name_doc_output = cover_letter_templates[0]['name'] if cover_letter_templates and isinstance(cover_letter_templates[0], dict) else None
@@ -1094,11 +1116,11 @@ def render_pdf_ui(
         st.subheader(get_text_pdf_ui(texts, "pdf_config_header", "PDF-Konfiguration"))
         with st.container():
             st.markdown("**" + get_text_pdf_ui(texts, "pdf_template_selection_info", "Vorlagen für das Angebot auswählen") + "**")
-            title_image_options = {t.get('name', f"Bild {i+1}"): t.get('data') for i, t in enumerate(title_image_templates) if isinstance(t,dict) and t.get('name')}
+            title_image_options = {t.get('name', f"Bild {i+1}"): t for i, t in enumerate(title_image_templates) if isinstance(t,dict) and t.get('name')}
             if not title_image_options: title_image_options = {get_text_pdf_ui(texts, "no_title_images_available", "Keine Titelbilder verfügbar"): None}
             title_image_keys = list(title_image_options.keys()); idx_title_img = title_image_keys.index(st.session_state.selected_title_image_name_doc_output) if st.session_state.selected_title_image_name_doc_output in title_image_keys else 0
             selected_title_image_name = st.selectbox(get_text_pdf_ui(texts, "pdf_select_title_image", "Titelbild auswählen"), options=title_image_keys, index=idx_title_img, key="pdf_title_image_select_v13_form")
-            if selected_title_image_name != st.session_state.selected_title_image_name_doc_output : st.session_state.selected_title_image_name_doc_output = selected_title_image_name; st.session_state.selected_title_image_b64_data_doc_output = title_image_options.get(selected_title_image_name)
+            if selected_title_image_name != st.session_state.selected_title_image_name_doc_output : st.session_state.selected_title_image_name_doc_output = selected_title_image_name; st.session_state.selected_title_image_b64_data_doc_output = resolve_template_image(title_image_options.get(selected_title_image_name))
             offer_title_options = {t.get('name', f"Titel {i+1}"): t.get('content') for i, t in enumerate(offer_title_templates) if isinstance(t,dict) and t.get('name')}
             if not offer_title_options: offer_title_options = {get_text_pdf_ui(texts, "no_offer_titles_available", "Keine Angebotstitel verfügbar"): "Standard Angebotstitel"}
             offer_title_keys = list(offer_title_options.keys()); idx_offer_title = offer_title_keys.index(st.session_state.selected_offer_title_name_doc_output) if st.session_state.selected_offer_title_name_doc_output in offer_title_keys else 0
@@ -1121,6 +1143,20 @@ def render_pdf_ui(
                 key="pdf_cb_append_after_main7_v1"
             )
             append_after_main7_flag = bool(st.session_state.pdf_inclusion_options.get("append_additional_pages_after_main7", False))
+            size_profile_labels = {
+                None: get_text_pdf_ui(texts, "pdf_size_profile_none", "Original (keine Optimierung)"),
+                "email": get_text_pdf_ui(texts, "pdf_size_profile_email", "E-Mail (kompakt, 150 DPI)"),
+                "print": get_text_pdf_ui(texts, "pdf_size_profile_print", "Druck (hohe Qualität, 300 DPI)"),
+            }
+            size_profile_options = list(size_profile_labels.keys())
+            current_size_profile = st.session_state.pdf_inclusion_options.get("pdf_size_profile")
+            st.session_state.pdf_inclusion_options["pdf_size_profile"] = st.selectbox(
+                get_text_pdf_ui(texts, "pdf_size_profile_label", "PDF-Größe optimieren"),
+                options=size_profile_options,
+                index=size_profile_options.index(current_size_profile) if current_size_profile in size_profile_options else 0,
+                format_func=lambda option: size_profile_labels[option],
+                key="pdf_size_profile_select_v1"
+            )
 
             # Zusatzoptionen für Seiten ab 8 nur anzeigen, wenn der Schalter aktiv ist
             if append_after_main7_flag:
@@ -1284,7 +1320,7 @@ def render_pdf_ui(
                             texts=texts,
                             customer_data=project_data.get('customer_data', {})
                         )
-                        st.session_state.generated_pdf_bytes_for_download_v1 = pdf_bytes
+                        st.session_state.generated_pdf_bytes_for_download_v1 = offload_session_value('generated_pdf_bytes_for_download_v1', pdf_bytes)
                         st.success(" Fallback-PDF erfolgreich erstellt!")
                         return
                     else:
@@ -1333,7 +1369,7 @@ def render_pdf_ui(
                     active_company_id=active_company_id_for_docs, 
                     texts=texts
                 )
-            st.session_state.generated_pdf_bytes_for_download_v1 = pdf_bytes
+            st.session_state.generated_pdf_bytes_for_download_v1 = offload_session_value('generated_pdf_bytes_for_download_v1', pdf_bytes)
         except Exception as e_gen_final_outer: 
             st.error(f"{get_text_pdf_ui(texts, 'pdf_generation_exception_outer', 'Kritischer Fehler im PDF-Prozess (pdf_ui.py):')} {e_gen_final_outer}")
             st.text_area("Traceback PDF Erstellung (pdf_ui.py):", traceback.format_exc(), height=250)
@@ -1344,7 +1380,7 @@ def render_pdf_ui(
             st.rerun() 
     if 'generated_pdf_bytes_for_download_v1' in st.session_state:
         # Nicht poppen: Bytes im Session-State belassen, damit Button-Klicks (Reruns) weiterhin Zugriff haben
-        pdf_bytes_to_download = st.session_state.get('generated_pdf_bytes_for_download_v1') 
+        pdf_bytes_to_download = resolve_session_blob(st.session_state.get('generated_pdf_bytes_for_download_v1'), None)
         if pdf_bytes_to_download and isinstance(pdf_bytes_to_download, bytes):
             # Stabiler Timestamp/Dateiname über Reruns hinweg
             meta = st.session_state.get('generated_pdf_meta') or {}
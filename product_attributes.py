@@ -1,19 +1,55 @@
 # product_attributes.py
 # Flexible Produkt-Attributdatenbank (Key/Value) mit CRUD
+# Lesezugriffe laufen über einen Prozess-Cache je Produkt (eine IN-Abfrage für viele Produkte),
+# der von upsert_attribute/bulk_upsert/delete_attribute invalidiert wird. Schreibzugriffe anderer Prozesse
+# (z. B. tools/import_module_attributes_from_pdf.py) werden höchstens alle _REVALIDATE_SECONDS über
+# COUNT/MAX(updated_at) der Tabelle erkannt.
 from __future__ import annotations
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, Iterable, List, Tuple
 from datetime import datetime
+import re
 import sqlite3
+import os
+import threading
+import time
 import traceback
 
 try:
+    import database as _database
     from database import get_db_connection
 except Exception as e:
+    _database = None  # type: ignore
     get_db_connection = None  # type: ignore
     print(f"product_attributes.py: WARN - database.get_db_connection nicht verfügbar: {e}")
 
+MODULE_ALIAS_SETTING_KEY = "module_pdf_alias_map"
+
+_ATTRIBUTE_COLUMNS = ("id", "product_id", "category", "attribute_key", "attribute_value", "unit", "display_order", "updated_at")
+_SELECT_ATTRIBUTES = f"SELECT {', '.join(_ATTRIBUTE_COLUMNS)} FROM product_attributes"
+# Obergrenze für Parameter je IN-Abfrage (SQLite-Standardlimit älterer Versionen: 999)
+_BULK_QUERY_CHUNK_SIZE = 500
+# Der Tabellenstand wird höchstens so oft gegen die Datenbank geprüft (Sekunden)
+_REVALIDATE_SECONDS = 5.0
+
+_cache_lock = threading.Lock()
+_ENSURED_DATABASES: set = set()
+# (Datenbankpfad, product_id) -> Attributzeilen sortiert nach display_order, attribute_key
+_ATTRIBUTE_CACHE: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+_ALIAS_INDEXES: Dict[str, "ModuleAliasIndex"] = {}
+# Wird bei jeder Invalidierung erhöht; geladene Zeilen werden nur ohne zwischenzeitliche Invalidierung gespeichert
+_cache_generation = 0
+# Datenbankpfad -> (Tabellenstand, Zeitpunkt der letzten Prüfung)
+_TABLE_STAMPS: Dict[str, Tuple[Any, float]] = {}
+
+
+def _db_cache_key() -> str:
+    return str(getattr(_database, "DB_PATH", "") or "")
+
 
 def _ensure_tables(conn: sqlite3.Connection) -> None:
+    db_key = _db_cache_key()
+    if db_key and db_key in _ENSURED_DATABASES:
+        return
     cur = conn.cursor()
     cur.execute(
         """
@@ -32,6 +68,149 @@ def _ensure_tables(conn: sqlite3.Connection) -> None:
         """
     )
     conn.commit()
+    if db_key:
+        _ENSURED_DATABASES.add(db_key)
+
+
+def _row_to_dict(row: Any) -> Dict[str, Any]:
+    return dict(zip(_ATTRIBUTE_COLUMNS, tuple(row)))
+
+
+def _normalize_product_ids(product_ids: Iterable[Any]) -> List[int]:
+    ids: List[int] = []
+    seen = set()
+    for pid in product_ids:
+        try:
+            pid_int = int(pid)
+        except (TypeError, ValueError):
+            continue
+        if pid_int not in seen:
+            seen.add(pid_int)
+            ids.append(pid_int)
+    return ids
+
+
+def invalidate_attribute_cache(product_id: Optional[int] = None) -> None:
+    """Verwirft gecachte Attribute eines Produkts (oder aller Produkte bei product_id=None)."""
+    global _cache_generation
+    db_key = _db_cache_key()
+    with _cache_lock:
+        _cache_generation += 1
+        if product_id is None:
+            for cache_key in [k for k in _ATTRIBUTE_CACHE if k[0] == db_key]:
+                del _ATTRIBUTE_CACHE[cache_key]
+        else:
+            _ATTRIBUTE_CACHE.pop((db_key, int(product_id)), None)
+
+
+def _table_stamp(db_path: str) -> Any:
+    """Stand der Tabelle product_attributes (Zeilenzahl, letzte Änderung, höchste id; nur lesend)."""
+    if not db_path or not os.path.exists(db_path):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        return tuple(conn.execute("SELECT COUNT(*), MAX(updated_at), MAX(id) FROM product_attributes").fetchone())
+    except sqlite3.Error:
+        # Tabelle noch nicht angelegt
+        return None
+    finally:
+        conn.close()
+
+
+def _revalidate_cache(db_key: str) -> None:
+    """Verwirft den Cache einer Datenbank, wenn sich die Tabelle seit der letzten Prüfung geändert hat."""
+    now = time.monotonic()
+    with _cache_lock:
+        known = _TABLE_STAMPS.get(db_key)
+    if known is not None and now - known[1] < _REVALIDATE_SECONDS:
+        return
+    stamp = _table_stamp(db_key)
+    with _cache_lock:
+        _TABLE_STAMPS[db_key] = (stamp, now)
+    if known is not None and known[0] != stamp:
+        invalidate_attribute_cache()
+
+
+def _load_attribute_rows(product_ids: Iterable[Any]) -> Dict[int, List[Dict[str, Any]]]:
+    """Attributzeilen je Produkt; fehlende Produkte werden gemeinsam in einer IN-Abfrage (je Chunk) geladen."""
+    ids = _normalize_product_ids(product_ids)
+    db_key = _db_cache_key()
+    _revalidate_cache(db_key)
+    with _cache_lock:
+        generation = _cache_generation
+        rows_by_id = {pid: _ATTRIBUTE_CACHE[(db_key, pid)] for pid in ids if (db_key, pid) in _ATTRIBUTE_CACHE}
+    missing = [pid for pid in ids if pid not in rows_by_id]
+    if not missing or not get_db_connection:
+        return rows_by_id
+    conn = get_db_connection()
+    if not conn:
+        return rows_by_id
+    try:
+        _ensure_tables(conn)
+        loaded: Dict[int, List[Dict[str, Any]]] = {pid: [] for pid in missing}
+        for start in range(0, len(missing), _BULK_QUERY_CHUNK_SIZE):
+            chunk = missing[start:start + _BULK_QUERY_CHUNK_SIZE]
+            placeholders = ", ".join("?" for _ in chunk)
+            cur = conn.execute(
+                f"{_SELECT_ATTRIBUTES} WHERE product_id IN ({placeholders}) "
+                "ORDER BY product_id, display_order, attribute_key",
+                chunk,
+            )
+            for row in cur.fetchall():
+                record = _row_to_dict(row)
+                loaded[int(record["product_id"])].append(record)
+        with _cache_lock:
+            # Nur speichern, wenn zwischenzeitlich nicht invalidiert wurde (sonst evtl. alter Stand)
+            if _cache_generation == generation:
+                for pid, rows in loaded.items():
+                    _ATTRIBUTE_CACHE[(db_key, pid)] = rows
+        rows_by_id.update(loaded)
+    except Exception as e:
+        print(f"product_attributes._load_attribute_rows: Fehler: {e}")
+    finally:
+        conn.close()
+    return rows_by_id
+
+
+def get_attributes_bulk(product_ids: Iterable[Any], keys: Optional[Iterable[str]] = None) -> Dict[int, Dict[str, Optional[str]]]:
+    """Pivotierte Attribute mehrerer Produkte: {product_id: {attribute_key: attribute_value}}.
+
+    Nicht gecachte Produkte werden in einer indizierten IN-Abfrage geladen. Mit ``keys``
+    werden nur diese Attribute zurückgegeben; Produkte ohne Attribute liefern ein leeres dict.
+    """
+    wanted = None if keys is None else set(keys)
+    pivot: Dict[int, Dict[str, Optional[str]]] = {}
+    for pid, rows in _load_attribute_rows(product_ids).items():
+        pivot[pid] = {
+            r["attribute_key"]: r["attribute_value"]
+            for r in rows
+            if wanted is None or r["attribute_key"] in wanted
+        }
+    return pivot
+
+
+def _upsert_row(cur: sqlite3.Cursor, product_id: int, category: str, attribute_key: str, attribute_value: Optional[str], unit: Optional[str], display_order: Optional[int], now_iso: str) -> int:
+    # Versuche Update
+    cur.execute(
+        "SELECT id FROM product_attributes WHERE product_id = ? AND attribute_key = ?",
+        (int(product_id), attribute_key),
+    )
+    row = cur.fetchone()
+    if row:
+        attr_id = int(row[0])
+        cur.execute(
+            "UPDATE product_attributes SET attribute_value = ?, unit = ?, display_order = COALESCE(?, display_order), updated_at = ? WHERE id = ?",
+            (attribute_value, unit, display_order, now_iso, attr_id),
+        )
+        return attr_id
+    cur.execute(
+        "INSERT INTO product_attributes (product_id, category, attribute_key, attribute_value, unit, display_order, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (int(product_id), category, attribute_key, attribute_value, unit, display_order or 0, now_iso),
+    )
+    return int(cur.lastrowid)
 
 
 def upsert_attribute(product_id: int, category: str, attribute_key: str, attribute_value: Optional[str], unit: Optional[str] = None, display_order: Optional[int] = None) -> Optional[int]:
@@ -44,29 +223,9 @@ def upsert_attribute(product_id: int, category: str, attribute_key: str, attribu
         return None
     try:
         _ensure_tables(conn)
-        cur = conn.cursor()
-        now_iso = datetime.now().isoformat()
-        # Versuche Update
-        cur.execute(
-            "SELECT id FROM product_attributes WHERE product_id = ? AND attribute_key = ?",
-            (int(product_id), attribute_key),
-        )
-        row = cur.fetchone()
-        if row:
-            attr_id = int(row[0])
-            cur.execute(
-                "UPDATE product_attributes SET attribute_value = ?, unit = ?, display_order = COALESCE(?, display_order), updated_at = ? WHERE id = ?",
-                (attribute_value, unit, display_order, now_iso, attr_id),
-            )
-            conn.commit()
-            return attr_id
-        else:
-            cur.execute(
-                "INSERT INTO product_attributes (product_id, category, attribute_key, attribute_value, unit, display_order, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                (int(product_id), category, attribute_key, attribute_value, unit, display_order or 0, now_iso),
-            )
-            conn.commit()
-            return int(cur.lastrowid)
+        attr_id = _upsert_row(conn.cursor(), product_id, category, attribute_key, attribute_value, unit, display_order, datetime.now().isoformat())
+        conn.commit()
+        return attr_id
     except Exception as e:
         print(f"product_attributes.upsert_attribute: Fehler: {e}")
         traceback.print_exc()
@@ -77,71 +236,29 @@ def upsert_attribute(product_id: int, category: str, attribute_key: str, attribu
         return None
     finally:
         conn.close()
+        try:
+            invalidate_attribute_cache(int(product_id))
+        except (TypeError, ValueError):
+            pass
 
 
 def get_attribute(product_id: int, attribute_key: str) -> Optional[Dict[str, Any]]:
-    if not get_db_connection:
-        return None
-    conn = get_db_connection()
-    if not conn:
-        return None
     try:
-        _ensure_tables(conn)
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT id, product_id, category, attribute_key, attribute_value, unit, display_order, updated_at FROM product_attributes WHERE product_id = ? AND attribute_key = ?",
-            (int(product_id), attribute_key),
-        )
-        row = cur.fetchone()
-        if not row:
-            return None
-        return {
-            "id": row[0],
-            "product_id": row[1],
-            "category": row[2],
-            "attribute_key": row[3],
-            "attribute_value": row[4],
-            "unit": row[5],
-            "display_order": row[6],
-            "updated_at": row[7],
-        }
+        rows = _load_attribute_rows([product_id]).get(int(product_id)) or []
     except Exception:
         return None
-    finally:
-        conn.close()
+    for record in rows:
+        if record["attribute_key"] == attribute_key:
+            return dict(record)
+    return None
 
 
 def list_attributes(product_id: int) -> List[Dict[str, Any]]:
-    if not get_db_connection:
-        return []
-    conn = get_db_connection()
-    if not conn:
-        return []
     try:
-        _ensure_tables(conn)
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT id, product_id, category, attribute_key, attribute_value, unit, display_order, updated_at FROM product_attributes WHERE product_id = ? ORDER BY display_order, attribute_key",
-            (int(product_id),),
-        )
-        rows = cur.fetchall()
-        return [
-            {
-                "id": r[0],
-                "product_id": r[1],
-                "category": r[2],
-                "attribute_key": r[3],
-                "attribute_value": r[4],
-                "unit": r[5],
-                "display_order": r[6],
-                "updated_at": r[7],
-            }
-            for r in rows
-        ]
+        rows = _load_attribute_rows([product_id]).get(int(product_id)) or []
     except Exception:
         return []
-    finally:
-        conn.close()
+    return [dict(record) for record in rows]
 
 
 def delete_attribute(attribute_id: int) -> bool:
@@ -153,8 +270,11 @@ def delete_attribute(attribute_id: int) -> bool:
     try:
         _ensure_tables(conn)
         cur = conn.cursor()
+        row = cur.execute("SELECT product_id FROM product_attributes WHERE id = ?", (int(attribute_id),)).fetchone()
         cur.execute("DELETE FROM product_attributes WHERE id = ?", (int(attribute_id),))
         conn.commit()
+        if row:
+            invalidate_attribute_cache(int(row[0]))
         return cur.rowcount > 0
     except Exception as e:
         print(f"product_attributes.delete_attribute: Fehler: {e}")
@@ -173,12 +293,93 @@ def get_attribute_value(product_id: int, key: str) -> Optional[str]:
 
 
 def bulk_upsert(product_id: int, category: str, entries: List[Tuple[str, Optional[str], Optional[str], Optional[int]]]) -> int:
-    """entries: Liste aus (key, value, unit, display_order). Rückgabe: Anzahl Upserts."""
-    count = 0
-    for k, v, u, d in entries:
-        if upsert_attribute(product_id, category, k, v, u, d):
-            count += 1
-    return count
+    """entries: Liste aus (key, value, unit, display_order). Rückgabe: Anzahl Upserts.
+
+    Alle Einträge werden über eine Verbindung in einer Transaktion geschrieben.
+    """
+    if not entries:
+        return 0
+    if not get_db_connection:
+        print("product_attributes.bulk_upsert: DB nicht verfügbar")
+        return 0
+    conn = get_db_connection()
+    if not conn:
+        print("product_attributes.bulk_upsert: get_db_connection lieferte None")
+        return 0
+    try:
+        _ensure_tables(conn)
+        cur = conn.cursor()
+        now_iso = datetime.now().isoformat()
+        count = 0
+        for k, v, u, d in entries:
+            if _upsert_row(cur, product_id, category, k, v, u, d, now_iso):
+                count += 1
+        conn.commit()
+        return count
+    except Exception as e:
+        print(f"product_attributes.bulk_upsert: Fehler: {e}")
+        traceback.print_exc()
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        return 0
+    finally:
+        conn.close()
+        try:
+            invalidate_attribute_cache(int(product_id))
+        except (TypeError, ValueError):
+            pass
+
+
+# --- Alias-Index für module_pdf_alias_map (PDF-Spaltenname -> kanonischer Attribut-Key) ---
+def normalize_attribute_key(key: Any) -> str:
+    """Key-Normalisierung wie im PDF-Importer: klein, Whitespace -> ein Leerzeichen."""
+    try:
+        return re.sub(r"\s+", " ", str(key).strip().lower())
+    except Exception:
+        return ""
+
+
+class ModuleAliasIndex:
+    """Vorkompilierte Alias-Map in beide Richtungen (normalisiert)."""
+
+    def __init__(self, alias_map: Optional[Dict[str, Any]]):
+        self.by_alias: Dict[str, str] = {}
+        self.by_canonical: Dict[str, List[str]] = {}
+        for src_key, dst_key in (alias_map or {}).items():
+            if not src_key or not dst_key:
+                continue
+            self.by_alias[normalize_attribute_key(src_key)] = str(dst_key).strip()
+            self.by_canonical.setdefault(normalize_attribute_key(dst_key), []).append(str(src_key).strip())
+
+    def aliases_for(self, canonical_key: str) -> List[str]:
+        """Alle Alias-Keys (Originalschreibweise), die auf ``canonical_key`` abgebildet werden."""
+        return self.by_canonical.get(normalize_attribute_key(canonical_key), [])
+
+
+def invalidate_alias_index() -> None:
+    """Verwirft den kompilierten Alias-Index (beim Speichern von module_pdf_alias_map)."""
+    with _cache_lock:
+        _ALIAS_INDEXES.clear()
+
+
+def get_module_alias_index() -> ModuleAliasIndex:
+    """Alias-Index aus admin_settings; wird nach dem Speichern der Alias-Map einmal neu aufgebaut."""
+    db_key = _db_cache_key()
+    with _cache_lock:
+        index = _ALIAS_INDEXES.get(db_key)
+    if index is not None:
+        return index
+    alias_map: Any = {}
+    try:
+        alias_map = _database.load_admin_setting(MODULE_ALIAS_SETTING_KEY, {}) or {}
+    except Exception:
+        alias_map = {}
+    index = ModuleAliasIndex(alias_map if isinstance(alias_map, dict) else {})
+    with _cache_lock:
+        _ALIAS_INDEXES[db_key] = index
+    return index
 
 
 # --- Erweiterung: CSV Import/Export (nur neue Funktionen, bestehendes unberührt) ---
@@ -197,9 +398,10 @@ def export_attributes_to_csv(file_path: str, category: Optional[str] = None) ->
             return True
 
         rows_out = []
+        rows_by_id = _load_attribute_rows(int(p['id']) for p in products)
         for p in products:
             pid = int(p['id'])
-            attrs = list_attributes(pid)
+            attrs = [dict(a) for a in rows_by_id.get(pid, [])]
             if not attrs:
                 rows_out.append([pid, p.get('category') or '', p.get('model_name') or '', p.get('brand') or '', '', '', '', ''])
             else:
@@ -8,6 +8,8 @@ import json
 from typing import Dict, List, Optional, Any, Union, Tuple
 import traceback
 import os
+import threading
+import time
 import sys # KORREKTUR: sys-Modul importieren
 
 # Datenbankverbindung und Verfügbarkeitsstatus
@@ -65,6 +67,7 @@ def create_product_table(conn: sqlite3.Connection):
     """)
     conn.commit()
     _migrate_product_table_columns(conn) 
+    create_catalog_version_tracking(conn)
 
 def _migrate_product_table_columns(conn: sqlite3.Connection):
     cursor = conn.cursor()
@@ -141,6 +144,80 @@ def _migrate_product_table_columns(conn: sqlite3.Connection):
             except Exception as e_general_add: print(f"product_db.py: Allgemeiner Fehler beim Hinzufügen der Spalte '{col_name}': {e_general_add}"); traceback.print_exc()
     conn.commit()
 
+# Katalog-Version: ein Zähler in der DB, den Trigger bei jedem INSERT/UPDATE/DELETE auf
+# 'products' erhöhen – unabhängig davon, ob product_db, database_bridge oder Roh-SQL schreibt.
+# Prozessweite Caches (z.B. StorageModelResolver) vergleichen ihn, um veraltete Einträge zu erkennen.
+def create_catalog_version_tracking(conn: sqlite3.Connection):
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE IF NOT EXISTS product_catalog_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL DEFAULT 0)")
+    cursor.execute("INSERT OR IGNORE INTO product_catalog_version (id, version) VALUES (1, 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_products_catalog_version_{event.lower()}
+            AFTER {event} ON products
+            BEGIN
+                UPDATE product_catalog_version SET version = version + 1 WHERE id = 1;
+            END
+        """)
+    conn.commit()
+
+# In-Prozess-Cache der Katalog-Version: Lookups lesen die DB höchstens alle
+# _CATALOG_VERSION_TTL_SECONDS; Schreibpfade in diesem Prozess erhöhen den lokalen Zähler sofort.
+_CATALOG_VERSION_TTL_SECONDS = 2.0
+_catalog_version_lock = threading.Lock()
+_catalog_version_state: Dict[str, Any] = {"db_path": None, "db_version": 0, "checked_at": None, "local": 0}
+
+def bump_catalog_version():
+    """Nach Produkt-Schreibzugriffen in diesem Prozess aufrufen (Caches sofort ungültig, DB neu lesen)."""
+    with _catalog_version_lock:
+        _catalog_version_state["local"] += 1
+        _catalog_version_state["checked_at"] = None
+
+def _read_catalog_version(db_path: str) -> Any:
+    if not os.path.exists(db_path): return 0
+    try: conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    except sqlite3.Error: return 0
+    try:
+        try:
+            row = conn.execute("SELECT version FROM product_catalog_version WHERE id = 1").fetchone()
+            if row is not None: return int(row[0])
+        except sqlite3.OperationalError:
+            pass  # Trigger noch nicht angelegt (DB nie über product_db geöffnet)
+        try:
+            row = conn.execute("SELECT COUNT(*), MAX(updated_at) FROM products").fetchone()
+            return ("products", row[0], row[1])
+        except sqlite3.OperationalError:
+            return 0
+    finally: conn.close()
+
+def get_catalog_version() -> Any:
+    """
+    Aktuelle Katalog-Version (DB-Zähler, lokaler Schreibzähler).
+
+    Die DB wird nur nach Ablauf der TTL oder nach bump_catalog_version() gelesen;
+    Schreibzugriffe anderer Prozesse (Roh-SQL, database_bridge) sind nach spätestens
+    _CATALOG_VERSION_TTL_SECONDS sichtbar.
+    """
+    if not DB_AVAILABLE: return 0
+    try:
+        import database
+        db_path = database.DB_PATH
+    except Exception: return 0
+    now = time.monotonic()
+    with _catalog_version_lock:
+        state = _catalog_version_state
+        if (state["db_path"] == db_path and state["checked_at"] is not None
+                and now - state["checked_at"] < _CATALOG_VERSION_TTL_SECONDS):
+            return (state["db_version"], state["local"])
+        local_before = state["local"]
+    db_version = _read_catalog_version(db_path)
+    with _catalog_version_lock:
+        state = _catalog_version_state
+        # Ein zwischenzeitlicher bump_catalog_version() macht diesen Lesewert ungültig
+        if state["local"] == local_before:
+            state.update(db_path=db_path, db_version=db_version, checked_at=now)
+        return (db_version, state["local"])
+
 def add_product(product_data: Dict[str, Any]) -> Optional[int]:
     conn = get_db_connection_safe_pd()
     if conn is None: print("product_db.add_product: DB nicht verfügbar."); return None
@@ -176,7 +253,7 @@ def add_product(product_data: Dict[str, Any]) -> Optional[int]:
     fields = ', '.join(insert_data.keys()); placeholders = ', '.join(['?'] * len(insert_data))
     try:
         cursor.execute(f"INSERT INTO products ({fields}) VALUES ({placeholders})", list(insert_data.values()))
-        conn.commit(); product_id = cursor.lastrowid
+        conn.commit(); product_id = cursor.lastrowid; bump_catalog_version()
         print(f"product_db.add_product: Produkt '{insert_data['model_name']}' erfolgreich mit ID {product_id} hinzugefügt."); return product_id
     except sqlite3.Error as e: print(f"product_db.add_product: SQLite Fehler bei INSERT von '{insert_data.get('model_name', 'N/A')}': {e}"); traceback.print_exc(); conn.rollback(); return None
     finally: conn.close()
@@ -197,7 +274,7 @@ def update_product(product_id: Union[int, float], product_data: Dict[str, Any])
     if not update_data: print(f"product_db.update_product: Keine gültigen Felder zum Aktualisieren für ID {product_id}."); conn.close(); return False 
     fields_to_set = [f"{k}=?" for k in update_data.keys()]; values = list(update_data.values()); values.append(int(product_id))
     try:
-        cursor.execute(f"UPDATE products SET {', '.join(fields_to_set)} WHERE id=?", values); conn.commit()
+        cursor.execute(f"UPDATE products SET {', '.join(fields_to_set)} WHERE id=?", values); conn.commit(); bump_catalog_version()
         if cursor.rowcount > 0: print(f"product_db.update_product: Produkt ID {product_id} erfolgreich aktualisiert."); return True
         else: print(f"product_db.update_product: Produkt ID {product_id} nicht gefunden."); return False
     except sqlite3.Error as e: print(f"product_db.update_product: SQLite Fehler für ID {product_id}: {e}"); traceback.print_exc(); conn.rollback(); return False
@@ -208,7 +285,7 @@ def delete_product(product_id: Union[int, float]) -> bool:
     if conn is None: print("product_db.delete_product: DB nicht verfügbar."); return False
     create_product_table(conn); cursor = conn.cursor()
     try:
-        cursor.execute("DELETE FROM products WHERE id=?", (int(product_id),)); conn.commit(); deleted_count = cursor.rowcount
+        cursor.execute("DELETE FROM products WHERE id=?", (int(product_id),)); conn.commit(); bump_catalog_version(); deleted_count = cursor.rowcount
         if deleted_count > 0: print(f"product_db.delete_product: Produkt ID {product_id} erfolgreich gelöscht.")
         else: print(f"product_db.delete_product: Produkt ID {product_id} nicht gefunden, nichts gelöscht.")
         return deleted_count > 0
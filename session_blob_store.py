@@ -0,0 +1,419 @@
+# session_blob_store.py
+# Auslagerung großer Werte (Bytes, DataFrames, Serien) aus st.session_state
+# Große Werte landen als Datei unter <SESSION_BLOB_DIR>/<session_id>/ und in einem gemeinsamen, größenbegrenzten
+# LRU-Speicher; im Session State bleiben nur BlobHandle-Objekte. Jede Session hat ein Kontingent, inaktive
+# Sessions verfallen nach einer TTL. Ergebnis-Dicts werden als LazyBlobDict abgelegt, das Handles beim Zugriff
+# transparent auflöst, sodass lesender Code (results.get('..._chart_bytes')) unverändert bleibt.
+# Ein Handle, dessen Blob verfallen oder verdrängt ist, liefert bei .get(key[, default]) den default
+# (None) und protokolliert das; direkter Zugriff (results[key], handle.resolve()) löst BlobExpiredError aus.
+# Werte, deren Objekt sich seit dem letzten Auslagern nicht geändert hat (gleiche Identität, noch im LRU),
+# werden bei Reruns nicht erneut serialisiert und gehasht.
+from __future__ import annotations
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Set, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None  # type: ignore
+
+DEFAULT_BLOB_DIR = os.environ.get("SESSION_BLOB_DIR") or os.path.join(tempfile.gettempdir(), "kakerlake_session_blobs")
+DEFAULT_MEMORY_BUDGET_BYTES = 64 * 1024 * 1024
+DEFAULT_SESSION_QUOTA_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 4 * 3600
+# Werte ab dieser Größe werden ausgelagert
+DEFAULT_MIN_BYTES = 32 * 1024
+# Verschachtelte Dicts (z.B. calculation_results_backup['results']) bis zu dieser Tiefe durchsuchen
+_MAX_DEPTH = 3
+_PURGE_INTERVAL_SECONDS = 60
+_MISSING = object()
+
+
+class BlobExpiredError(KeyError):
+    """Der Blob hinter einem Handle ist verfallen (TTL), verdrängt (Kontingent) oder freigegeben."""
+
+    def __init__(self, handle: "BlobHandle"):
+        super().__init__(handle.key)
+        self.handle = handle
+
+    def __str__(self) -> str:
+        return (f"Blob '{self.handle.key}' der Session '{self.handle.session_id}' ist abgelaufen "
+                f"(verfallen, verdrängt oder freigegeben); bitte die Berechnung erneut ausführen.")
+
+
+@dataclass(frozen=True)
+class BlobHandle:
+    """Leichtgewichtiger Verweis auf einen ausgelagerten Wert."""
+    key: str
+    session_id: str
+    kind: str  # 'bytes' oder 'pickle'
+    size_bytes: int
+
+    def resolve(self, default: Any = _MISSING) -> Any:
+        return get_session_blob_store().get(self, default)
+
+
+def estimate_size(value: Any) -> int:
+    """Grobe Größe eines Werts in Bytes (0 für Werte, die nicht ausgelagert werden)."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if pd is not None and isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if pd is not None and isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=False))
+    if np is not None and isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (list, tuple)) and value and isinstance(value[0], (int, float)):
+        # Zahlenreihen (Monats-/Stundenwerte): 8 Byte je Wert plus Objekt-Overhead
+        return len(value) * 32
+    return 0
+
+
+class SessionBlobStore:
+    """Blob-Speicher je Streamlit-Session mit gemeinsamem LRU, Kontingent und Verfall."""
+
+    def __init__(self, root_dir: str = DEFAULT_BLOB_DIR, memory_budget_bytes: int = DEFAULT_MEMORY_BUDGET_BYTES,
+                 session_quota_bytes: int = DEFAULT_SESSION_QUOTA_BYTES, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.root_dir = root_dir
+        self.memory_budget_bytes = memory_budget_bytes
+        self.session_quota_bytes = session_quota_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.RLock()
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[Any, int]]" = OrderedDict()
+        self._memory_bytes = 0
+        # (session_id, id(Wert)) -> Key; nur für Werte im LRU (dort gehalten, die id bleibt also eindeutig)
+        self._identity: Dict[Tuple[str, int], str] = {}
+        # session_id -> key -> (Größe, letzter Zugriff)
+        self._blobs: Dict[str, "OrderedDict[str, Tuple[int, float]]"] = {}
+        # session_id -> slot -> Keys, die der Slot referenziert
+        self._slots: Dict[str, Dict[str, Set[str]]] = {}
+        self._last_access: Dict[str, float] = {}
+        self._last_purge = 0.0
+
+    # --- Pfade ---
+
+    def _session_dir(self, session_id: str) -> str:
+        safe = "".join(ch for ch in str(session_id) if ch.isalnum() or ch in "-_") or "default"
+        return os.path.join(self.root_dir, safe)
+
+    def _blob_path(self, session_id: str, key: str) -> str:
+        return os.path.join(self._session_dir(session_id), key)
+
+    # --- Speicher ---
+
+    def _remember(self, session_id: str, key: str, value: Any, size: int) -> None:
+        if size > self.memory_budget_bytes:
+            return
+        mem_key = (session_id, key)
+        if mem_key in self._memory:
+            self._memory.move_to_end(mem_key)
+            return
+        self._memory[mem_key] = (value, size)
+        self._memory_bytes += size
+        self._identity[(session_id, id(value))] = key
+        while self._memory_bytes > self.memory_budget_bytes and self._memory:
+            (evicted_session, _), (evicted_value, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+            self._identity.pop((evicted_session, id(evicted_value)), None)
+
+    def _forget(self, session_id: str, key: str) -> None:
+        entry = self._memory.pop((session_id, key), None)
+        if entry is not None:
+            self._memory_bytes -= entry[1]
+            self._identity.pop((session_id, id(entry[0])), None)
+
+    def _known_handle(self, session_id: str, value: Any) -> Optional[BlobHandle]:
+        # Caller hält self._lock; gleiche Objektidentität wie ein Wert im LRU -> gleicher Blob
+        key = self._identity.get((session_id, id(value)))
+        if key is None:
+            return None
+        entry = self._memory.get((session_id, key))
+        blobs = self._blobs.get(session_id)
+        if entry is None or entry[0] is not value or blobs is None or key not in blobs:
+            return None
+        now = time.time()
+        size = blobs[key][0]
+        blobs[key] = (size, now)
+        blobs.move_to_end(key)
+        self._memory.move_to_end((session_id, key))
+        self._last_access[session_id] = now
+        return BlobHandle(key=key, session_id=session_id, kind="bytes" if key.endswith(".bin") else "pickle",
+                          size_bytes=size)
+
+    def put(self, session_id: str, value: Any) -> BlobHandle:
+        """Lagert einen Wert aus und gibt den Handle zurück (Datei + gemeinsamer LRU)."""
+        self._maybe_purge()
+        with self._lock:
+            handle = self._known_handle(session_id, value)
+        if handle is not None and os.path.exists(self._blob_path(session_id, handle.key)):
+            return handle
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            kind, payload = "bytes", bytes(value)
+        else:
+            kind, payload = "pickle", pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        # Inhaltsadressiert: unveränderte Werte eines Reruns werden nicht erneut geschrieben
+        key = f"{hashlib.blake2b(payload, digest_size=16).hexdigest()}.{'bin' if kind == 'bytes' else 'pkl'}"
+        size = len(payload)
+        with self._lock:
+            known = key in self._blobs.get(session_id, {})
+        if not known or not os.path.exists(self._blob_path(session_id, key)):
+            session_dir = self._session_dir(session_id)
+            os.makedirs(session_dir, exist_ok=True)
+            tmp_path = os.path.join(session_dir, f".{key}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, self._blob_path(session_id, key))
+        now = time.time()
+        with self._lock:
+            self._blobs.setdefault(session_id, OrderedDict())[key] = (size, now)
+            self._last_access[session_id] = now
+            self._remember(session_id, key, value if kind == "pickle" else payload, size)
+            self._enforce_quota(session_id, protect=key)
+        return BlobHandle(key=key, session_id=session_id, kind=kind, size_bytes=size)
+
+    def get(self, handle: BlobHandle, default: Any = _MISSING) -> Any:
+        """
+        Löst einen Handle auf. Für verfallene oder verdrängte Blobs wird default geliefert bzw.
+        BlobExpiredError ausgelöst, wenn kein default angegeben ist.
+        """
+        now = time.time()
+        mem_key = (handle.session_id, handle.key)
+        with self._lock:
+            self._last_access[handle.session_id] = now
+            blobs = self._blobs.get(handle.session_id)
+            if blobs is not None and handle.key in blobs:
+                blobs[handle.key] = (blobs[handle.key][0], now)
+                blobs.move_to_end(handle.key)
+            entry = self._memory.get(mem_key)
+            if entry is not None:
+                self._memory.move_to_end(mem_key)
+                return entry[0]
+        try:
+            with open(self._blob_path(handle.session_id, handle.key), "rb") as f:
+                payload = f.read()
+        except OSError:
+            print(f"session_blob_store.py: {BlobExpiredError(handle)}")
+            if default is _MISSING:
+                raise BlobExpiredError(handle) from None
+            return default
+        value = payload if handle.kind == "bytes" else pickle.loads(payload)
+        with self._lock:
+            self._remember(handle.session_id, handle.key, value, len(payload))
+        return value
+
+    def delete(self, session_id: str, key: str) -> None:
+        with self._lock:
+            self._forget(session_id, key)
+            blobs = self._blobs.get(session_id)
+            if blobs is not None:
+                blobs.pop(key, None)
+        try:
+            os.remove(self._blob_path(session_id, key))
+        except OSError:
+            pass
+
+    def session_usage(self, session_id: str) -> int:
+        with self._lock:
+            return sum(size for size, _ in self._blobs.get(session_id, {}).values())
+
+    def _enforce_quota(self, session_id: str, protect: Optional[str] = None) -> None:
+        # Älteste (zuletzt am längsten nicht gelesene) Blobs der Session zuerst verwerfen
+        blobs = self._blobs.get(session_id)
+        if not blobs:
+            return
+        total = sum(size for size, _ in blobs.values())
+        for key in list(blobs.keys()):
+            if total <= self.session_quota_bytes:
+                break
+            if key == protect:
+                continue
+            total -= blobs[key][0]
+            self.delete(session_id, key)
+            for slot_keys in self._slots.get(session_id, {}).values():
+                slot_keys.discard(key)
+
+    # --- Slots: ein Session-State-Eintrag besitzt seine Blobs ---
+
+    def assign_slot(self, session_id: str, slot: str, keys: Iterable[str]) -> None:
+        """Setzt die Blobs eines Slots; nicht mehr referenzierte Blobs werden gelöscht."""
+        with self._lock:
+            slots = self._slots.setdefault(session_id, {})
+            previous = slots.get(slot, set())
+            slots[slot] = set(keys)
+            still_used = set().union(*slots.values()) if slots else set()
+            for key in previous - still_used:
+                self.delete(session_id, key)
+
+    def release_slot(self, session_id: str, slot: str) -> None:
+        self.assign_slot(session_id, slot, ())
+
+    # --- Verfall ---
+
+    def _maybe_purge(self) -> None:
+        now = time.time()
+        if now - self._last_purge < _PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        self.purge_expired(now)
+
+    def purge_expired(self, now: Optional[float] = None) -> List[str]:
+        """Entfernt Sessions, die länger als die TTL nicht benutzt wurden (auch Verzeichnisse früherer Prozesse)."""
+        now = time.time() if now is None else now
+        expired: List[str] = []
+        with self._lock:
+            for session_id, last in list(self._last_access.items()):
+                if now - last >= self.ttl_seconds:
+                    expired.append(session_id)
+            for session_id in expired:
+                self._drop_session(session_id)
+        with self._lock:
+            active_dirs = {os.path.basename(self._session_dir(s)) for s in self._last_access}
+        try:
+            entries = list(os.scandir(self.root_dir))
+        except OSError:
+            entries = []
+        for entry in entries:
+            if not entry.is_dir() or entry.name in active_dirs:
+                continue
+            try:
+                if now - entry.stat().st_mtime >= self.ttl_seconds:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    expired.append(entry.name)
+            except OSError:
+                pass
+        return expired
+
+    def _drop_session(self, session_id: str) -> None:
+        for mem_key in [k for k in self._memory if k[0] == session_id]:
+            self._forget(*mem_key)
+        for identity_key in [k for k in self._identity if k[0] == session_id]:
+            del self._identity[identity_key]
+        self._blobs.pop(session_id, None)
+        self._slots.pop(session_id, None)
+        self._last_access.pop(session_id, None)
+        shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+
+
+class LazyBlobDict(dict):
+    """
+    Dict, dessen Werte BlobHandle sein können; Zugriffe lösen Handles transparent auf.
+
+    __iter__ ist überschrieben, damit auch dict(x), {**x}, json und copy über __getitem__ gehen.
+    """
+
+    def __getitem__(self, key: Any) -> Any:
+        value = dict.__getitem__(self, key)
+        return value.resolve() if isinstance(value, BlobHandle) else value
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        # Wie dict.get: fehlende Schlüssel und abgelaufene Blobs liefern default (protokolliert in store.get)
+        if not dict.__contains__(self, key):
+            return default
+        value = dict.__getitem__(self, key)
+        return value.resolve(default) if isinstance(value, BlobHandle) else value
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(dict.keys(self))
+
+    def items(self):  # type: ignore[override]
+        return [(k, self[k]) for k in dict.keys(self)]
+
+    def values(self):  # type: ignore[override]
+        return [self[k] for k in dict.keys(self)]
+
+    def pop(self, key: Any, *default: Any) -> Any:
+        value = dict.pop(self, key, *default)
+        return value.resolve(*default) if isinstance(value, BlobHandle) else value
+
+    def copy(self) -> "LazyBlobDict":
+        # Flache Kopie teilt die Handles, nicht die Daten
+        return LazyBlobDict(dict.items(self))
+
+    def raw_items(self) -> List[Tuple[Any, Any]]:
+        return list(dict.items(self))
+
+    def materialize(self) -> Dict[Any, Any]:
+        return {k: (v.materialize() if isinstance(v, LazyBlobDict) else v) for k, v in self.items()}
+
+    def __reduce__(self):
+        return (dict, (self.materialize(),))
+
+
+def _offload(value: Any, session_id: str, store: SessionBlobStore, min_bytes: int, keys: Set[str], depth: int) -> Any:
+    if isinstance(value, BlobHandle):
+        keys.add(value.key)
+        return value
+    if isinstance(value, dict) and depth < _MAX_DEPTH:
+        source = value.raw_items() if isinstance(value, LazyBlobDict) else value.items()
+        return LazyBlobDict((k, _offload(v, session_id, store, min_bytes, keys, depth + 1)) for k, v in source)
+    if estimate_size(value) >= min_bytes:
+        handle = store.put(session_id, value)
+        keys.add(handle.key)
+        return handle
+    return value
+
+
+_store: Optional[SessionBlobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_blob_store() -> SessionBlobStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionBlobStore()
+        return _store
+
+
+def get_session_id() -> str:
+    """ID der aktuellen Streamlit-Session (außerhalb von Streamlit: 'default')."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        if ctx is not None and getattr(ctx, "session_id", None):
+            return str(ctx.session_id)
+    except Exception:
+        pass
+    return "default"
+
+
+def offload_session_value(slot: str, value: Any, session_id: Optional[str] = None, min_bytes: int = DEFAULT_MIN_BYTES) -> Any:
+    """
+    Bereitet einen Wert für st.session_state[slot] vor: große Teile werden ausgelagert.
+
+    Dicts werden zu LazyBlobDict, große Einzelwerte zu BlobHandle. Die Blobs eines früheren
+    Werts desselben Slots werden freigegeben, sofern kein anderer Slot sie noch referenziert.
+
+    Auch ein bereits ausgelagerter Wert, der unter einem weiteren Schlüssel abgelegt wird
+    (Alias, z.B. analysis_results = calculation_results), muss hierüber laufen: so wird der
+    Alias als eigener Slot registriert und behält seine Blobs, wenn der Ursprungsslot neu
+    belegt wird.
+    """
+    store = get_session_blob_store()
+    session_id = session_id or get_session_id()
+    keys: Set[str] = set()
+    try:
+        result = _offload(value, session_id, store, min_bytes, keys, 0)
+    except Exception as e:
+        print(f"session_blob_store.py: Auslagerung für '{slot}' fehlgeschlagen, Wert bleibt im Session State: {e}")
+        return value
+    store.assign_slot(session_id, slot, keys)
+    return result
+
+
+def resolve(value: Any, default: Any = _MISSING) -> Any:
+    """Gibt den Wert hinter einem Handle zurück (andere Werte unverändert); siehe SessionBlobStore.get."""
+    return value.resolve(default) if isinstance(value, BlobHandle) else value
@@ -274,6 +274,12 @@ class SolarCalculatorProductBridge:
                     labor_hours REAL
                 )
             ''')
+            # Katalog-Versions-Trigger, damit Caches (StorageModelResolver) diesen Import bemerken
+            try:
+                from product_db import create_catalog_version_tracking
+                create_catalog_version_tracking(conn)
+            except ImportError:
+                pass
             
             for item in mapped_rows:
                 # Capture stdout for each database operation
@@ -335,6 +341,11 @@ class SolarCalculatorProductBridge:
             
             conn.commit()
             conn.close()
+            try:
+                from product_db import bump_catalog_version
+                bump_catalog_version()
+            except ImportError:
+                pass
             
         except Exception as e:
             sys.stdout = old_stdout  # Ensure stdout is always restored
@@ -494,8 +505,13 @@ class SolarCalculatorProductBridge:
         ok = product_db.delete_product(pid)
         return {"success": bool(ok)}
 
-    def import_customers_from_file(self, file_path: str, dry_run: bool = False) -> Dict[str, Any]:
-        """Importiert Kunden aus CSV/XLSX/JSON. Nutzt crm.py wenn möglich."""
+    def import_customers_from_file(self, file_path: str, dry_run: bool = False, geocode: bool = False,
+                                   geocode_workers: int = 4) -> Dict[str, Any]:
+        """Importiert Kunden aus CSV/XLSX/JSON. Nutzt crm.py wenn möglich.
+
+        Mit geocode=True werden die Adressen gebündelt (geocoding.geocode_many, höchstens
+        geocode_workers parallele Anfragen) vorab geokodiert und landen im Geocode-Cache.
+        """
         ok, result = self._validate_import_path(file_path, ('.csv', '.xlsx', '.xls', '.json'))
         if not ok:
             return {"success": False, "error": result}
@@ -578,8 +594,13 @@ class SolarCalculatorProductBridge:
             if m:
                 mapped.append(m)
 
+        geocoded = self._geocode_customers(mapped, geocode_workers) if geocode else None
+
         if dry_run:
-            return {"success": True, "dry_run": True, "rows": len(mapped)}
+            result_dry = {"success": True, "dry_run": True, "rows": len(mapped)}
+            if geocoded is not None:
+                result_dry["geocoded"] = geocoded
+            return result_dry
 
         created = 0
         updated = 0
@@ -639,7 +660,24 @@ class SolarCalculatorProductBridge:
             except Exception as e2:
                 return {"success": False, "error": f"Import fehlgeschlagen: {e2}"}
 
-        return {"success": True, "created": created, "updated": updated, "skipped": skipped, "errors": errors[:5]}
+        result_import = {"success": True, "created": created, "updated": updated, "skipped": skipped, "errors": errors[:5]}
+        if geocoded is not None:
+            result_import["geocoded"] = geocoded
+        return result_import
+
+    def _geocode_customers(self, customers: List[Dict[str, Any]], max_workers: int) -> int:
+        """Geokodiert die Adressen importierter Kunden gebündelt; gibt die Anzahl Treffer zurück."""
+        try:
+            from geocoding import get_geocoding_service  # type: ignore
+            from database import load_admin_setting  # type: ignore
+        except Exception:
+            return 0
+        addresses = [c for c in customers if c.get('street') and c.get('city')]
+        if not addresses:
+            return 0
+        api_key = os.environ.get("Maps_API_KEY") or load_admin_setting("Maps_api_key", None)
+        service = get_geocoding_service(api_key)
+        return sum(1 for coords in service.geocode_many(addresses, max_workers=max_workers) if coords)
 
     def add_customer_document_from_path(self, customer_id: int, project_id: Optional[int], file_path: str, display_name: Optional[str], doc_type: str = "other") -> Dict[str, Any]:
         """Liest eine Datei von der Platte und speichert sie als Kundendokument über database.add_customer_document mit Whitelist/Limit."""
@@ -650,10 +688,9 @@ class SolarCalculatorProductBridge:
         ext = self._safe_ext(result)
         mime, _ = mimetypes.guess_type(result)
         try:
-            with open(result, 'rb') as f:
-                data = f.read()
             from database import add_customer_document  # type: ignore
-            doc_id = add_customer_document(int(customer_id), data, display_name or os.path.basename(result), doc_type=doc_type, project_id=int(project_id) if project_id is not None else None, suggested_filename=os.path.basename(result))
+            with open(result, 'rb') as f:
+                doc_id = add_customer_document(int(customer_id), f, display_name or os.path.basename(result), doc_type=doc_type, project_id=int(project_id) if project_id is not None else None, suggested_filename=os.path.basename(result))
             if not doc_id:
                 return {"success": False, "error": "Dokument konnte nicht gespeichert werden"}
             return {"success": True, "document_id": int(doc_id), "mime": mime or '', "ext": ext}
@@ -1336,7 +1373,7 @@ if __name__ == "__main__":
         elif command == "import_customers_from_file" and len(sys.argv) > 2:
             try:
                 payload = json.loads(sys.argv[2])
-                res = bridge.import_customers_from_file(payload.get('file_path', ''), dry_run=bool(payload.get('dry_run', False)))
+                res = bridge.import_customers_from_file(payload.get('file_path', ''), dry_run=bool(payload.get('dry_run', False)), geocode=bool(payload.get('geocode', False)))
                 print(json.dumps(res, default=str))
             except Exception as e:
                 print(json.dumps({"success": False, "error": str(e)}))
@@ -6,10 +6,100 @@ for use in price matrix lookups, with proper fallback handling.
 """
 
 import logging
-from typing import Optional, Callable, Dict, Any
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Optional, Callable, Dict, Any, List, Tuple
 
 logger = logging.getLogger(__name__)
 
+NO_STORAGE = "Ohne Speicher"
+_MAX_MATRIX_LAYOUTS = 4
+_MAX_CACHED_NAMES = 1024
+
+
+class _SharedResolutionCache:
+    """
+    Process-wide cache for resolved storage names.
+
+    Entries are keyed by (identity of the product lookup function, storage ID)
+    and tagged with the catalog version they were resolved under; an entry from
+    an older catalog version counts as a miss and is replaced on the next
+    lookup. At most _MAX_CACHED_NAMES entries are kept (LRU). Entries of a
+    lookup function are dropped once the function is garbage collected, so a
+    reused id() can never hit them.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.names: "OrderedDict[Tuple[Tuple[int, ...], int], Tuple[Any, str]]" = OrderedDict()
+        # function key -> references keeping the key's id()s meaningful
+        self.owners: Dict[Tuple[int, ...], Tuple[Any, ...]] = {}
+        # Filled by weakref callbacks (may run inside a locked section), purged under the lock
+        self.dead_keys: List[Tuple[int, ...]] = []
+        # matrix columns -> {model name: (column, is_exact_match)}
+        self.matrix_columns: Dict[Tuple[str, ...], Dict[str, Tuple[str, bool]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.prewarmed = 0
+
+    def clear(self) -> None:
+        with self.lock:
+            self.names.clear()
+            self.owners.clear()
+            self.dead_keys.clear()
+            self.matrix_columns.clear()
+            self.hits = self.misses = self.stale = self.prewarmed = 0
+
+    def function_key(self, get_product_func: Callable[[int], Optional[Dict[str, Any]]]) -> Tuple[int, ...]:
+        """Key for a lookup function; caller holds self.lock."""
+        self._purge_dead_keys()
+        # Bound methods are recreated on every attribute access: key on function and instance
+        func = getattr(get_product_func, "__func__", None)
+        targets = (func, get_product_func.__self__) if func is not None else (get_product_func,)
+        key = tuple(id(target) for target in targets)
+        refs = self.owners.get(key)
+        if refs is not None and all(_dereference(ref) is target for ref, target in zip(refs, targets)):
+            return key
+        if refs is not None:
+            self._drop_function(key)
+        self.owners[key] = tuple(self._reference(target, key) for target in targets)
+        return key
+
+    def _reference(self, target: Any, key: Tuple[int, ...]) -> Any:
+        dead_keys = self.dead_keys
+        try:
+            return weakref.ref(target, lambda _ref: dead_keys.append(key))
+        except TypeError:
+            # Not weak-referenceable (e.g. builtins): keep it alive while it has entries
+            return target
+
+    def _purge_dead_keys(self) -> None:
+        while self.dead_keys:
+            self._drop_function(self.dead_keys.pop())
+
+    def _drop_function(self, key: Tuple[int, ...]) -> None:
+        self.owners.pop(key, None)
+        for cache_key in [k for k in self.names if k[0] == key]:
+            del self.names[cache_key]
+
+
+_SHARED_CACHE = _SharedResolutionCache()
+
+
+def _dereference(ref: Any) -> Any:
+    return ref() if isinstance(ref, weakref.ref) else ref
+
+
+def get_catalog_version() -> Any:
+    """Current product catalog version (counter in the database, bumped by triggers on every product write)."""
+    try:
+        from product_db import get_catalog_version as _product_catalog_version
+        return _product_catalog_version()
+    except Exception:
+        return 0
+
 
 class StorageModelResolver:
     """
@@ -21,8 +111,8 @@ class StorageModelResolver:
     """
     
     def __init__(self):
-        """Initialize the StorageModelResolver."""
-        self._cache = {}  # Simple cache for resolved names
+        """Initialize the StorageModelResolver (all instances share one cache)."""
+        self._shared = _SHARED_CACHE
         logger.debug("StorageModelResolver initialized")
     
     def resolve_storage_name(self, 
@@ -64,37 +154,142 @@ class StorageModelResolver:
             logger.warning(f"Invalid storage_id format: '{storage_id}', returning 'Ohne Speicher'")
             return "Ohne Speicher"
         
-        # Step 4: Check cache first
-        cache_key = f"storage_{storage_id_int}"
-        if cache_key in self._cache:
-            cached_result = self._cache[cache_key]
-            logger.debug(f"Using cached result for storage_id {storage_id_int}: '{cached_result}'")
-            return cached_result
+        # Step 4: Check cache first (valid only for the current catalog version)
+        catalog_version = get_catalog_version()
+        with self._shared.lock:
+            cache_key = (self._shared.function_key(get_product_func), storage_id_int)
+            cached = self._shared.names.get(cache_key)
+            if cached is not None and cached[0] == catalog_version:
+                self._shared.names.move_to_end(cache_key)
+                self._shared.hits += 1
+                logger.debug(f"Using cached result for storage_id {storage_id_int}: '{cached[1]}'")
+                return cached[1]
+            self._shared.misses += 1
+            if cached is not None:
+                self._shared.stale += 1
         
         # Step 5: Try to get product details
         try:
             storage_details = get_product_func(storage_id_int)
         except Exception as e:
+            # Not cached: a transient database error must not stick process-wide
             logger.error(f"Error calling get_product_func for storage_id {storage_id_int}: {e}")
-            storage_details = None
+            return NO_STORAGE
         
         # Step 6: Extract model name
-        if not storage_details:
-            logger.warning(f"Storage product with ID {storage_id_int} not found in database")
-            result = "Ohne Speicher"
-        else:
-            model_name = storage_details.get('model_name')
-            if not model_name or not model_name.strip():
-                logger.warning(f"Storage product ID {storage_id_int} has no model_name")
-                result = "Ohne Speicher"
-            else:
-                result = model_name.strip()
-                logger.debug(f"Resolved storage_id {storage_id_int} to model_name: '{result}'")
+        result = self._model_name_from_details(storage_id_int, storage_details)
         
         # Step 7: Cache the result
-        self._cache[cache_key] = result
+        with self._shared.lock:
+            self._store_name(cache_key, catalog_version, result)
         
         return result
+
+    def _store_name(self, cache_key: Tuple[Tuple[int, ...], int], catalog_version: Any, name: str) -> None:
+        # Caller holds self._shared.lock
+        if cache_key[0] not in self._shared.owners:
+            return  # lookup function collected meanwhile
+        names = self._shared.names
+        names[cache_key] = (catalog_version, name)
+        names.move_to_end(cache_key)
+        while len(names) > _MAX_CACHED_NAMES:
+            names.popitem(last=False)
+
+    @staticmethod
+    def _model_name_from_details(storage_id: int, storage_details: Optional[Dict[str, Any]]) -> str:
+        if not storage_details:
+            logger.warning(f"Storage product with ID {storage_id} not found in database")
+            return NO_STORAGE
+        model_name = storage_details.get('model_name')
+        if not model_name or not model_name.strip():
+            logger.warning(f"Storage product ID {storage_id} has no model_name")
+            return NO_STORAGE
+        result = model_name.strip()
+        logger.debug(f"Resolved storage_id {storage_id} to model_name: '{result}'")
+        return result
+
+    def prewarm(self,
+                storage_products: List[Dict[str, Any]],
+                get_product_func: Callable[[int], Optional[Dict[str, Any]]],
+                matrix_columns: Optional[List[str]] = None) -> Dict[int, str]:
+        """
+        Bulk pre-resolution of storage products that are already loaded.
+
+        Fills the shared cache so later resolve_storage_name calls with the same
+        get_product_func need no database lookup. If matrix_columns are given,
+        each model is also matched against the matrix column index once.
+
+        Args:
+            storage_products: Product rows (need 'id' and 'model_name')
+            get_product_func: Lookup function the entries are cached for
+            matrix_columns: Price matrix columns (last one is "Ohne Speicher")
+
+        Returns:
+            Mapping storage_id -> resolved name (matrix column if columns given)
+        """
+        catalog_version = get_catalog_version()
+        resolved: Dict[int, str] = {}
+        for product in storage_products or []:
+            try:
+                storage_id = int(product.get('id'))
+            except (TypeError, ValueError):
+                continue
+            resolved[storage_id] = self._model_name_from_details(storage_id, product)
+
+        with self._shared.lock:
+            lookup_key = self._shared.function_key(get_product_func)
+            for storage_id, name in resolved.items():
+                self._store_name((lookup_key, storage_id), catalog_version, name)
+            self._shared.prewarmed += len(resolved)
+
+        if matrix_columns is None:
+            return resolved
+        column_index = self._column_index(matrix_columns)
+        with self._shared.lock:
+            for name in set(resolved.values()):
+                column_index[name] = self._match_column(name, matrix_columns)
+        return {storage_id: column_index[name][0] for storage_id, name in resolved.items()}
+
+    def resolve_matrix_column(self,
+                              storage_id: Optional[str],
+                              include_storage: bool,
+                              get_product_func: Callable[[int], Optional[Dict[str, Any]]],
+                              matrix_columns: List[str]) -> Tuple[str, bool]:
+        """
+        Resolve storage ID directly to the price matrix column.
+
+        Returns:
+            Tuple of (column name or "Ohne Speicher", is_exact_match)
+        """
+        name = self.resolve_storage_name(storage_id, include_storage, get_product_func)
+        if name == NO_STORAGE:
+            return NO_STORAGE, False
+        column_index = self._column_index(matrix_columns)
+        with self._shared.lock:
+            match = column_index.get(name)
+            if match is None:
+                match = column_index[name] = self._match_column(name, matrix_columns)
+        return match
+
+    def _column_index(self, matrix_columns: List[str]) -> Dict[str, Tuple[str, bool]]:
+        key = tuple(str(c) for c in matrix_columns)
+        with self._shared.lock:
+            index = self._shared.matrix_columns.get(key)
+            if index is None:
+                # A new matrix upload replaces the old column layout
+                if len(self._shared.matrix_columns) >= _MAX_MATRIX_LAYOUTS:
+                    self._shared.matrix_columns.pop(next(iter(self._shared.matrix_columns)))
+                index = self._shared.matrix_columns[key] = {}
+            return index
+
+    @staticmethod
+    def _match_column(name: str, matrix_columns: List[str]) -> Tuple[str, bool]:
+        # Same matching rule as PriceMatrix.get_price: trimmed, case-insensitive, last column excluded
+        normalized = name.strip().lower()
+        for column in list(matrix_columns)[:-1]:
+            if str(column).strip().lower() == normalized:
+                return str(column), True
+        return NO_STORAGE, False
     
     def normalize_storage_name(self, storage_name: str) -> str:
         """
@@ -160,8 +355,8 @@ class StorageModelResolver:
         return "Ohne Speicher", False
     
     def clear_cache(self) -> None:
-        """Clear the internal cache."""
-        self._cache.clear()
+        """Clear the shared cache (affects all resolver instances)."""
+        self._shared.clear()
         logger.debug("Storage resolver cache cleared")
     
     def get_cache_stats(self) -> dict:
@@ -171,10 +366,23 @@ class StorageModelResolver:
         Returns:
             Dictionary with cache information
         """
-        return {
-            "cache_size": len(self._cache),
-            "cached_items": list(self._cache.keys())
-        }
+        catalog_version = get_catalog_version()
+        with self._shared.lock:
+            keys = list(self._shared.names.keys())
+            current = sum(1 for version, _ in self._shared.names.values() if version == catalog_version)
+            lookups = self._shared.hits + self._shared.misses
+            return {
+                "cache_size": len(keys),
+                "cached_items": [f"storage_{storage_id}" for _, storage_id in keys],
+                "current_entries": current,
+                "catalog_version": catalog_version,
+                "hits": self._shared.hits,
+                "misses": self._shared.misses,
+                "stale_misses": self._shared.stale,
+                "hit_rate": (self._shared.hits / lookups) if lookups else 0.0,
+                "prewarmed": self._shared.prewarmed,
+                "matrix_column_indexes": len(self._shared.matrix_columns),
+            }
 
 
 # Convenience function for direct usage
@@ -0,0 +1,115 @@
+"""
+Tests for the derived-series and figure cache in analysis_series.
+
+Covers the compatibility of the NumPy series with the former list
+comprehensions, sharing of series across callers, invalidation by the input
+fingerprint and the figure/export cache used by the analysis dashboard.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+import analysis_series
+from analysis_series import DerivedSeriesCache, annual_cost_series, finite_array
+
+RESULTS = {
+    "simulation_period_years_effective": 3,
+    "annual_productions_sim": [1000.0, 990.0, float("nan"), 980.0],
+    "annual_pv_production_kwh": 1000.0,
+    "annual_benefits_sim": [100.0, 110.0, 120.0],
+    "monthly_direct_self_consumption_kwh": [20.0] * 12,
+    "monthly_storage_discharge_for_sc_kwh": [5.0] * 11 + ["k.A."],
+    "monthly_feed_in_kwh": [30.0] * 12,
+    "monthly_consumption_sim": [50.0] * 11 + [0.0],
+}
+
+
+class TestDerivedSeriesCache:
+    """Test cases for DerivedSeriesCache.series, figure and export_bytes."""
+
+    @pytest.fixture(autouse=True)
+    def cache(self):
+        """Use a fresh cache per test."""
+        self.cache = DerivedSeriesCache(max_figures=2)
+
+    def test_series_match_former_list_code(self):
+        """Test that the arrays equal the values the switchers computed before."""
+        assert finite_array([1, None, "x", float("inf"), 2.5]).tolist() == [1.0, 0.0, 0.0, 0.0, 2.5]
+        assert finite_array([1, float("nan"), 2], drop_invalid=True).tolist() == [1.0, 2.0]
+        assert annual_cost_series(1000.0, 4, 5.0).tolist() == [1000.0 * (1.05 ** i) for i in range(4)]
+        assert self.cache.series("cumulative_benefits", RESULTS).tolist() == [0.0, 100.0, 210.0, 330.0]
+
+        eigen, einspeisung = self.cache.series("selfuse_stack", RESULTS)
+        assert eigen.tolist() == pytest.approx([p * 0.295 for p in (1000.0, 990.0, 980.0)])
+        assert einspeisung.tolist() == pytest.approx([p * 0.36 for p in (1000.0, 990.0, 980.0)])
+
+        ratio = self.cache.series("monthly_selfuse_ratio", RESULTS)
+        assert ratio[0] == pytest.approx(50.0) and ratio[11] == pytest.approx(2000.0)
+        assert len(self.cache.series("monthly_selfuse_ratio", {"monthly_consumption_sim": [1.0] * 11})) == 0
+
+    def test_series_are_shared_and_invalidated_by_inputs(self, monkeypatch):
+        """Test that a series is computed once per input fingerprint and is read-only."""
+        calls = []
+        inputs, func = analysis_series._SERIES_REGISTRY["annual_benefits"]
+        monkeypatch.setitem(analysis_series._SERIES_REGISTRY, "annual_benefits",
+                            (inputs, lambda results, cache: calls.append(1) or func(results, cache)))
+
+        first = self.cache.series("annual_benefits", RESULTS)
+        assert self.cache.series("annual_benefits", dict(RESULTS, anlage_kwp=12.0)) is first
+        self.cache.series("cumulative_benefits", RESULTS)
+        assert len(calls) == 1
+        with pytest.raises(ValueError):
+            first[0] = 0.0
+
+        changed = dict(RESULTS, annual_benefits_sim=[100.0, 110.0, 130.0])
+        assert self.cache.series("cumulative_benefits", changed)[-1] == 340.0
+        assert len(calls) == 2
+
+    def test_figures_and_exports_are_reused(self):
+        """Test that figures are built once per key, handed out as copies and exported once per content."""
+        go = pytest.importorskip("plotly.graph_objects")
+        builds, exports = [], []
+
+        def build():
+            builds.append(1)
+            return go.Figure(go.Bar(x=[1, 2], y=[3, 4]))
+
+        def export(fig):
+            exports.append(fig)
+            return b"PNG"
+
+        fig = self.cache.figure("chart", ("fp", "Säulen"), build)
+        again = self.cache.figure("chart", ("fp", "Säulen"), build)
+        assert again is not fig and again.to_json() == fig.to_json()
+        assert self.cache.export_bytes(fig, export) == self.cache.export_bytes(again, export) == b"PNG"
+        assert len(builds) == 1 and len(exports) == 1
+
+        # Änderungen an einer Kopie erreichen weder den Cache noch deren Export
+        again.update_layout(title="geändert")
+        assert self.cache.figure("chart", ("fp", "Säulen"), build).layout.title.text is None
+        self.cache.export_bytes(again, export)
+        assert len(exports) == 2
+
+        assert self.cache.figure("chart", ("anders", "Säulen"), lambda: None) is None
+        self.cache.figure("chart", ("fp", "Strich"), build)
+        self.cache.figure("other", ("fp",), build)
+        self.cache.figure("chart", ("fp", "Säulen"), build)
+        assert len(builds) == 4
+
+        # Objekte ohne to_json werden jedes Mal exportiert
+        loose = object()
+        self.cache.export_bytes(loose, export)
+        self.cache.export_bytes(loose, export)
+        assert exports.count(loose) == 2
+
+    def test_fingerprint_distinguishes_inputs(self):
+        """Test that equal values hash equally and changed or missing keys do not."""
+        keys = ("annual_benefits_sim", "fehlt")
+        assert analysis_series.results_fingerprint(RESULTS, keys) == analysis_series.results_fingerprint(dict(RESULTS), keys)
+        assert analysis_series.results_fingerprint(RESULTS, keys) != analysis_series.results_fingerprint(
+            dict(RESULTS, fehlt=0), keys
+        )
+        assert analysis_series.fingerprint([1.0, 2.0], "a") != analysis_series.fingerprint([1.0], [2.0], "a")
+        assert not math.isnan(float(np.sum(self.cache.series("cumulative_cash_flows", {}))))
@@ -0,0 +1,125 @@
+"""
+Tests for the merged brand-logo index in brand_logo_db.
+
+Covers source priority between admin_settings and the brand_logos table,
+alias/suffix/case normalization, decoded image bytes and invalidation by the
+write functions and save_admin_setting.
+"""
+
+import base64
+import json
+import sqlite3
+
+import pytest
+
+import brand_logo_db
+import database
+
+PNG = b"\x89PNG\r\n\x1a\n-logo"
+JPEG = b"\xff\xd8\xff-logo"
+PNG_B64 = base64.b64encode(PNG).decode()
+JPEG_B64 = base64.b64encode(JPEG).decode()
+
+
+class TestBrandLogoIndex:
+    """Test cases for resolve_brand_logo, get_logos_for_brands and database.get_brand_logo."""
+
+    @pytest.fixture(autouse=True)
+    def logo_db(self, tmp_path, monkeypatch):
+        """Use a temporary database with logos in all three sources."""
+        monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app_data.db"))
+        conn = sqlite3.connect(database.DB_PATH)
+        conn.execute("CREATE TABLE admin_settings (key TEXT PRIMARY KEY, value TEXT, last_modified TEXT)")
+        conn.executemany("INSERT INTO admin_settings (key, value) VALUES (?, ?)", [
+            ("brand_logo_Huawei", "data:image/jpeg;base64," + JPEG_B64),
+            ("brand_logos", json.dumps({"SMA": JPEG_B64, "Leer": ""})),
+            ("brand_logo_aliases", json.dumps({"BYD Battery-Box": "BYD"})),
+        ])
+        conn.commit()
+        conn.close()
+        brand_logo_db.invalidate_brand_logo_index()
+        for brand in ("Huawei", "BYD", "Fronius International", "SMA"):
+            assert brand_logo_db.add_brand_logo(brand, PNG_B64, "PNG")
+        yield
+        brand_logo_db.invalidate_brand_logo_index()
+
+    def test_sources_priority_and_decoded_bytes(self):
+        """Test that admin settings win over the table and images are decoded once."""
+        huawei = brand_logo_db.resolve_brand_logo("Huawei")
+        assert huawei["source"] == "admin_setting"
+        assert huawei["logo_bytes"] == JPEG and huawei["logo_format"] == "JPEG"
+        assert brand_logo_db.resolve_brand_logo("SMA")["source"] == "admin_map"
+        byd = brand_logo_db.resolve_brand_logo("BYD")
+        assert byd["source"] == "brand_logos" and byd["logo_bytes"] == PNG
+        assert database.get_brand_logo(" Huawei ").endswith(JPEG_B64)
+        assert database.get_brand_logo("Leer") is None
+
+    def test_alias_case_and_suffix_normalization(self):
+        """Test the lookup variants used for page 4 manufacturer names."""
+        assert brand_logo_db.resolve_brand_logo("BYD Battery-Box")["brand_name"] == "BYD"
+        assert brand_logo_db.resolve_brand_logo("byd")["brand_name"] == "BYD"
+        assert brand_logo_db.resolve_brand_logo("FroniusInternational")["brand_name"] == "Fronius International"
+        assert brand_logo_db.resolve_brand_logo("BYDSpeicher")["brand_name"] == "BYD"
+        assert brand_logo_db.resolve_brand_logo("HuaweiWR")["source"] == "admin_setting"
+        assert brand_logo_db.resolve_brand_logo("Unbekannt") is None
+
+        logos = brand_logo_db.get_logos_for_brands(["HuaweiWR", "Unbekannt", "BYD"])
+        assert set(logos) == {"HuaweiWR", "BYD"}
+        logos["BYD"]["logo_base64"] = "verändert"
+        assert brand_logo_db.resolve_brand_logo("BYD")["logo_base64"] == PNG_B64
+
+    def test_index_is_built_once_and_invalidated_by_writes(self, monkeypatch):
+        """Test that lookups reuse the index and every write path rebuilds it."""
+        builds = []
+        original_build = brand_logo_db._build_brand_logo_index
+
+        def counting_build(conn):
+            builds.append(1)
+            return original_build(conn)
+
+        monkeypatch.setattr(brand_logo_db, "_build_brand_logo_index", counting_build)
+        for brand in ("Huawei", "BYD", "SMA", "Fronius International", "BYDSpeicher"):
+            brand_logo_db.resolve_brand_logo(brand)
+        assert len(builds) == 1
+
+        assert brand_logo_db.deactivate_brand_logo("BYD")
+        assert brand_logo_db.resolve_brand_logo("BYD") is None
+        assert brand_logo_db.add_brand_logo("BYD", JPEG_B64, "JPEG")
+        assert brand_logo_db.resolve_brand_logo("BYD") is None  # weiterhin deaktiviert
+        assert brand_logo_db.delete_brand_logo("Fronius International")
+        assert brand_logo_db.resolve_brand_logo("Fronius International") is None
+        assert database.save_admin_setting("brand_logos", {"Fronius": PNG_B64})
+        assert brand_logo_db.resolve_brand_logo("Fronius International") is None
+        assert brand_logo_db.resolve_brand_logo("fronius")["source"] == "admin_map"
+        assert len(builds) == 5
+
+    def test_invalidation_during_build_is_not_lost(self, monkeypatch):
+        """Test that an index built across a concurrent invalidation is not cached."""
+        original_build = brand_logo_db._build_brand_logo_index
+
+        def build_then_write(conn):
+            index = original_build(conn)
+            brand_logo_db.invalidate_brand_logo_index()  # Schreibzugriff eines anderen Threads
+            return index
+
+        monkeypatch.setattr(brand_logo_db, "_build_brand_logo_index", build_then_write)
+        brand_logo_db.resolve_brand_logo("BYD")
+        monkeypatch.setattr(brand_logo_db, "_build_brand_logo_index", original_build)
+        assert brand_logo_db._LOGO_INDEXES == {}
+
+    def test_admin_ui_writes_invalidate_index(self):
+        """Test that uploads through the admin logo UI are visible without a restart."""
+        admin_ui = pytest.importorskip("admin_brand_logo_management_ui")
+        conn = sqlite3.connect(database.DB_PATH)
+        for column in ("description", "website_url", "country", "category"):
+            conn.execute(f"ALTER TABLE brand_logos ADD COLUMN {column} TEXT DEFAULT ''")
+        conn.commit()
+        conn.close()
+        admin = admin_ui.BrandLogoAdmin(db_path=database.DB_PATH)
+
+        assert brand_logo_db.resolve_brand_logo("Sungrow") is None
+        assert admin.add_brand_logo({"brand_name": "Sungrow", "logo_base64": PNG_B64})
+        assert brand_logo_db.resolve_brand_logo("Sungrow")["logo_bytes"] == PNG
+        brand_id = admin.get_brand_by_name("Sungrow")["id"]
+        assert admin.delete_brand_logo(brand_id)
+        assert brand_logo_db.resolve_brand_logo("Sungrow") is None
@@ -0,0 +1,98 @@
+"""
+Tests for backend selection in PDFSystemManager.
+
+Covers the ordered fallback chain (each backend tried at most once per
+request), input preflight and the per-backend circuit breaker.
+"""
+
+from central_pdf_system import PDFSystemManager
+
+
+class TestPDFSystemManager:
+    """Test cases for PDFSystemManager.generate_pdf."""
+
+    def setup_method(self):
+        """Replace the probed backends with counting stubs."""
+        self.manager = PDFSystemManager()
+        self.calls = []
+        self.manager.available_systems = {
+            'mega_hybrid': self._backend('mega_hybrid', None),
+            'tom90': self._backend('tom90', RuntimeError("renderer crashed")),
+            'standard': self._backend('standard', b'%PDF-standard'),
+        }
+        self.manager._capabilities = {'mega_hybrid': True, 'tom90': True, 'standard': True, 'preview': False}
+        self.manager._try_emergency_fallback = lambda *args, **kwargs: b'%PDF-emergency'
+
+    def _backend(self, name, outcome):
+        def render(*args, **kwargs):
+            self.calls.append(name)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        return render
+
+    def test_chain_tries_each_backend_once(self):
+        """Test that failing backends fall through in priority order without retries."""
+        result = self.manager.generate_pdf("tom90", project_data={})
+        assert result == b'%PDF-standard'
+        assert self.calls == ['tom90', 'mega_hybrid', 'standard']
+        statuses = [(a['system'], a['status']) for a in self.manager.get_last_attempts()]
+        assert statuses == [('tom90', 'error'), ('mega_hybrid', 'empty'), ('standard', 'success')]
+
+    def test_unavailable_backend_is_skipped_without_rendering(self):
+        """Test that backends without capability are never called."""
+        self.manager._capabilities['mega_hybrid'] = False
+        assert self.manager.get_best_available_system() == 'tom90'
+        self.manager.generate_pdf("auto", project_data={})
+        assert 'mega_hybrid' not in self.calls
+        assert self.manager.get_last_attempts()[1] == {
+            'system': 'mega_hybrid', 'status': 'skipped', 'reason': 'nicht verfügbar', 'duration_s': 0.0,
+        }
+
+    def test_invalid_input_short_circuits(self):
+        """Test that malformed requests fail before any backend runs."""
+        assert self.manager.generate_pdf("standard", project_data=None) is None
+        assert self.manager.generate_pdf("standard", project_data={}, company_info="ACME") is None
+        assert self.calls == []
+        assert self.manager.get_last_attempts()[0]['status'] == 'invalid'
+
+    def test_circuit_breaker_opens_after_consecutive_failures(self):
+        """Test that a repeatedly failing backend is skipped until the cooldown expires."""
+        for _ in range(PDFSystemManager.CIRCUIT_BREAKER_THRESHOLD):
+            self.manager.generate_pdf("tom90", project_data={})
+        assert self.calls.count('tom90') == PDFSystemManager.CIRCUIT_BREAKER_THRESHOLD
+        assert self.manager.can_render('tom90') == (False, "Circuit Breaker offen")
+
+        self.calls.clear()
+        assert self.manager.generate_pdf("tom90", project_data={}) == b'%PDF-standard'
+        assert 'tom90' not in self.calls
+        assert self.manager.get_backend_health()['tom90']['circuit_open'] is True
+
+        # Abkühlzeit abgelaufen: genau ein Probeversuch, der den Breaker erneut öffnet
+        self.manager._backend_health['tom90']['opened_at'] -= PDFSystemManager.CIRCUIT_BREAKER_COOLDOWN_S + 1
+        self.calls.clear()
+        self.manager.generate_pdf("tom90", project_data={})
+        assert self.calls.count('tom90') == 1
+        assert self.manager.can_render('tom90')[0] is False
+
+    def test_success_resets_circuit_breaker(self):
+        """Test that a successful render clears the failure streak."""
+        self.manager._register_outcome('standard', False, 'x')
+        self.manager._register_outcome('standard', False, 'x')
+        self.manager.generate_pdf("standard", project_data={})
+        health = self.manager.get_backend_health()['standard']
+        assert health['consecutive_failures'] == 0
+        assert health['successes'] == 1
+
+    def test_all_backends_failing_uses_emergency_pdf(self):
+        """Test that the emergency PDF is returned once every backend failed."""
+        self.manager.available_systems['standard'] = self._backend('standard', None)
+        assert self.manager.generate_pdf("auto", project_data={}) == b'%PDF-emergency'
+        assert self.calls == ['mega_hybrid', 'tom90', 'standard']
+        assert self.manager.get_last_attempts()[-1]['system'] == 'emergency'
+
+    def test_system_status_is_cached(self):
+        """Test that status queries reuse the probe from startup."""
+        status = self.manager.get_system_status()
+        assert status['standard'] is True
+        assert {'tom90', 'mega_hybrid', 'preview'} <= set(status)
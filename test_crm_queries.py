@@ -0,0 +1,89 @@
+"""
+Tests for the indexed CRM queries in crm.
+
+Covers the index usage for project lookups, FTS5 customer search kept in sync
+by triggers, keyset pagination and the cached column lists.
+"""
+
+import sqlite3
+
+import pytest
+
+import crm
+
+
+def _customer(first, last, **extra):
+    data = {"first_name": first, "last_name": last}
+    data.update(extra)
+    return data
+
+
+class TestCrmQueries:
+    """Test cases for ensure_crm_indexes, list_customers_page, list_projects_page and search_customers."""
+
+    @pytest.fixture(autouse=True)
+    def conn(self, tmp_path):
+        """Create the CRM tables in a temporary database."""
+        self.conn = sqlite3.connect(str(tmp_path / "crm.db"))
+        self.conn.row_factory = sqlite3.Row
+        crm.create_tables_crm(self.conn)
+        yield self.conn
+        self.conn.close()
+
+    def test_project_lookup_uses_index(self):
+        """Test that customer and status filters are served by indexes."""
+        plan = " ".join(str(tuple(row)) for row in self.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM projects WHERE customer_id=?", (1,)))
+        assert "idx_projects_customer_id" in plan
+        plan = " ".join(str(tuple(row)) for row in self.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM customers ORDER BY last_name, first_name, id LIMIT 10"))
+        assert "idx_customers_name" in plan
+
+    def test_search_follows_inserts_updates_and_deletes(self):
+        """Test prefix search across name, city and email after changes."""
+        anna = crm.save_customer(self.conn, _customer("Anna", "Müller", city="Köln", email="anna@example.de"))
+        crm.save_customer(self.conn, _customer("Bernd", "Schulz", city="Kölleda"))
+        crm.save_customer(self.conn, _customer("Carla", "Meyer", city="Bonn"))
+
+        assert {c["last_name"] for c in crm.search_customers("Köl", conn=self.conn)} == {"Müller", "Schulz"}
+        assert [c["id"] for c in crm.search_customers("anna köln", conn=self.conn)] == [anna]
+        assert crm.search_customers('" OR *', conn=self.conn) == []
+
+        crm.save_customer(self.conn, {"id": anna, "first_name": "Anna", "last_name": "Schmidt", "city": "Bonn"})
+        assert [c["id"] for c in crm.search_customers("schmidt", conn=self.conn)] == [anna]
+        assert crm.search_customers("müller", conn=self.conn) == []
+
+        crm.delete_customer(self.conn, anna)
+        assert [c["first_name"] for c in crm.search_customers("bonn", conn=self.conn)] == ["Carla"]
+
+    def test_customer_pages_cover_all_rows_once(self):
+        """Test keyset pagination with duplicate names."""
+        for i in range(23):
+            crm.save_customer(self.conn, _customer(f"Vorname{i % 3}", f"Name{i % 5}"))
+        seen, cursor = [], None
+        while True:
+            page = crm.list_customers_page(self.conn, limit=5, after=cursor)
+            seen.extend(c["id"] for c in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        expected = [row[0] for row in self.conn.execute("SELECT id FROM customers ORDER BY last_name, first_name, id")]
+        assert seen == expected
+
+    def test_project_pages_filter_by_customer_and_status(self):
+        """Test that project pages respect filters and the after_id cursor."""
+        customer_id = crm.save_customer(self.conn, _customer("Anna", "Müller"))
+        for i in range(7):
+            crm.save_project(self.conn, {"customer_id": customer_id, "project_name": f"PV {i}",
+                                         "project_status": "Offen" if i % 2 else "Abgeschlossen"})
+        first = crm.list_projects_page(self.conn, customer_id=customer_id, status="Offen", limit=2)
+        second = crm.list_projects_page(self.conn, customer_id=customer_id, status="Offen", limit=2, after_id=first["next_cursor"])
+        assert [p["project_name"] for p in first["items"] + second["items"]] == ["PV 1", "PV 3", "PV 5"]
+        assert second["next_cursor"] is None
+
+    def test_column_cache_follows_schema_changes(self):
+        """Test that the cached column list is refreshed after ALTER TABLE."""
+        assert "notes" not in crm._table_columns(self.conn, "customers")
+        self.conn.execute("ALTER TABLE customers ADD COLUMN notes TEXT")
+        customer_id = crm.save_customer(self.conn, _customer("Anna", "Müller", notes="Rückruf"))
+        assert crm.load_customer(self.conn, customer_id)["notes"] == "Rückruf"
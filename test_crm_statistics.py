@@ -0,0 +1,90 @@
+"""
+Tests for the CRM pipeline statistics.
+
+Covers the trigger-maintained summary tables, period statistics with the
+funnel and previous-period comparison, and the backfill of existing leads.
+"""
+
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+
+import crm_statistics
+
+NOW = datetime(2026, 10, 18, 12, 0, tzinfo=timezone.utc)
+
+
+def _summary(conn):
+    return (conn.execute("SELECT * FROM crm_pipeline_summary WHERE lead_count != 0 ORDER BY stage").fetchall(),
+            conn.execute("SELECT * FROM crm_pipeline_monthly ORDER BY month").fetchall())
+
+
+class TestCrmStatistics:
+    """Test cases for get_pipeline_kpis, get_period_statistics and the summary triggers."""
+
+    @pytest.fixture(autouse=True)
+    def conn(self, tmp_path):
+        """Prepare a temporary database with some leads moving through the pipeline."""
+        self.conn = sqlite3.connect(str(tmp_path / "crm.db"))
+        crm_statistics.ensure_statistics_tables(self.conn)
+        self._add_leads(self.conn)
+        yield self.conn
+        self.conn.close()
+
+    @staticmethod
+    def _add_leads(conn):
+        for i in range(10):
+            conn.execute(
+                "INSERT INTO crm_leads (company_name, contact_person, lead_source, estimated_value, stage, "
+                "created_at, stage_changed_at) VALUES (?, ?, ?, ?, 'lead', '2026-10-01 10:00:00', '2026-10-01 10:00:00')",
+                (f"Firma {i}", "Kontakt", "Website" if i % 2 else "Messe", 1000.0 * (i + 1)))
+        conn.execute("UPDATE crm_leads SET stage = 'qualified', stage_changed_at = '2026-10-05 10:00:00' WHERE id <= 6")
+        conn.execute("UPDATE crm_leads SET stage = 'won', stage_changed_at = '2026-10-11 10:00:00' WHERE id <= 3")
+        conn.execute("UPDATE crm_leads SET stage = 'lost', stage_changed_at = '2026-10-11 10:00:00' WHERE id = 4")
+        conn.execute(
+            "INSERT INTO crm_leads (company_name, contact_person, estimated_value, stage, created_at, stage_changed_at) "
+            "VALUES ('Vormonat', 'Kontakt', 9000, 'won', '2026-08-20 09:00:00', '2026-09-10 09:00:00')")
+        conn.commit()
+
+    def test_incremental_summary_matches_rebuild(self):
+        """Test that the trigger-maintained totals equal a full recomputation, also after deletes."""
+        self.conn.execute("DELETE FROM crm_leads WHERE id IN (2, 7)")
+        self.conn.commit()
+        incremental = _summary(self.conn)
+        crm_statistics.rebuild_pipeline_summary(self.conn)
+        assert _summary(self.conn) == incremental
+
+    def test_pipeline_kpis(self):
+        """Test the O(1) dashboard KPIs."""
+        kpis = crm_statistics.get_pipeline_kpis(self.conn, now=NOW)
+        assert kpis['total_leads'] == 11
+        assert kpis['active_leads'] == 6
+        assert kpis['total_pipeline_value'] == 5000 + 6000 + 7000 + 8000 + 9000 + 10000
+        assert kpis['conversion_rate'] == pytest.approx(80.0)
+        assert kpis['new_leads_this_month'] == 10
+        assert kpis['avg_sales_cycle'] == pytest.approx((3 * 10 + 21) / 4)
+        assert kpis['leads_by_stage'] == {'lead': 4, 'qualified': 2, 'won': 4, 'lost': 1}
+
+    def test_period_statistics(self):
+        """Test funnel, revenue and previous-period comparison for the last 30 days."""
+        stats = crm_statistics.get_period_statistics(self.conn, 'last_30_days', now=NOW)
+        assert stats['new_leads'] == 10
+        assert (stats['won_deals'], stats['won_value'], stats['lost_deals']) == (3, 6000.0, 1)
+        assert stats['conversion_rate'] == pytest.approx(75.0)
+        assert stats['avg_deal_size'] == pytest.approx(2000.0)
+        assert stats['deal_size_change'] == pytest.approx((2000 - 9000) / 9000 * 100)
+        assert stats['funnel_data'] == {'lead': 10, 'qualified': 6, 'proposal': 3, 'negotiation': 3, 'won': 3}
+        assert stats['source_performance']['Messe'] == {'count': 5, 'conversion_rate': 40.0}
+        assert stats['trend_data'] == {'September 2026': {'new_leads': 0, 'won_deals': 1},
+                                       'Oktober 2026': {'new_leads': 10, 'won_deals': 3}}
+        assert crm_statistics.get_monthly_revenue(self.conn, 2026)[8:10] == [9000.0, 6000.0]
+
+    def test_existing_leads_are_backfilled(self, tmp_path):
+        """Test that installing the triggers on an existing table builds the totals from the data."""
+        conn = sqlite3.connect(str(tmp_path / "alt.db"))
+        conn.execute(crm_statistics.LEADS_TABLE_SQL)
+        self._add_leads(conn)
+        crm_statistics.ensure_statistics_tables(conn)
+        assert _summary(conn) == _summary(self.conn)
+        conn.close()
@@ -0,0 +1,117 @@
+"""
+Tests for the content-addressed customer document store in database.
+
+Covers deduplication by SHA-256 with reference counting, streaming from file
+handles, deletion of shared content and the ref-count sweep in
+cleanup_orphaned_files.
+"""
+
+import io
+import os
+
+import pytest
+
+import database
+
+
+class TestCustomerDocumentStore:
+    """Test cases for add_customer_document, delete_customer_document and cleanup_orphaned_files."""
+
+    @pytest.fixture(autouse=True)
+    def data_dir(self, tmp_path, monkeypatch):
+        """Point the database and document directories to a temporary folder."""
+        monkeypatch.setattr(database, "DATA_DIR", str(tmp_path))
+        monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app_data.db"))
+        monkeypatch.setattr(database, "CUSTOMER_DOCS_BASE_DIR", str(tmp_path / "customer_docs"))
+        monkeypatch.setattr(database, "COMPANY_DOCS_BASE_DIR", str(tmp_path / "company_docs"))
+        monkeypatch.setattr(database, "CUSTOMER_DOC_STREAM_CHUNK_SIZE", 4096)
+        self.tmp_path = tmp_path
+
+    def _blobs(self):
+        conn = database.get_db_connection()
+        try:
+            return {row[0]: row[1] for row in conn.execute("SELECT sha256, ref_count FROM customer_document_blobs")}
+        finally:
+            conn.close()
+
+    def _blob_files(self):
+        blob_dir = self.tmp_path / "customer_docs" / "blobs"
+        return [name for _, _, files in os.walk(blob_dir) for name in files]
+
+    def test_identical_content_is_stored_once(self):
+        """Test that resending the same offer to several customers only adds references."""
+        offer = os.urandom(50_000)
+        ids = [database.add_customer_document(cid, offer, "Angebot", doc_type="offer_pdf", suggested_filename="Angebot.pdf")
+               for cid in (1, 2, 2)]
+        database.add_customer_document(1, b"Datenblatt", "Datenblatt.pdf")
+
+        assert all(ids) and len(set(ids)) == 3
+        assert sorted(self._blobs().values()) == [1, 3]
+        assert len(self._blob_files()) == 2
+        with open(database.get_customer_document_file_path(ids[1]), "rb") as f:
+            assert f.read() == offer
+        assert [d["file_name"] for d in database.list_customer_documents(2)] == ["Angebot.pdf", "Angebot.pdf"]
+
+    def test_streaming_from_file_handle(self):
+        """Test that file handles are read in chunks and give the same hash as bytes."""
+        content = os.urandom(20_000)
+        from_handle = database.add_customer_document(1, io.BytesIO(content), "gross.pdf")
+        from_bytes = database.add_customer_document(1, content, "gross.pdf")
+        assert self._blobs() and list(self._blobs().values()) == [2]
+        assert database.get_customer_document_file_path(from_handle) == database.get_customer_document_file_path(from_bytes)
+        assert database.add_customer_document(1, io.BytesIO(b""), "leer.pdf") is None
+        assert database.add_customer_document(1, b"", "leer.pdf") is None
+        assert not [name for name in self._blob_files() if name.startswith(".upload-")]
+
+    def test_shared_content_survives_until_last_reference(self):
+        """Test that deleting one document keeps content other documents still use."""
+        first = database.add_customer_document(1, b"gleich", "a.pdf")
+        second = database.add_customer_document(2, b"gleich", "b.pdf")
+        path = database.get_customer_document_file_path(second)
+
+        assert database.delete_customer_document(first)
+        assert os.path.exists(path) and list(self._blobs().values()) == [1]
+        assert database.delete_customer_document(second)
+        assert not os.path.exists(path) and self._blobs() == {}
+
+    def test_cleanup_sweeps_unreferenced_content(self):
+        """Test that the sweep fixes drifted counters and removes unreferenced content."""
+        kept = database.add_customer_document(1, b"bleibt", "a.pdf")
+        dropped = database.add_customer_document(1, b"weg", "b.pdf")
+        conn = database.get_db_connection()
+        conn.execute("DELETE FROM customer_documents WHERE id = ?", (dropped,))
+        conn.execute("UPDATE customer_document_blobs SET ref_count = 5")
+        conn.commit()
+        conn.close()
+
+        results = database.cleanup_orphaned_files()
+        assert results["blobs_removed"] == 1 and results["bytes_freed"] == len(b"weg")
+        assert list(self._blobs().values()) == [1]
+        assert os.path.exists(database.get_customer_document_file_path(kept))
+
+    def test_failed_insert_removes_new_blob_file(self, monkeypatch):
+        """Test that a rolled-back upload leaves neither a blob row nor an orphaned file."""
+        database.add_customer_document(1, b"vorhanden", "a.pdf")
+        original_create = database._create_customer_documents_table
+
+        def create_and_break_documents(conn):
+            original_create(conn)
+            conn.execute("CREATE TRIGGER IF NOT EXISTS fail_insert BEFORE INSERT ON customer_documents "
+                         "BEGIN SELECT RAISE(ABORT, 'kaputt'); END")
+            conn.commit()
+
+        monkeypatch.setattr(database, "_create_customer_documents_table", create_and_break_documents)
+        assert database.add_customer_document(1, b"neu", "b.pdf") is None
+        assert database.add_customer_document(2, b"vorhanden", "c.pdf") is None
+        assert list(self._blobs().values()) == [1]
+        assert len(self._blob_files()) == 1
+
+    def test_missing_file_of_known_blob_is_restored(self):
+        """Test that storing content again re-places a file that vanished from disk."""
+        first = database.add_customer_document(1, b"inhalt", "a.pdf")
+        path = database.get_customer_document_file_path(first)
+        os.remove(path)
+        second = database.add_customer_document(2, b"inhalt", "b.pdf")
+        assert database.get_customer_document_file_path(second) == path
+        with open(path, "rb") as f:
+            assert f.read() == b"inhalt"
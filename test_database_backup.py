@@ -0,0 +1,123 @@
+"""
+Tests for online backup and restore in database.
+
+Covers backups through the SQLite backup API (plain and gzip), incremental
+snapshots with chunk reuse and rotation (also with parallel snapshots), and
+verified restores.
+"""
+
+import os
+import sqlite3
+import threading
+
+import pytest
+
+import database
+
+
+def _rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT id, payload FROM items ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+class TestDatabaseBackup:
+    """Test cases for backup_database, create_incremental_backup and restore_database."""
+
+    @pytest.fixture(autouse=True)
+    def live_db(self, tmp_path, monkeypatch):
+        """Point DB_PATH to a temporary database with some blob rows."""
+        self.db_path = str(tmp_path / "app_data.db")
+        monkeypatch.setattr(database, "DB_PATH", self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, payload BLOB)")
+        conn.executemany("INSERT INTO items (payload) VALUES (?)", [(os.urandom(4096),) for _ in range(64)])
+        conn.commit()
+        conn.close()
+        self.tmp_path = tmp_path
+
+    def _modify(self, sql, params=()):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(sql, params)
+        conn.commit()
+        conn.close()
+
+    def test_backup_reports_progress_and_roundtrips(self):
+        """Test plain and compressed backups while another connection holds the DB open."""
+        progress = []
+        reader = sqlite3.connect(self.db_path)
+        try:
+            assert database.backup_database(str(self.tmp_path / "b.db"), progress_callback=lambda d, t: progress.append((d, t)))
+            assert database.backup_database(str(self.tmp_path / "b.db.gz"))
+        finally:
+            reader.close()
+        assert progress and progress[-1][0] == progress[-1][1]
+        assert _rows(str(self.tmp_path / "b.db")) == _rows(self.db_path)
+
+        expected = _rows(self.db_path)
+        self._modify("DELETE FROM items")
+        assert database.restore_database(str(self.tmp_path / "b.db.gz"))
+        assert _rows(self.db_path) == expected
+
+    def test_incremental_snapshots_reuse_unchanged_chunks(self):
+        """Test that a small change only writes the changed chunks."""
+        backup_dir = str(self.tmp_path / "backups")
+        first = database.create_incremental_backup(backup_dir, chunk_size=16384)
+        self._modify("UPDATE items SET payload = ? WHERE id = 1", (b"x" * 4096,))
+        second = database.create_incremental_backup(backup_dir, chunk_size=16384)
+
+        assert first["chunks_new"] == first["chunks_total"]
+        assert 0 < second["chunks_new"] < second["chunks_total"] / 4
+
+        expected = _rows(self.db_path)
+        self._modify("DELETE FROM items")
+        assert database.restore_database(second["manifest_path"])
+        assert _rows(self.db_path) == expected
+
+    def test_rotation_keeps_latest_snapshots_and_their_chunks(self):
+        """Test that old manifests and unreferenced chunks are removed."""
+        backup_dir = str(self.tmp_path / "backups")
+        for i in range(4):
+            self._modify("UPDATE items SET payload = ? WHERE id = ?", (os.urandom(4096), i + 1))
+            info = database.create_incremental_backup(backup_dir, keep=2, chunk_size=16384)
+        manifests = database.list_incremental_backups(backup_dir)
+        assert len(manifests) == 2 and info["snapshots_removed"] == 1
+        assert database.restore_database(manifests[0])
+
+    def test_parallel_snapshots_keep_their_chunks(self, monkeypatch):
+        """Test that rotation runs under the backup lock and never removes chunks of a pending snapshot."""
+        backup_dir = str(self.tmp_path / "backups")
+        original = database._rotate_incremental_backups
+        results = []
+
+        def rotate_while_second_snapshot_runs(directory, keep):
+            assert database._INCREMENTAL_BACKUP_LOCK.locked()
+            if not results:
+                self._modify("UPDATE items SET payload = ? WHERE id = 1", (os.urandom(4096),))
+                second = threading.Thread(target=lambda: results.append(
+                    database.create_incremental_backup(backup_dir, keep=1, chunk_size=16384)))
+                results.append(second)
+                second.start()
+                second.join(0.2)
+            return original(directory, keep)
+
+        monkeypatch.setattr(database, "_rotate_incremental_backups", rotate_while_second_snapshot_runs)
+        first = database.create_incremental_backup(backup_dir, keep=1, chunk_size=16384)
+        results[0].join()
+        assert first is not None and results[1] is not None
+        expected = _rows(self.db_path)
+        self._modify("DELETE FROM items")
+        assert database.restore_database(results[1]["manifest_path"])
+        assert _rows(self.db_path) == expected
+
+    def test_corrupt_backup_leaves_database_untouched(self):
+        """Test that restore verifies integrity before replacing anything."""
+        broken = self.tmp_path / "kaputt.db"
+        broken.write_bytes(b"SQLite format 3\x00" + os.urandom(8192))
+        expected = _rows(self.db_path)
+        assert database.restore_database(str(broken)) is False
+        assert database.restore_database(str(self.tmp_path / "fehlt.db")) is False
+        assert _rows(self.db_path) == expected
+        assert not [name for name in os.listdir(self.tmp_path) if name.endswith(".restore")]
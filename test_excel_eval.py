@@ -0,0 +1,106 @@
+"""
+Tests for the headless workbook evaluation in excel_eval.
+
+Covers the signed pickle cache keyed by workbook hash, evaluation in
+dependency order (long precedent chains, shared precedents, errors) and the
+process-pool fan-out of batch_export.
+"""
+
+import pickle
+
+import pytest
+
+import excel_eval
+
+openpyxl = pytest.importorskip("openpyxl")
+
+
+def _write_workbook(path, chain_length=600):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Calc"
+    ws["A1"] = 2
+    ws["A2"] = 3
+    for i in range(3, chain_length + 1):
+        ws[f"A{i}"] = f"=A{i - 1}+A{i - 2}*0.001"
+    ws["B1"] = "=SUM(A1:A10)"
+    ws["B2"] = "=ROUND(B1/3,2)"
+    ws["B3"] = '=IF(B2>10,"gross","klein")'
+    ws["B4"] = "=1/0"
+    ws["B5"] = "=B4+1"
+    wb.create_sheet("Zwei")["A1"] = "=Calc!B2*2"
+    wb.save(path)
+    return path
+
+
+class TestExcelEvalHeadless:
+    """Test cases for load_compiled_model, ExcelEngineHeadless.evaluate_many and batch_export."""
+
+    @pytest.fixture(autouse=True)
+    def workbook(self, tmp_path, monkeypatch):
+        """Create a workbook and use a temporary model cache."""
+        pytest.importorskip("xlcalculator")
+        monkeypatch.setattr(excel_eval, "MODEL_CACHE_DIR", tmp_path / "cache")
+        excel_eval._model_memo.clear()
+        self.tmp_path = tmp_path
+        self.path = _write_workbook(tmp_path / "rechner.xlsx")
+        yield
+        excel_eval._model_memo.clear()
+
+    def test_compiled_model_is_pickled_by_hash(self, monkeypatch):
+        """Test that a second process-level load comes from the pickle cache without compiling."""
+        model = excel_eval.load_compiled_model(self.path)
+        memo_copy = excel_eval.load_compiled_model(self.path)
+        assert memo_copy is not model and set(memo_copy.cells) == set(model.cells)
+        cached = [p for p in (self.tmp_path / "cache").iterdir() if p.suffix == ".pkl"]
+        assert len(cached) == 1 and cached[0].name.startswith(excel_eval.workbook_hash(self.path))
+
+        import xlcalculator
+
+        def no_compiling(*args, **kwargs):
+            raise AssertionError("workbook must not be compiled again")
+
+        monkeypatch.setattr(xlcalculator.ModelCompiler, "read_and_parse_archive", no_compiling)
+        excel_eval._model_memo.clear()
+        reloaded = excel_eval.load_compiled_model(self.path)
+        assert set(reloaded.cells) == set(model.cells)
+
+    def test_tampered_pickle_is_not_loaded(self):
+        """Test that a cache file without a valid signature is recompiled instead of unpickled."""
+        excel_eval.load_compiled_model(self.path)
+        cache_file = next((self.tmp_path / "cache").glob("*.pkl"))
+        data = cache_file.read_bytes()
+        cache_file.write_bytes(data[:32] + pickle.dumps({"cells": "manipuliert"}))
+        excel_eval._model_memo.clear()
+        model = excel_eval.load_compiled_model(self.path)
+        assert "Calc!B1" in model.cells
+        key = excel_eval._cache_key(self.tmp_path / "cache")
+        assert excel_eval._read_cached_model(cache_file, excel_eval.workbook_hash(self.path), key) is not None
+
+    def test_engines_do_not_share_evaluated_cells(self):
+        """Test that evaluating in one engine leaves the cached model untouched."""
+        first = excel_eval.ExcelEngineHeadless(self.path)
+        first.evaluate("Calc!B1")
+        second = excel_eval.ExcelEngineHeadless(self.path)
+        assert second._model.cells["Calc!B1"].value != first._model.cells["Calc!B1"].value
+
+    def test_evaluation_in_dependency_order(self):
+        """Test long chains, cross-sheet precedents and errors in one pass."""
+        engine = excel_eval.ExcelEngineHeadless(self.path)
+        values = engine.evaluate_many(["Calc!A600", "Calc!B1", "Calc!B2", "Calc!B3", "Calc!B5", "Zwei!A1"])
+        assert values[0] > 0
+        assert values[2] == excel_eval.excel_round(values[1] / 3, 2)
+        assert values[3:] == ["klein", "#DIV/0!", pytest.approx(2 * values[2])]
+        order = engine.dependency_order(["Zwei!A1"])
+        assert order.index("Calc!A3") < order.index("Calc!B1") < order.index("Calc!B2") < order.index("Zwei!A1")
+
+    def test_batch_export_in_process_pool(self):
+        """Test that parallel batch export writes the same rows as the serial run."""
+        (self.tmp_path / "in" / "sub").mkdir(parents=True)
+        _write_workbook(self.tmp_path / "in" / "a.xlsx", chain_length=50)
+        _write_workbook(self.tmp_path / "in" / "sub" / "b.xlsx", chain_length=60)
+        serial = excel_eval.batch_export(self.tmp_path / "in", out_dir=self.tmp_path / "s", engine="headless")
+        parallel = excel_eval.batch_export(self.tmp_path / "in", out_dir=self.tmp_path / "p", engine="headless", workers=2)
+        assert [i for i, _ in serial] == [i for i, _ in parallel]
+        for (_, s_out), (_, p_out) in zip(serial, parallel):
+            assert s_out.read_text(encoding="utf-8") == p_out.read_text(encoding="utf-8")
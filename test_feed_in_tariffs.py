@@ -0,0 +1,140 @@
+"""
+Tests for the shared feed-in tariff service.
+
+Covers the compiled interval index (scalar and vectorized), ct/€ handling,
+cache invalidation when the admin setting is saved, the EEG degression
+schedule and the placeholder resolver using the same table.
+"""
+
+import json
+import sqlite3
+
+import numpy as np
+import pytest
+
+import database
+import feed_in_tariffs
+from pdf_template_engine.placeholders import resolve_feed_in_tariff_eur_per_kwh
+
+TARIFFS = {
+    "parts": [
+        {"kwp_min": 10.01, "kwp_max": 40.0, "ct_per_kwh": 6.80},
+        {"kwp_min": 0.0, "kwp_max": 10.0, "ct_per_kwh": 7.86},
+        {"kwp_min": 40.01, "kwp_max": 100.0, "ct_per_kwh": 0.0556},
+    ],
+    "full": [
+        {"kwp_min": 0.0, "kwp_max": 10.0, "ct_per_kwh": 12.47},
+        {"kwp_min": 10.01, "kwp_max": 100.0, "ct_per_kwh": 10.45},
+    ],
+}
+
+
+class TestFeedInTariffs:
+    """Test cases for FeedInTariffTable and the cached resolver functions."""
+
+    def setup_method(self):
+        """Start every test without compiled tables."""
+        feed_in_tariffs.invalidate_tariff_cache()
+        self.table = feed_in_tariffs.get_tariff_table(tariffs_block=TARIFFS)
+
+    def test_interval_lookup(self):
+        """Test bracket selection including boundaries, gaps and values above the last bracket."""
+        kwps = [0.0, 9.99, 10.0, 10.005, 25.0, 40.0, 99.0, 150.0]
+        expected = [0.0786, 0.0786, 0.0786, 0.068, 0.068, 0.068, 0.0556, 0.0556]
+        assert [self.table.lookup(k) for k in kwps] == pytest.approx(expected)
+        assert self.table.lookup(12.0, "Volleinspeisung") == pytest.approx(0.1045)
+        assert feed_in_tariffs.get_tariff_table(tariffs_block={}).lookup(5.0) is None
+
+    def test_vectorized_lookup_matches_scalar(self):
+        """Test that lookup_many agrees with lookup for random system sizes."""
+        kwps = np.random.default_rng(3).uniform(0, 120, 500)
+        for mode in ("parts", "full"):
+            scalar = [self.table.lookup(k, mode) for k in kwps]
+            assert self.table.lookup_many(kwps, mode) == pytest.approx(scalar)
+
+    def test_table_is_cached_until_setting_is_saved(self, tmp_path, monkeypatch):
+        """Test that saving feed_in_tariffs through the database invalidates the compiled index."""
+        monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app_data.db"))
+        conn = sqlite3.connect(database.DB_PATH)
+        conn.execute("CREATE TABLE admin_settings (key TEXT PRIMARY KEY, value TEXT, last_modified TEXT)")
+        conn.close()
+        calls = []
+
+        def load(key, default=None):
+            calls.append(key)
+            return database.load_admin_setting(key, default)
+
+        assert database.save_admin_setting("feed_in_tariffs", TARIFFS)
+        assert feed_in_tariffs.resolve_feed_in_tariff(8.0, "parts", load) == pytest.approx(0.0786)
+        assert feed_in_tariffs.resolve_feed_in_tariff(30.0, "parts", load) == pytest.approx(0.068)
+        assert calls == ["feed_in_tariffs"]
+
+        assert database.save_admin_setting("feed_in_tariffs", {"parts": [{"kwp_max": 100, "ct_per_kwh": 7.0}]})
+        assert feed_in_tariffs.resolve_feed_in_tariff(8.0, "parts", load) == pytest.approx(0.07)
+        assert len(calls) == 2
+
+    def test_raw_sql_write_from_other_process_is_picked_up(self, tmp_path, monkeypatch):
+        """Test that a write bypassing save_admin_setting (update_tariffs.py) reloads the table."""
+        monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app_data.db"))
+        conn = sqlite3.connect(database.DB_PATH)
+        conn.execute("CREATE TABLE admin_settings (key TEXT PRIMARY KEY, value TEXT, last_modified TEXT DEFAULT CURRENT_TIMESTAMP)")
+        conn.execute("INSERT OR REPLACE INTO admin_settings (key, value) VALUES (?, ?)", ("feed_in_tariffs", json.dumps(TARIFFS)))
+        conn.commit()
+        monkeypatch.setattr(feed_in_tariffs, "_REVALIDATE_SECONDS", 0.0)
+        load = database.load_admin_setting
+        assert feed_in_tariffs.resolve_feed_in_tariff(8.0, "parts", load) == pytest.approx(0.0786)
+        assert feed_in_tariffs.resolve_feed_in_tariff(8.0, "parts", load) == pytest.approx(0.0786)
+        assert feed_in_tariffs.get_cache_stats()["stale_reloads"] == 0
+
+        conn.execute("INSERT OR REPLACE INTO admin_settings (key, value) VALUES (?, ?)",
+                     ("feed_in_tariffs", json.dumps({"parts": [{"kwp_max": 100, "ct_per_kwh": 7.5}]})))
+        conn.commit()
+        conn.close()
+        assert feed_in_tariffs.resolve_feed_in_tariff(8.0, "parts", load) == pytest.approx(0.075)
+        assert feed_in_tariffs.get_cache_stats()["stale_reloads"] == 1
+
+    def test_cached_table_skips_database_within_revalidation_window(self, monkeypatch):
+        """Test that repeated lookups inside the window neither query the settings row nor call the loader again."""
+        stamps = []
+        monkeypatch.setattr(feed_in_tariffs, "_settings_stamp", lambda: stamps.append(1) or ("db",))
+        monkeypatch.setattr(feed_in_tariffs, "_reads_database", lambda func: True)
+        calls = []
+        load = lambda key, default=None: calls.append(key) or TARIFFS
+        for kwp in (5.0, 8.0, 30.0):
+            feed_in_tariffs.resolve_feed_in_tariff(kwp, "parts", load)
+        assert stamps == [1] and calls == ["feed_in_tariffs"]
+
+    def test_injected_loader_is_not_validated_against_database(self, monkeypatch):
+        """Test that a custom loader is re-read after the window instead of trusting the database stamp."""
+        monkeypatch.setattr(feed_in_tariffs, "_REVALIDATE_SECONDS", 0.0)
+        source = {"feed_in_tariffs": TARIFFS}
+        load = lambda key, default=None: source.get(key, default)
+        assert feed_in_tariffs.resolve_feed_in_tariff(8.0, "parts", load) == pytest.approx(0.0786)
+        source["feed_in_tariffs"] = {"parts": [{"kwp_max": 100, "ct_per_kwh": 6.0}]}
+        assert feed_in_tariffs.resolve_feed_in_tariff(8.0, "parts", load) == pytest.approx(0.06)
+
+    def test_degression_schedule(self):
+        """Test 1 % steps every six months from valid_from, rounded to 0.01 ct."""
+        table = feed_in_tariffs.get_tariff_table(
+            tariffs_block=dict(TARIFFS, degression={"valid_from": "2025-08-01"}))
+        assert table.lookup(8.0) == pytest.approx(0.0786)
+        assert table.lookup(8.0, commissioning_date="2026-01-31") == pytest.approx(0.0786)
+        assert table.lookup(8.0, commissioning_date="2026-02-01") == pytest.approx(0.0778)
+        assert table.lookup(8.0, commissioning_date="2027-02-01") == pytest.approx(0.0763)
+        rates = table.lookup_many([8.0, 8.0, 20.0], commissioning_dates=["2025-08-01", "2026-08-15", "2026-02-01"])
+        assert rates == pytest.approx([0.0786, 0.0770, 0.0673])
+
+    def test_annual_series_switches_to_market_value(self):
+        """Test the per-year tariff used by the simulation."""
+        series = feed_in_tariffs.annual_tariff_series(0.08, 22, eeg_period_years=20, post_eeg_eur_per_kwh=0.03)
+        assert len(series) == 22 and series[19] == 0.08 and series[20] == 0.03
+
+    def test_placeholder_resolver_uses_service(self):
+        """Test that the PDF placeholders resolve through the same table with their fallbacks."""
+        def load(key, default=None):
+            return TARIFFS if key == "feed_in_tariffs" else default
+
+        assert resolve_feed_in_tariff_eur_per_kwh(25.0, "parts", load) == pytest.approx(0.068)
+        assert resolve_feed_in_tariff_eur_per_kwh(
+            25.0, "parts", lambda key, default=None: {}, analysis_results_snapshot=(8.5,)) == pytest.approx(0.085)
+        assert resolve_feed_in_tariff_eur_per_kwh(25.0, "parts", lambda key, default=None: {}) == pytest.approx(0.0786)
@@ -0,0 +1,158 @@
+"""
+Tests for the geocoding service in geocoding.
+
+Covers address normalization, the persistent coordinate cache with TTL and
+negative caching, the satellite image cache and the bounded batch path
+geocode_many.
+"""
+
+import threading
+import time
+
+import pytest
+
+import database
+import geocoding
+
+
+class CountingProvider(geocoding.OfflineGeocodingProvider):
+    """Offline stand-in that records concurrent calls."""
+
+    max_concurrency = 8
+
+    def __init__(self, *args, delay=0.0, fail=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delay = delay
+        self.fail = fail
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def geocode(self, query):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            if self.fail:
+                raise ConnectionError("offline")
+            with self._lock:
+                return super().geocode(query)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class TestGeocodingService:
+    """Test cases for GeocodingService.geocode, geocode_many and satellite_image."""
+
+    @pytest.fixture(autouse=True)
+    def geocode_db(self, tmp_path, monkeypatch):
+        """Use a temporary database and image directory."""
+        monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app_data.db"))
+        self.tmp_path = tmp_path
+        self.table = {
+            "Musterstraße 1, 12345 Berlin": (52.52, 13.405),
+            "Hauptstr. 5, 80331 München": (48.137, 11.575),
+        }
+
+    def test_normalize_address(self):
+        """Test that spelling variants map to one cache key."""
+        key = geocoding.normalize_address("Musterstraße  1", "12345", "Berlin")
+        assert key == geocoding.normalize_address(" musterstr. 1", "12345", " BERLIN ")
+        assert key == geocoding.normalize_address("Musterstraße 1, 12345 Berlin") == "musterstrasse 1 12345 berlin"
+        assert geocoding.normalize_address("", "", "") == ""
+
+    def test_repeated_lookups_hit_persistent_cache(self):
+        """Test that a new service instance answers from SQLite and misses are cached briefly."""
+        provider = CountingProvider(self.table)
+        service = geocoding.GeocodingService(provider)
+        coords = service.geocode("Musterstraße 1", "12345", "Berlin")
+        assert coords == {"latitude": 52.52, "longitude": 13.405}
+        assert service.geocode("Musterstr. 1", "12345", "berlin") == coords
+        assert service.geocode("Nirgendwo 9", "00000", "Irgendwo") is None
+        assert service.geocode("Nirgendwo 9", "00000", "Irgendwo") is None
+        assert provider.calls == 2
+
+        fresh = geocoding.GeocodingService(CountingProvider(self.table))
+        assert fresh.geocode("Musterstraße 1", "12345", "Berlin") == coords
+        assert fresh.provider.calls == 0
+
+        expired = geocoding.GeocodingService(CountingProvider(self.table), negative_ttl_seconds=0)
+        assert expired.geocode("Nirgendwo 9", "00000", "Irgendwo") is None
+        assert expired.provider.calls == 1
+
+    def test_provider_errors_are_not_cached(self):
+        """Test that a failing provider does not poison the cache."""
+        failing = geocoding.GeocodingService(CountingProvider(self.table, fail=True))
+        assert failing.geocode("Musterstraße 1", "12345", "Berlin") is None
+        working = geocoding.GeocodingService(CountingProvider(self.table))
+        assert working.geocode("Musterstraße 1", "12345", "Berlin") is not None
+        assert working.provider.calls == 1
+
+    def test_geocode_many_deduplicates_with_bounded_concurrency(self):
+        """Test that the batch path queries each address once and respects max_workers."""
+        provider = CountingProvider(self.table, delay=0.02)
+        service = geocoding.GeocodingService(provider)
+        items = [
+            {"street": "Musterstraße 1", "zip": "12345", "city": "Berlin"},
+            ("Hauptstr. 5", "80331", "München"),
+            "Musterstraße 1, 12345 Berlin",
+            {"address": "musterstr. 1", "zip_code": "12345", "city": "Berlin"},
+            {"street": "", "city": ""},
+        ] + [("Weg %d" % i, "11111", "Dorf") for i in range(6)]
+        results = service.geocode_many(items, max_workers=3)
+        assert results[0] == results[2] == results[3] == {"latitude": 52.52, "longitude": 13.405}
+        assert results[1] == {"latitude": 48.137, "longitude": 11.575}
+        assert results[4] is None and results[5:] == [None] * 6
+        assert provider.calls == 8 and 1 < provider.peak <= 3
+
+    def test_satellite_image_cache(self):
+        """Test that images are cached on disk by rounded coordinates and zoom."""
+        provider = CountingProvider(images={(52.52, 13.405, 20): b"PNG-DATA"})
+        service = geocoding.GeocodingService(provider, image_dir=str(self.tmp_path / "tiles"))
+        assert service.satellite_image(52.5200000001, 13.405) == b"PNG-DATA"
+        fresh = geocoding.GeocodingService(CountingProvider(), image_dir=str(self.tmp_path / "tiles"))
+        assert fresh.satellite_image(52.52, 13.405) == b"PNG-DATA"
+        assert fresh.provider.calls == 0
+        assert fresh.satellite_image(52.52, 13.405, zoom=19) is None
+
+    def test_providers_without_images_do_not_wait(self, monkeypatch):
+        """Test that image requests to a provider without images return at once without a throttle slot."""
+        provider = geocoding.NominatimGeocodingProvider()
+        monkeypatch.setattr(provider, "wait_for_slot", lambda: pytest.fail("no request, no slot"))
+        service = geocoding.GeocodingService(provider, image_dir=str(self.tmp_path / "tiles"))
+        assert service.satellite_image(52.52, 13.405) is None
+
+    def test_provider_interface_is_abstract(self):
+        """Test that providers must implement geocode."""
+        with pytest.raises(TypeError):
+            geocoding.GeocodingProvider()
+
+    def test_min_interval_spaces_provider_calls(self):
+        """Test that a provider's minimum interval holds across worker threads."""
+        provider = CountingProvider(self.table)
+        provider.min_interval_seconds = 0.05
+        stamps = []
+        original = provider.geocode
+        provider.geocode = lambda query: (stamps.append(time.monotonic()), original(query))[1]
+        geocoding.GeocodingService(provider).geocode_many([("Weg %d" % i, "11111", "Dorf") for i in range(4)], max_workers=4)
+        gaps = [b - a for a, b in zip(sorted(stamps), sorted(stamps)[1:])]
+        assert len(stamps) == 4 and min(gaps) >= 0.045
+
+    def test_memory_cache_is_bounded(self, monkeypatch):
+        """Test that the in-process memo keeps at most _MEMO_MAX_ENTRIES addresses."""
+        monkeypatch.setattr(geocoding, "_MEMO_MAX_ENTRIES", 2)
+        service = geocoding.GeocodingService(CountingProvider(self.table))
+        for i in range(5):
+            service.geocode("Weg %d" % i, "11111", "Dorf")
+        assert len(service._memo) == 2
+
+    def test_service_follows_admin_provider_setting(self, monkeypatch):
+        """Test that callers without provider_name share the service of the configured provider."""
+        monkeypatch.setattr(geocoding, "_SERVICES", {})
+        monkeypatch.setattr(database, "load_admin_setting", lambda key, default=None: "nominatim")
+        service = geocoding.get_geocoding_service("key-a")
+        assert service.provider_name == "nominatim"
+        assert geocoding.get_geocoding_service("key-b") is service
+        assert geocoding.get_geocoding_service("key-a", provider_name="google").provider_name == "google"
@@ -0,0 +1,72 @@
+"""
+Tests for the reference-year heat pump simulation in calculations_heatpump.
+"""
+
+import pytest
+import calculations_heatpump as hp
+
+
+class TestHeatPumpSimulation:
+    """Test cases for simulate_heat_pumps / rank_heat_pumps."""
+
+    def setup_method(self):
+        """Set up a small catalog and building profile."""
+        hp.clear_heatpump_simulation_cache()
+        self.profile = {'heat_load_kw': 8.0, 'design_temp_c': -12, 'flow_temp_c': 35,
+                        'hot_water_kwh_per_year': 2500}
+        self.pumps = [
+            {'model_name': 'Klein', 'heating_output_kw': 4.0, 'scop': 4.5, 'price': 9000},
+            {'model_name': 'Passend', 'heating_output_kw': 10.0, 'scop': 4.5, 'price': 14000},
+            {'model_name': 'Effizient', 'heating_output_kw': 10.0, 'scop': 5.0, 'price': 14500},
+            {'model_name': 'Sole', 'heating_output_kw': 10.0, 'scop': 4.8, 'price': 22000,
+             'type': 'Sole-Wasser-Wärmepumpe'},
+        ]
+
+    def test_reference_year_is_deterministic(self):
+        """Test that the bundled reference year has plausible hourly values."""
+        temps = hp.reference_year_temperatures()
+        assert temps.shape == (hp.HOURS_PER_YEAR,)
+        assert 8.0 < temps.mean() < 11.0
+        assert temps.min() < -8.0
+        assert 1700 < hp.reference_full_load_hours() < 2600
+
+    def test_undersized_pump_needs_backup_heater(self):
+        """Test that a small pump has lower coverage and SPF."""
+        results = {r['pump']['model_name']: r for r in hp.simulate_heat_pumps(self.profile, self.pumps)}
+        assert results['Klein']['coverage_percent'] < results['Passend']['coverage_percent']
+        assert results['Klein']['backup_electricity_kwh'] > 0
+        assert results['Klein']['spf'] < results['Passend']['spf']
+        assert results['Effizient']['spf'] > results['Passend']['spf']
+
+    def test_higher_flow_temperature_lowers_spf(self):
+        """Test that radiators at 55 °C reduce the seasonal performance."""
+        low = hp.simulate_heat_pumps(self.profile, self.pumps[1:2])[0]['spf']
+        high = hp.simulate_heat_pumps(dict(self.profile, flow_temp_c=55), self.pumps[1:2])[0]['spf']
+        assert high < low
+
+    def test_ranking_prefers_covered_pumps_by_cost(self):
+        """Test ranking order and caching per building profile."""
+        ranked = hp.rank_heat_pumps(self.profile, self.pumps)
+        assert [r['rank'] for r in ranked] == [1, 2, 3, 4]
+        assert ranked[-1]['pump']['model_name'] == 'Klein'
+        assert ranked[0]['pump']['model_name'] == 'Effizient'
+        assert hp.rank_heat_pumps(self.profile, self.pumps) == ranked
+        assert len(hp._SIMULATION_CACHE) == 1
+
+    def test_annual_consumption_with_reference_hours(self):
+        """Test that heating_hours=None uses the reference-year full-load hours."""
+        expected = 8.0 * hp.reference_full_load_hours() / 4.0
+        assert hp.calculate_annual_energy_consumption(8.0, 4.0, None) == pytest.approx(expected)
+        assert hp.calculate_annual_energy_consumption(8.0, 4.0) == pytest.approx(3600.0)
+
+    def test_parse_flow_temperature(self):
+        """Test flow temperature parsing from UI labels."""
+        assert hp.parse_flow_temperature_c("Radiatoren (55°C)") == 55.0
+        assert hp.parse_flow_temperature_c(40) == 40.0
+        assert hp.parse_flow_temperature_c("unbekannt") == 35.0
+
+    def test_zero_degree_design_temperature_is_kept(self):
+        """Test that 0 °C is a valid design temperature and only missing values use -12 °C."""
+        assert hp.building_profile_from_data({'outside_temp': 0})['design_temp_c'] == 0.0
+        assert hp.building_profile_from_data({'outside_temp': None})['design_temp_c'] == -12.0
+        assert hp.building_profile_from_data({})['design_temp_c'] == -12.0
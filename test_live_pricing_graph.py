@@ -0,0 +1,103 @@
+"""
+Tests for the incremental live pricing graph.
+
+Checks that pricing slider changes only recompute price-dependent nodes and
+that the graph reproduces the direct formulas.
+"""
+
+import pytest
+from live_pricing_graph import DependencyGraph, LivePricingEngine
+from calculations import _calculate_final_price_with_correct_formula
+
+
+class TestDependencyGraph:
+    """Test cases for DependencyGraph."""
+
+    def setup_method(self):
+        """Build a small diamond-shaped graph."""
+        self.graph = DependencyGraph()
+        self.graph.add_input('a', 1.0)
+        self.graph.add_input('b', 2.0)
+        self.graph.add_node('double_a', lambda a: a * 2, ['a'])
+        self.graph.add_node('sum', lambda x, b: x + b, ['double_a', 'b'])
+
+    def test_nodes_are_cached_until_inputs_change(self):
+        """Test that repeated reads do not recompute."""
+        assert self.graph.get('sum') == 4.0
+        assert self.graph.get('sum') == 4.0
+        assert self.graph.recompute_counts == {'double_a': 1, 'sum': 1}
+
+    def test_only_dependents_of_changed_inputs_recompute(self):
+        """Test that changing b leaves double_a cached."""
+        self.graph.get('sum')
+        assert self.graph.set_inputs({'a': 1.0, 'b': 5.0}) == {'b'}
+        assert self.graph.get('sum') == 7.0
+        assert self.graph.recompute_counts == {'double_a': 1, 'sum': 2}
+
+    def test_unknown_names_raise(self):
+        """Test that undeclared inputs and dependencies are rejected."""
+        with pytest.raises(KeyError):
+            self.graph.set_inputs({'c': 1.0})
+        with pytest.raises(KeyError):
+            self.graph.add_node('broken', lambda c: c, ['c'])
+
+
+class TestLivePricingEngine:
+    """Test cases for LivePricingEngine."""
+
+    def setup_method(self):
+        """Load typical perform_calculations results."""
+        self.engine = LivePricingEngine()
+        self.results = {
+            'annual_pv_production_kwh': 9500.0,
+            'annual_consumption_kwh': 4500.0,
+            'monthly_electricity_cost': 120.0,
+            'self_supply_rate_percent': 65.0,
+            'battery_capacity_kwh': 10.0,
+            'simulation_period_years_effective': 25,
+            'total_investment_netto': 18000.0,
+            'annual_financial_benefit_year1': 1400.0,
+        }
+        self.engine.load_results(self.results)
+
+    def test_slider_change_keeps_energy_nodes_cached(self):
+        """Test that a discount change recomputes only price-dependent nodes."""
+        self.engine.live_values()
+        self.engine.pricing()
+        before = dict(self.engine.graph.recompute_counts)
+
+        self.engine.set_modifications({'discount_percent': 5.0})
+        self.engine.live_values()
+        self.engine.pricing()
+        recomputed = {k for k, v in self.engine.graph.recompute_counts.items() if v != before[k]}
+        assert recomputed == {'final_price', 'final_amortization_years', 'final_roi_percent',
+                              'final_cumulative_cash_flows'}
+
+    def test_pricing_matches_final_price_formula(self):
+        """Test that graph pricing equals the perform_calculations formula."""
+        modifications = {'discount_percent': 5.0, 'surcharge_percent': 2.0,
+                         'special_discount': 200.0, 'additional_costs': 300.0}
+        self.engine.set_modifications(modifications)
+        pricing = self.engine.pricing()
+        expected = _calculate_final_price_with_correct_formula(18000.0, 0.0, modifications, 19.0)
+
+        assert pricing['final_price_netto'] == pytest.approx(expected['final_price_netto'])
+        assert pricing['final_price_brutto'] == pytest.approx(expected['final_price_brutto'])
+        assert pricing['final_amortization_years'] == pytest.approx(expected['final_price_netto'] / 1400.0)
+        assert len(pricing['final_cumulative_cash_flows']) == 25
+
+    def test_live_values_match_yearly_loop(self):
+        """Test that vectorized cost totals equal the year-by-year sum."""
+        values = self.engine.live_values()
+        expected = sum(120.0 * 12 * 1.04 ** (year - 1) for year in range(1, 26))
+        assert values['stromkosten_ohne_pv_total'] == pytest.approx(expected)
+        assert values['direct_consumption_kwh'] == pytest.approx(4500.0 * 0.65)
+
+    def test_pricing_returns_copies_and_zero_without_savings(self):
+        """Test that callers cannot mutate cached nodes and that no savings give 0 years."""
+        flows = self.engine.pricing()['final_cumulative_cash_flows']
+        flows.append(123.0)
+        assert len(self.engine.pricing()['final_cumulative_cash_flows']) == 25
+
+        self.engine.load_results({**self.results, 'annual_financial_benefit_year1': 0.0})
+        assert self.engine.pricing()['final_amortization_years'] == 0.0
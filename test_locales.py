@@ -0,0 +1,82 @@
+"""
+Tests for the cached translation catalog in locales.
+
+Covers loading once per locale, mtime-based hot reload, precompiled format
+templates and the missing-key counters.
+"""
+
+import json
+import os
+
+import pytest
+
+import locales
+
+
+class TestTranslationCatalog:
+    """Test cases for get_text and get_catalog."""
+
+    def setup_method(self):
+        """Start every test with empty caches and counters."""
+        locales.clear_translation_cache()
+        locales.reset_missing_key_counts()
+
+    def teardown_method(self):
+        """Drop catalogs loaded from temporary files."""
+        locales.clear_translation_cache()
+
+    @pytest.fixture
+    def catalog_file(self, tmp_path, monkeypatch):
+        path = tmp_path / "tt.json"
+        path.write_text(json.dumps({"greeting": "Hallo {name}!", "plain": "Text"}), encoding="utf-8")
+        monkeypatch.setattr(locales, "_translation_path", lambda lang_code: str(tmp_path / f"{lang_code}.json"))
+        return path
+
+    def test_file_is_read_once(self, catalog_file, monkeypatch):
+        """Test that repeated lookups reuse the loaded catalog."""
+        reads = []
+        original = locales._read_translations
+        monkeypatch.setattr(locales, "_read_translations", lambda code: reads.append(code) or original(code))
+        for _ in range(50):
+            assert locales.get_text("plain", locale="tt") == "Text"
+        assert reads == ["tt"]
+
+    def test_catalog_is_immutable_and_copies_are_not(self, catalog_file):
+        """Test that the shared mapping cannot be modified but load_translations returns a dict copy."""
+        catalog = locales.get_catalog("tt")
+        with pytest.raises(TypeError):
+            catalog["plain"] = "x"
+        copy = locales.load_translations("tt")
+        copy["plain"] = "x"
+        assert locales.get_text("plain", locale="tt") == "Text"
+
+    def test_changed_file_is_reloaded(self, catalog_file, monkeypatch):
+        """Test that a newer mtime triggers a reload once the check interval passed."""
+        monkeypatch.setattr(locales, "_RELOAD_CHECK_INTERVAL_S", 0.0)
+        monkeypatch.setattr(locales, "_HOT_RELOAD", True)
+        assert locales.get_text("plain", locale="tt") == "Text"
+        catalog_file.write_text(json.dumps({"plain": "Neu"}), encoding="utf-8")
+        stat = os.stat(catalog_file)
+        os.utime(catalog_file, (stat.st_atime, stat.st_mtime + 5))
+        assert locales.get_text("plain", locale="tt") == "Neu"
+
+    def test_format_templates(self, catalog_file):
+        """Test formatting with kwargs, including missing parameters."""
+        assert locales.get_text("greeting", locale="tt", name="Max") == "Hallo Max!"
+        assert locales.get_text("greeting", locale="tt", name="Eva", unused=1) == "Hallo Eva!"
+        assert locales.get_text("greeting", locale="tt") == "Hallo {name}!"
+        assert locales.get_text("greeting", locale="tt", other="x") == "Hallo {name}!"
+        assert locales.get_text("fehlt", locale="tt", fallback="Wert {n}", n=3) == "Wert 3"
+
+    def test_escaped_braces_without_fields(self, catalog_file):
+        """Test that escaped braces are unescaped with kwargs even if the text has no placeholders."""
+        assert locales.get_text("fehlt", locale="tt", fallback="JSON {{x}}", n=1) == "JSON {x}"
+        assert locales.get_text("fehlt", locale="tt", fallback="JSON {{x}}") == "JSON {{x}}"
+        assert locales.get_text("fehlt", locale="tt", fallback="Kaputt {", n=1) == "Kaputt {"
+
+    def test_missing_keys_are_counted(self, catalog_file):
+        """Test that lookups of unknown keys are counted per locale."""
+        assert locales.get_text("fehlt", locale="tt") == "fehlt"
+        assert locales.get_text("fehlt", locale="tt", fallback="Ersatz") == "Ersatz"
+        locales.get_text("plain", locale="tt")
+        assert locales.get_missing_key_counts("tt") == {("tt", "fehlt"): 2}
@@ -0,0 +1,72 @@
+"""
+Tests for the offer benchmark harness.
+
+Covers the statistics summary, the baseline comparison and the synthetic
+price matrix fixture (which must load through MatrixLoader).
+"""
+
+import random
+
+from benchmarks.fixtures import build_price_matrix_csv
+from benchmarks.offer_benchmark import compare_to_baseline, summarize
+from matrix_loader import MatrixLoader
+
+
+class TestSummarize:
+    """Test cases for summarize()."""
+
+    def test_median_and_iqr(self):
+        stats = summarize([1.0, 2.0, 3.0, 4.0, 5.0])
+        assert stats["median_s"] == 3.0
+        assert stats["iqr_s"] == 2.0
+        assert stats["min_s"] == 1.0
+        assert stats["max_s"] == 5.0
+
+    def test_single_sample(self):
+        stats = summarize([0.5])
+        assert stats["median_s"] == 0.5
+        assert stats["iqr_s"] == 0.0
+
+
+class TestCompareToBaseline:
+    """Test cases for compare_to_baseline()."""
+
+    def setup_method(self):
+        self.baseline = {
+            "fast": {"median_s": 0.100},
+            "slow": {"median_s": 0.100},
+            "tiny": {"median_s": 0.001},
+        }
+
+    def test_regression_above_threshold(self):
+        verdicts = compare_to_baseline({"slow": {"median_s": 0.140}}, self.baseline, threshold=0.25)
+        assert verdicts["slow"]["status"] == "regression"
+        assert verdicts["slow"]["ratio"] == 1.4
+
+    def test_within_threshold_is_ok(self):
+        verdicts = compare_to_baseline({"fast": {"median_s": 0.110}}, self.baseline, threshold=0.25)
+        assert verdicts["fast"]["status"] == "ok"
+
+    def test_improvement(self):
+        verdicts = compare_to_baseline({"fast": {"median_s": 0.050}}, self.baseline, threshold=0.25)
+        assert verdicts["fast"]["status"] == "improved"
+
+    def test_noise_floor_ignores_tiny_absolute_deltas(self):
+        verdicts = compare_to_baseline({"tiny": {"median_s": 0.002}}, self.baseline, threshold=0.25)
+        assert verdicts["tiny"]["status"] == "ok"
+
+    def test_new_and_error_cases(self):
+        results = {"unknown": {"median_s": 1.0}, "broken": {"error": "RuntimeError: x"}}
+        verdicts = compare_to_baseline(results, self.baseline, threshold=0.25)
+        assert verdicts["unknown"]["status"] == "new"
+        assert verdicts["broken"]["status"] == "error"
+
+
+def test_price_matrix_fixture_loads_with_matrix_loader():
+    storage_models = ["BYD Speicher 5.0 kWh S001", "Sonnen Speicher 7.5 kWh S002"]
+    csv_data = build_price_matrix_csv(storage_models, random.Random(1), max_modules=30)
+    df, source, errors = MatrixLoader().load_matrix(csv_data=csv_data)
+    assert source == "CSV"
+    assert df.shape == (30, 3)
+    assert list(df.columns) == storage_models + ["Ohne Speicher"]
+    assert not errors
@@ -0,0 +1,120 @@
+"""
+Tests for the compiled payment terms in payment_terms.
+
+Covers schedule computation from the cached variant index, invalidation when
+a configuration is saved, the batch API and the indexed discount rules of
+PaymentTermsManager.
+"""
+
+import sqlite3
+
+import pytest
+
+import database
+import payment_terms
+
+CONFIG = {
+    "variants": [
+        {
+            "id": "fix",
+            "name": "Fester Abschlag",
+            "segments": [
+                {"key": "deposit", "label": "Anzahlung", "percent": None, "amount": 1000},
+                {"key": "rest", "label": "Rest", "percent": 60, "amount": None},
+                {"key": "final", "label": "Schluss", "percent": 30, "amount": None},
+            ],
+            "text_template": "{deposit} Anzahlung, {rest} und {final}.",
+        },
+        {
+            "id": "drittel",
+            "name": "Drei Drittel",
+            "segments": [{"key": f"r{i}", "label": f"Rate {i}", "percent": 33.33, "amount": None} for i in range(3)],
+            "text_template": "",
+        },
+    ]
+}
+
+
+class TestPaymentTerms:
+    """Test cases for compute_payment_schedule(s), the config cache and PaymentTermsManager."""
+
+    @pytest.fixture(autouse=True)
+    def settings_db(self, tmp_path, monkeypatch):
+        """Use a temporary admin_settings table and count the settings loads."""
+        monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app_data.db"))
+        conn = sqlite3.connect(database.DB_PATH)
+        conn.execute("CREATE TABLE admin_settings (key TEXT PRIMARY KEY, value TEXT, last_modified TEXT)")
+        conn.close()
+        self.loads = []
+
+        def counting_load(key, default=None):
+            self.loads.append(key)
+            return database.load_admin_setting(key, default)
+
+        monkeypatch.setattr(payment_terms, "load_admin_setting", counting_load)
+        payment_terms.invalidate_payment_terms_cache()
+        yield
+        payment_terms.invalidate_payment_terms_cache()
+
+    def test_default_variant_schedule(self):
+        """Test the stored default configuration and the 30/40/30 schedule."""
+        schedule = payment_terms.compute_payment_schedule("variant1", 10000.0)
+        assert [(s["key"], s["amount"], s["percent"]) for s in schedule] == [
+            ("deposit", 3000.0, 30.0), ("dc_montage", 4000.0, 40.0), ("commissioning", 3000.0, 30.0)]
+        assert payment_terms.compute_payment_schedule("unbekannt", 10000.0) == []
+        assert database.load_admin_setting(payment_terms.PAYMENT_TERMS_KEY, None)["variants"]
+
+    def test_config_is_loaded_once_until_saved(self):
+        """Test that repeated schedules reuse the compiled config and saving invalidates it."""
+        assert payment_terms.save_payment_terms_config(CONFIG)
+        payment_terms.get_payment_manager()  # legt beim ersten Laden die Standard-Optionen an
+        self.loads.clear()
+        for amount in (1000.0, 2000.0, 3000.0):
+            payment_terms.compute_payment_schedule("fix", amount)
+            payment_terms.get_payment_terms_text("fix", [])
+        payment_terms.get_payment_manager()
+        assert self.loads.count(payment_terms.PAYMENT_TERMS_KEY) == 1
+        assert self.loads.count(payment_terms.COMPREHENSIVE_PAYMENT_KEY) == 1
+
+        changed = {"variants": [dict(CONFIG["variants"][1], id="fix")]}
+        assert database.save_admin_setting(payment_terms.PAYMENT_TERMS_KEY, changed)
+        assert len(payment_terms.compute_payment_schedule("fix", 900.0)) == 3
+        assert payment_terms.compute_payment_schedule("fix", 900.0)[0]["key"] == "r0"
+        assert self.loads.count(payment_terms.PAYMENT_TERMS_KEY) == 2
+        assert self.loads.count(payment_terms.COMPREHENSIVE_PAYMENT_KEY) == 2
+
+    def test_fixed_amounts_and_rounding_remainder(self):
+        """Test fixed amounts, the remainder on the last segment and the text template."""
+        payment_terms.save_payment_terms_config(CONFIG)
+        schedule = payment_terms.compute_payment_schedule("fix", 11000.0)
+        assert [s["amount"] for s in schedule] == [1000.0, 6600.0, 3400.0]
+        assert payment_terms.get_payment_terms_text("fix", schedule).endswith("€ Anzahlung, 60 % und 31 %.")
+        thirds = payment_terms.compute_payment_schedule("drittel", 100.0)
+        assert [s["amount"] for s in thirds] == [33.33, 33.33, 33.34]
+        assert payment_terms.get_payment_terms_text("drittel", thirds).startswith("Rate 0: 33.33 €")
+
+    def test_batch_matches_single_schedules(self):
+        """Test that compute_payment_schedules equals per-amount calls in input order."""
+        payment_terms.save_payment_terms_config(CONFIG)
+        variant_ids = ["fix", "drittel", "fehlt", "fix", "drittel"]
+        amounts = [11000.0, 100.0, 5.0, 0.0, 12345.67]
+        batch = payment_terms.compute_payment_schedules(variant_ids, amounts)
+        assert batch == [payment_terms.compute_payment_schedule(v, a) for v, a in zip(variant_ids, amounts)]
+        assert batch[2] == [] and all(s["percent"] == 0.0 for s in batch[3])
+        assert payment_terms.compute_payment_schedules("drittel", [100.0, 200.0])[1][2]["amount"] == 66.68
+        with pytest.raises(ValueError):
+            payment_terms.compute_payment_schedules(["fix"], [1.0, 2.0])
+
+    def test_manager_discounts_use_index(self):
+        """Test quantity and seasonal discounts and that managers do not share mutable config."""
+        manager = payment_terms.get_payment_manager()
+        assert manager._calculate_quantity_discount(49999) == 0.0
+        assert manager._calculate_quantity_discount(150000) == 4.0
+        assert manager._calculate_seasonal_discount(12) == 3.0
+        assert manager._calculate_seasonal_discount(4) == 0.0
+        result = manager.calculate_payment_with_discounts(100000.0, "cash_full", quantity_amount=100000.0, month=7)
+        assert result["total_discount_percent"] == pytest.approx(
+            manager._get_payment_option("cash_full")["discount_percent"] + 4.0 + 1.5)
+
+        manager.comprehensive_config["payment_options"].clear()
+        assert payment_terms.get_comprehensive_payment_options()
@@ -0,0 +1,87 @@
+"""
+Tests for single-pass offer PDF assembly.
+
+Covers OfferDocument (pages appended without intermediate serialization,
+footer stamping through one multi-page canvas) and the footer used for the
+pages appended after the seven main template pages.
+"""
+
+import io
+
+from pypdf import PdfReader
+from reportlab.pdfgen import canvas
+
+from pdf_template_engine import OfferDocument, read_pdf
+from pdf_generator import _make_additional_page_footer
+
+
+def _make_pdf(labels, pagesize=(595.0, 842.0)):
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=pagesize)
+    for label in labels:
+        c.drawString(100, 400, label)
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+class TestOfferDocument:
+    """Test cases for OfferDocument."""
+
+    def setup_method(self):
+        """Create a main part and an additional part."""
+        self.main_pdf = _make_pdf(["Haupt 1", "Haupt 2"])
+        self.additional_pdf = _make_pdf(["Zusatz A", "Zusatz B", "Zusatz C"], pagesize=(842.0, 595.0))
+
+    def test_read_pdf_passes_through_readers(self):
+        """Test that already parsed readers are reused and empty input yields None."""
+        reader = read_pdf(self.main_pdf)
+        assert read_pdf(reader) is reader
+        assert read_pdf(b"") is None
+        assert read_pdf(None) is None
+        assert read_pdf(b"kein pdf") is None
+
+    def test_pages_are_appended_in_order(self):
+        """Test that main and additional pages end up in one document."""
+        document = OfferDocument()
+        assert document.add_pdf(self.main_pdf) == 2
+        assert document.add_pages(read_pdf(self.additional_pdf).pages) == 3
+        result = PdfReader(io.BytesIO(document.to_bytes()))
+        texts = [page.extract_text() for page in result.pages]
+        assert len(texts) == 5
+        assert "Haupt 1" in texts[0] and "Zusatz C" in texts[4]
+
+    def test_stamp_pages_only_touches_selected_range(self):
+        """Test that stamps follow each page size and skip pages before start_index."""
+        document = OfferDocument()
+        document.add_pdf(self.main_pdf)
+        document.add_pdf(self.additional_pdf)
+        seen = []
+
+        def draw(c, width, height, index):
+            seen.append((index, width, height))
+            c.drawString(20, 20, f"Stempel {index}")
+
+        document.stamp_pages(draw, start_index=2)
+        assert seen == [(2, 842.0, 595.0), (3, 842.0, 595.0), (4, 842.0, 595.0)]
+        texts = [page.extract_text() for page in PdfReader(io.BytesIO(document.to_bytes())).pages]
+        assert "Stempel" not in texts[1]
+        assert "Stempel 4" in texts[4]
+
+
+class TestAdditionalPageFooter:
+    """Test cases for the footer of appended pages."""
+
+    def test_footer_numbers_continue_after_main_pages(self):
+        """Test that appended pages are numbered from 8 on with the total page count."""
+        document = OfferDocument()
+        document.add_pdf(_make_pdf([f"Seite {i}" for i in range(1, 8)]))
+        document.add_pdf(_make_pdf(["Zusatz A", "Zusatz B"]))
+        footer = _make_additional_page_footer(8, 9, 7, footer_left_text="Herr Max Mustermann")
+        document.stamp_pages(footer, start_index=7)
+
+        texts = [page.extract_text() for page in PdfReader(io.BytesIO(document.to_bytes())).pages]
+        assert "Seite 8 von 9" in texts[7]
+        assert "Seite 9 von 9" in texts[8]
+        assert "Herr Max Mustermann" in texts[8]
+        assert "von 9" not in texts[6]
@@ -0,0 +1,89 @@
+"""
+Tests for the streaming mode of pdf_atomizer.
+
+Covers JSON Lines output matching explode(), page-parallel extraction in
+worker processes, the SHA-256 keyed atom cache and optional raw objects.
+"""
+
+import json
+
+import pytest
+
+pytest.importorskip("fitz")
+pytest.importorskip("pdfminer")
+pikepdf = pytest.importorskip("pikepdf")
+
+import pdf_atomizer
+
+
+class TestPdfAtomizerStreaming:
+    """Test cases for PDFAatomizer.iter_atoms, write_jsonl and load_atoms_jsonl."""
+
+    @pytest.fixture(autouse=True)
+    def sample_pdf(self, tmp_path, monkeypatch):
+        """Write a small multi-page PDF."""
+        monkeypatch.setattr(pdf_atomizer, "VERBOSE", False)
+        pdf = pikepdf.Pdf.new()
+        for _ in range(10):
+            pdf.add_blank_page()
+        self.src = tmp_path / "vorlage.pdf"
+        pdf.save(self.src)
+        self.tmp_path = tmp_path
+
+    def test_jsonl_matches_explode_with_parallel_pages(self):
+        """Test that streamed records from worker processes rebuild the same atoms."""
+        atomizer = pdf_atomizer.PDFAatomizer(self.src)
+        atomizer.explode()
+        expected = json.loads(json.dumps(atomizer.atoms))
+
+        out = self.tmp_path / "atoms.jsonl"
+        count = atomizer.write_jsonl(out, workers=3)
+        records = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+        assert count == len(records) == 1 + 4 + 10 + 4
+        assert records[0]["section"] == "document" and records[0]["data"]["page_count"] == 10
+        assert [r["key"] for r in records if r["section"] == "pages"] == list(range(10))
+        assert json.loads(json.dumps(pdf_atomizer.load_atoms_jsonl(out))) == expected
+        assert expected["raw"] == {}
+
+    def test_unchanged_source_is_read_from_cache(self, monkeypatch):
+        """Test that a second run with the same source bytes does not open the PDF."""
+        cache_dir = self.tmp_path / "cache"
+        first = self.tmp_path / "first.jsonl"
+        pdf_atomizer.PDFAatomizer(self.src).write_jsonl(first, workers=1, cache_dir=cache_dir)
+        assert len(list(cache_dir.iterdir())) == 1
+
+        def fail_open(*args, **kwargs):
+            raise AssertionError("PDF sollte nicht erneut geöffnet werden")
+
+        monkeypatch.setattr(pdf_atomizer.pikepdf, "open", fail_open)
+        second = self.tmp_path / "second.jsonl"
+        pdf_atomizer.PDFAatomizer(self.src).write_jsonl(second, cache_dir=cache_dir)
+        assert second.read_bytes() == first.read_bytes()
+
+    def test_raw_objects_only_on_request(self):
+        """Test that raw stream dumps are produced only with include_raw."""
+        cache_dir = self.tmp_path / "cache"
+        plain = list(pdf_atomizer.PDFAatomizer(self.src).iter_atoms(workers=1, cache_dir=cache_dir))
+        raw = list(pdf_atomizer.PDFAatomizer(self.src, include_raw=True).iter_atoms(workers=1, cache_dir=cache_dir))
+        assert not any(r["section"] == "raw" for r in plain)
+        raw_records = [r for r in raw if r["section"] == "raw"]
+        assert raw_records and all("b64" in r["data"] for r in raw_records)
+        assert len(list(cache_dir.iterdir())) == 2
+
+    def test_jsonl_collect_fills_atoms_in_one_pass(self, monkeypatch):
+        """Test that write_jsonl(collect=True) fills atoms without a second extraction."""
+        reference = pdf_atomizer.PDFAatomizer(self.src)
+        reference.explode()
+        expected = json.loads(json.dumps(reference.atoms))
+
+        atomizer = pdf_atomizer.PDFAatomizer(self.src)
+        calls = []
+        original = atomizer.iter_atoms
+        monkeypatch.setattr(atomizer, "iter_atoms", lambda **kw: calls.append(kw) or original(**kw))
+        atomizer.write_jsonl(self.tmp_path / "atoms.jsonl", workers=1, collect=True)
+        assert len(calls) == 1
+        assert json.loads(json.dumps(atomizer.atoms)) == expected
+
+    def test_default_cache_dir_is_anchored_next_to_module(self):
+        """Test that the default cache does not depend on the working directory."""
+        assert pdf_atomizer.DEFAULT_CACHE_DIR.is_absolute() or "PDF_ATOM_CACHE_DIR" in pdf_atomizer.os.environ
@@ -0,0 +1,102 @@
+"""
+Tests for the PDF attachment cache.
+
+Covers reader reuse keyed by path/mtime/size, single appending of duplicate
+paths, resource deduplication across attachments and upload-time optimization.
+"""
+
+import io
+
+import numpy as np
+from PIL import Image
+from pypdf import PdfReader, PdfWriter
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from pdf_attachment_cache import (AttachmentCache, append_attachments,
+                                  optimize_attachment_pdf, optimize_attachment_upload)
+
+_NOISE = np.random.default_rng(7).integers(0, 255, (200, 200, 3), dtype=np.uint8)
+
+
+def _datasheet(label, with_image=True):
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer)
+    c.drawString(100, 750, label)
+    if with_image:
+        image = io.BytesIO()
+        Image.fromarray(_NOISE).save(image, format="PNG")
+        image.seek(0)
+        c.drawImage(ImageReader(image), 100, 400, width=200, height=200)
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+class TestAttachmentCache:
+    """Test cases for AttachmentCache and append_attachments."""
+
+    def setup_method(self):
+        """Create a fresh cache for every test."""
+        self.cache = AttachmentCache()
+
+    def _write(self, tmp_path, name, data):
+        path = tmp_path / name
+        path.write_bytes(data)
+        return str(path)
+
+    def test_reader_is_reused_until_file_changes(self, tmp_path):
+        """Test that unchanged files hit the cache and modified files are reparsed."""
+        path = self._write(tmp_path, "modul.pdf", _datasheet("Modul"))
+        first = self.cache.get_reader(path)
+        assert self.cache.get_reader(path) is first
+        assert (self.cache.hits, self.cache.misses) == (1, 1)
+
+        self._write(tmp_path, "modul.pdf", _datasheet("Modul v2", with_image=False))
+        second = self.cache.get_reader(path)
+        assert second is not first
+        assert "Modul v2" in second.pages[0].extract_text()
+        assert self.cache.get_stats()['entries'] == 1
+
+    def test_missing_and_broken_files_are_not_cached(self, tmp_path):
+        """Test that unreadable attachments yield None."""
+        broken = self._write(tmp_path, "kaputt.pdf", b"kein pdf")
+        assert self.cache.get_reader(broken) is None
+        assert self.cache.get_reader(str(tmp_path / "fehlt.pdf")) is None
+        assert self.cache.get_stats()['entries'] == 0
+
+    def test_duplicate_paths_are_appended_once(self, tmp_path):
+        """Test that the same datasheet is only appended once per offer."""
+        modul = self._write(tmp_path, "modul.pdf", _datasheet("Modul"))
+        wr = self._write(tmp_path, "wr.pdf", _datasheet("Wechselrichter"))
+        writer = PdfWriter()
+        appended = append_attachments(writer, [modul, wr, modul, str(tmp_path / "fehlt.pdf")], cache=self.cache)
+        assert appended == [modul, wr]
+        assert len(writer.pages) == 2
+
+    def test_shared_images_are_embedded_once(self, tmp_path):
+        """Test that identical images in different datasheets are deduplicated."""
+        paths = [self._write(tmp_path, f"ds{i}.pdf", _datasheet(f"Datenblatt {i}")) for i in range(3)]
+        writer = PdfWriter()
+        append_attachments(writer, paths, cache=self.cache)
+        out = io.BytesIO()
+        writer.write(out)
+        single = len(_datasheet("Datenblatt 0"))
+        assert len(out.getvalue()) < 1.5 * single
+        assert len(PdfReader(io.BytesIO(out.getvalue())).pages) == 3
+
+
+class TestOptimizeAttachment:
+    """Test cases for upload-time optimization."""
+
+    def test_optimized_pdf_keeps_content(self):
+        """Test that optimization never grows the file and keeps pages readable."""
+        original = _datasheet("Speicher")
+        optimized = optimize_attachment_pdf(original)
+        assert len(optimized) <= len(original)
+        assert "Speicher" in PdfReader(io.BytesIO(optimized)).pages[0].extract_text()
+
+    def test_non_pdf_uploads_are_untouched(self):
+        """Test that other files and invalid PDFs pass through unchanged."""
+        assert optimize_attachment_upload("logo.png", b"png") == b"png"
+        assert optimize_attachment_upload("kaputt.pdf", b"kein pdf") == b"kein pdf"
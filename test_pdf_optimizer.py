@@ -0,0 +1,98 @@
+"""
+Tests for the offer PDF size optimizer.
+
+Covers duplicate XObject merging, DPI-based image recompression (JPEG for
+photos, lossless palette images for charts), the email/print profiles and
+the per-category savings report.
+"""
+
+import io
+
+import numpy as np
+from PIL import Image
+from pypdf import PdfReader
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from pdf_template_engine import OfferDocument, optimize_pdf_bytes
+from pdf_template_engine.optimizer import SAVING_CATEGORIES
+
+_RNG = np.random.default_rng(11)
+# Foto-ähnlich: weicher Verlauf mit Rauschen, 900 px auf 1,5 Zoll (= 600 DPI)
+_yy, _xx = np.mgrid[0:900, 0:900]
+PHOTO = np.clip(np.stack([_xx / 4, _yy / 4, (_xx + _yy) / 8], axis=-1) + _RNG.normal(0, 12, (900, 900, 3)), 0, 255).astype(np.uint8)
+# Diagramm-ähnlich: wenige Flächenfarben
+CHART = np.zeros((300, 400, 3), dtype=np.uint8)
+CHART[:, :200] = (27, 54, 112)
+CHART[:, 200:] = (240, 180, 40)
+CHART[100:120, :] = (255, 255, 255)
+
+
+def _pdf_with_image(array, size_pt, pages=1):
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=(595, 842))
+    image = io.BytesIO()
+    Image.fromarray(array).save(image, format="PNG")
+    for _ in range(pages):
+        image.seek(0)
+        c.drawImage(ImageReader(image), 50, 400, width=size_pt[0], height=size_pt[1])
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def _images(pdf_bytes):
+    return [img for page in PdfReader(io.BytesIO(pdf_bytes)).pages for img in page.images]
+
+
+class TestPdfOptimizer:
+    """Test cases for optimize_pdf_bytes and OfferDocument.to_bytes(optimize_profile=...)."""
+
+    def test_photo_is_downsampled_to_profile_dpi(self):
+        """Test that oversized photos become JPEGs at the profile resolution."""
+        original = _pdf_with_image(PHOTO, (108, 108))
+        email, report = optimize_pdf_bytes(original, "email")
+        printed, _ = optimize_pdf_bytes(original, "print")
+
+        assert len(email) < len(printed) < len(original)
+        assert report["images_recompressed"] == 1 and report["saved"]["images"] > 0
+        assert _images(email)[0].image.size == (225, 225)
+        assert _images(printed)[0].image.size == (450, 450)
+        assert _images(email)[0].name.endswith(".jpg")
+
+    def test_chart_colors_are_preserved(self):
+        """Test that charts with few colors stay lossless when downsampled."""
+        original = _pdf_with_image(CHART, (72, 54))
+        optimized, report = optimize_pdf_bytes(original, "email")
+        image = _images(optimized)[0].image.convert("RGB")
+        assert image.size == (150, 112)
+        original_colors = {c for _, c in Image.fromarray(CHART).getcolors()}
+        assert {c for _, c in image.getcolors(256)} <= original_colors | {(255, 255, 255)}
+        assert report["saved"]["images"] > 0
+
+    def test_duplicate_xobjects_are_merged(self):
+        """Test that the same image coming from separate PDFs is stored once."""
+        part = _pdf_with_image(CHART, (400, 300))
+        document = OfferDocument()
+        document.add_pdf(part)
+        document.add_pdf(part)
+        optimized = document.to_bytes(optimize_profile="print")
+        report = document.optimization_report
+
+        assert report["xobjects_merged"] == 1
+        assert report["saved"]["xobject_dedupe"] > 0
+        # Das Bild bleibt erhalten (print, keine Neuabtastung): nur seine ASCII85-Schicht fällt weg
+        assert report["saved"]["ascii85"] > 0
+        assert set(report["saved"]) == set(SAVING_CATEGORIES)
+        reader = PdfReader(io.BytesIO(optimized))
+        refs = {page["/Resources"]["/XObject"].raw_get(name).idnum
+                for page in reader.pages for name in page["/Resources"]["/XObject"]}
+        assert len(reader.pages) == 2 and len(refs) == 1
+
+    def test_unoptimizable_input_is_returned_unchanged(self):
+        """Test that invalid PDFs and files without savings keep their bytes."""
+        assert optimize_pdf_bytes(b"kein pdf")[0] == b"kein pdf"
+        small = _pdf_with_image(CHART[:10, :10], (10, 10))
+        optimized, report = optimize_pdf_bytes(small, "print")
+        assert len(optimized) <= len(small)
+        assert report["bytes_before"] == len(small)
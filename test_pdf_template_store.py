@@ -0,0 +1,146 @@
+"""
+Tests for the blob-backed PDF template store in pdf_template_store.
+
+Covers the one-time migration of the admin_settings lists, metadata-only
+listing, lazy image loading with the hash-keyed cache, reference-counted
+blobs, lists saved through save_admin_setting by older code and the
+round trip through export_admin_settings/import_admin_settings.
+"""
+
+import base64
+import json
+import sqlite3
+
+import pytest
+
+import database
+import pdf_template_store
+
+PNG_A = b"\x89PNG-bild-a" * 50
+PNG_B = b"\x89PNG-bild-b" * 50
+
+
+class TestPdfTemplateStore:
+    """Test cases for list_templates, get_template_image, save_template and delete_template."""
+
+    @pytest.fixture(autouse=True)
+    def template_db(self, tmp_path, monkeypatch):
+        """Use a temporary database holding the old JSON lists."""
+        monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app_data.db"))
+        conn = sqlite3.connect(database.DB_PATH)
+        conn.execute("CREATE TABLE admin_settings (key TEXT PRIMARY KEY, value TEXT, last_modified TEXT)")
+        conn.executemany("INSERT INTO admin_settings (key, value) VALUES (?, ?)", [
+            ("pdf_title_image_templates", json.dumps([
+                {"name": "Dach", "data": base64.b64encode(PNG_A).decode()},
+                {"name": "Dach Kopie", "data": base64.b64encode(PNG_A).decode()},
+                {"name": "Haus", "data": base64.b64encode(PNG_B).decode()},
+            ])),
+            ("pdf_offer_title_templates", json.dumps([{"name": "Standard", "content": "Ihr Angebot"}])),
+        ])
+        conn.commit()
+        conn.close()
+        pdf_template_store.clear_image_cache()
+        yield
+        pdf_template_store.clear_image_cache()
+
+    def _blob_refs(self):
+        conn = sqlite3.connect(database.DB_PATH)
+        try:
+            return dict(conn.execute("SELECT sha256, ref_count FROM pdf_template_blobs").fetchall())
+        finally:
+            conn.close()
+
+    def test_migration_and_metadata_listing(self):
+        """Test that the settings lists move into pdf_templates and listing carries no image data."""
+        images = pdf_template_store.list_templates("title_image")
+        assert [t["name"] for t in images] == ["Dach", "Dach Kopie", "Haus"]
+        assert all("data" not in t and "content" not in t for t in images)
+        assert images[0]["size_bytes"] == len(PNG_A)
+        assert images[0]["content_sha256"] == images[1]["content_sha256"]
+        assert sorted(self._blob_refs().values()) == [1, 2]
+        assert [t["content"] for t in pdf_template_store.list_templates("offer_title")] == ["Ihr Angebot"]
+        assert database.load_admin_setting("pdf_title_image_templates", None) is None
+
+    def test_images_load_lazily_and_are_cached(self, monkeypatch):
+        """Test that images are fetched by ID and repeated reads use the cache."""
+        first = pdf_template_store.list_templates("title_image")[0]
+        assert pdf_template_store.get_template_image(first["id"]) == PNG_A
+        assert pdf_template_store.resolve_template_image(first) == base64.b64encode(PNG_A).decode()
+        assert pdf_template_store.resolve_template_image({"name": "alt", "data": "abc"}) == "abc"
+
+        blob_queries = []
+        original_connect = pdf_template_store._connect
+
+        def tracing_connect():
+            conn = original_connect()
+            conn.set_trace_callback(lambda sql: blob_queries.append(sql) if "pdf_template_blobs" in sql else None)
+            return conn
+
+        monkeypatch.setattr(pdf_template_store, "_connect", tracing_connect)
+        assert pdf_template_store.get_template_image(first["id"]) == PNG_A
+        assert blob_queries == []
+
+    def test_save_and_delete_release_blobs(self):
+        """Test reference counting on update and delete."""
+        dach, kopie, haus = pdf_template_store.list_templates("title_image")
+        assert pdf_template_store.save_template("title_image", "Dach neu", template_id=dach["id"]) == dach["id"]
+        assert pdf_template_store.get_template_image(dach["id"]) == PNG_A
+        assert pdf_template_store.save_template("title_image", "Dach neu", image_data=PNG_B, template_id=dach["id"])
+        assert self._blob_refs() == {kopie["content_sha256"]: 1, haus["content_sha256"]: 2}
+        assert pdf_template_store.delete_template(kopie["id"]) and pdf_template_store.delete_template(haus["id"])
+        assert self._blob_refs() == {haus["content_sha256"]: 1}
+
+        new_id = pdf_template_store.save_template("cover_letter", "Brief", content="Sehr geehrte ...")
+        assert pdf_template_store.get_template(new_id)["content"] == "Sehr geehrte ..."
+
+    def test_list_saved_by_old_code_is_imported(self):
+        """Test that save_admin_setting with a template list replaces that template type."""
+        pdf_template_store.list_templates("title_image")
+        assert database.save_admin_setting("pdf_title_image_templates", [{"name": "Neu", "data": base64.b64encode(PNG_B).decode()}])
+        images = pdf_template_store.list_templates("title_image")
+        assert [t["name"] for t in images] == ["Neu"]
+        assert len(self._blob_refs()) == 1
+        assert pdf_template_store.load_template_list("pdf_title_image_templates")[0]["id"] == images[0]["id"]
+
+    def test_settings_export_round_trip(self):
+        """Test that exported settings carry the templates and importing them restores the table."""
+        pdf_template_store.save_template("cover_letter", "Brief", content="Sehr geehrte ...")
+        exported = database.export_admin_settings()
+        assert [t["name"] for t in exported["pdf_title_image_templates"]] == ["Dach", "Dach Kopie", "Haus"]
+        assert exported["pdf_title_image_templates"][2]["data"] == base64.b64encode(PNG_B).decode()
+        assert exported["pdf_offer_title_templates"] == [{"name": "Standard", "content": "Ihr Angebot"}]
+        assert exported["pdf_cover_letter_templates"] == [{"name": "Brief", "content": "Sehr geehrte ..."}]
+
+        for template in pdf_template_store.list_templates("title_image"):
+            pdf_template_store.delete_template(template["id"])
+        assert database.import_admin_settings(json.loads(json.dumps(exported)))
+        images = pdf_template_store.list_templates("title_image")
+        assert [t["name"] for t in images] == ["Dach", "Dach Kopie", "Haus"]
+        assert pdf_template_store.get_template_image(images[2]["id"]) == PNG_B
+        assert database.load_admin_setting("pdf_title_image_templates", None) is None
+
+    def test_unmigrated_list_is_kept_as_backup(self):
+        """Test that a list for an already populated type is renamed instead of deleted."""
+        pdf_template_store.list_templates("offer_title")
+        conn = sqlite3.connect(database.DB_PATH)
+        conn.execute("INSERT INTO admin_settings (key, value) VALUES (?, ?)",
+                     ("pdf_offer_title_templates", json.dumps([{"name": "Alt", "content": "Altes Angebot"}])))
+        conn.commit()
+        conn.close()
+        pdf_template_store._ENSURED_DATABASES.discard(database.DB_PATH)
+
+        assert [t["name"] for t in pdf_template_store.list_templates("offer_title")] == ["Standard"]
+        conn = sqlite3.connect(database.DB_PATH)
+        try:
+            keys = dict(conn.execute("SELECT key, value FROM admin_settings").fetchall())
+        finally:
+            conn.close()
+        assert "pdf_offer_title_templates" not in keys
+        assert json.loads(keys["pdf_offer_title_templates_legacy_backup"])[0]["name"] == "Alt"
+
+    def test_fallback_loader_when_table_unreachable(self, monkeypatch):
+        """Test that load_template_list falls back to the old setting if the table cannot be read."""
+        monkeypatch.setattr(pdf_template_store, "_connect", lambda: None)
+        fallback = lambda key, default: [{"name": "Aus Einstellungen"}] if key == "pdf_offer_title_templates" else default
+        assert pdf_template_store.load_template_list("pdf_offer_title_templates", fallback) == [{"name": "Aus Einstellungen"}]
+        assert pdf_template_store.list_templates("offer_title") == []
@@ -0,0 +1,117 @@
+"""
+Tests for the compiled binary price-matrix store in matrix_loader.
+
+Covers the round trip through the .npy/.json format, memory-mapped loading
+without re-parsing the source, unsaved upload previews, the bounded in-memory
+cache and pruning of entries for removed sources.
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+
+import matrix_loader
+from matrix_loader import MatrixLoader
+
+
+CSV_DATA = """Anzahl Module;BYD Battery-Box Premium LVS 4.0;Huawei LUNA2000-5kWh;Ohne Speicher
+7;13.711,80;13.511,80;10.711,80
+8;13.911,80;;10.911,80
+9;14.111,80;13.911,80;11.111,80"""
+
+
+def _excel_bytes():
+    df = pd.DataFrame({
+        'Anzahl Module': [7, 8, 9],
+        'BYD Battery-Box Premium LVS 4.0': [13711.80, 13911.80, 14111.80],
+        'Ohne Speicher': [10711.80, 10911.80, 11111.80],
+    })
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+class TestPriceMatrixStore:
+    """Test cases for save_compiled_matrix, load_compiled_matrix and MatrixLoader(compiled_dir=...)."""
+
+    def test_round_trip_preserves_labels_and_dtypes(self, tmp_path):
+        """Test that values, NaN, labels and non-float dtypes survive the binary format."""
+        df = pd.DataFrame({'A': [1.5, np.nan], 'B': [2, 3], 'Ohne Speicher': [4.25, 5.0]}, index=[7, 8])
+        df.index.name = 'Anzahl Module'
+        matrix_loader.save_compiled_matrix(tmp_path, "abc", df, "CSV", ["Hinweis"])
+
+        loaded, source, errors = matrix_loader.load_compiled_matrix(tmp_path, "abc")
+        pd.testing.assert_frame_equal(loaded, df)
+        assert (source, errors) == ("CSV", ["Hinweis"])
+        assert matrix_loader.load_compiled_matrix(tmp_path, "fehlt") is None
+
+    def test_second_loader_memory_maps_without_parsing(self, tmp_path, monkeypatch):
+        """Test that a cold loader reads the compiled matrix instead of parsing CSV or Excel."""
+        excel_bytes = _excel_bytes()
+        first = MatrixLoader(compiled_dir=tmp_path)
+        csv_df, _, _ = first.load_matrix(csv_data=CSV_DATA)
+        excel_df, _, _ = first.load_matrix(excel_bytes=excel_bytes)
+        assert csv_df is not None and excel_df is not None
+        csv_errors = first.load_matrix(csv_data=CSV_DATA)[2]
+        assert len(list(tmp_path.glob("*.npy"))) == 2
+
+        def no_parsing(*args, **kwargs):
+            raise AssertionError("source must not be parsed again")
+
+        monkeypatch.setattr(MatrixLoader, "_parse_csv", no_parsing)
+        monkeypatch.setattr(MatrixLoader, "_parse_excel", no_parsing)
+        second = MatrixLoader(compiled_dir=tmp_path)
+        mapped_df, source, errors = second.load_matrix(csv_data=CSV_DATA)
+        pd.testing.assert_frame_equal(mapped_df, csv_df)
+        assert (source, errors) == ("CSV", csv_errors)
+        mapped_excel, source, _ = second.load_matrix(excel_bytes=excel_bytes)
+        pd.testing.assert_frame_equal(mapped_excel, excel_df)
+        assert source == "Excel"
+
+        values = mapped_df.to_numpy()
+        assert isinstance(values.base, np.memmap) or not values.flags.writeable
+
+    def test_prune_keeps_current_sources(self, tmp_path):
+        """Test that compile_matrix persists and prune_compiled removes stale entries."""
+        loader = MatrixLoader(compiled_dir=tmp_path)
+        old_csv = CSV_DATA.replace("13.711,80", "13.000,00")
+        assert loader.compile_matrix(csv_data=old_csv)[0]
+        assert loader.compile_matrix(csv_data=CSV_DATA)[0]
+        assert len(list(tmp_path.glob("*.json"))) == 2
+
+        keep = loader.source_hashes(csv_data=CSV_DATA)
+        assert loader.prune_compiled(keep) == 1
+        assert sorted(p.stem for p in tmp_path.iterdir()) == [keep[0], keep[0]]
+
+    def test_preview_is_compiled_only_when_saved(self, tmp_path):
+        """Test that persist=False leaves no files and compile_matrix writes the cached preview."""
+        loader = MatrixLoader(compiled_dir=tmp_path)
+        df, _, _ = loader.load_matrix(csv_data=CSV_DATA, persist=False)
+        assert df is not None
+        assert list(tmp_path.iterdir()) == []
+
+        assert loader.compile_matrix(csv_data=CSV_DATA)[0]
+        keep = loader.source_hashes(csv_data=CSV_DATA)
+        assert sorted(p.name for p in tmp_path.iterdir()) == [f"{keep[0]}.json", f"{keep[0]}.npy"]
+
+    def test_memory_cache_drops_least_recently_used(self):
+        """Test that the in-memory cache keeps at most max_entries matrices."""
+        loader = MatrixLoader(max_entries=2)
+        sources = [CSV_DATA.replace("13.711,80", f"13.{n}00,00") for n in range(3)]
+        loader.load_matrix(csv_data=sources[0])
+        loader.load_matrix(csv_data=sources[1])
+        loader.load_matrix(csv_data=sources[0])
+        loader.load_matrix(csv_data=sources[2])
+        cached = [entry["hash"] for entry in loader.get_cache_info()["entries"]]
+        expected = [loader.source_hashes(csv_data=sources[n])[0][:8] + "..." for n in (0, 2)]
+        assert cached == expected
+
+    def test_without_compiled_dir_nothing_is_written(self, tmp_path, monkeypatch):
+        """Test that the default loader keeps the previous in-memory behaviour."""
+        monkeypatch.chdir(tmp_path)
+        loader = MatrixLoader()
+        df, _, _ = loader.load_matrix(csv_data=CSV_DATA)
+        assert df is not None
+        assert loader.prune_compiled([]) == 0
+        assert list(tmp_path.iterdir()) == []
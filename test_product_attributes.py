@@ -0,0 +1,113 @@
+"""
+Tests for the product attribute store in product_attributes.
+
+Covers the pivoted bulk fetch, the process cache and its invalidation by
+upsert_attribute, bulk_upsert and delete_attribute (and by writes from other
+processes), and the precompiled module alias index.
+"""
+
+import sqlite3
+
+import pytest
+
+import database
+import product_attributes
+
+
+class TestProductAttributes:
+    """Test cases for get_attributes_bulk, the attribute cache and get_module_alias_index."""
+
+    @pytest.fixture(autouse=True)
+    def attributes_db(self, tmp_path, monkeypatch):
+        """Use a temporary database and count opened connections."""
+        monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app_data.db"))
+        conn = sqlite3.connect(database.DB_PATH)
+        conn.execute("CREATE TABLE admin_settings (key TEXT PRIMARY KEY, value TEXT, last_modified TEXT)")
+        conn.close()
+        self.connections = 0
+        original = product_attributes.get_db_connection
+
+        def counting_connection():
+            self.connections += 1
+            return original()
+
+        monkeypatch.setattr(product_attributes, "get_db_connection", counting_connection)
+        product_attributes.bulk_upsert(1, "Modul", [
+            ("cell_technology", "N-Type TOPCon", None, 2),
+            ("Zelltyp", "Halbzellen", None, 1),
+        ])
+        product_attributes.upsert_attribute(2, "Wechselrichter", "phasen", "3")
+        yield
+        product_attributes.invalidate_attribute_cache()
+        product_attributes.invalidate_alias_index()
+
+    def test_bulk_fetch_returns_pivot(self):
+        """Test the pivot for several products, key filtering and invalid ids."""
+        pivot = product_attributes.get_attributes_bulk([1, "2", 3, None, "x", 1])
+        assert pivot == {
+            1: {"Zelltyp": "Halbzellen", "cell_technology": "N-Type TOPCon"},
+            2: {"phasen": "3"},
+            3: {},
+        }
+        assert list(pivot[1]) == ["Zelltyp", "cell_technology"]
+        assert product_attributes.get_attributes_bulk([1, 2], keys=["phasen"]) == {1: {}, 2: {"phasen": "3"}}
+
+    def test_reads_are_cached_until_written(self):
+        """Test that lookups after a bulk fetch need no connection and writes invalidate the product."""
+        product_attributes.get_attributes_bulk([1, 2])
+        opened = self.connections
+        assert product_attributes.get_attribute_value(1, "cell_technology") == "N-Type TOPCon"
+        assert product_attributes.get_attribute(2, "phasen")["product_id"] == 2
+        assert [a["attribute_key"] for a in product_attributes.list_attributes(1)] == ["Zelltyp", "cell_technology"]
+        assert product_attributes.get_attribute_value(1, "fehlt") is None
+        assert self.connections == opened
+
+        product_attributes.upsert_attribute(1, "Modul", "cell_technology", "HJT")
+        assert product_attributes.get_attribute_value(1, "cell_technology") == "HJT"
+        assert product_attributes.list_attributes(1)[1]["display_order"] == 2
+        attr_id = product_attributes.get_attribute(2, "phasen")["id"]
+        assert product_attributes.delete_attribute(attr_id)
+        assert product_attributes.get_attributes_bulk([2]) == {2: {}}
+
+    def test_raw_sql_write_is_seen_after_revalidation(self, monkeypatch):
+        """Test that a write bypassing this module (e.g. another process) replaces the cached rows."""
+        monkeypatch.setattr(product_attributes, "_REVALIDATE_SECONDS", 0.0)
+        assert product_attributes.get_attribute_value(2, "phasen") == "3"
+        conn = sqlite3.connect(database.DB_PATH)
+        conn.execute("UPDATE product_attributes SET attribute_value = '1', updated_at = '2999-01-01' WHERE product_id = 2")
+        conn.commit()
+        conn.close()
+        assert product_attributes.get_attribute_value(2, "phasen") == "1"
+        opened = self.connections
+        assert product_attributes.get_attribute_value(2, "phasen") == "1"
+        assert self.connections == opened
+
+    def test_rows_loaded_across_invalidation_are_not_cached(self, monkeypatch):
+        """Test that rows read while the cache is invalidated are returned but not stored."""
+        original = product_attributes.get_db_connection
+
+        def invalidating_connection():
+            conn = original()
+            product_attributes.invalidate_attribute_cache(1)
+            return conn
+
+        monkeypatch.setattr(product_attributes, "get_db_connection", invalidating_connection)
+        assert product_attributes.get_attribute_value(1, "Zelltyp") == "Halbzellen"
+        assert (database.DB_PATH, 1) not in product_attributes._ATTRIBUTE_CACHE
+
+    def test_returned_records_do_not_alias_cache(self):
+        """Test that callers modifying returned records do not change cached values."""
+        product_attributes.list_attributes(1)[0]["attribute_value"] = "geändert"
+        product_attributes.get_attribute(1, "Zelltyp")["attribute_value"] = "geändert"
+        assert product_attributes.get_attribute_value(1, "Zelltyp") == "Halbzellen"
+
+    def test_alias_index_rebuilt_after_save(self):
+        """Test that the alias index is built once and replaced when the alias map is saved."""
+        assert database.save_admin_setting("module_pdf_alias_map", {" Zellen  Typ ": "cell_type", "Typ": "Cell_Type"})
+        index = product_attributes.get_module_alias_index()
+        assert index.aliases_for("cell type") == [] and index.aliases_for("cell_type") == ["Zellen  Typ", "Typ"]
+        assert index.by_alias["zellen typ"] == "cell_type"
+        assert product_attributes.get_module_alias_index() is index
+
+        assert database.save_admin_setting("module_pdf_alias_map", {"Aufbau": "module_structure"})
+        assert product_attributes.get_module_alias_index().aliases_for("module_structure") == ["Aufbau"]
@@ -0,0 +1,121 @@
+"""
+Tests for the content-hash index cache of tools/repo_porter.
+
+Covers reuse of cached module indexes across scans and trees, re-parsing of
+changed files only, parallel parsing and unchanged compute_missing results.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools"))
+
+import repo_porter
+
+SRC_MODULE = '''"""Modul."""
+import os
+
+
+def helper(a, *args, **kw):
+    return os.path.join(a)
+
+
+class Rechner:
+    def summe(self, x):
+        return helper(x)
+
+    def neu(self):
+        return 1
+'''
+
+DST_MODULE = '''"""Modul."""
+import os
+
+
+class Rechner:
+    def summe(self, x):
+        return x
+'''
+
+
+class TestRepoPorterIndexCache:
+    """Test cases for index_repo with cache_dir and compute_missing on cached indexes."""
+
+    @pytest.fixture(autouse=True)
+    def trees(self, tmp_path, monkeypatch):
+        """Create a source and a target tree sharing one identical module."""
+        self.src = tmp_path / "src"
+        self.dst = tmp_path / "dst"
+        self.cache_dir = tmp_path / "cache"
+        for root, module in ((self.src, SRC_MODULE), (self.dst, DST_MODULE)):
+            (root / "pkg").mkdir(parents=True)
+            (root / "pkg" / "rechner.py").write_text(module, encoding="utf-8")
+            (root / "pkg" / "gemeinsam.py").write_text("def gemeinsam():\n    pass\n", encoding="utf-8")
+        (self.src / "kaputt.py").write_text("def (:\n", encoding="utf-8")
+
+        self.parsed = []
+        original_parse = repo_porter.parse_module
+
+        def counting_parse(text, mod_rel):
+            self.parsed.append(mod_rel)
+            return original_parse(text, mod_rel)
+
+        monkeypatch.setattr(repo_porter, "parse_module", counting_parse)
+
+    def _missing(self, cache_dir):
+        src = repo_porter.index_repo(self.src, cache_dir=cache_dir)
+        dst = repo_porter.index_repo(self.dst, cache_dir=cache_dir)
+        missing, report = repo_porter.compute_missing(src, dst)
+        return [(m.module_rel, m.kind, m.qualname, m.dst_anchor_line, m.anchor_context_before) for m in missing], report
+
+    def test_cached_scan_matches_uncached_and_skips_parsing(self):
+        """Test that a second scan reads every module, including broken ones, from the cache."""
+        expected = self._missing(None)
+        context = "class Rechner:\n    def summe(self, x):\n        return x"
+        assert expected[0] == [
+            ("pkg/rechner.py", "func", "helper", 7, context),
+            ("pkg/rechner.py", "method", "Rechner.neu", 7, context),
+        ]
+        self.parsed.clear()
+
+        assert self._missing(self.cache_dir) == expected
+        # gemeinsam.py ist in beiden Bäumen identisch und wird nur einmal geparst
+        assert sorted(self.parsed) == ["kaputt.py", "pkg/gemeinsam.py", "pkg/rechner.py", "pkg/rechner.py"]
+        self.parsed.clear()
+
+        assert self._missing(self.cache_dir) == expected
+        assert self.parsed == []
+
+        dst = repo_porter.index_repo(self.dst, cache_dir=self.cache_dir)
+        helper = repo_porter.index_repo(self.src, cache_dir=self.cache_dir)["pkg/rechner.py"].top_funcs["helper"]
+        assert helper.signature_hint == "(a, *args, **kw)" and "os" in helper.depends_on_local
+        assert dst["pkg/gemeinsam.py"].file_path == self.dst / "pkg" / "gemeinsam.py"
+        assert dst["pkg/rechner.py"].src_lines == DST_MODULE.splitlines()
+
+    def test_changed_file_is_reparsed(self):
+        """Test that editing a file invalidates only its own cache entry."""
+        repo_porter.index_repo(self.dst, cache_dir=self.cache_dir)
+        self.parsed.clear()
+        (self.dst / "pkg" / "rechner.py").write_text(DST_MODULE + "\n    def neu(self):\n        return 2\n",
+                                                    encoding="utf-8")
+        dst = repo_porter.index_repo(self.dst, cache_dir=self.cache_dir)
+        assert self.parsed == ["pkg/rechner.py"]
+        assert ("Rechner", "neu") in dst["pkg/rechner.py"].methods
+
+    def test_duplicate_content_is_bound_per_module(self, monkeypatch):
+        """Test that identical files in one tree and parallel parsing yield separate module indexes."""
+        monkeypatch.setattr(repo_porter, "PARALLEL_MIN_FILES", 2)
+        for i in range(3):
+            (self.src / f"kopie_{i}.py").write_text(SRC_MODULE + f"\nWERT = {i}\n", encoding="utf-8")
+        (self.src / "kopie_gleich.py").write_text(SRC_MODULE, encoding="utf-8")
+
+        parallel = repo_porter.index_repo(self.src, cache_dir=self.cache_dir, workers=2)
+        serial = repo_porter.index_repo(self.src)
+        assert sorted(parallel) == sorted(serial)
+        a = parallel["pkg/rechner.py"].top_funcs["helper"]
+        b = parallel["kopie_gleich.py"].top_funcs["helper"]
+        assert a is not b
+        assert (a.module_rel, b.module_rel) == ("pkg/rechner.py", "kopie_gleich.py")
+        assert parallel["kopie_1.py"].methods[("Rechner", "neu")].lineno == serial["kopie_1.py"].methods[("Rechner", "neu")].lineno
@@ -0,0 +1,111 @@
+"""
+Tests for offloading large session-state values in session_blob_store.
+
+Covers transparent access through LazyBlobDict, blob sharing between the
+results and backup slots, aliases of an offloaded dict, the per-session
+quota, TTL-based expiry (None from .get, BlobExpiredError on direct access)
+and reuse of blobs for unchanged objects across reruns.
+"""
+
+import copy
+import os
+
+import pandas as pd
+import pytest
+
+import session_blob_store
+from session_blob_store import BlobExpiredError, BlobHandle, LazyBlobDict, SessionBlobStore, offload_session_value
+
+CHART = b"\x89PNG-chart" * 10000
+
+
+class TestSessionBlobStore:
+    """Test cases for offload_session_value, SessionBlobStore slots, quota and purge_expired."""
+
+    @pytest.fixture(autouse=True)
+    def blob_store(self, tmp_path, monkeypatch):
+        """Use a store below a temporary directory."""
+        self.store = SessionBlobStore(root_dir=str(tmp_path), memory_budget_bytes=1024 * 1024,
+                                      session_quota_bytes=1024 * 1024)
+        monkeypatch.setattr(session_blob_store, "_store", self.store)
+
+    def _files(self, session_id="s1"):
+        path = self.store._session_dir(session_id)
+        return sorted(os.listdir(path)) if os.path.isdir(path) else []
+
+    def test_results_dict_resolves_transparently(self):
+        """Test that chart bytes are replaced by handles but readers see the original values."""
+        results = {"anlage_kwp": 9.5, "monthly_prod_sim_kwh": [800.0] * 12, "yearly_production_chart_bytes": CHART}
+        stored = offload_session_value("calculation_results", results, session_id="s1")
+        assert isinstance(stored, LazyBlobDict)
+        assert isinstance(dict.__getitem__(stored, "yearly_production_chart_bytes"), BlobHandle)
+        assert stored.get("yearly_production_chart_bytes") == CHART
+        assert stored["anlage_kwp"] == 9.5
+        assert dict(stored) == results == {**stored} == copy.deepcopy(stored)
+        assert stored.copy().raw_items() == stored.raw_items()
+        assert len(self._files()) == 1
+
+    def test_backup_shares_blobs_and_slots_release_them(self):
+        """Test that a backup copy reuses the blob and it is deleted only when no slot holds it."""
+        results = offload_session_value("calculation_results", {"chart_bytes": CHART}, session_id="s1")
+        backup = offload_session_value("calculation_results_backup", {"results": results.copy()}, session_id="s1")
+        assert backup["results"]["chart_bytes"] == CHART
+        assert len(self._files()) == 1
+
+        offload_session_value("calculation_results", {"chart_bytes": CHART + b"neu"}, session_id="s1")
+        assert len(self._files()) == 2
+        self.store.release_slot("s1", "calculation_results_backup")
+        assert len(self._files()) == 1
+        assert backup["results"].get("chart_bytes") is None
+        assert backup["results"].get("chart_bytes", "weg") == "weg"
+        with pytest.raises(BlobExpiredError):
+            backup["results"]["chart_bytes"]
+
+    def test_alias_slot_keeps_blobs_after_source_is_recomputed(self):
+        """Test that a dict re-registered under another slot survives reassignment of the source slot."""
+        results = offload_session_value("calculation_results", {"chart_bytes": CHART}, session_id="s1")
+        alias = offload_session_value("analysis_results", results, session_id="s1")
+        offload_session_value("calculation_results", {"chart_bytes": CHART + b"neu"}, session_id="s1")
+        assert alias["chart_bytes"] == CHART
+        assert results.get("chart_bytes") == CHART
+
+    def test_unchanged_object_is_not_serialized_again(self, monkeypatch):
+        """Test that re-offloading the same object on a rerun reuses its handle without pickling."""
+        df = pd.DataFrame({"jahr": range(5000), "ertrag": [1.5] * 5000})
+        first = offload_session_value("cashflow", {"df": df}, session_id="s1")
+        dumps = []
+        real_dumps = session_blob_store.pickle.dumps
+        monkeypatch.setattr(session_blob_store.pickle, "dumps", lambda *a, **k: dumps.append(1) or real_dumps(*a, **k))
+
+        second = offload_session_value("cashflow", {"df": df}, session_id="s1")
+        assert dumps == []
+        assert dict.__getitem__(second, "df") == dict.__getitem__(first, "df")
+        offload_session_value("cashflow", {"df": df.copy()}, session_id="s1")
+        assert dumps == [1]
+
+    def test_quota_evicts_least_recently_used(self):
+        """Test that a session over quota drops its oldest blobs first."""
+        handles = [self.store.put("s1", bytes([i]) * 400 * 1024) for i in range(3)]
+        assert self.store.session_usage("s1") <= self.store.session_quota_bytes
+        with pytest.raises(BlobExpiredError, match="abgelaufen"):
+            handles[0].resolve()
+        assert handles[2].resolve() == bytes([2]) * 400 * 1024
+
+    def test_expired_sessions_are_purged(self):
+        """Test that inactive sessions lose their files after the TTL."""
+        handle = self.store.put("s1", CHART)
+        self.store.put("s2", CHART)
+        later = self.store._last_access["s1"] + self.store.ttl_seconds + 1
+        self.store._last_access["s2"] = later
+        assert self.store.purge_expired(now=later) == ["s1"]
+        assert self._files("s1") == [] and self._files("s2")
+        assert handle.resolve("weg") == "weg"
+        with pytest.raises(BlobExpiredError):
+            LazyBlobDict({"hourly": handle})["hourly"]
+
+    def test_dataframe_round_trip_from_disk(self):
+        """Test that pickled values survive eviction from the memory cache."""
+        df = pd.DataFrame({"jahr": range(5000), "ertrag": [1.5] * 5000})
+        stored = offload_session_value("cashflow", {"df": df}, session_id="s1")
+        self.store._forget("s1", dict.__getitem__(stored, "df").key)
+        pd.testing.assert_frame_equal(stored["df"], df)
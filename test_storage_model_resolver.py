@@ -219,6 +219,133 @@ class TestStorageModelResolver:
         assert result == "Ohne Speicher"
 
 
+class TestSharedResolutionCache:
+    """Test cases for the process-wide, catalog-versioned cache."""
+
+    def setup_method(self):
+        """Set up a counting product lookup and a clean shared cache."""
+        StorageModelResolver().clear_cache()
+        self.calls = []
+        self.products = {
+            7: {"id": 7, "model_name": "BYD HVS 10.2", "category": "Batteriespeicher"},
+            8: {"id": 8, "model_name": "Sonnen eco 10", "category": "Batteriespeicher"},
+        }
+
+    def get_product(self, product_id: int) -> Optional[Dict[str, Any]]:
+        """Counting product lookup."""
+        self.calls.append(product_id)
+        return self.products.get(product_id)
+
+    def test_cache_is_shared_between_instances(self):
+        """Test that a new resolver instance reuses earlier resolutions."""
+        StorageModelResolver().resolve_storage_name("7", True, self.get_product)
+        assert StorageModelResolver().resolve_storage_name("7", True, self.get_product) == "BYD HVS 10.2"
+        assert self.calls == [7]
+        stats = StorageModelResolver().get_cache_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_catalog_write_invalidates_entries(self, tmp_path, monkeypatch):
+        """Test that a raw SQL product write (no product_db call) forces a fresh lookup."""
+        import sqlite3
+        product_db = pytest.importorskip("product_db")
+        import database
+
+        db_path = str(tmp_path / "app_data.db")
+        monkeypatch.setattr(database, "DB_PATH", db_path)
+        monkeypatch.setattr(product_db, "_CATALOG_VERSION_TTL_SECONDS", 0.0)
+        conn = sqlite3.connect(db_path)
+        product_db.create_product_table(conn)
+        conn.execute("INSERT INTO products (id, category, model_name) VALUES (7, 'Batteriespeicher', 'BYD HVS 10.2')")
+        conn.commit()
+
+        resolver = StorageModelResolver()
+        resolver.resolve_storage_name("7", True, self.get_product)
+        self.products[7]["model_name"] = "BYD HVS 12.8"
+        conn.execute("UPDATE products SET model_name = 'BYD HVS 12.8' WHERE id = 7")
+        conn.commit()
+        conn.close()
+
+        assert resolver.resolve_storage_name("7", True, self.get_product) == "BYD HVS 12.8"
+        assert self.calls == [7, 7]
+        assert resolver.get_cache_stats()["stale_misses"] == 1
+
+    def test_catalog_version_is_read_once_per_ttl(self, tmp_path, monkeypatch):
+        """Test that cached lookups do not hit the database until the TTL expires or a local write bumps it."""
+        product_db = pytest.importorskip("product_db")
+        import database
+
+        monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app_data.db"))
+        monkeypatch.setattr(product_db, "_CATALOG_VERSION_TTL_SECONDS", 60.0)
+        reads = []
+        monkeypatch.setattr(product_db, "_read_catalog_version", lambda path: reads.append(path) or 0)
+        product_db.bump_catalog_version()
+
+        resolver = StorageModelResolver()
+        for _ in range(5):
+            assert resolver.resolve_storage_name("7", True, self.get_product) == "BYD HVS 10.2"
+        assert len(reads) == 1 and self.calls == [7]
+
+        product_db.bump_catalog_version()
+        resolver.resolve_storage_name("7", True, self.get_product)
+        assert len(reads) == 2 and self.calls == [7, 7]
+
+    def test_closures_with_same_qualname_do_not_share_entries(self):
+        """Test that the cache keys on the function object, not its name."""
+        def make_lookup(name):
+            return lambda product_id: {"id": product_id, "model_name": name}
+
+        resolver = StorageModelResolver()
+        first, second = make_lookup("Speicher A"), make_lookup("Speicher B")
+        assert first.__qualname__ == second.__qualname__
+        assert resolver.resolve_storage_name("7", True, first) == "Speicher A"
+        assert resolver.resolve_storage_name("7", True, second) == "Speicher B"
+
+        del first
+        import gc
+        gc.collect()
+        resolver.resolve_storage_name("8", True, second)
+        assert resolver.get_cache_stats()["cache_size"] == 2
+
+    def test_cache_is_bounded(self, monkeypatch):
+        """Test that the least recently used entries are evicted at the cap."""
+        import storage_model_resolver
+
+        monkeypatch.setattr(storage_model_resolver, "_MAX_CACHED_NAMES", 2)
+        resolver = StorageModelResolver()
+        resolver.resolve_storage_name("7", True, self.get_product)
+        resolver.resolve_storage_name("8", True, self.get_product)
+        resolver.resolve_storage_name("7", True, self.get_product)
+        resolver.resolve_storage_name("9", True, self.get_product)
+
+        assert resolver.get_cache_stats()["cache_size"] == 2
+        resolver.resolve_storage_name("7", True, self.get_product)
+        assert self.calls == [7, 8, 9]
+
+    def test_lookup_errors_are_not_cached(self):
+        """Test that a transient lookup error does not stick."""
+        resolver = StorageModelResolver()
+
+        def failing_lookup(product_id):
+            raise Exception("database locked")
+
+        assert resolver.resolve_storage_name("7", True, failing_lookup) == "Ohne Speicher"
+        assert resolver.get_cache_stats()["cache_size"] == 0
+
+    def test_prewarm_and_matrix_columns(self):
+        """Test bulk pre-resolution against the matrix column index."""
+        resolver = StorageModelResolver()
+        columns = ["byd hvs 10.2 ", "Tesla Powerwall 2", "Ohne Speicher"]
+
+        mapping = resolver.prewarm(list(self.products.values()), self.get_product, columns)
+        assert mapping == {7: "byd hvs 10.2 ", 8: "Ohne Speicher"}
+        assert resolver.resolve_storage_name("8", True, self.get_product) == "Sonnen eco 10"
+        assert resolver.resolve_matrix_column("7", True, self.get_product, columns) == ("byd hvs 10.2 ", True)
+        assert resolver.resolve_matrix_column("7", False, self.get_product, columns) == ("Ohne Speicher", False)
+        assert self.calls == []
+        assert resolver.get_cache_stats()["prewarmed"] == 2
+
+
 class TestStorageModelResolverIntegration:
     """Integration tests with real-world scenarios."""
     
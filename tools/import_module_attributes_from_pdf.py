@@ -122,17 +122,10 @@ def _canonical_map() -> Dict[str, str]:
     "modellbezeichnung": "model_name",
     }
     # Optional: konfigurierbare Alias-Mappings aus admin_settings laden und mergen
+    # (Keys wie im Parser normiert: klein + Whitespaces -> 1 Space; Index wird beim Speichern neu gebaut)
     try:
-        from database import load_admin_setting  # type: ignore
-        cfg = load_admin_setting("module_pdf_alias_map", {}) or {}
-        # Normiere Keys wie im Parser (klein + Whitespaces -> 1 Space)
-        norm_cfg: Dict[str, str] = {}
-        for k, v in cfg.items():
-            if not k or not v:
-                continue
-            nk = re.sub(r"\s+", " ", str(k).strip().lower())
-            norm_cfg[nk] = str(v).strip()
-        base.update(norm_cfg)
+        from product_attributes import get_module_alias_index  # type: ignore
+        base.update(get_module_alias_index().by_alias)
     except Exception:
         pass
     return base
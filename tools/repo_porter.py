@@ -11,6 +11,10 @@ und erzeugt:
   - index_src.csv / index_dst.csv    (Symbol-Inventare)
   - report.json                      (Zusammenfassung)
 
+Der Symbol-Index je Datei wird persistent zwischengespeichert (Schlüssel: SHA-256 des Dateiinhalts,
+Default-Ordner tools/.repo_porter_cache bzw. REPO_PORTER_CACHE_DIR). Wiederholte Scans parsen nur
+geänderte Dateien – diese parallel in einem Prozess-Pool (--workers). --no-cache schaltet das ab.
+
 Optional kann 'apply' sichere Fälle automatisch einspielen:
   - Imports (oben, nach Modul-Docstring)
   - Top-Level Funktionen/Klassen
@@ -37,18 +41,27 @@ from __future__ import annotations
 import argparse
 import ast
 import csv
+import hashlib
 import json
 import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 EXCLUDE_DIRS = {
     ".git", "__pycache__", ".mypy_cache", ".pytest_cache", ".env", "env", "venv",
-    "build", "dist", ".idea", ".vscode", ".ipynb_checkpoints"
+    "build", "dist", ".idea", ".vscode", ".ipynb_checkpoints", ".repo_porter_cache"
 }
 PY_EXT = {".py"}
 
+# Index-Cache: bei Änderungen an DefInfo/ModuleIndex oder der Indexierung hochzählen
+INDEX_CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = Path(os.environ.get("REPO_PORTER_CACHE_DIR", Path(__file__).resolve().parent / ".repo_porter_cache"))
+# Unterhalb dieser Anzahl geänderter Dateien lohnt der Prozess-Pool nicht
+PARALLEL_MIN_FILES = 16
+
 # ---------- Datenstrukturen ----------
 
 @dataclass(frozen=True)
@@ -150,80 +163,169 @@ def collect_decorator_lines(n: ast.AST) -> List[int]:
 
 # ---------- Indexierung ----------
 
-def index_repo(root: Path) -> Dict[str, ModuleIndex]:
+def parse_module(text: str, mod_rel: str) -> Optional[ModuleIndex]:
+    """Indexiert einen Modulquelltext; None bei Syntaxfehlern. file_path/src_lines setzt der Aufrufer."""
+    try:
+        tree = ast.parse(text)
+    except Exception:
+        return None
+    imports = collect_import_line_numbers(tree)
+    top_funcs: Dict[str, DefInfo] = {}
+    classes: Dict[str, DefInfo] = {}
+    methods: Dict[Tuple[str, str], DefInfo] = {}
+
+    for n in tree.body:
+        if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            di = DefInfo(
+                kind="func",
+                name=n.name,
+                qualname=n.name,
+                module_rel=mod_rel,
+                lineno=n.lineno if hasattr(n, "lineno") else 1,
+                end_lineno=n.end_lineno if hasattr(n, "end_lineno") else n.lineno,
+                decorators=collect_decorator_lines(n),
+                signature_hint=node_signature(n),
+                parent_class=None,
+                depends_on_local=collect_name_reads(n),
+                import_lines=imports
+            )
+            top_funcs[n.name] = di
+        elif isinstance(n, ast.ClassDef):
+            cinfo = DefInfo(
+                kind="class",
+                name=n.name,
+                qualname=n.name,
+                module_rel=mod_rel,
+                lineno=n.lineno,
+                end_lineno=n.end_lineno if hasattr(n, "end_lineno") else n.lineno,
+                decorators=collect_decorator_lines(n),
+                signature_hint=node_signature(n),
+                parent_class=None,
+                depends_on_local=set(),  # Klassen-Header hat selten Reads
+                import_lines=imports
+            )
+            classes[n.name] = cinfo
+            # Methoden
+            for b in n.body:
+                if isinstance(b, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    mi = DefInfo(
+                        kind="method",
+                        name=b.name,
+                        qualname=f"{n.name}.{b.name}",
+                        module_rel=mod_rel,
+                        lineno=b.lineno,
+                        end_lineno=b.end_lineno if hasattr(b, "end_lineno") else b.lineno,
+                        decorators=collect_decorator_lines(b),
+                        signature_hint=node_signature(b),
+                        parent_class=n.name,
+                        depends_on_local=collect_name_reads(b),
+                        import_lines=imports
+                    )
+                    methods[(n.name, b.name)] = mi
+
+    return ModuleIndex(
+        module_rel=mod_rel,
+        file_path=Path(mod_rel),
+        src_lines=[],
+        top_funcs=top_funcs,
+        classes=classes,
+        methods=methods,
+        imports_line_nos=imports
+    )
+
+def _parse_job(job: Tuple[str, str, str]) -> Tuple[str, Optional[ModuleIndex]]:
+    # Worker für den Prozess-Pool: (sha, mod_rel, text) -> (sha, Index)
+    sha, mod_rel, text = job
+    return sha, parse_module(text, mod_rel)
+
+def _cache_file(cache_dir: Path, sha: str) -> Path:
+    return cache_dir / sha[:2] / f"{sha}.v{INDEX_CACHE_VERSION}.pkl"
+
+def _load_cached(cache_dir: Path, sha: str) -> Tuple[bool, Optional[ModuleIndex]]:
+    """(Treffer, Index) – auch nicht parsebare Dateien werden als Treffer mit None gespeichert."""
+    try:
+        with _cache_file(cache_dir, sha).open("rb") as f:
+            entry = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return False, None
+    if not isinstance(entry, dict) or entry.get("version") != INDEX_CACHE_VERSION:
+        return False, None
+    return True, entry.get("index")
+
+def _store_cached(cache_dir: Path, sha: str, index: Optional[ModuleIndex]) -> None:
+    path = _cache_file(cache_dir, sha)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with tmp.open("wb") as f:
+            pickle.dump({"version": INDEX_CACHE_VERSION, "index": index}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[WARN] Index-Cache nicht schreibbar ({path}): {e}")
+
+def _bind_module(index: ModuleIndex, mod_rel: str, file_path: Path, lines: List[str]) -> ModuleIndex:
+    # Gleicher Inhalt kann unter anderem Pfad (anderes Repo/Modul) im Cache liegen
+    if index.module_rel != mod_rel:
+        index.module_rel = mod_rel
+        for di in list(index.top_funcs.values()) + list(index.classes.values()) + list(index.methods.values()):
+            di.module_rel = mod_rel
+    index.file_path = file_path
+    index.src_lines = lines
+    return index
+
+def index_repo(root: Path, cache_dir: Optional[Path] = None, workers: int = 1) -> Dict[str, ModuleIndex]:
+    """
+    Indexiert alle Python-Dateien unter root.
+
+    Mit cache_dir wird der Index je Dateiinhalt (SHA-256) wiederverwendet; nur geänderte Dateien
+    werden geparst, ab PARALLEL_MIN_FILES Dateien mit 'workers' Prozessen.
+    """
     root = root.resolve()
-    modules: Dict[str, ModuleIndex] = {}
+    files: List[Tuple[str, Path, str, str, List[str]]] = []
     for f in iter_py_files(root):
         try:
-            lines = read_lines(f)
-            text = "\n".join(lines) + ("\n" if lines else "")
-            tree = ast.parse(text)
-        except Exception:
+            raw = f.read_bytes()
+        except OSError:
             continue
-        mod_rel = relpath(f, root)
-        imports = collect_import_line_numbers(tree)
-        top_funcs: Dict[str, DefInfo] = {}
-        classes: Dict[str, DefInfo] = {}
-        methods: Dict[Tuple[str, str], DefInfo] = {}
-
-        for n in tree.body:
-            if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                di = DefInfo(
-                    kind="func",
-                    name=n.name,
-                    qualname=n.name,
-                    module_rel=mod_rel,
-                    lineno=n.lineno if hasattr(n, "lineno") else 1,
-                    end_lineno=n.end_lineno if hasattr(n, "end_lineno") else n.lineno,
-                    decorators=collect_decorator_lines(n),
-                    signature_hint=node_signature(n),
-                    parent_class=None,
-                    depends_on_local=collect_name_reads(n),
-                    import_lines=imports
-                )
-                top_funcs[n.name] = di
-            elif isinstance(n, ast.ClassDef):
-                cinfo = DefInfo(
-                    kind="class",
-                    name=n.name,
-                    qualname=n.name,
-                    module_rel=mod_rel,
-                    lineno=n.lineno,
-                    end_lineno=n.end_lineno if hasattr(n, "end_lineno") else n.lineno,
-                    decorators=collect_decorator_lines(n),
-                    signature_hint=node_signature(n),
-                    parent_class=None,
-                    depends_on_local=set(),  # Klassen-Header hat selten Reads
-                    import_lines=imports
-                )
-                classes[n.name] = cinfo
-                # Methoden
-                for b in n.body:
-                    if isinstance(b, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                        mi = DefInfo(
-                            kind="method",
-                            name=b.name,
-                            qualname=f"{n.name}.{b.name}",
-                            module_rel=mod_rel,
-                            lineno=b.lineno,
-                            end_lineno=b.end_lineno if hasattr(b, "end_lineno") else b.lineno,
-                            decorators=collect_decorator_lines(b),
-                            signature_hint=node_signature(b),
-                            parent_class=n.name,
-                            depends_on_local=collect_name_reads(b),
-                            import_lines=imports
-                        )
-                        methods[(n.name, b.name)] = mi
-
-        modules[mod_rel] = ModuleIndex(
-            module_rel=mod_rel,
-            file_path=f,
-            src_lines=lines,
-            top_funcs=top_funcs,
-            classes=classes,
-            methods=methods,
-            imports_line_nos=imports
-        )
+        lines = raw.decode("utf-8", errors="ignore").splitlines(keepends=False)
+        text = "\n".join(lines) + ("\n" if lines else "")
+        sha = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        files.append((relpath(f, root), f, sha, text, lines))
+
+    parsed: Dict[str, Optional[ModuleIndex]] = {}
+    jobs: Dict[str, Tuple[str, str, str]] = {}
+    for mod_rel, _, sha, text, _ in files:
+        if sha in parsed or sha in jobs:
+            continue
+        if cache_dir is not None:
+            hit, index = _load_cached(cache_dir, sha)
+            if hit:
+                parsed[sha] = index
+                continue
+        jobs[sha] = (sha, mod_rel, text)
+
+    if jobs:
+        if workers > 1 and len(jobs) >= PARALLEL_MIN_FILES:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                results = list(ex.map(_parse_job, jobs.values(), chunksize=max(1, len(jobs) // (workers * 4))))
+        else:
+            results = [_parse_job(job) for job in jobs.values()]
+        for sha, index in results:
+            parsed[sha] = index
+            if cache_dir is not None:
+                _store_cached(cache_dir, sha, index)
+
+    modules: Dict[str, ModuleIndex] = {}
+    bound: Set[str] = set()
+    for mod_rel, f, sha, _, lines in files:
+        index = parsed.get(sha)
+        if index is None:
+            continue
+        if sha in bound:
+            # Identischer Inhalt mehrfach im Baum: eigene Kopie je Modul
+            index = pickle.loads(pickle.dumps(index, protocol=pickle.HIGHEST_PROTOCOL))
+        bound.add(sha)
+        modules[mod_rel] = _bind_module(index, mod_rel, f, lines)
     return modules
 
 # ---------- Vergleich ----------
@@ -264,32 +366,45 @@ def compute_missing(src: Dict[str, ModuleIndex], dst: Dict[str, ModuleIndex]) ->
             report["modules_compared"] += 1
             continue
 
+        # Anker je Zielmodul/-klasse nur einmal bestimmen
+        toplevel_anchor: Optional[Tuple[int, str, str]] = None
+        class_anchors: Dict[str, Tuple[int, str, str]] = {}
+
+        def _toplevel() -> Tuple[int, str, str]:
+            nonlocal toplevel_anchor
+            if toplevel_anchor is None:
+                # Anchor = nach letztem Top-Level-Block in DST
+                anchor = _anchor_after_last_toplevel(dst_mod)
+                toplevel_anchor = (anchor, *_anchor_context(dst_mod.src_lines, anchor))
+            return toplevel_anchor
+
         # Top-Level Funktionen
         for fn, di in src_mod.top_funcs.items():
             if fn not in dst_mod.top_funcs:
-                # Anchor = nach letztem Top-Level-Block in DST
-                anchor = _anchor_after_last_toplevel(dst_mod)
-                ctx_b, ctx_a = _anchor_context(dst_mod.src_lines, anchor)
+                anchor, ctx_b, ctx_a = _toplevel()
                 missing.append(MissingItem(mod_rel, "func", di.qualname, None, di, anchor, "toplevel", ctx_b, ctx_a))
                 report["missing_counts"]["func"] += 1
 
+        # Methoden der SRC-Klassen gruppieren (Reihenfolge bleibt erhalten)
+        src_methods_by_class: Dict[str, List[Tuple[str, DefInfo]]] = {}
+        for (cc, mn), mdi in src_mod.methods.items():
+            src_methods_by_class.setdefault(cc, []).append((mn, mdi))
+
         # Klassen
         for cn, di in src_mod.classes.items():
             if cn not in dst_mod.classes:
-                anchor = _anchor_after_last_toplevel(dst_mod)
-                ctx_b, ctx_a = _anchor_context(dst_mod.src_lines, anchor)
+                anchor, ctx_b, ctx_a = _toplevel()
                 missing.append(MissingItem(mod_rel, "class", di.qualname, None, di, anchor, "toplevel", ctx_b, ctx_a))
                 report["missing_counts"]["class"] += 1
             else:
                 # Methoden vergleichen
-                for (cc, mn), mdi in src_mod.methods.items():
-                    if cc != cn:
-                        continue
-                    if (cc, mn) not in dst_mod.methods:
+                for mn, mdi in src_methods_by_class.get(cn, []):
+                    if (cn, mn) not in dst_mod.methods:
                         # Anchor = nach letzter Methode in dieser Klasse
-                        cls = dst_mod.classes[cn]
-                        anchor = _anchor_after_class_body(dst_mod, cls)
-                        ctx_b, ctx_a = _anchor_context(dst_mod.src_lines, anchor)
+                        if cn not in class_anchors:
+                            anchor = _anchor_after_class_body(dst_mod, dst_mod.classes[cn])
+                            class_anchors[cn] = (anchor, *_anchor_context(dst_mod.src_lines, anchor))
+                        anchor, ctx_b, ctx_a = class_anchors[cn]
                         missing.append(MissingItem(mod_rel, "method", mdi.qualname, cn, mdi, anchor, "method", ctx_b, ctx_a))
                         report["missing_counts"]["method"] += 1
 
@@ -364,8 +479,10 @@ def cmd_scan(args: argparse.Namespace) -> None:
     out_root = Path(args.out).resolve()
     out_root.mkdir(parents=True, exist_ok=True)
 
-    idx_src = index_repo(src_root)
-    idx_dst = index_repo(dst_root)
+    cache_dir = None if args.no_cache else Path(args.cache_dir).resolve()
+    workers = max(1, int(args.workers or 1))
+    idx_src = index_repo(src_root, cache_dir=cache_dir, workers=workers)
+    idx_dst = index_repo(dst_root, cache_dir=cache_dir, workers=workers)
 
     # Inventare
     rows_src = []
@@ -606,6 +723,9 @@ def main():
     aps.add_argument("--src", required=True, help="Pfad zum erweiterten Repo (Repo 2, A..X)")
     aps.add_argument("--dst", required=True, help="Pfad zum Basis-Repo (Repo 1, A..T)")
     aps.add_argument("--out", required=True, help="Ausgabeordner für Patches/CSV/Report")
+    aps.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="Ordner für den Symbol-Index-Cache (je Dateiinhalt)")
+    aps.add_argument("--no-cache", action="store_true", help="Index-Cache weder lesen noch schreiben")
+    aps.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Prozesse zum Parsen geänderter Dateien")
 
     apa = sub.add_parser("apply", help="Patches in DST einspielen (sichere Fälle)")
     apa.add_argument("--dst", required=True, help="Pfad zum Basis-Repo (Ziel)")